@@ -150,6 +150,17 @@ IF(USE_DNNL)
     LIST(APPEND SINGA_LINKER_LIBS ${DNNL_LIBRARIES})
 ENDIF()
 
+IF(USE_OPENMP)
+    FIND_PACKAGE(OpenMP)
+    IF(OPENMP_FOUND)
+        MESSAGE(STATUS "Found OpenMP with flags ${OpenMP_CXX_FLAGS}")
+        SET(CMAKE_CXX_FLAGS "${CMAKE_CXX_FLAGS} ${OpenMP_CXX_FLAGS}")
+    ELSE()
+        MESSAGE(STATUS "OpenMP not found, the native cpu kernels are single threaded")
+        SET(USE_OPENMP OFF)
+    ENDIF()
+ENDIF()
+
 IF(USE_DIST)
     FIND_PATH(MPI_INCLUDE_DIR NAME "mpi.h" PATHS "$ENV{HOME}/mpich-3.3.2/build/include/")
     FIND_LIBRARY(MPI_LIBRARIES NAME "mpi" PATHS "$ENV{HOME}/mpich-3.3.2/build/lib")
@@ -60,6 +60,7 @@ typedef struct _Opencl {
 }  // namespace lang
 
 class Device;
+class Graph;
 /// Block represent a chunk of memory (on device or host).
 class Block {
  public:
@@ -67,6 +68,17 @@ class Block {
       : data_(ptr), size_(size), offset_(offset), device_(device) {
     ref_count_ = 1;  // std::make_shared<std::atomic<int>>(1);
   }
+  /// Wrap the initialized memory 'ptr' owned by 'owner', e.g., a numpy array,
+  /// without copying. The memory is never freed by the device; 'owner' is
+  /// released when the block is deleted.
+  Block(void* ptr, size_t size, Device* device, std::shared_ptr<void> owner)
+      : data_(ptr),
+        size_(size),
+        initialized_(true),
+        device_(device),
+        owner_(owner) {
+    ref_count_ = 1;
+  }
   // Disabled as it is not used currently.
   // Block(void* ptr, size_t size, size_t offset, std::shared_ptr<atomic<int>>
   //  ref) : data_(ptr), size_(size), offset_(offset), ref_count_(ref) {}
@@ -84,16 +96,28 @@ class Block {
 
   bool initialized() const { return initialized_; }
 
+  /// Return true if the memory is owned by others, i.e., not by the device
+  bool external() const { return owner_ != nullptr; }
+
+  /// A globally unique number which is updated whenever the data may be
+  /// written, i.e., when mutable_data() is called. It is used to check if the
+  /// data derived from this block (e.g., reordered weights) is out of date.
+  size_t version() const { return version_.load(); }
+
  private:
+  friend Graph;
+
   Block() {}
   void* data_ = nullptr;
   size_t size_ = 0;
   size_t offset_ = 0;
   bool initialized_ = false;
   Device* device_ = nullptr;
+  std::shared_ptr<void> owner_ = nullptr;
   // Disabled as it is not used currently.
   // std::shared_ptr<std::atomic<int>> ref_count_ = nullptr;
   std::atomic<int> ref_count_;
+  std::atomic<size_t> version_{0};
 };
 
 typedef struct _Context {
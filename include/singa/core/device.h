@@ -73,6 +73,9 @@ class Device {
   /// Called by Tensor.
   Block* NewBlock(int size);
 
+  /// Called by Tensor to share the memory 'ptr' owned by 'owner'.
+  Block* NewBlock(void* ptr, size_t size, std::shared_ptr<void> owner);
+
   /// Called by Tensor.
   void FreeBlock(Block* block);
 
@@ -97,6 +100,18 @@ class Device {
 
   void ResetGraph() { graph_->Reset(); }
 
+  /// Assign the memory of the intermediate blocks of the graph from one
+  /// arena according to their lifetime, instead of allocating them one by one.
+  /// It has no effect when the graph runs on multiple executors.
+  void EnableMemoryPlan(bool enable) { graph_->EnableMemoryPlan(enable); }
+
+  /// Return the size (bytes) of the arena planned for intermediate blocks.
+  size_t GetPlannedPeakMemory() { return graph_->GetPlannedPeakMemory(); }
+
+  /// Return the total size (bytes) of the intermediate blocks in the plan,
+  /// i.e., the memory they take if each of them is allocated separately.
+  size_t GetNaivePeakMemory() { return graph_->GetNaivePeakMemory(); }
+
   // Wait for one event.
   // void WaitFor();
 
@@ -105,6 +120,9 @@ class Device {
 
   int id() const { return id_; }
 
+  /// Return the number of executors, e.g., worker threads or cuda streams.
+  int num_executors() const { return num_executors_; }
+
   /// Return the programming language for this device.
   LangType lang() const { return lang_; }
 
@@ -128,6 +146,21 @@ class Device {
     skip_iteration_ = skip_iteration;
   };
 
+  /// Record the time, executor, memory and blocks of every operation run by
+  /// the graph, independent of the verbosity. The operations of cuda devices
+  /// are synchronized one by one to measure them.
+  void EnableProfiling(bool enable) { graph_->profiler()->Enable(enable); }
+  /// Remove the recorded operations.
+  void ClearProfile() { graph_->profiler()->Clear(); }
+  /// Return the time and memory of the recorded operations aggregated per op
+  /// name and per node as a JSON string, see Profiler::Summary().
+  string GetProfile() { return graph_->profiler()->Summary(); }
+  /// Write the recorded operations to a Chrome trace file (JSON), which can
+  /// be loaded by chrome://tracing and Perfetto.
+  void ExportProfile(const string& path) {
+    graph_->profiler()->ExportChromeTrace(path);
+  }
+
  protected:
   /// Execute one operation on one executor.
   virtual void DoExec(function<void(Context*)>&& fn, int executor) = 0;
@@ -177,14 +210,17 @@ class Device {
 extern std::shared_ptr<Device> defaultDevice;
 
 /// Represent a CPU device which may have multiple threads/executors.
-/// It runs cpp code.
+/// It runs cpp code. With more than one executor, the buffered graph runs
+/// independent operations concurrently, one thread per executor.
+/// CPU devices have negative IDs; the default host device has ID -1.
 class CppCPU : public Device {
  public:
   ~CppCPU();
-  CppCPU();
+  CppCPU(int num_executors = 1, int id = -1);
 
   std::shared_ptr<Device> host() const override { return defaultDevice; }
   void SetRandSeed(unsigned seed) override;
+  size_t GetAllocatedMem() override;
 
  protected:
   void DoExec(function<void(Context*)>&& fn, int executor) override;
@@ -200,6 +236,16 @@ class CppCPU : public Device {
 
   /// Free cpu memory.
   void Free(void* ptr) override;
+
+ private:
+  /// Return the context of the given executor.
+  Context* executor_context(int executor);
+
+ private:
+  /// contexts of executors 1 to num_executors - 1; executor 0 uses ctx_
+  vector<Context> executor_ctx_;
+  /// caching pool of the host memory; Malloc() zeroes the blocks from it
+  std::shared_ptr<CppMemPool> pool_;
 };
 
 // Implement Device using OpenCL libs.
@@ -317,6 +363,17 @@ class Platform {
     return defaultDevice;
   }
 
+  /// Create a new CppCPU device which runs graph operations on
+  /// 'num_executors' threads. It gets a new negative ID, i.e., -2, -3, ...
+  static std::shared_ptr<Device> CreateCppCPU(int num_executors = 1);
+
+  /// Set the number of threads used by each native cpu kernel parallelized
+  /// with OpenMP; 0 (the default) follows OpenMP, e.g., OMP_NUM_THREADS.
+  static void SetNumCpuThreads(int num_threads);
+
+  /// Return the number of threads used by each native cpu kernel.
+  static int GetNumCpuThreads();
+
 #ifdef USE_CUDA
   /// Return the number of total available GPUs
   static int GetNumGPUs();
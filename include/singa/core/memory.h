@@ -21,6 +21,8 @@
 
 #include <atomic>
 #include <mutex>
+#include <unordered_map>
+#include <vector>
 
 #include "singa/proto/core.pb.h"
 #include "singa/singa_config.h"
@@ -53,6 +55,52 @@ class DeviceMemPool {
   //  size_t init_size_ = 0, max_size_ = 0;
 };
 
+/// Caching memory pool for the host (CPU) memory.
+/// Blocks are aligned to kAlignment bytes and their sizes are rounded up into
+/// buckets. Freed blocks are kept in the pool and reused by later requests of
+/// the same bucket, e.g., the activations allocated in every training step.
+/// Memory is not zeroed unless it is requested via Calloc().
+class CppMemPool : public DeviceMemPool {
+ public:
+  /// Alignment (in bytes) of all blocks returned by the pool.
+  static const size_t kAlignment = 64;
+
+  /// Create the pool which caches at most max_cached bytes of free blocks;
+  /// 0 for no limit.
+  CppMemPool(size_t max_cached = 0);
+
+  void Malloc(void** ptr, const size_t size) override;
+  /// Allocate a block like Malloc() and fill it with zeros.
+  void Calloc(void** ptr, const size_t size);
+  void Free(void* ptr) override;
+
+  /// Return the size of the cached (free) blocks and the total size of the
+  /// memory allocated from the system.
+  std::pair<size_t, size_t> GetMemUsage() override;
+
+  /// Return all cached blocks to the system.
+  void ReleaseCache();
+
+  /// Release all the memory managed by this pool.
+  ~CppMemPool();
+
+ private:
+  /// Round the size up to the bucket size.
+  static size_t BucketSize(const size_t size);
+  /// Free the cached blocks; the caller must hold mtx_.
+  void FreeCachedBlocks();
+
+ private:
+  size_t max_cached_;
+  size_t cached_ = 0;
+  size_t total_ = 0;
+  // free blocks of each bucket
+  std::unordered_map<size_t, std::vector<void*>> free_blocks_;
+  // bucket size of each block in use
+  std::unordered_map<void*, size_t> used_blocks_;
+  std::mutex mtx_;
+};
+
 #ifdef USE_CUDA
 class CnMemPool : public DeviceMemPool {
  public:
@@ -0,0 +1,100 @@
+/**
+ * Licensed to the Apache Software Foundation (ASF) under one
+ * or more contributor license agreements.  See the NOTICE file
+ * distributed with this work for additional information
+ * regarding copyright ownership.  The ASF licenses this file
+ * to you under the Apache License, Version 2.0 (the
+ * "License"); you may not use this file except in compliance
+ * with the License.  You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+
+#ifndef SINGA_CORE_PROFILER_H_
+#define SINGA_CORE_PROFILER_H_
+
+#include <atomic>
+#include <chrono>
+#include <mutex>
+#include <string>
+#include <vector>
+
+namespace singa {
+
+/// One execution of a node of the computational graph.
+struct OpRecord {
+  int iteration = 0;
+  int node = 0;
+  std::string op_name;
+  /// the executor (i.e., worker thread or stream) which ran the node
+  int executor = 0;
+  /// in microseconds since the profiler was created or cleared
+  double start = 0;
+  double end = 0;
+  /// bytes of device memory allocated by the node and freed by the node or
+  /// by the graph right after the node, e.g., for blocks not used later
+  size_t bytes_allocated = 0;
+  size_t bytes_freed = 0;
+  /// ids of the blocks read and written by the node, see BlkInfo::id()
+  std::vector<int> read_blocks;
+  std::vector<int> write_blocks;
+};
+
+/// Record the time and memory of the nodes executed by a Graph.
+///
+/// The graph calls Start() and Stop() around the execution of a node on the
+/// executor thread, and Record() after releasing the blocks of the node. The
+/// records are exported in the Chrome trace format (for chrome://tracing and
+/// Perfetto) or summarized per op name and per node.
+class Profiler {
+ public:
+  Profiler();
+
+  void Enable(bool enable) { enabled_ = enable; }
+  bool enabled() const { return enabled_; }
+
+  /// Remove all records and restart the clock.
+  void Clear();
+
+  void Start(int executor);
+  void Stop();
+  void Record(int iteration, int node, const std::string &op_name,
+              std::vector<int> &&read_blocks, std::vector<int> &&write_blocks);
+
+  /// Return a copy of the records, in the order of completion.
+  std::vector<OpRecord> records() const;
+
+  /// Return the records in the Chrome trace event format (JSON).
+  std::string ChromeTrace() const;
+
+  /// Write the records in the Chrome trace event format to a file.
+  void ExportChromeTrace(const std::string &path) const;
+
+  /// Return a summary (JSON) with the time (in seconds) and memory aggregated
+  /// per op name ("ops", sorted by the total time) and per node ("nodes").
+  std::string Summary() const;
+
+  /// Count the memory allocated and freed by the blocks on this thread.
+  static void CountAlloc(size_t bytes);
+  static void CountFree(size_t bytes);
+
+ private:
+  double Now() const;
+
+ private:
+  /// set by the Python thread and read by the executor threads
+  std::atomic<bool> enabled_{false};
+  std::chrono::steady_clock::time_point origin_;
+  mutable std::mutex mutex_;
+  std::vector<OpRecord> records_;
+};
+
+}  // namespace singa
+
+#endif  // SINGA_CORE_PROFILER_H_
@@ -29,6 +29,7 @@
 #include <vector>
 
 #include "singa/core/common.h"
+#include "singa/core/profiler.h"
 #include "singa/utils/safe_queue.h"
 
 using std::function;
@@ -67,6 +68,8 @@ class Node {
   string op_name() const { return op_name_; }
   const EdgeVec &in_edges() const { return in_edges_; }
   const EdgeVec &out_edges() const { return out_edges_; }
+  const BlockVec &read_blocks() const { return read_blocks_; }
+  const BlockVec &write_blocks() const { return write_blocks_; }
   float time_elapsed() const { return time_elapsed_; }
 
   // time profiling
@@ -79,6 +82,8 @@ class Node {
   OpFunc op_;
   EdgeVec in_edges_;
   EdgeVec out_edges_;
+  BlockVec read_blocks_;
+  BlockVec write_blocks_;
 
   string op_name_;
   float time_elapsed_ = 0;
@@ -137,6 +142,7 @@ class BlkInfo {
   int graph_ref_;
   Edge *write_edge_;    // the edge of last node that writes data into blk
   NodeVec used_nodes_;  // the nodes that use this block(in order of execution)
+  NodeVec readers_;     // the nodes that read blk before any node writes it
 };
 
 class Graph {
@@ -156,6 +162,9 @@ class Graph {
   void RunGraph();
   void RunInSerial();
   void PrintTimeProfiling();
+  void EnableMemoryPlan(bool enable);
+  size_t GetPlannedPeakMemory();
+  size_t GetNaivePeakMemory();
   void AddOperation(OpFunc &&op, const BlockVec &read_blocks,
                     const BlockVec &write_blocks, string op_name = "no_name");
 
@@ -171,6 +180,7 @@ class Graph {
   const std::vector<NodeVec> &next_nodes() const { return next_nodes_; }
   const std::vector<BlockVec> &free_blocks() const { return free_blocks_; }
   int iteration() const { return iteration_; }
+  Profiler *profiler() { return &profiler_; }
 
   Node *node(const size_t idx) const;
   Edge *edge(const size_t idx) const;
@@ -185,9 +195,25 @@ class Graph {
   void FreeLoop();
   void AnalyzeNodes();
   void AnalyzeEdges();
-  void TimeProfilingDoExec(Node *curNode);
+  void AnalyzeDependencies();
+  void PlanMemory();
+  void TimeProfilingDoExec(Node *curNode, int executor = 0);
+  void ProfileRecord(Node *curNode);
   void AddSyncOp(function<void(Context *)> &&op, string op_name = "no_name");
 
+  // execution on multiple executors
+  bool RunInParallel() const;
+  void ExecInParallel();
+  void StartWorkers(int num_workers);
+  void StopWorkers();
+  void WorkerLoop(int executor);
+  void FinishNode(Node *curNode);
+
+  // static memory plan of the recyclable blocks
+  void AssignPlannedBlocks();
+  void RecycleBlock(Block *blk);
+  void ReleaseArena();
+
   void step() { iteration_++; }
   void time_elapsed_inc(float time) { time_elapsed_ += time; }
   void TakeStartTime(TimePoint &start);
@@ -218,7 +244,31 @@ class Graph {
   int iteration_ = 0;
   float time_elapsed_ = 0;
 
+  // Structured profiling of every node, see Profiler
+  Profiler profiler_;
+
   SafeQueue<int> free_queue_;
+
+  // Parallel execution: dependency and block usage counters, the workers
+  // and the queue of nodes that are ready to run
+  std::vector<int> node_deps_;
+  std::vector<int> pending_deps_;
+  std::vector<BlockVec> node_blocks_;
+  std::unordered_map<Block *, int> block_users_;
+  std::unordered_map<Block *, int> pending_users_;
+  size_t num_finished_ = 0;
+  std::mutex exec_mutex_;
+  std::condition_variable exec_cond_;
+  std::vector<std::thread> workers_;
+  SafeQueue<Node *> ready_queue_;
+
+  // Static memory plan: the offsets of the recyclable blocks in one arena
+  // which is allocated for each run
+  bool plan_memory_ = false;
+  size_t planned_peak_ = 0;
+  size_t naive_peak_ = 0;
+  std::unordered_map<Block *, size_t> block_offsets_;
+  void *arena_ = nullptr;
 };
 
 /// Scheduling Tensor operations with dependency detection.
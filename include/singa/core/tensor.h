@@ -64,6 +64,12 @@ class Tensor {
   Tensor(const Shape &shape, std::shared_ptr<Device> dev,
          DataType dtype = kFloat32);
 
+  /// Constructor sharing the host memory 'ptr' owned by 'owner', e.g., the
+  /// buffer of a numpy array, without copying. 'dev' must be a CppCPU device.
+  /// 'owner' is released when no tensor uses the memory.
+  Tensor(const Shape &shape, std::shared_ptr<Device> dev, DataType dtype,
+         void *ptr, std::shared_ptr<void> owner);
+
   /// Copy constructor.  No deep copy.
   Tensor(const Tensor &from);
 
@@ -559,6 +565,12 @@ Tensor SoftMax(const Tensor &in, int axis);
 Tensor SoftMaxBackward(const Tensor &in, int axis, const Tensor &fdout);
 
 Tensor RowMax(const Tensor &in);
+/// Return the dot product of each row of 'a' and the same row of 'b', i.e., a
+/// vector of a.shape(0) elements. 'a' and 'b' are 2-d Tensors of the same
+/// shape.
+Tensor RowDot(const Tensor &a, const Tensor &b);
+/// Return the L2 norm of each row of the 2-d Tensor 'in'.
+Tensor RowNorm(const Tensor &in);
 /// Do softmax for each row. 'in' could be a 1-d or 2-d Tensor.
 void SoftMax(const Tensor &in, Tensor *out);
 void SoftMax(const Tensor &in, Tensor *out, int axis);
@@ -598,6 +610,34 @@ void Axpy(SType alpha, const Tensor &in, Tensor *out);
 
 void Axpy(const Tensor &alpha, const Tensor &in, Tensor *out);
 
+/// Fused SGD step over a list of parameters, which are updated in-place
+/// together with their momentum buffers in one operation:
+///   g = grad + weight_decay * param
+///   moment = momentum * moment + (1 - dampening) * g
+///   g = g + momentum * moment if nesterov, otherwise g = moment
+///   param = param - lr * g
+/// The momentum is skipped if 'moments' is empty. The hyper-parameters are
+/// 1-element tensors on the device of the parameters.
+void MultiTensorSGD(const vector<Tensor> &grads, const vector<Tensor> &params,
+                    const vector<Tensor> &moments, const Tensor &lr,
+                    const Tensor &momentum, const Tensor &dampening,
+                    const Tensor &weight_decay, bool nesterov);
+
+/// Fused Adam step over a list of parameters, which are updated in-place
+/// together with their 'm' and 'v' slots in one operation:
+///   g = grad + weight_decay * param
+///   m = beta_1 * m + (1 - beta_1) * g
+///   v = beta_2 * v + (1 - beta_2) * g * g
+///   m_norm = m / (1 - beta_1 ^ t), v_norm = v / (1 - beta_2 ^ t)
+///   param = param - lr * m_norm / (sqrt(v_norm) + epsilon)
+/// where t = step + 1, i.e., 'step' is the number of finished steps. The
+/// hyper-parameters are 1-element tensors on the device of the parameters.
+void MultiTensorAdam(const vector<Tensor> &grads, const vector<Tensor> &params,
+                     const vector<Tensor> &m, const vector<Tensor> &v,
+                     const Tensor &lr, const Tensor &beta_1,
+                     const Tensor &beta_2, const Tensor &epsilon,
+                     const Tensor &weight_decay, const Tensor &step);
+
 /// Do matrix vector multipication or matrix matrix multiplication depdending
 /// on the Tensor shape.  result = A * B
 Tensor Mult(const Tensor &A, const Tensor &B);
@@ -636,6 +676,23 @@ void SoftmaxCrossEntropyBwd(const Tensor &t, Tensor *p);
 Tensor CrossEntropyFwd(const Tensor &p, const Tensor &t);
 Tensor SoftmaxCrossEntropyBwd(const Tensor &p, const Tensor &t);
 
+/// Compute the softmax cross entropy loss of the logits 'x' (batchsize x dim)
+/// against the label indices 't' (a kInt tensor of batchsize elements), and
+/// its gradient w.r.t. 'x' into 'grad' if it is not nullptr. Both are computed
+/// from 'x' directly, i.e., without materializing the softmax or the one-hot
+/// target. The target of a row puts 1 - smoothing on its label and spreads
+/// smoothing evenly over all labels. Rows labelled ignore_index have zero loss
+/// and gradient. The losses and the gradient are divided by the number of the
+/// other rows, hence the mean loss is the sum of the returned losses.
+Tensor SoftmaxCrossEntropyFwdBwd(const Tensor &x, const Tensor &t, Tensor *grad,
+                                 const float smoothing = 0.f,
+                                 const int ignore_index = -1);
+/// The same as SoftmaxCrossEntropyFwdBwd except that 'p' is the probabilities,
+/// e.g., the output of SoftMax, instead of the logits.
+Tensor CrossEntropyFwdBwd(const Tensor &p, const Tensor &t, Tensor *grad,
+                          const float smoothing = 0.f,
+                          const int ignore_index = -1);
+
 /// Return a tensor consisting of rows ([start, end)) from 'in'. It copies the
 /// values from 'in'. 'in' ia a 2D Tensor.
 Tensor CopyRows(const Tensor &in, const size_t start, const size_t end);
@@ -661,6 +718,74 @@ Tensor ConcatRows(const vector<Tensor> &in);
 Tensor ConcatenateColumns(const vector<Tensor> &in);
 /// Alias name for function ConcatenateColumns
 Tensor ConcatColumns(const vector<Tensor> &in);
+
+/// Return the rows of the 2D tensor 'in' selected by 'indices', e.g., the
+/// embedding vectors of word indices. The shape of the returned tensor is
+/// indices.shape() + {in.shape(1)}. 'indices' could be of int or float type.
+/// The rows of negative indices are zeros.
+Tensor GatherRows(const Tensor &in, const Tensor &indices);
+/// Add the i-th row of 'in' into the row of the 2D tensor 'out' selected by
+/// indices[i], i.e., out[indices[i]] += in[i]. Rows with the same index are
+/// accumulated. It is the backward of GatherRows. Negative indices are skipped.
+void ScatterAddRows(const Tensor &in, const Tensor &indices, Tensor *out);
+/// Copy the i-th row of 'in' into the row of the 2D tensor 'out' selected by
+/// indices[i], i.e., out[indices[i]] = in[i]. The indices should be unique
+/// except the negative ones, which are skipped.
+void ScatterRows(const Tensor &in, const Tensor &indices, Tensor *out);
+/// Return the slices of 'in' along 'axis' selected by 'indices', like
+/// numpy.take. The shape of the returned tensor is in.shape()[:axis] +
+/// indices.shape() + in.shape()[axis+1:]. The slices of negative indices are
+/// zeros.
+Tensor Gather(const Tensor &in, const Tensor &indices, int axis);
+/// Add the slices of 'in' along 'axis' into the slices of 'out' selected by
+/// indices, i.e., out[..., indices[j], ...] += in[..., j, ...]. Slices with
+/// the same index are accumulated. It is the backward of Gather. Negative
+/// indices are skipped.
+void ScatterAdd(const Tensor &in, const Tensor &indices, int axis, Tensor *out);
+/// Return in[starts[0]:ends[0]:steps[0], starts[1]:ends[1]:steps[1], ...]
+/// following the slicing of python, with one start, end and step per
+/// dimension. The steps could be negative but not zero.
+Tensor StridedSlice(const Tensor &in, const vector<int> &starts,
+                    const vector<int> &ends, const vector<int> &steps);
+/// The backward of StridedSlice, i.e., a tensor of 'shape' whose sliced
+/// elements are from 'dy' and whose other elements are zeros.
+Tensor StridedSliceBackward(const Tensor &dy, const Shape &shape,
+                            const vector<int> &starts, const vector<int> &ends,
+                            const vector<int> &steps);
+/// Return a tensor of 'shape' whose element (j_0, j_1, ...) is
+/// in[maps_0[j_0], maps_1[j_1], ...], where maps_k of shape[k] indices is the
+/// k-th segment of 'maps' (an int tensor of sum(shape) elements). The elements
+/// with a negative index of any dim are 'value'. Broadcasting, tiling,
+/// nearest upsampling and padding are such index mappings, e.g., the map of a
+/// dim of size 2 tiled twice is [0, 1, 0, 1].
+Tensor IndexMap(const Tensor &in, const Shape &shape, const Tensor &maps,
+                const float value = 0.f);
+/// The backward of IndexMap, i.e., a tensor of 'shape' (the shape of the
+/// input of IndexMap) whose elements are the sums of the elements of 'dy'
+/// mapped from them.
+Tensor IndexMapBackward(const Tensor &dy, const Shape &shape,
+                        const Tensor &maps);
+/// Drop each element of 'in' with probability 'ratio' and scale the other
+/// elements by 1 / (1 - ratio). The kept elements are recorded in 'mask', a
+/// kInt tensor of (in.Size() + 31) / 32 elements, with one bit per element of
+/// 'in', i.e., 32x smaller than a float mask.
+Tensor PackedDropout(const Tensor &in, const float ratio, Tensor *mask);
+/// The backward of PackedDropout, i.e., dy * mask / (1 - ratio) for the bit
+/// mask generated by the forward.
+Tensor PackedDropoutBackward(const Tensor &dy, const float ratio,
+                             const Tensor &mask);
+/// Merge the rows of a row sparse tensor, i.e., the values of row
+/// indices[i] are values[i], whose indices are duplicated. The first
+/// occurrence of each index gets the sum of the rows of this index; the
+/// other occurrences get index -1 and zero values. 'out_indices' (kInt) and
+/// 'out_values' should have the same shapes as 'indices' and 'values'.
+void CoalesceRows(const Tensor &indices, const Tensor &values,
+                  Tensor *out_indices, Tensor *out_values);
+/// Serialize a row sparse tensor of the given (dense) shape, whose row
+/// indices[i] is values[i], into 'proto'. Only the rows with non-negative
+/// indices are stored; Tensor::FromProto restores the dense tensor.
+void RowSparseToProto(const Tensor &indices, const Tensor &values,
+                      const Shape &shape, singa::TensorProto *proto);
 }  // namespace singa
 
 #endif  // SINGA_CORE_TENSOR_H_
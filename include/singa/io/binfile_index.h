@@ -0,0 +1,61 @@
+/**
+ * Licensed to the Apache Software Foundation (ASF) under one
+ * or more contributor license agreements.  See the NOTICE file
+ * distributed with this work for additional information
+ * regarding copyright ownership.  The ASF licenses this file
+ * to you under the Apache License, Version 2.0 (the
+ * "License"); you may not use this file except in compliance
+ * with the License.  You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+#ifndef SINGA_IO_BINFILE_INDEX_H_
+#define SINGA_IO_BINFILE_INDEX_H_
+
+#include <cstdint>
+#include <string>
+
+namespace singa {
+namespace io {
+
+/// Suffix of the sidecar index file of a binary file, which is written by
+/// BinFileWriter and read by BinFileReader for random access.
+const char kBinFileIndexSuffix[] = ".idx";
+
+/// Entry of the sidecar index for one tuple; the index file is the array of
+/// the entries of all tuples in the order of the binary file.
+struct BinFileIndexEntry {
+  /// offset of the tuple (i.e., its magic word) in the binary file
+  uint64_t offset;
+  /// hash of the key, see BinFileKeyHash()
+  uint64_t key_hash;
+};
+
+/// 64-bit FNV-1a hash of the key, which is stable across platforms and runs.
+inline uint64_t BinFileKeyHash(const std::string& key) {
+  uint64_t hash = 14695981039346656037ULL;
+  for (unsigned char c : key) {
+    hash ^= c;
+    hash *= 1099511628211ULL;
+  }
+  return hash;
+}
+
+/// Return true if the num entries of the index match the binary file at path,
+/// which has filesize bytes, i.e., the offsets start from 0 and increase by at
+/// least the size of the smallest tuple, and the last tuple ends exactly at the
+/// end of the file. An index file left by an earlier version of the binary
+/// file normally fails this check.
+bool BinFileIndexMatches(const BinFileIndexEntry* index, size_t num,
+                         const std::string& path, size_t filesize);
+
+}  // namespace io
+}  // namespace singa
+
+#endif  // SINGA_IO_BINFILE_INDEX_H_
@@ -21,7 +21,10 @@
 
 #include <cstring>
 #include <fstream>
+#include <random>
 #include <string>
+#include <vector>
+#include "singa/io/binfile_index.h"
 #include "singa/singa_config.h"
 
 #ifdef USE_LMDB
@@ -67,6 +70,8 @@ class Reader {
 };
 
 /// Binfilereader reads tuples from binary file with key-value pairs.
+/// If the sidecar index file (path + kBinFileIndexSuffix) written by
+/// BinFileWriter exists, it is loaded by Open() to support random access.
 class BinFileReader : public Reader {
  public:
   ~BinFileReader() { Close(); }
@@ -77,17 +82,42 @@ class BinFileReader : public Reader {
   /// \copydoc Close()
   void Close() override;
   /// \copydoc Read(std::string* key, std::string* value)
+  /// In the shuffled mode, the tuples are returned in a random order.
   bool Read(std::string* key, std::string* value) override;
   /// \copydoc Count()
+  /// It is read from the index without iterating if the index is loaded.
   int Count() override;
   /// \copydoc SeekToFirst()
+  /// In the shuffled mode, a new order is drawn for the next epoch.
   void SeekToFirst() override;
   /// return path to binary file
   inline std::string path() { return path_; }
+  /// return true if the index is loaded, which is required by the functions
+  /// below
+  inline bool has_index() const { return index_ != nullptr; }
+
+  /// Move the cursor so that the next Read() returns the i-th tuple (of the
+  /// current order in the shuffled mode).
+  void Seek(int i);
+  /// Read the i-th tuple of the file without moving the cursor.
+  /// It is safe to call it from multiple threads.
+  /// return false if i is out of range.
+  bool ReadAt(int i, std::string* key, std::string* value) const;
+  /// Read the tuples of the given indices, in parallel if openmp is enabled.
+  void ReadMany(const std::vector<int>& indices, std::vector<std::string>* keys,
+                std::vector<std::string>* values) const;
+  /// Return the index of the first tuple with the key, or -1 if not found.
+  int Find(const std::string& key) const;
+  /// Enable or disable the shuffled mode, where Read() iterates over a random
+  /// permutation of the tuples; it starts from the first tuple of the
+  /// permutation, which is re-drawn by every SeekToFirst() after that.
+  void Shuffle(bool shuffle, unsigned seed = 0);
 
  protected:
   /// Open a file with path_ and initialize buf_
   bool OpenFile();
+  /// Open the data file for pread and map the index file if it exists
+  void OpenIndex();
   /// Read the next filed, including content_len and content;
   /// return true if succeed.
   bool ReadField(std::string* content);
@@ -110,6 +140,22 @@ class BinFileReader : public Reader {
   int bufsize_ = 0;
   /// magic word
   const char kMagicWord[2] = {'s', 'g'};
+  /// file descriptor of the data file for pread
+  int fd_ = -1;
+  /// bytes of the data file
+  size_t filesize_ = 0;
+  /// mapped index file
+  const BinFileIndexEntry* index_ = nullptr;
+  /// num of entries in index_
+  size_t num_entries_ = 0;
+  /// whether Read() follows order_
+  bool shuffle_ = false;
+  /// permutation of the tuples in the shuffled mode
+  std::vector<int> order_;
+  /// position of the next tuple in order_
+  size_t pos_ = 0;
+  /// random engine to draw order_
+  std::mt19937 rng_;
 };
 
 /// TextFileReader reads tuples from CSV file.
@@ -64,12 +64,18 @@ class Snapshot {
   /// binary file is for serialized tensors, the other csv file is for parameter
   /// names and shapes.
   void Write(const std::string& key, const Tensor& param);
+  /// Serialize and dump out a row sparse parameter of the given shape, whose
+  /// row indices[i] is values[i]. It is read back as a dense tensor.
+  void Write(const std::string& key, const Tensor& indices,
+             const Tensor& values, const Shape& shape);
   /// available for singa > 1.0.1
   int version() const {
     return version_;
   }
 
  private:
+  /// Dump out the serialized parameter and its description.
+  void WriteProto(const std::string& key, const TensorProto& tp);
   /// version of SINGA which generates the snapshot
   int version_ = 0;
   std::string prefix_;
@@ -22,6 +22,8 @@
 #include <cstring>
 #include <fstream>
 #include <string>
+#include <vector>
+#include "singa/io/binfile_index.h"
 #include "singa/singa_config.h"
 
 #ifdef USE_LMDB
@@ -81,6 +83,12 @@ class BinFileWriter : public Writer {
   bool Open(const std::string &path, Mode mode) override;
   /// \copydoc Open(const std::string& path), user defines capacity
   bool Open(const std::string &path, Mode mode, int capacity);
+  /// \copydoc Open(const std::string& path), user defines capacity;
+  /// if index is true, the offset and key hash of each tuple are also written
+  /// into the sidecar index file (path + kBinFileIndexSuffix), which enables
+  /// the random access of BinFileReader; otherwise, the sidecar index file
+  /// is removed as it would not cover the tuples written from now on
+  bool Open(const std::string &path, Mode mode, int capacity, bool index);
   /// \copydoc Close()
   void Close() override;
   /// \copydoc Write(const std::string& key, const std::string& value) override;
@@ -93,6 +101,9 @@ class BinFileWriter : public Writer {
  protected:
   /// Open a file with path_ and initialize buf_
   bool OpenFile();
+  /// Open the index file; the tuples already in the file are indexed if it
+  /// is appended without an index file or with one that does not match
+  void OpenIndexFile();
 
  private:
   /// file to be written
@@ -108,6 +119,15 @@ class BinFileWriter : public Writer {
   int bufsize_ = 0;
   /// magic word
   const char kMagicWord[2] = {'s', 'g'};
+  /// whether to write the index file
+  bool index_ = false;
+  /// ofstream of the index file
+  std::ofstream fidx_;
+  /// bytes in the file before buf_
+  size_t written_ = 0;
+  /// index entries of the tuples in buf_, which are written after the tuples
+  /// so that the index never refers to data not in the file
+  std::vector<BinFileIndexEntry> entries_;
 };
 
 /// TextFileWriter write training/validation/test tuples in CSV file.
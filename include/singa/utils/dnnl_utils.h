@@ -21,6 +21,13 @@
 #ifndef SINGA_UTILS_MKLDNN_UTILS_H_
 #define SINGA_UTILS_MKLDNN_UTILS_H_
 
+#include <functional>
+#include <list>
+#include <mutex>
+#include <string>
+#include <unordered_map>
+#include <utility>
+
 namespace singa {
 
 using namespace dnnl;
@@ -50,5 +57,68 @@ inline dnnl::memory::format_tag get_dnnl_format_tag(const Tensor &x) {
   }
   return format_tag_;
 }
+
+inline void dnnl_key_append(std::string *key, const memory::dims &dims) {
+  for (auto d : dims) {
+    key->append(std::to_string(d));
+    key->push_back(',');
+  }
+  key->push_back(';');
+}
+
+// for numbers; enums should be converted to int
+template <typename T>
+inline void dnnl_key_append(std::string *key, T value) {
+  key->append(std::to_string(value));
+  key->push_back(';');
+}
+
+/// Create the key of a cached dnnl primitive from the operation name, the
+/// engine and the dims, strides, paddings, data type, prop kind, etc. that
+/// decide the primitive.
+template <typename... Args>
+std::string dnnl_key(const std::string &op, const engine &eng,
+                     const Args &... args) {
+  std::string key = op + ';';
+  dnnl_key_append(&key, reinterpret_cast<size_t>(eng.get()));
+  int unused[] = {0, (dnnl_key_append(&key, args), 0)...};
+  (void)unused;
+  return key;
+}
+
+/// Max num of cached objects of each type in dnnl_cached().
+const size_t kDnnlCacheCapacity = 256;
+
+/// Return the object (a primitive descriptor or a primitive) of type T for
+/// the key, which is created by 'create' if it is not cached yet. The cache
+/// is shared by all CPU operations (convolution, pooling, batchnorm, etc.)
+/// to avoid creating the primitives in every call. When it is full, the
+/// least recently used object is dropped, e.g., for the shapes of the input
+/// that are no longer used; the object is returned by value, which is a
+/// reference counted handle, hence it stays valid if it is dropped meanwhile.
+/// 'create' is a std::function rather than a template parameter, so that all
+/// the call sites of the same T share one cache (and one capacity).
+template <typename T>
+T dnnl_cached(const std::string &key, const std::function<T()> &create) {
+  using Entry = std::pair<std::string, T>;
+  static std::mutex mtx;
+  // the most recently used first
+  static std::list<Entry> lru;
+  static std::unordered_map<std::string, typename std::list<Entry>::iterator>
+      cache;
+  std::lock_guard<std::mutex> lock(mtx);
+  auto it = cache.find(key);
+  if (it != cache.end()) {
+    lru.splice(lru.begin(), lru, it->second);
+    return it->second->second;
+  }
+  lru.emplace_front(key, create());
+  cache[key] = lru.begin();
+  if (lru.size() > kDnnlCacheCapacity) {
+    cache.erase(lru.back().first);
+    lru.pop_back();
+  }
+  return lru.front().second;
+}
 }  // namespace singa
 #endif  // SINGA_UTILS_MKLDNN_UTILS_H_
@@ -198,6 +198,8 @@ def backward(y, dy=None):
                 dxs_ = not_ready[src_op]
                 if dxs_[y_idx] is None:
                     dxs_[y_idx] = dx
+                elif isinstance(dx, tensor.RowSparseTensor):
+                    dxs_[y_idx] = dx + dxs_[y_idx]
                 else:
                     # add the gradient from another children operation that
                     # uses y_idx'th output of src_op as input arg
@@ -210,16 +212,26 @@ def backward(y, dy=None):
                 # it may cause a delay to yield. Only after src_op's all
                 # output tensors have recieved the gradients, then output
                 g = not_ready[src_op][y_idx]
-                tg = Tensor(device=g.device(),
-                            data=g,
-                            name=src_op.grad_name(y_idx))
+                if isinstance(g, tensor.RowSparseTensor):
+                    g.name = src_op.grad_name(y_idx)
+                    tg = g
+                else:
+                    tg = Tensor(device=g.device(),
+                                data=g,
+                                name=src_op.grad_name(y_idx))
                 yield (y, tg)
 
             if op_dep[src_op] == 0:
                 if src_op.requires_grad is True:
                     assert not isinstance(
                         src_op, Dummy), "Dummy op does not do backward()"
-                    ready.append((src_op, not_ready[src_op]))
+                    # operations only accept dense gradients
+                    dys = [
+                        g.to_dense().data
+                        if isinstance(g, tensor.RowSparseTensor) else g
+                        for g in not_ready[src_op]
+                    ]
+                    ready.append((src_op, dys))
                 del not_ready[src_op]
         del op  # delete the operation to free all tensors from this op
 
@@ -1211,9 +1223,11 @@ def binary_cross_entropy(x, t):
 
 class CrossEntropy(Operator):
 
-    def __init__(self, t):
+    def __init__(self, t, smoothing=0.0, ignore_index=-1):
         super(CrossEntropy, self).__init__()
         self.t = t.data
+        self.smoothing = smoothing
+        self.ignore_index = ignore_index
 
     """
     Calculte negative log likelihood loss for a batch of training data.
@@ -1228,6 +1242,16 @@ class CrossEntropy(Operator):
         Returns:
             loss (CTensor): scalar.
         """
+        if _is_label_indices(self.t, x):
+            # label indices, the loss and dx are computed together
+            self.t = _label_indices(self.t)
+            self.dx = singa.Tensor(list(x.shape()),
+                                   x.device()) if training else None
+            return singa.SumAll(
+                singa.CrossEntropyFwdBwd(x, self.t, self.dx, self.smoothing,
+                                         self.ignore_index))
+        assert self.smoothing == 0, "label smoothing requires label indices"
+        self.dx = None
         loss = singa.SumAll(singa.__mul__(self.t, singa.Log(x)))
         loss /= -x.shape()[0]
         self.x = x
@@ -1243,24 +1267,67 @@ class CrossEntropy(Operator):
                           of current network. note that this is true for
                           dy = 1.0
         """
+        if self.dx is not None:
+            return _scale_loss_grad(self.dx, dy)
 
         dx = singa.__div__(self.t, self.x)
         dx *= float(-1.0 / self.x.shape()[0])
-        if isinstance(dy, float):
-            # dtype of dy: float
-            dx *= dy
-            return dx
-        elif isinstance(dy, CTensor):
-            pass  # TODO, broadcast elementwise multiply seems not support
+        return _scale_loss_grad(dx, dy)
+
 
+def _is_label_indices(t, x):
+    """
+    Return True if the target t is the label indices of the rows of x, i.e.,
+    a 1d tensor or an int tensor with one element per row; a dense target of
+    shape (N, 1) is not.
+    """
+    return t.Size() == x.shape()[0] and (t.nDim() == 1 or
+                                         t.data_type() == singa.kInt)
 
-def cross_entropy(x, t):
+
+def _label_indices(t):
+    """
+    Return the label indices t as an int CTensor.
+    """
+    if t.data_type() != singa.kInt:
+        t = t.AsType(singa.kInt)
+    return t
+
+
+def _scale_loss_grad(dx, dy):
+    """
+    Return the gradient dx of a scalar loss multiplied by dy, which is a float
+    or a CTensor of a single element.
+    """
+    if isinstance(dy, CTensor):
+        return singa.__mul__(dx, dy)
+    if dy != 1.0:
+        return singa.MultFloat(dx, float(dy))
+    return dx
+
+
+def cross_entropy(x, t, smoothing=0.0, ignore_index=-1):
+    """
+    Compute the cross entropy loss of the probabilities x.
+    Args:
+        x (Tensor): 2d tensor, the probabilities of each row.
+        t (Tensor): the target, either the one-hot (or label weighted) 2d
+            tensor, or the label indices of the rows, which are handled without
+            materializing the one-hot target.
+        smoothing (float): label smoothing for label indices, i.e., the target
+            of a row is 1 - smoothing on its label plus smoothing spread over
+            all labels.
+        ignore_index (int): the rows labelled ignore_index are excluded from
+            the loss and the gradient.
+    Returns:
+        the mean loss of the rows
+    """
     assert x.ndim() == 2, "1st arg required 2d tensor. got shape: " + str(
         x.shape)
     assert t.ndim() <= 2, "2nd arg required <=2d tensor. got shape: " + str(
         t.shape)
     # x is the logits and t is the ground truth.
-    return CrossEntropy(t)(x)[0]
+    return CrossEntropy(t, smoothing, ignore_index)(x)[0]
 
 
 class RankingLoss(Operator):
@@ -1305,11 +1372,25 @@ def ranking_loss(pos, neg, M=0.2):
 
 class SoftMaxCrossEntropy(Operator):
 
-    def __init__(self, t):
+    def __init__(self, t, smoothing=0.0, ignore_index=-1):
         super(SoftMaxCrossEntropy, self).__init__()
         self.t = t.data
+        self.smoothing = smoothing
+        self.ignore_index = ignore_index
 
     def forward(self, x):
+        if _is_label_indices(self.t, x):
+            # label indices, the loss and dx are computed together from the
+            # logits, without the softmax output or the one-hot target
+            self.t = _label_indices(self.t)
+            self.dx = singa.Tensor(list(x.shape()),
+                                   x.device()) if training else None
+            return singa.SumAll(
+                singa.SoftmaxCrossEntropyFwdBwd(x, self.t, self.dx,
+                                                self.smoothing,
+                                                self.ignore_index))
+        assert self.smoothing == 0, "label smoothing requires label indices"
+        self.dx = None
         self.p = singa.SoftMax(x)
         ret = singa.CrossEntropyFwd(self.p, self.t)
         loss = singa.SumAll(ret)
@@ -1317,18 +1398,35 @@ class SoftMaxCrossEntropy(Operator):
         return loss
 
     def backward(self, dy=1.0):
+        if self.dx is not None:
+            return _scale_loss_grad(self.dx, dy)
         dx = singa.SoftmaxCrossEntropyBwd(self.p, self.t)
         dx /= float(self.p.shape()[0])
         return dx
 
 
-def softmax_cross_entropy(x, t):
+def softmax_cross_entropy(x, t, smoothing=0.0, ignore_index=-1):
+    """
+    Compute the cross entropy loss of the softmax of the logits x.
+    Args:
+        x (Tensor): 2d tensor, the logits of each row.
+        t (Tensor): the target, either the one-hot 2d tensor, or the label
+            indices of the rows, which are handled by a fused kernel without
+            materializing the softmax output or the one-hot target.
+        smoothing (float): label smoothing for label indices, i.e., the target
+            of a row is 1 - smoothing on its label plus smoothing spread over
+            all labels.
+        ignore_index (int): the rows labelled ignore_index are excluded from
+            the loss and the gradient.
+    Returns:
+        the mean loss of the rows
+    """
     assert x.ndim() == 2, "1st arg required 2d tensor. got shape: " + str(
         x.shape)
     assert t.ndim() <= 2, "2nd arg required <=2d tensor. got shape: " + str(
         t.shape)
     # x is the logits and t is the ground truth.
-    return SoftMaxCrossEntropy(t)(x)[0]
+    return SoftMaxCrossEntropy(t, smoothing, ignore_index)(x)[0]
 
 
 class MeanSquareError(Operator):
@@ -3939,7 +4037,8 @@ def constant_of_shape(x, value=0):
 class Dropout(Operator):
     """
     Init a Dropout, which scales the masked input data by the following equation:
-    `output = scale * data * mask`, `scale = 1. / (1. - ratio)`.
+    `output = scale * data * mask`, `scale = 1. / (1. - ratio)`. The mask is
+    kept for the backward with one bit per element.
     """
 
     def __init__(self, seed=0, ratio=0.5):
@@ -3965,10 +4064,10 @@ class Dropout(Operator):
             x.device().SetRandSeed(self.seed)
             self.init_seed = True
         if training:
-            self.scale = 1 / 1 - self.ratio
-            self.mask = singa.Tensor(list(x.shape()), x.device())
-            singa.Bernoulli(1 - self.ratio, self.mask)
-            x = singa.MultFloat(singa.__mul__(self.mask, x), self.scale)
+            # 32 elements per int of the mask
+            self.mask = singa.Tensor([(x.Size() + 31) // 32], x.device(),
+                                     singa.kInt)
+            x = singa.PackedDropout(x, self.ratio, self.mask)
         return x
 
     def backward(self, dy):
@@ -3980,7 +4079,7 @@ class Dropout(Operator):
             the gradient tensor over input tensor.
         """
         if training:
-            dy = singa.MultFloat(singa.__mul__(self.mask, dy), self.scale)
+            dy = singa.PackedDropoutBackward(dy, self.ratio, self.mask)
         return dy
 
 
@@ -4191,27 +4290,28 @@ class Slice(Operator):
         x_shape = list(x.shape())
         # handle the special axes
         if self.axes is None:
-            self.axes = [i for i in range(len(x_shape))]  # axes = None
+            self.axes = [i for i in range(len(self.starts))]  # axes = None
         else:
-            self.axes = [i if i >= 0 else len(x_shape) + i for i in self.axes
-                        ]  # axes has negative
-        self.cache = []
+            self.axes = [
+                int(i) if i >= 0 else len(x_shape) + int(i) for i in self.axes
+            ]  # axes has negative
         # handle the special steps
         if self.steps is None:
-            self.steps = [1] * len(x_shape)  # steps = None
-        for idx, axis in enumerate(self.axes):
-            axis = int(axis)
-            start, end, step = self.starts[idx], self.ends[idx], self.steps[idx]
-            if end > x_shape[axis]:
-                end = x_shape[axis]
-            self.cache.append((axis, x_shape[axis], start, end, step))
-            xs = []
-            for step_idx in range(x_shape[axis])[start:end:step]:
-                xs.append(singa.SliceOn(x, step_idx, step_idx + 1, axis))
-            assert len(xs) > 0, "Cannot support empty tensor"
-            x = singa.VecTensor(xs)
-            x = singa.ConcatOn(x, axis)
-        return x
+            self.steps = [1] * len(self.axes)  # steps = None
+        # the start, end and step of every axis; the starts and ends are
+        # clipped into [-n - 1, n], which keeps their meaning for slicing
+        starts, ends = [0] * len(x_shape), list(x_shape)
+        steps = [1] * len(x_shape)
+        for axis, start, end, step in zip(self.axes, self.starts, self.ends,
+                                          self.steps):
+            n = x_shape[axis]
+            starts[axis] = int(np.clip(start, -n - 1, n))
+            ends[axis] = int(np.clip(end, -n - 1, n))
+            steps[axis] = int(step)
+        self.cache = (x_shape, starts, ends, steps)
+        y = singa.StridedSlice(x, starts, ends, steps)
+        assert y.Size() > 0, "Cannot support empty tensor"
+        return y
 
     def backward(self, dy):
         """
@@ -4221,23 +4321,8 @@ class Slice(Operator):
         Returns:
             the gradient tensor over input tensor.
         """
-        for axis, shape, start, end, step in self.cache[::-1]:
-            data_idxes = tuple(range(shape)[start:end:step])
-            dys = []
-            data_idx = 0
-            for step_idx in range(shape):
-                if step_idx in data_idxes:
-                    tmp_tensor = singa.SliceOn(dy, data_idx, data_idx + 1, axis)
-                    data_idx += 1
-                else:
-                    tmp_shape = list(dy.shape())
-                    tmp_shape[axis] = 1
-                    tmp_tensor = singa.Tensor(tmp_shape, dy.device())
-                    tmp_tensor.SetFloatValue(0.)
-                dys.append(tmp_tensor)
-            dys = singa.VecTensor(dys)
-            dy = singa.ConcatOn(dys, axis)
-        return dy
+        x_shape, starts, ends, steps = self.cache
+        return singa.StridedSliceBackward(dy, x_shape, starts, ends, steps)
 
 
 def slice(x, starts, ends, axes=None, steps=None):
@@ -4444,6 +4529,8 @@ class Gather(Operator):
         super(Gather, self).__init__()
         self.axis = axis
         self.indices = indices
+        self._indices = None
+        self.indices_data = None
 
     def forward(self, x):
         """
@@ -4456,26 +4543,22 @@ class Gather(Operator):
         self.x_shape = list(x.shape())
         self.axis = self.axis % len(self.x_shape)  # handle the negative value
         _shape = self.x_shape[self.axis]
-        xs = []
-        for indice in self.indices:
-            # each indice is a sub-indice
-            if isinstance(indice, (tuple, list, np.ndarray)):
-                sub_xs = []
-                for idx in indice:
-                    idx = int(idx % _shape)
-                    tmp_tensor = singa.SliceOn(x, idx, idx + 1, self.axis)
-                    sub_xs.append(tmp_tensor)
-                sub_xs = singa.VecTensor(sub_xs)
-                tmp_tensor = singa.ConcatOn(sub_xs, self.axis)
-                _slice_shape = list(tmp_tensor.shape())
-                _slice_shape.insert(self.axis, 1)  # add a new axis to concat
-                tmp_tensor = singa.Reshape(tmp_tensor, _slice_shape)
-            else:
-                indice = int(indice % _shape)
-                tmp_tensor = singa.SliceOn(x, indice, indice + 1, self.axis)
-            xs.append(tmp_tensor)
-        xs = singa.VecTensor(xs)
-        return singa.ConcatOn(xs, self.axis)
+        indices = np.mod(np.array(self.indices, dtype=np.int32), _shape)
+        # the indices are copied to the device once and reused by the later
+        # iterations and the backward
+        if (self.indices_data is None or
+                self.indices_data.device().id() != x.device().id() or
+                not np.array_equal(indices, self._indices)):
+            self._indices = indices
+            self.indices_data = tensor.from_numpy(np.atleast_1d(indices))
+            self.indices_data.to_device(x.device())
+            self.indices_data = self.indices_data.data
+        y = singa.Gather(x, self.indices_data, self.axis)
+        if indices.ndim == 0:
+            # a scalar index removes the axis
+            y_shape = self.x_shape[:self.axis] + self.x_shape[self.axis + 1:]
+            y = singa.Reshape(y, y_shape)
+        return y
 
     def backward(self, dy):
         """
@@ -4485,45 +4568,10 @@ class Gather(Operator):
         Returns:
             the gradient tensor over input tensor.
         """
-        _shape = self.x_shape[self.axis]
-
-        def construct_dx(dy, axis, indices, _shape):
-            dys = []
-            data_idx = 0
-            data_idxes = tuple(indices)
-            for step_idx in range(_shape):
-                if step_idx in data_idxes:
-                    tmp_tensor = singa.SliceOn(dy, data_idx, data_idx + 1, axis)
-                    data_idx += 1
-                else:
-                    tmp_shape = list(dy.shape())
-                    tmp_shape[axis] = 1
-                    tmp_tensor = singa.Tensor(tmp_shape, dy.device())
-                    tmp_tensor.SetFloatValue(0.)
-                dys.append(tmp_tensor)
-            dys = singa.VecTensor(dys)
-            dy = singa.ConcatOn(dys, axis)
-            return dy
-
-        if isinstance(self.indices[0], tuple) or isinstance(
-                self.indices[0], list):
-            dx = singa.Tensor(self.x_shape, dy.device())
-            dx.SetFloatValue(0.)
-            for data_idx in range(len(self.indices)):
-                # get a piece of the dy and remove its new axis added at forward
-                tmp_tensor = singa.SliceOn(dy, data_idx, data_idx + 1,
-                                           self.axis)
-                _slice_shape = list(tmp_tensor.shape())
-                del _slice_shape[self.axis]
-                tmp_tensor = singa.Reshape(tmp_tensor, _slice_shape)
-                # construct dx and sum them together
-                tmp_tensor = construct_dx(tmp_tensor, self.axis,
-                                          self.indices[data_idx],
-                                          self.x_shape[self.axis])
-                dx = singa.__add__(dx, tmp_tensor)
-            return dx
-        else:
-            return construct_dx(dy, self.axis, self.indices, _shape)
+        dx = singa.Tensor(self.x_shape, dy.device())
+        dx.SetFloatValue(0.)
+        singa.ScatterAdd(dy, self.indices_data, self.axis, dx)
+        return dx
 
 
 def gather(x, axis, indices):
@@ -4543,6 +4591,27 @@ def gather(x, axis, indices):
     return Gather(axis, indices)(x)[0]
 
 
+def _index_maps(op, maps, dev):
+    """
+    Concatenate the index maps of the dims for singa.IndexMap. The CTensor of
+    the maps is cached in the operator and copied to the device again only
+    if the maps change.
+    Args:
+        op (Operator): the operator using the maps.
+        maps (list of np.ndarray): the index map of each dim of the output.
+        dev (Device): the device of the input tensor.
+    Returns:
+        the int CTensor of the maps.
+    """
+    maps = np.concatenate(maps).astype(np.int32)
+    if (op.maps is None or op.maps[1] != dev.id() or
+            not np.array_equal(op.maps[0], maps)):
+        maps_data = tensor.from_numpy(maps)
+        maps_data.to_device(dev)
+        op.maps = (maps, dev.id(), maps_data.data)
+    return op.maps[2]
+
+
 class Tile(Operator):
     """
     Init a Tile, Constructs a tensor by tiling a given tensor. This is the same
@@ -4558,6 +4627,7 @@ class Tile(Operator):
         """
         super(Tile, self).__init__()
         self.repeats = [repeats] if isinstance(repeats, int) else repeats
+        self.maps = None
 
     def forward(self, x):
         """
@@ -4568,20 +4638,18 @@ class Tile(Operator):
             the output CTensor.
         """
         self.x_shape = list(x.shape())
-        # add new axis from head
-        if len(self.x_shape) < len(self.repeats):
-            append_len = len(self.repeats) - len(self.x_shape)
-            new_shape = [1] * append_len + self.x_shape
-            x = singa.Reshape(x, new_shape)
-        for axis, rp in enumerate(self.repeats):
-            if rp == 1:
-                continue
-            xs = []
-            for idx in range(rp):
-                xs.append(x.Clone())
-            xs = singa.VecTensor(xs)
-            x = singa.ConcatOn(xs, axis)
-        return x
+        repeats = [int(rp) for rp in self.repeats]
+        # add new axis from head to the input or the repeats
+        ndim = np.maximum(len(self.x_shape), len(repeats))
+        self.in_shape = [1] * (ndim - len(self.x_shape)) + self.x_shape
+        repeats = [1] * (ndim - len(repeats)) + repeats
+        out_shape = [n * rp for n, rp in zip(self.in_shape, repeats)]
+        # the index j of an axis is from the index j % n of the input
+        maps = _index_maps(
+            self, [np.arange(m) % n for m, n in zip(out_shape, self.in_shape)],
+            x.device())
+        return singa.IndexMap(singa.Reshape(x, self.in_shape), out_shape, maps,
+                              0.)
 
     def backward(self, dy):
         """
@@ -4591,24 +4659,9 @@ class Tile(Operator):
         Returns:
             the gradient tensor over input tensor.
         """
-        for axis, rp in enumerate(self.repeats):
-            if rp == 1:
-                continue
-            _slice_shape = list(dy.shape())
-            ori_len = _slice_shape[axis] // rp
-            _slice_shape[axis] = ori_len
-            _dy = singa.Tensor(_slice_shape, dy.device())
-            _dy.SetFloatValue(0.)
-
-            for idx in range(rp):
-                tmp_tensor = singa.SliceOn(dy, ori_len * idx,
-                                           ori_len * (idx + 1), axis)
-                _dy = singa.__add__(_dy, tmp_tensor)
-            dy = _dy
+        dx = singa.IndexMapBackward(dy, self.in_shape, self.maps[2])
         # remove the new axis we added at forward
-        if len(self.x_shape) < len(self.repeats):
-            dy = singa.Reshape(dy, self.x_shape)
-        return dy
+        return singa.Reshape(dx, self.x_shape)
 
 
 def tile(x, repeats):
@@ -4826,25 +4879,29 @@ class _RNN(Operator):
             #  batch_first=True,
             use_mask=False,
             seq_lengths=None):
-        assert singa.USE_CUDA, "Not able to run without CUDA"
         super(_RNN, self).__init__()
         self.handle = handle
+        # RNNHandle runs the fused cpu kernels and CudnnRNNHandle runs cuDNN
+        self.prefix = "Cpu" if type(handle) == singa.RNNHandle else "Gpu"
         self.return_sequences = return_sequences
         self.use_mask = use_mask
         if use_mask:
             assert type(seq_lengths) == Tensor, "wrong type for seq_lengths"
         self.seq_lengths = seq_lengths
 
+    def _fn(self, name):
+        return getattr(singa, self.prefix + name)
+
     def forward(self, x, hx, cx, w):
         if training:
             if self.use_mask:
                 (y, hy,
-                 cy) = singa.GpuRNNForwardTrainingEx(x, hx, cx, w,
-                                                     self.seq_lengths.data,
-                                                     self.handle)
+                 cy) = self._fn("RNNForwardTrainingEx")(x, hx, cx, w,
+                                                        self.seq_lengths.data,
+                                                        self.handle)
             else:
-                (y, hy,
-                 cy) = singa.GpuRNNForwardTraining(x, hx, cx, w, self.handle)
+                (y, hy, cy) = self._fn("RNNForwardTraining")(x, hx, cx, w,
+                                                             self.handle)
             self.inputs = {
                 'x': x,
                 'hx': hx,
@@ -4857,12 +4914,12 @@ class _RNN(Operator):
         else:
             if self.use_mask:
                 (y, hy,
-                 cy) = singa.GpuRNNForwardInferenceEx(x, hx, cx, w,
-                                                      self.seq_lengths.data,
-                                                      self.handle)
+                 cy) = self._fn("RNNForwardInferenceEx")(x, hx, cx, w,
+                                                         self.seq_lengths.data,
+                                                         self.handle)
             else:
-                (y, hy,
-                 cy) = singa.GpuRNNForwardInference(x, hx, cx, w, self.handle)
+                (y, hy, cy) = self._fn("RNNForwardInference")(x, hx, cx, w,
+                                                              self.handle)
 
         if self.return_sequences:
             # (seq, bs, data)
@@ -4910,21 +4967,21 @@ class _RNN(Operator):
         dcy.SetFloatValue(0.0)
 
         if self.use_mask:
-            (dx, dhx,
-             dcx) = singa.GpuRNNBackwardxEx(self.inputs['y'], dy, dhy, dcy,
-                                            self.inputs['w'], self.inputs['hx'],
-                                            self.inputs['cx'],
+            (dx, dhx, dcx) = self._fn("RNNBackwardxEx")(
+                self.inputs['y'], dy, dhy, dcy, self.inputs['w'],
+                self.inputs['hx'], self.inputs['cx'], self.seq_lengths.data,
+                self.handle)
+            dW = self._fn("RNNBackwardWEx")(self.inputs['x'], self.inputs['hx'],
+                                            self.inputs['y'],
                                             self.seq_lengths.data, self.handle)
-            dW = singa.GpuRNNBackwardWEx(self.inputs['x'], self.inputs['hx'],
-                                         self.inputs['y'],
-                                         self.seq_lengths.data, self.handle)
         else:
-            (dx, dhx,
-             dcx) = singa.GpuRNNBackwardx(self.inputs['y'], dy, dhy, dcy,
-                                          self.inputs['w'], self.inputs['hx'],
-                                          self.inputs['cx'], self.handle)
-            dW = singa.GpuRNNBackwardW(self.inputs['x'], self.inputs['hx'],
-                                       self.inputs['y'], self.handle)
+            (dx, dhx, dcx) = self._fn("RNNBackwardx")(self.inputs['y'], dy, dhy,
+                                                      dcy, self.inputs['w'],
+                                                      self.inputs['hx'],
+                                                      self.inputs['cx'],
+                                                      self.handle)
+            dW = self._fn("RNNBackwardW")(self.inputs['x'], self.inputs['hx'],
+                                          self.inputs['y'], self.handle)
 
         return dx, dhx, dcx, dW
 
@@ -4940,24 +4997,14 @@ class CosSim(Operator):
     @classmethod
     def dot(cls, a, b):
         """
-        dot multiply
+        dot multiply of each row of a and the same row of b
         Args:
             a (CTensor): 2d input tensor.
             b (CTensor): 2d input tensor.
         Returns:
             CTensor: the output CTensor.
         """
-        batch_size = a.shape()[0]
-        ret = []
-        for indice in range(batch_size):
-            tmp_a = singa.SliceOn(a, indice, indice + 1, 0)  # 1 * d
-            tmp_b = singa.SliceOn(b, indice, indice + 1, 0)  # 1 * d
-            tmp_b = singa.DefaultTranspose(tmp_b)
-            tmp_tensor = singa.Mult(tmp_a, tmp_b)  # 1 * d * d * 1
-            ret.append(tmp_tensor)
-        ret = singa.VecTensor(ret)
-        ret = singa.ConcatOn(ret, 0)  # b * 1
-        return singa.Reshape(ret, [ret.shape()[0]])  # b
+        return singa.RowDot(a, b)  # b
 
     def forward(self, a, b):
         """
@@ -4968,13 +5015,11 @@ class CosSim(Operator):
         Returns:
             the output CTensor.
         """
-        ad = CosSim.dot(a, a)
-        bd = CosSim.dot(b, b)
-        ap = singa.PowFloat(ad, 0.5)
-        bp = singa.PowFloat(bd, 0.5)
+        ap = singa.RowNorm(a)
+        bp = singa.RowNorm(b)
         ret = singa.__div__(CosSim.dot(a, b), singa.__mul__(ap, bp))
         if training:
-            self.cache = (a, b, ad, bd, ap, bp, ret)
+            self.cache = (a, b, ap, bp, ret)
         return ret
 
     def backward(self, dy):
@@ -4986,19 +5031,15 @@ class CosSim(Operator):
         Return:
             the gradient tensor over input tensor.
         """
-        a, b, ad, bd, ap, bp, ret = self.cache
-        ab = singa.__mul__(ap, bp)
-        ab = singa.Reshape(ab, list(ab.shape()) + [1])  # b * 1
-        ad = singa.Reshape(ad, list(ad.shape()) + [1])  # b * 1
-        bd = singa.Reshape(bd, list(bd.shape()) + [1])  # b * 1
-        ret = singa.Reshape(ret, list(ret.shape()) + [1])  # b * 1
-        dy = singa.Reshape(dy, list(dy.shape()) + [1])  # boardcast
-        da = singa.__sub__(singa.__div__(b, ab),
-                           singa.__div__(singa.__mul__(ret, a), ad))
-        db = singa.__sub__(singa.__div__(a, ab),
-                           singa.__div__(singa.__mul__(ret, b), bd))
-        da = singa.__mul__(dy, da)
-        db = singa.__mul__(dy, db)
+        a, b, ap, bp, ret = self.cache
+        shape = [ret.shape()[0], 1]  # b * 1, broadcast to the rows
+        # da = dy / (|a||b|) * b - dy * ret / |a|^2 * a, and db likewise
+        s = singa.Reshape(singa.__div__(dy, singa.__mul__(ap, bp)), shape)
+        dyret = singa.__mul__(dy, ret)
+        sa = singa.Reshape(singa.__div__(dyret, singa.__mul__(ap, ap)), shape)
+        sb = singa.Reshape(singa.__div__(dyret, singa.__mul__(bp, bp)), shape)
+        da = singa.__sub__(singa.__mul__(b, s), singa.__mul__(a, sa))
+        db = singa.__sub__(singa.__mul__(a, s), singa.__mul__(b, sb))
         return da, db
 
 
@@ -5049,6 +5090,7 @@ class Expand(Operator):
         """
         super(Expand, self).__init__()
         self.shape = shape
+        self.maps = None
 
     def forward(self, x):
         if isinstance(self.shape, np.ndarray):
@@ -5056,53 +5098,25 @@ class Expand(Operator):
         else:
             self.shape = list(self.shape)
         self.x_shape = list(x.shape())
-        x_shape = self.x_shape.copy()
-        self.dim_changed = True if len(self.shape) != len(x_shape) else False
-        if self.dim_changed:
-            tmp_tensor = singa.Tensor(self.shape, x.device())
-            tmp_tensor.SetFloatValue(1.)
-            x = singa.__mul__(x, tmp_tensor)
-        else:
-            for axis, s_1, s_2 in zip(range(len(self.shape)), self.shape,
-                                      x_shape):
-                if s_1 == s_2:
-                    continue
-                xs = [x] * (s_1 // s_2)
-                x = singa.VecTensor(xs)
-                x = singa.ConcatOn(x, axis)
-        return x
+        # align the shapes from the tail following the broadcast rule
+        ndim = np.maximum(len(self.shape), len(self.x_shape))
+        self.in_shape = [1] * (ndim - len(self.x_shape)) + self.x_shape
+        shape = [1] * (ndim - len(self.shape)) + [int(s) for s in self.shape]
+        out_shape = []
+        for n, m in zip(self.in_shape, shape):
+            assert n == m or n == 1 or m == 1, (
+                'cannot expand the shape %s to %s' % (self.x_shape, self.shape))
+            out_shape.append(m if n == 1 else n)
+        # all indices of a broadcast axis are from the index 0 of the input
+        maps = _index_maps(
+            self, [np.arange(m) % n for m, n in zip(out_shape, self.in_shape)],
+            x.device())
+        return singa.IndexMap(singa.Reshape(x, self.in_shape), out_shape, maps,
+                              0.)
 
     def backward(self, dy):
-        x_shape = self.x_shape
-        if self.dim_changed:
-            dy = tensor.from_raw_tensor(dy)
-            if len(self.shape) > len(x_shape):
-                x_shape = [1] * (len(self.shape) - len(x_shape)) + x_shape
-            for axis, s in zip(range(len(self.shape))[::-1], x_shape[::1]):
-                if s == 1:
-                    dy = tensor.sum(dy, axis)
-            dy = dy.data
-        else:
-            for axis, s_1, s_2 in zip(
-                    range(len(self.shape))[::-1], self.shape[::-1],
-                    x_shape[::-1]):
-                if s_1 > s_2:
-                    duplic = s_1 // s_2
-                    dxs = []
-                    for i in range(s_2):
-                        tmp_tensor = None
-                        for j in range(duplic):
-                            if not tmp_tensor:
-                                tmp_tensor = singa.SliceOn(
-                                    dy, j * s_2 + i, j * s_2 + i + 1, axis)
-                            else:
-                                tmp_tensor += singa.SliceOn(
-                                    dy, j * s_2 + i, j * s_2 + i + 1, axis)
-                        dxs.append(tmp_tensor)
-                    dxs = singa.VecTensor(dxs)
-                    dy = singa.ConcatOn(dxs, axis)
-        dy = singa.Reshape(dy, self.x_shape)
-        return dy
+        dx = singa.IndexMapBackward(dy, self.in_shape, self.maps[2])
+        return singa.Reshape(dx, self.x_shape)
 
 
 def expand(x, shape):
@@ -5183,6 +5197,7 @@ class Pad(Operator):
         self.constant = constant
         self.pads = pads
         self.pad_width = ()
+        self.maps = None
 
     def forward(self, x):
         if not self.pad_width:
@@ -5190,58 +5205,30 @@ class Pad(Operator):
             for i in range(half_width):
                 self.pad_width += ((self.pads[i], self.pads[i + half_width])),
 
-        for axis, pads in zip(range(len(x.shape())), self.pad_width):
-            for pad, is_left in zip(pads, (True, False)):
-                if pad == 0:
-                    continue
-                pad_shape = list(x.shape())
-                if self.mode == "constant":
-                    pad_shape[axis] = pad
-                    padding = singa.Tensor(list(pad_shape), x.device())
-                    padding.SetFloatValue(self.constant)
-                    if is_left:
-                        x = singa.ConcatOn(singa.VecTensor([padding, x]), axis)
-                    else:
-                        x = singa.ConcatOn(singa.VecTensor([x, padding]), axis)
-                elif self.mode == "reflect":
-                    axis_shape = pad_shape[axis]
-                    if is_left:
-                        padding = singa.SliceOn(x, 0, pad, axis)
-                        x = singa.ConcatOn(singa.VecTensor([padding, x]), axis)
-                    else:
-                        padding = singa.SliceOn(x, axis_shape - pad, axis_shape,
-                                                axis)
-                        x = singa.ConcatOn(singa.VecTensor([x, padding]), axis)
-                elif self.mode == "edge":
-                    axis_shape = pad_shape[axis]
-                    if is_left:
-                        padding = []
-                        for _ in range(pad):
-                            padding.append(singa.SliceOn(x, 0, 1, axis))
-                        padding.append(x)
-                        padding = singa.VecTensor(padding)
-                        x = singa.ConcatOn(padding, axis)
-                    else:
-                        padding = [x]
-                        for _ in range(pad):
-                            padding.append(
-                                singa.SliceOn(x, axis_shape - 1, axis_shape,
-                                              axis))
-                        padding = singa.VecTensor(padding)
-                        x = singa.ConcatOn(padding, axis)
-        return x
+        self.x_shape = list(x.shape())
+        out_shape, maps = [], []
+        for axis, n in enumerate(self.x_shape):
+            before, after = self.pad_width[axis] if axis < len(
+                self.pad_width) else (0, 0)
+            # the index j of the output is from the index j - before of x
+            idx = np.arange(n + int(before) + int(after)) - int(before)
+            if self.mode == "constant":
+                idx[(idx < 0) | (idx >= n)] = -1
+            elif self.mode == "reflect":
+                # reflect on the first and the last elements, like numpy.pad
+                period = np.maximum(2 * (n - 1), 1)
+                idx = np.abs(idx) % period
+                idx = np.where(idx >= n, period - idx, idx)
+            elif self.mode == "edge":
+                idx = np.clip(idx, 0, n - 1)
+            out_shape.append(len(idx))
+            maps.append(idx)
+        maps = _index_maps(self, maps, x.device())
+        value = self.constant if self.mode == "constant" else 0.
+        return singa.IndexMap(x, out_shape, maps, float(value))
 
     def backward(self, dy):
-        for axis, pads in zip(range(len(dy.shape())), self.pad_width):
-            for pad, is_left in zip(pads, (True, False)):
-                if pad == 0:
-                    continue
-                axis_shape = list(dy.shape())[axis]
-                if is_left:
-                    dy = singa.SliceOn(dy, pad, axis_shape, axis)
-                else:
-                    dy = singa.SliceOn(dy, 0, axis_shape - pad, axis)
-        return dy
+        return singa.IndexMapBackward(dy, self.x_shape, self.maps[2])
 
 
 def pad(x, mode, pads, constant=0.):
@@ -5288,6 +5275,7 @@ class UpSample(Operator):
         self.mode = mode.lower()
         if self.mode != "nearest":
             assert False, "only support nearest mode."
+        self.maps = None
 
     def forward(self, x):
         if isinstance(self.scales, np.ndarray):
@@ -5295,39 +5283,17 @@ class UpSample(Operator):
         else:
             self.scales = list(self.scales)
         self.x_shape = list(x.shape())
-        for axis, s in zip(range(len(self.scales)), self.scales):
-            s = int(s)
-            if s == 1:
-                continue
-            x = x.Repeat([
-                s,
-            ], axis)
-        return x
+        scales = [int(s) for s in self.scales]
+        scales += [1] * (len(self.x_shape) - len(scales))
+        out_shape = [n * s for n, s in zip(self.x_shape, scales)]
+        # the index j of an axis is from the nearest index j // s of the input
+        maps = _index_maps(
+            self, [np.arange(m) // s for m, s in zip(out_shape, scales)],
+            x.device())
+        return singa.IndexMap(x, out_shape, maps, 0.)
 
     def backward(self, dy):
-        x_shape = self.x_shape.copy()
-        for axis, s_1, s_2 in zip(
-                range(len(self.scales))[::-1], self.scales[::-1],
-                x_shape[::-1]):
-            s_1 = int(s_1)
-            if s_1 != 1:
-                duplic = s_1
-                dxs = []
-                for i in range(s_2):
-                    tmp_tensor = None
-                    for j in range(duplic):
-                        if not tmp_tensor:
-                            tmp_tensor = singa.SliceOn(dy, i * duplic + j,
-                                                       i * duplic + j + 1, axis)
-                        else:
-                            tmp_tensor += singa.SliceOn(dy, i * duplic + j,
-                                                        i * duplic + j + 1,
-                                                        axis)
-                    dxs.append(tmp_tensor)
-                dxs = singa.VecTensor(dxs)
-                dy = singa.ConcatOn(dxs, axis)
-        dy = singa.Reshape(dy, self.x_shape)
-        return dy
+        return singa.IndexMapBackward(dy, self.x_shape, self.maps[2])
 
 
 def upsample(x, mode, scales):
@@ -5650,8 +5616,15 @@ class Embedding(Operator):
     Init an embedding operator
     """
 
-    def __init__(self):
+    def __init__(self, sparse_grad=False):
+        """
+        Args:
+            sparse_grad (bool): if True, the gradient of the weight is a
+                tensor.RowSparseTensor of the rows selected by the input,
+                otherwise a dense tensor.
+        """
         super(Embedding, self).__init__()
+        self.sparse_grad = sparse_grad
 
     def forward(self, x, w):
         """
@@ -5662,27 +5635,11 @@ class Embedding(Operator):
         Returns:
             the output CTensor.
         """
-        x = tensor.to_numpy(tensor.from_raw_tensor(x))
+        if x.data_type() != tensor.int32:
+            x = x.AsType(tensor.int32)
         if training:
             self.cache = (x, w.shape())
-
-        xs = []
-        x = x.tolist()
-        for indice in x:
-            sub_xs = []
-            for idx in indice:
-                idx = int(idx)
-                tmp_tensor = singa.SliceOn(w, idx, idx + 1, 0)
-                sub_xs.append(tmp_tensor)
-            sub_xs = singa.VecTensor(sub_xs)
-            tmp_tensor = singa.ConcatOn(sub_xs, 0)
-            tmp_tensor = singa.Reshape(tmp_tensor,
-                                       [1] + list(tmp_tensor.shape()))
-
-            xs.append(tmp_tensor)
-        xs = singa.VecTensor(xs)
-        xs = singa.ConcatOn(xs, 0)
-        return xs
+        return singa.GatherRows(w, x)
 
     def backward(self, dy):
         """
@@ -5693,33 +5650,34 @@ class Embedding(Operator):
             the gradient tensor over input tensor.
         """
         x, w_shape = self.cache
-        dy_shape = dy.shape()
         # construct the dx
         dx = tensor.sum(tensor.from_raw_tensor(dy), axis=2)
 
         # construct the dw
-        dws = []
-        for idx in range(w_shape[0]):
-            tmp_tensor = singa.Tensor((1, w_shape[1]), dy.device())
-            tmp_tensor.SetFloatValue(0.0)
-            dws.append(tmp_tensor)
-        dy = singa.Reshape(dy, [dy_shape[0] * dy_shape[1], dy_shape[2]])
-        x = x.reshape(-1)
-        for idx, val in enumerate(x):
-            tmp_tensor = singa.SliceOn(dy, idx, idx + 1, 0)
-            dws[val] = singa.__add__(dws[val], tmp_tensor)
-        dws = singa.VecTensor(dws)
-        return dx.data, singa.ConcatOn(dws, 0)
-
-
-def embedding(x, w):
+        dy = singa.Reshape(dy, [x.Size(), w_shape[1]])
+        if self.sparse_grad:
+            indices = singa.Reshape(x, [x.Size()])
+            dw = tensor.RowSparseTensor(tensor.from_raw_tensor(indices),
+                                        tensor.from_raw_tensor(dy), w_shape)
+        else:
+            dw = singa.Tensor(list(w_shape), dy.device())
+            dw.SetFloatValue(0.0)
+            singa.ScatterAddRows(dy, x, dw)
+        return dx.data, dw
+
+
+def embedding(x, w, sparse_grad=False):
     """
     Produces an embedding operator.
     Args:
+        x (Tensor): input tensor of the word indices.
+        w (Tensor): weight tensor of shape (vocabulary size, dimension).
+        sparse_grad (bool): if True, the gradient of w is a
+            tensor.RowSparseTensor.
     Returns:
         the output Tensor.
     """
-    return Embedding()(x, w)[0]
+    return Embedding(sparse_grad)(x, w)[0]
 
 
 class Erf(Operator):
@@ -56,14 +56,19 @@ from builtins import range
 from builtins import object
 import os
 import random
-import time
-from multiprocessing import Process, Queue
+from multiprocessing import Process, Condition, Event, RawArray, RawValue
 import numpy as np
 
 
 class ImageBatchIter(object):
     '''Utility for iterating over an image dataset to get mini-batches.
 
+    The images are loaded and transformed by multiple worker processes, each
+    of which fills every num_workers-th mini-batch into a ring buffer in the
+    shared memory. The order of the images is decided by the seed and the
+    epoch, hence it does not depend on the number of workers. Calling start
+    after end resumes from the next mini-batch which has not been returned.
+
     Args:
         img_list_file(str): name of the file containing image meta data; each
                             line consists of image_path_suffix delimiter meta_info,
@@ -75,12 +80,16 @@ class ImageBatchIter(object):
                             if meta info is available, we return a list of None.
         batch_size(int): num of samples in one mini-batch
         image_transform: a function for image augmentation; it accepts the full
-                        image path and outputs a list of augmented images.
+                        image path and outputs a list of augmented images, which
+                        should have the same size and length for all images.
         shuffle(boolean): True for shuffling images in the list
         delimiter(char): delimiter between image_path_suffix and label, e.g.,
                          space or comma
         image_folder(boolean): prefix of the image path
-        capacity(int): the max num of mini-batches in the internal queue.
+        capacity(int): the max num of mini-batches in the internal buffer.
+        num_workers(int): num of processes for loading images
+        seed(int): seed for shuffling the images and for the augmentation of
+                   the workers; a random one is used if it is None.
     '''
 
     def __init__(self,
@@ -90,87 +99,167 @@ class ImageBatchIter(object):
                  shuffle=True,
                  delimiter=' ',
                  image_folder=None,
-                 capacity=10):
+                 capacity=10,
+                 num_workers=1,
+                 seed=None):
         self.img_list_file = img_list_file
-        self.queue = Queue(capacity)
+        self.capacity = capacity
         self.batch_size = batch_size
         self.image_transform = image_transform
         self.shuffle = shuffle
         self.delimiter = delimiter
         self.image_folder = image_folder
-        self.stop = False
-        self.p = None
+        self.num_workers = num_workers
+        self.seed = seed
+        self.stop = Event()
+        self.workers = []
+        self.batch = 0  # index of the next mini-batch
+        self.epoch = -1
+        self.order = None
         with open(img_list_file, 'r') as fd:
             self.num_samples = len(fd.readlines())
 
     def start(self):
-        self.p = Process(target=self.run)
-        self.p.start()
-        return
-
-    def __next__(self):
-        assert self.p is not None, 'call start before next'
-        while self.queue.empty():
-            time.sleep(0.1)
-        x, y = self.queue.get()  # dequeue one mini-batch
-        return x, y
-
-    def end(self):
-        if self.p is not None:
-            self.stop = True
-            time.sleep(0.1)
-            self.p.terminate()
-
-    def run(self):
-        img_list = []
-        is_label_index = True
+        self.img_list = []
+        self.is_label_index = True
         for line in open(self.img_list_file, 'r'):
             item = line.strip('\n').split(self.delimiter)
             if len(item) < 2:
-                is_label_index = False
-                img_list.append((item[0].strip(), None))
+                self.is_label_index = False
+                self.img_list.append((item[0].strip(), None))
             else:
                 if not item[1].strip().isdigit():
                     # the meta info is not label index
-                    is_label_index = False
-                img_list.append((item[0].strip(), item[1].strip()))
-        index = 0  # index for the image
-        if self.shuffle:
-            random.shuffle(img_list)
-        while not self.stop:
-            if not self.queue.full():
-                x, y = [], []
-                i = 0
-                while i < self.batch_size:
-                    img_path, img_meta = img_list[index]
-                    aug_images = self.image_transform(
-                        os.path.join(self.image_folder, img_path))
-                    assert i + len(aug_images) <= self.batch_size, \
-                        'too many images (%d) in a batch (%d)' % \
-                        (i + len(aug_images), self.batch_size)
-                    for img in aug_images:
-                        ary = np.asarray(img.convert('RGB'), dtype=np.float32)
-                        x.append(ary.transpose(2, 0, 1))
-                        if is_label_index:
-                            y.append(int(img_meta))
-                        else:
-                            y.append(img_meta)
-                        i += 1
-                    index += 1
-                    if index == self.num_samples:
-                        index = 0  # reset to the first image
-                        if self.shuffle:
-                            random.shuffle(img_list)
-                # enqueue one mini-batch
-                if is_label_index:
-                    self.queue.put((np.asarray(x), np.asarray(y,
-                                                              dtype=np.int32)))
-                else:
-                    self.queue.put((np.asarray(x), y))
-            else:
-                time.sleep(0.1)
+                    self.is_label_index = False
+                self.img_list.append((item[0].strip(), item[1].strip()))
+        if self.seed is None:
+            self.seed = random.randrange(1 << 30)
+
+        # get the shape of the mini-batch from the first image
+        aug_images = self.image_transform(
+            os.path.join(self.image_folder, self.img_list[0][0]))
+        self.images_per_file = len(aug_images)
+        assert self.batch_size % self.images_per_file == 0, \
+            'batch size (%d) should be a multiple of the images per file ' \
+            '(%d)' % (self.batch_size, self.images_per_file)
+        self.files_per_batch = self.batch_size // self.images_per_file
+        self.image_shape = _to_array(aug_images[0]).shape
+
+        self.buf = RawArray(
+            'f',
+            self.capacity * self.batch_size * int(np.prod(self.image_shape)))
+        # ready[slot] is the index (plus 1) of the mini-batch in the slot
+        self.ready = RawArray('q', self.capacity)
+        # the workers resume from the next mini-batch to return
+        self.consumed = RawValue('q', self.batch)
+        self.cond = Condition()
+        self.stop.clear()
+
+        workers = []
+        for i in range(self.num_workers):
+            p = Process(target=self.run, args=(i,))
+            p.daemon = True
+            p.start()
+            workers.append(p)
+        self.workers = workers
         return
 
+    def __next__(self):
+        assert self.workers, 'call start before next'
+        slot = self.batch % self.capacity
+        with self.cond:
+            while self.ready[slot] != self.batch + 1:
+                if not self.cond.wait(1.0):
+                    self._check_workers()
+        x = self._batch_buffer()[slot].copy()
+        with self.cond:
+            self.consumed.value += 1
+            self.cond.notify_all()
+
+        y = []
+        for pos in self._file_positions(self.batch):
+            img_meta = self._file_at(pos)[1]
+            if self.is_label_index:
+                img_meta = int(img_meta)
+            y.extend([img_meta] * self.images_per_file)
+        self.batch += 1
+        if self.is_label_index:
+            return x, np.asarray(y, dtype=np.int32)
+        return x, y
+
+    def end(self):
+        if self.workers:
+            self.stop.set()
+            with self.cond:
+                self.cond.notify_all()
+            for p in self.workers:
+                p.join(1.0)
+                if p.is_alive():
+                    p.terminate()
+            self.workers = []
+
+    def run(self, worker_id):
+        # different workers should do different augmentation
+        random.seed(self.seed + 1 + worker_id)
+        np.random.seed((self.seed + 1 + worker_id) % (1 << 32))
+        batch_buffer = self._batch_buffer()
+        # self.batch is the next mini-batch to return when the worker starts
+        batch = self.batch + worker_id
+        while True:
+            # wait until the slot is consumed
+            with self.cond:
+                while not self.stop.is_set() and \
+                        batch >= self.consumed.value + self.capacity:
+                    self.cond.wait()
+            if self.stop.is_set():
+                break
+            slot = batch % self.capacity
+            i = 0
+            for pos in self._file_positions(batch):
+                img_path = self._file_at(pos)[0]
+                aug_images = self.image_transform(
+                    os.path.join(self.image_folder, img_path))
+                assert len(aug_images) == self.images_per_file, \
+                    'expect %d images from %s, got %d' % \
+                    (self.images_per_file, img_path, len(aug_images))
+                for img in aug_images:
+                    batch_buffer[slot, i] = _to_array(img)
+                    i += 1
+            with self.cond:
+                self.ready[slot] = batch + 1
+                self.cond.notify_all()
+            batch += self.num_workers
+        return
+
+    def _batch_buffer(self):
+        shape = (self.capacity, self.batch_size) + self.image_shape
+        return np.frombuffer(self.buf, dtype=np.float32).reshape(shape)
+
+    def _file_positions(self, batch):
+        start = batch * self.files_per_batch
+        return range(start, start + self.files_per_batch)
+
+    def _file_at(self, pos):
+        '''Return the (path, meta) of the pos-th file over all epochs.'''
+        epoch, index = divmod(pos, self.num_samples)
+        if epoch != self.epoch:
+            self.order = list(range(self.num_samples))
+            if self.shuffle:
+                random.Random(self.seed + epoch).shuffle(self.order)
+            self.epoch = epoch
+        return self.img_list[self.order[index]]
+
+    def _check_workers(self):
+        for p in self.workers:
+            if p.exitcode is not None:
+                raise RuntimeError('worker (pid %d) exited unexpectedly with '
+                                   'code %d' % (p.pid, p.exitcode))
+
+
+def _to_array(img):
+    '''Convert a PIL image into a float32 array of shape (3, height, width).'''
+    return np.asarray(img.convert('RGB'), dtype=np.float32).transpose(2, 0, 1)
+
 
 if __name__ == '__main__':
     from . import image_tool
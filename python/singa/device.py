@@ -56,13 +56,38 @@ def device_query(id, verbose=False):
     return singa.Platform.DeviceQuery(id, verbose)
 
 
-def create_cpu_device():
-    '''Create the default CPU device.
+def create_cpu_device(num_executors=1):
+    '''Create a CPU device.
+
+    Args:
+        num_executors (int): number of threads used to run independent
+            operations of the buffered graph concurrently. If it is 1, the
+            default CPU device is returned; otherwise a new CPU device with
+            a negative ID other than -1 is created.
 
     Returns:
         a swig converted CPU device.
     '''
-    return singa.Platform.GetDefaultDevice()
+    assert num_executors >= 1, 'num_executors must be a positive integer.'
+    if num_executors == 1:
+        return singa.Platform.GetDefaultDevice()
+    return singa.Platform.CreateCppCPU(num_executors)
+
+
+def set_num_cpu_threads(num):
+    '''Set the number of OpenMP threads used by the CPU tensor kernels.
+
+    Args:
+        num (int): number of threads; 0 restores the OpenMP default, which
+            honours the OMP_NUM_THREADS environment variable.
+    '''
+    assert num >= 0, 'num must be a non-negative integer.'
+    singa.Platform.SetNumCpuThreads(num)
+
+
+def get_num_cpu_threads():
+    '''Get the number of threads used by the CPU tensor kernels.'''
+    return singa.Platform.GetNumCpuThreads()
 
 
 def create_cuda_gpus(num):
@@ -468,17 +468,24 @@ class Embedding(Layer):
     Generate an Embedding operator
     """
 
-    def __init__(self, input_dim, output_dim, initializer="gaussian"):
+    def __init__(self,
+                 input_dim,
+                 output_dim,
+                 initializer="gaussian",
+                 sparse_grad=False):
         """init the Embedding operator
         Args:
             input_dim (int): the number of different words in the dictionary
             output_dim (int): the dimendion of a word after the embedding
             initializer (str, optional): weight initializer, can be [uniform, gaussian]. Defaults to "uniform".
+            sparse_grad (bool, optional): if True, the gradient of the weight
+                is a tensor.RowSparseTensor of the rows of the input words.
         """
         super(Embedding, self).__init__()
         self.input_dim = input_dim
         self.output_dim = output_dim
         self.initializer = initializer
+        self.sparse_grad = sparse_grad
 
     def initialize(self, x):
         w_shape = (self.input_dim, self.output_dim)
@@ -496,7 +503,7 @@ class Embedding(Layer):
         self.W.requires_grad = not freeze
 
     def forward(self, x):
-        return autograd.embedding(x, self.W)
+        return autograd.embedding(x, self.W, self.sparse_grad)
 
     def get_params(self):
         return {self.W.name: self.W}
@@ -608,6 +615,8 @@ class Conv2d(Layer):
         self.inner_params = {
             "cudnn_prefer": "fastest",
             "workspace_MB_limit": 1024,
+            # set it to False to use the native cpu convolution instead of dnnl
+            "use_dnnl": True,
         }
         # TODO valid value of inner_params check
 
@@ -664,21 +673,20 @@ class Conv2d(Layer):
             _x = Tensor(shape=x_shape, device=x.device)
             _x.set_value(0.0)
 
-        if _x.device.id() == -1:
-            if self.group != 1:
-                raise ValueError("Not implemented yet")
-            else:
-                if not hasattr(self, "handle"):
-                    self.handle = singa.ConvHandle(
-                        _x.data,
-                        self.kernel_size,
-                        self.stride,
-                        self.padding,
-                        self.in_channels,
-                        self.nb_kernels,
-                        self.bias,
-                        self.group,
-                    )
+        if _x.device.id() < 0:
+            if not hasattr(self, "handle"):
+                self.handle = singa.ConvHandle(
+                    _x.data,
+                    self.kernel_size,
+                    self.stride,
+                    self.padding,
+                    self.in_channels,
+                    self.nb_kernels,
+                    self.bias,
+                    self.group,
+                )
+                if not self.inner_params["use_dnnl"]:
+                    self.handle.use_dnnl = False
         else:
             if not hasattr(self, "handle"):
                 if _x.dtype == tensor.float16:
@@ -844,7 +852,7 @@ class BatchNorm2d(Layer):
         self.running_var.set_value(1.0)
 
         if not hasattr(self, "handle"):
-            if x.device.id() == -1:
+            if x.device.id() < 0:
                 self.handle = singa.BatchNormHandle(self.momentum, x.data)
             else:
                 self.handle = singa.CudnnBatchNormHandle(self.momentum, x.data)
@@ -981,7 +989,7 @@ class Pooling2d(Layer):
             _x = Tensor(shape=x_shape, device=x.device)
             _x.set_value(0.0)
 
-        if _x.device.id() == -1:
+        if _x.device.id() < 0:
             self.handle = singa.PoolingHandle(
                 _x.data,
                 self.kernel_size,
@@ -1454,11 +1462,19 @@ class SoftMaxCrossEntropy(Layer):
     Generate a SoftMaxCrossEntropy operator
     """
 
-    def __init__(self):
+    def __init__(self, smoothing=0.0, ignore_index=-1):
+        """
+        Args:
+            smoothing (float): label smoothing for the targets of label indices
+            ignore_index (int): the label of the rows excluded from the loss
+        """
         super(SoftMaxCrossEntropy, self).__init__()
+        self.smoothing = smoothing
+        self.ignore_index = ignore_index
 
     def forward(self, x, t):
-        return autograd.softmax_cross_entropy(x, t)
+        return autograd.softmax_cross_entropy(x, t, self.smoothing,
+                                              self.ignore_index)
 
 
 class SoftMax(Layer):
@@ -1490,11 +1506,18 @@ class CrossEntropy(Layer):
     Generate a CrossEntropy operator
     """
 
-    def __init__(self):
+    def __init__(self, smoothing=0.0, ignore_index=-1):
+        """
+        Args:
+            smoothing (float): label smoothing for the targets of label indices
+            ignore_index (int): the label of the rows excluded from the loss
+        """
         super(CrossEntropy, self).__init__()
+        self.smoothing = smoothing
+        self.ignore_index = ignore_index
 
     def forward(self, x, t):
-        return autograd.cross_entropy(x, t)
+        return autograd.cross_entropy(x, t, self.smoothing, self.ignore_index)
 
 
 class BinaryCrossEntropy(Layer):
@@ -1549,7 +1572,7 @@ class Reshape(Layer):
 
 class CudnnRNN(Layer):
     """ `CudnnRNN` class implements with c++ backend and run the operation
-          directly on cuDNN
+          directly on cuDNN, or on the fused cpu kernels for CppCPU
         While `RNN` class implements with high level singa API
     """
 
@@ -1569,7 +1592,6 @@ class CudnnRNN(Layer):
                 hidden_size: hidden feature dim
                 rnn_mode: accepted value: "vanilla", "tanh", "relu",  "lstm", "gru"
         """
-        assert singa.USE_CUDA, "Not able to run without CUDA"
         assert num_layers > 0, "num layers should be > 0"
         assert 0 <= dropout < 1, "dropout shouldbe >=0 and <1"
         super(CudnnRNN, self).__init__()
@@ -1599,13 +1621,20 @@ class CudnnRNN(Layer):
             x = x.transpose((1, 0, 2))
         self.input_size = x.shape[1]
 
-        # GPU handle
-        self.handle = singa.CudnnRNNHandle(x.data,
-                                           self.hidden_size,
-                                           mode=self.cudnn_rnn_mode,
-                                           num_layers=self.num_layers,
-                                           dropout=self.dropout,
-                                           bidirectional=self.bidirectional)
+        if x.device.id() < 0:
+            self.handle = singa.RNNHandle(x.data,
+                                          self.hidden_size,
+                                          mode=self.cudnn_rnn_mode,
+                                          num_layers=self.num_layers,
+                                          dropout=self.dropout,
+                                          bidirectional=self.bidirectional)
+        else:
+            self.handle = singa.CudnnRNNHandle(x.data,
+                                               self.hidden_size,
+                                               mode=self.cudnn_rnn_mode,
+                                               num_layers=self.num_layers,
+                                               dropout=self.dropout,
+                                               bidirectional=self.bidirectional)
 
         self.W = Tensor(shape=(self.handle.weights_size,),
                         requires_grad=True,
@@ -20,13 +20,17 @@ This script includes Model class for python users
 to use Computational Graph in their model.
 '''
 
+import io
 import os
 import gc
-import time
 import json
+import mmap
+import zlib
+import struct
 import zipfile
 import numpy as np
 from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
 from collections import Iterable
 
 from singa import tensor
@@ -153,6 +157,10 @@ class Model(layer.Layer, metaclass=ModelMeta):
         self._buffered = False
         self._results = None
 
+        # background checkpointing
+        self._save_executor = None
+        self._pending_saves = []
+
     def compile(self, inputs, is_train=True, use_graph=False, sequential=False):
         """ Compile and initialize the model
 
@@ -241,68 +249,88 @@ class Model(layer.Layer, metaclass=ModelMeta):
         else:
             return self.forward(*input, **kwargs)
 
-    def save_states(self, fpath, aux_states={}):
+    def save_states(self, fpath, aux_states={}, compression=False):
         """Save states.
 
+        The states are written into a single file in one pass: the tensor
+        data, which is written from the tensor memory directly (tensors on GPU
+        are copied to host one by one), followed by a JSON index with the
+        offset of each tensor.
+
         Args:
             fpath: output file path (without the extension)
             aux_states(dict): values are standard data types or Tensor,
                               e.g., epoch ID, learning rate, optimizer states
+            compression(bool): compress the tensor data with zlib. The
+                uncompressed file could be loaded via mmap.
         """
         assert not os.path.isfile(fpath), (
             "Failed to save states, %s is already existed." % fpath)
 
-        states = self.get_states()
+        # tensors on GPU are copied to host one by one while writing
+        states = ((k, tensor.to_numpy(v, copy=False), state_type)
+                  for k, v, state_type in self._collect_states(aux_states))
+        _write_states(fpath, states, compression)
+
+    def async_save_states(self,
+                          fpath,
+                          aux_states={},
+                          compression=False,
+                          max_pending=1):
+        """Save states in a background thread.
+
+        The states are copied into host memory before returning, hence the
+        training could continue while the copy is written into a temporary
+        file, which is flushed to disk and then renamed to fpath.
 
-        # save states data and attr
-        tensor_dict = {}
-        states_attr = {}
-        for k, v in states.items():
+        Usage:
+            handle = m.async_save_states('mymodel.bin', aux_states)
+            ... # training
+            handle.result()  # wait until the file is in place
+
+        Args:
+            fpath: output file path
+            aux_states(dict): values are Tensor, e.g., optimizer states
+            compression(bool): compress the tensor data with zlib
+            max_pending(int): the max number of snapshots being written; this
+                call waits for the earlier snapshots to bound the host memory.
+        Returns:
+            a concurrent.futures.Future, whose result() waits for the saving
+            and raises the exception of the background thread if any
+        """
+        assert not os.path.isfile(fpath), (
+            "Failed to save states, %s is already existed." % fpath)
+        assert max_pending > 0, "max_pending should be positive"
+
+        self._pending_saves = [f for f in self._pending_saves if not f.done()]
+        while len(self._pending_saves) >= max_pending:
+            self._pending_saves.pop(0).result()
+
+        # a consistent snapshot of the states
+        states = [(k, tensor.to_numpy(v), state_type)
+                  for k, v, state_type in self._collect_states(aux_states)]
+
+        if self._save_executor is None:
+            self._save_executor = ThreadPoolExecutor(max_workers=1)
+        handle = self._save_executor.submit(_write_states_atomic, fpath, states,
+                                            compression)
+        self._pending_saves.append(handle)
+        return handle
+
+    def _collect_states(self, aux_states):
+        """Return the list of (name, tensor, state type) to be saved."""
+        ret = []
+        for k, v in self.get_states().items():
             assert isinstance(v, tensor.Tensor), "Only tensor state is allowed"
-            tensor_dict[k] = tensor.to_numpy(v)
-            states_attr[k] = {
-                'state_type': self.MODEL_STATE_TYPE,
-                'shape': v.shape,
-                'dtype': v.dtype
-            }
+            ret.append((k, v, self.MODEL_STATE_TYPE))
 
         for k, v in aux_states.items():
             assert isinstance(v,
                               tensor.Tensor), "Only tensor aux state is allowed"
-            tensor_dict[k] = tensor.to_numpy(v)
-            states_attr[k] = {
-                'state_type': self.AUX_STATE_TYPE,
-                'shape': v.shape,
-                'dtype': v.dtype
-            }
+            ret.append((k, v, self.AUX_STATE_TYPE))
+        return ret
 
-        # save to files
-        timestamp = time.time()
-        tmp_dir = '/tmp/singa_save_states_%s' % timestamp
-        os.mkdir(tmp_dir)
-        tensor_dict_fp = tmp_dir + self.TENSOR_DICT_FILENAME
-        states_attr_fp = tmp_dir + self.STATES_ATTR_FILENAME
-
-        np.savez(tensor_dict_fp, **tensor_dict)
-
-        with open(states_attr_fp, 'w') as fp:
-            json.dump(states_attr, fp)
-
-        compression = zipfile.ZIP_DEFLATED
-        with zipfile.ZipFile(fpath, mode="w") as zf:
-            zf.write(tensor_dict_fp,
-                     os.path.basename(tensor_dict_fp),
-                     compress_type=compression)
-            zf.write(states_attr_fp,
-                     os.path.basename(states_attr_fp),
-                     compress_type=compression)
-
-        # clean up tmp files
-        os.remove(tensor_dict_fp)
-        os.remove(states_attr_fp)
-        os.rmdir(tmp_dir)
-
-    def load_states(self, fpath):
+    def load_states(self, fpath, mmap=False):
         """Load the model states and auxiliary states from disk.
 
         Usage:
@@ -312,6 +340,9 @@ class Model(layer.Layer, metaclass=ModelMeta):
 
         Args:
             path: input file path (without the extension)
+            mmap(bool): map the uncompressed file into memory instead of
+                reading it; the model states are copied from the mapped pages
+                and the auxiliary states share the (copy-on-write) pages.
         Returns:
             dict
         """
@@ -319,36 +350,153 @@ class Model(layer.Layer, metaclass=ModelMeta):
         assert os.path.isfile(fpath), (
             "Failed to load states, %s is not exist." % fpath)
 
-        timestamp = time.time()
-        tmp_dir = '/tmp/singa_load_states_%s' % timestamp
-        os.mkdir(tmp_dir)
-
-        with zipfile.ZipFile(fpath, 'r') as zf:
-            zf.extractall(tmp_dir)
-
-        tensor_dict_fp = tmp_dir + self.TENSOR_DICT_FILENAME
-        states_attr_fp = tmp_dir + self.STATES_ATTR_FILENAME
-
-        with open(states_attr_fp) as f:
-            states_attr = json.load(f)
-
-        tensor_dict = np.load(tensor_dict_fp)
+        with open(fpath, 'rb') as fp:
+            magic = fp.read(len(_STATES_MAGIC))
+        # the tensor data of the states may look like the end of a zip
+        # archive, hence the zip format of earlier versions is checked last
+        if magic != _STATES_MAGIC and zipfile.is_zipfile(fpath):
+            arrays = _read_zip_states(fpath, self.TENSOR_DICT_FILENAME,
+                                      self.STATES_ATTR_FILENAME)
+        else:
+            arrays = _read_states(fpath, mmap)
 
-        # restore singa tensor from numpy
+        # restore singa tensor from numpy without copy
         model_states = dict()
         aux_states = dict()
 
-        for k in tensor_dict.files:
-            if states_attr[k]['state_type'] == self.MODEL_STATE_TYPE:
-                model_states[k] = tensor.from_numpy(tensor_dict[k])
-            elif states_attr[k]['state_type'] == self.AUX_STATE_TYPE:
-                aux_states[k] = tensor.from_numpy(tensor_dict[k])
+        for k, (arr, state_type) in arrays.items():
+            if state_type == self.MODEL_STATE_TYPE:
+                model_states[k] = tensor.from_numpy(arr, copy=False)
+            elif state_type == self.AUX_STATE_TYPE:
+                aux_states[k] = tensor.from_numpy(arr, copy=False)
 
         # restore model_states
         self.set_states(model_states)
-
-        # clean up tmp files
-        os.remove(tensor_dict_fp)
-        os.remove(states_attr_fp)
-        os.rmdir(tmp_dir)
         return aux_states
+
+
+# file format of the states: the magic (padded), the tensor data aligned to
+# _STATES_ALIGN bytes, the json header, the length of the header and the magic.
+# the header includes the version and, for each tensor, its state type, shape,
+# numpy dtype, offset in the file, number of bytes and whether it is compressed
+_STATES_MAGIC = b'SINGAST\x00'
+_STATES_VERSION = 1
+_STATES_ALIGN = 64
+_STATES_CHUNK = 1 << 24
+
+
+def _write_states(fpath, arrays, compression=False, fsync=False):
+    """Write the (name, numpy array, state_type) tuples into fpath in one pass.
+    """
+    states = dict()
+    with open(fpath, 'wb') as fp:
+        fp.write(_STATES_MAGIC.ljust(_STATES_ALIGN, b'\x00'))
+        for k, arr, state_type in arrays:
+            buf = arr.reshape(-1).view(np.uint8)
+            offset = fp.tell()
+            if compression:
+                comp = zlib.compressobj()
+                for i in range(0, buf.size, _STATES_CHUNK):
+                    fp.write(comp.compress(buf[i:i + _STATES_CHUNK]))
+                fp.write(comp.flush())
+            else:
+                fp.write(buf)
+            states[k] = {
+                'state_type': state_type,
+                'shape': list(arr.shape),
+                'dtype': arr.dtype.str,
+                'offset': offset,
+                'nbytes': fp.tell() - offset,
+                'compressed': compression
+            }
+            fp.write(b'\x00' * (-fp.tell() % _STATES_ALIGN))
+        header = json.dumps({
+            'version': _STATES_VERSION,
+            'states': states
+        }).encode()
+        fp.write(header)
+        fp.write(struct.pack('<Q', len(header)) + _STATES_MAGIC)
+        if fsync:
+            fp.flush()
+            os.fsync(fp.fileno())
+
+
+def _write_states_atomic(fpath, arrays, compression=False):
+    """Write the states into a temporary file and rename it to fpath."""
+    tmp_fpath = fpath + '.tmp'
+    try:
+        _write_states(tmp_fpath, arrays, compression, fsync=True)
+        os.replace(tmp_fpath, fpath)
+    except BaseException:
+        if os.path.isfile(tmp_fpath):
+            os.remove(tmp_fpath)
+        raise
+
+
+def _read_states(fpath, use_mmap=False):
+    """Read the states written by _write_states.
+
+    Returns:
+        a dict from the state name to (numpy array, state_type)
+    """
+    ret = dict()
+    with open(fpath, 'rb') as fp:
+        tail = len(_STATES_MAGIC) + 8
+        assert fp.read(len(_STATES_MAGIC)) == _STATES_MAGIC, (
+            "Failed to load states, %s has an unknown format." % fpath)
+        fp.seek(-tail, os.SEEK_END)
+        header_len, magic = struct.unpack('<Q%ds' % len(_STATES_MAGIC),
+                                          fp.read(tail))
+        assert magic == _STATES_MAGIC, (
+            "Failed to load states, %s is truncated." % fpath)
+        fp.seek(-tail - header_len, os.SEEK_END)
+        header = json.loads(fp.read(header_len).decode())
+        assert header['version'] <= _STATES_VERSION, (
+            "Failed to load states of version %d" % header['version'])
+
+        mm = None
+        if use_mmap:
+            # copy-on-write pages, which are kept alive by the arrays
+            mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_COPY)
+
+        for k, attr in header['states'].items():
+            dtype = np.dtype(attr['dtype'])
+            shape = tuple(attr['shape'])
+            if attr['compressed']:
+                arr = np.empty(shape, dtype)
+                buf = arr.reshape(-1).view(np.uint8)
+                decomp = zlib.decompressobj()
+                fp.seek(attr['offset'])
+                pos, remain = 0, attr['nbytes']
+                while remain > 0:
+                    chunk = decomp.decompress(
+                        fp.read(min(remain, _STATES_CHUNK)))
+                    remain -= _STATES_CHUNK
+                    buf[pos:pos + len(chunk)] = np.frombuffer(chunk, np.uint8)
+                    pos += len(chunk)
+                chunk = decomp.flush()
+                buf[pos:pos + len(chunk)] = np.frombuffer(chunk, np.uint8)
+            elif mm is not None:
+                arr = np.frombuffer(mm,
+                                    dtype,
+                                    count=attr['nbytes'] // dtype.itemsize,
+                                    offset=attr['offset']).reshape(shape)
+            else:
+                arr = np.empty(shape, dtype)
+                fp.seek(attr['offset'])
+                fp.readinto(arr.reshape(-1).view(np.uint8))
+            ret[k] = (arr, attr['state_type'])
+    return ret
+
+
+def _read_zip_states(fpath, tensor_dict_filename, states_attr_filename):
+    """Read the states saved as a zip archive of a npz and a json file."""
+    with zipfile.ZipFile(fpath, 'r') as zf:
+        states_attr = json.loads(
+            zf.read(os.path.basename(states_attr_filename)).decode())
+        tensor_dict = np.load(
+            io.BytesIO(zf.read(os.path.basename(tensor_dict_filename))))
+        return {
+            k: (tensor_dict[k], states_attr[k]['state_type'])
+            for k in tensor_dict.files
+        }
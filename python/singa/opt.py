@@ -91,6 +91,9 @@ class Optimizer(object):
         self.step_counter.set_value(0)
         self.lr_value = self.lr(self.step_counter)
 
+        # update the dense float32 params in one op via apply_fused
+        self.fused = False
+
     def get_states(self):
         # skip DecayScheduler as it does not have persistent states
         return {'step_counter': tensor.to_numpy(self.step_counter)[0]}
@@ -105,10 +108,17 @@ class Optimizer(object):
         self.step()
 
     def call(self, loss):
+        fused = []
         for p, g in autograd.backward(loss):
             if p.name is None:
                 p.name = id(p)
-            self.apply(p.name, p, g)
+            if (self.fused and isinstance(g, Tensor) and
+                    p.dtype == tensor.float32):
+                fused.append((p.name, p, g))
+            else:
+                self.apply(p.name, p, g)
+        if fused:
+            self.apply_fused(*zip(*fused))
 
     def step(self):
         """To increment the step counter and update the lr"""
@@ -123,7 +133,22 @@ class Optimizer(object):
                 param_name(String): the name of the param
                 param_value(Tensor): param values to be update in-place
                 grad(Tensor): param gradients; the values may be updated
-                        in this function; cannot use it anymore
+                        in this function; cannot use it anymore. A
+                        RowSparseTensor gradient is applied lazily, i.e.,
+                        only its rows of the param and of the optimizer
+                        states are updated
+        """
+        raise NotImplementedError
+
+    def apply_fused(self, param_names, param_values, param_grads):
+        """Performs a single optimization step for all the params in one
+        fused operation, following the same update rule as apply().
+
+        Args:
+                param_names(list of String): the names of the params
+                param_values(list of Tensor): param values to be update
+                        in-place; they should be on the same device
+                param_grads(list of Tensor): param gradients
         """
         raise NotImplementedError
 
@@ -182,6 +207,8 @@ class SGD(Optimizer):
         weight_decay(float, optional): weight decay(L2 penalty)(default: 0)
         dampening(float, optional): dampening for momentum(default: 0)
         nesterov(bool, optional): enables Nesterov momentum(default: False)
+        fused(bool, optional): updates all dense float32 params in one
+            fused operation when called with the loss(default: False)
 
     Typical usage example:
         >> > from singa import opt
@@ -219,8 +246,10 @@ class SGD(Optimizer):
                  dampening=0,
                  weight_decay=0,
                  nesterov=False,
-                 dtype=tensor.float32):
+                 dtype=tensor.float32,
+                 fused=False):
         super(SGD, self).__init__(lr, dtype)
+        self.fused = fused
 
         # init momentum
         if type(momentum) == float or type(momentum) == int:
@@ -284,6 +313,10 @@ class SGD(Optimizer):
         # derive dtype from input
         assert param_value.dtype == self.dtype
 
+        if isinstance(param_grad, tensor.RowSparseTensor):
+            self._apply_row_sparse(param_name, param_value, param_grad)
+            return
+
         # TODO add branch operator
         # if self.decay_value != 0:
         if self.weight_decay.init_value != 0:
@@ -309,6 +342,59 @@ class SGD(Optimizer):
         minus_lr = 0.0 - self.lr_value
         singa.Axpy(minus_lr.data, param_grad.data, param_value.data)
 
+    def apply_fused(self, param_names, param_values, param_grads):
+        self.device_check(param_values[0], self.step_counter, self.lr_value,
+                          self.mom_value, self.dam_value, self.decay_value)
+
+        moments = []
+        if self.momentum.init_value != 0:
+            for name, param_value in zip(param_names, param_values):
+                if name not in self.moments:
+                    flag = param_value.device.graph_enabled()
+                    param_value.device.EnableGraph(False)
+                    self.moments[name] = tensor.zeros_like(param_value)
+                    param_value.device.EnableGraph(flag)
+                moments.append(self.moments[name].data)
+
+        singa.MultiTensorSGD([g.data for g in param_grads],
+                             [p.data for p in param_values], moments,
+                             self.lr_value.data, self.mom_value.data,
+                             self.dam_value.data, self.decay_value.data,
+                             self.nesterov)
+
+    def _apply_row_sparse(self, param_name, param_value, param_grad):
+        """Updates the rows of the param and the moment in the row sparse
+        gradient; the other rows are not changed."""
+        if self.weight_decay.init_value != 0 or self.momentum.init_value != 0:
+            # each row should be updated once
+            param_grad = param_grad.coalesce()
+        indices, values = param_grad.indices, param_grad.values
+
+        if self.weight_decay.init_value != 0:
+            rows = tensor.gather_rows(param_value, indices)
+            singa.Axpy(self.decay_value.data, rows.data, values.data)
+
+        if self.momentum.init_value != 0:
+            if param_name not in self.moments:
+                flag = param_value.device.graph_enabled()
+                param_value.device.EnableGraph(False)
+                self.moments[param_name] = tensor.zeros_like(param_value)
+                param_value.device.EnableGraph(flag)
+
+            buf = tensor.gather_rows(self.moments[param_name], indices)
+            buf *= self.mom_value
+            alpha = 1.0 - self.dam_value
+            singa.Axpy(alpha.data, values.data, buf.data)
+            tensor.scatter_rows(buf, indices, self.moments[param_name])
+
+            if self.nesterov:
+                singa.Axpy(self.mom_value.data, buf.data, values.data)
+            else:
+                values = buf
+
+        minus_lr = 0.0 - self.lr_value
+        tensor.scatter_add_rows(values * minus_lr, indices, param_value)
+
     def step(self):
         # increment step counter, lr and moment
         super().step()
@@ -394,6 +480,10 @@ class RMSProp(Optimizer):
         self.device_check(param_value, self.step_counter, self.lr_value,
                           self.rho_value, self.epsilon_value, self.decay_value)
 
+        if isinstance(param_grad, tensor.RowSparseTensor):
+            self._apply_row_sparse(param_name, param_value, param_grad)
+            return
+
         # if self.decay_value != 0:
         if self.weight_decay.init_value != 0:
             singa.Axpy(self.decay_value.data, param_value.data, param_grad.data)
@@ -420,6 +510,36 @@ class RMSProp(Optimizer):
 
         singa.Axpy(minus_lr.data, tmp3, param_value.data)
 
+    def _apply_row_sparse(self, param_name, param_value, param_grad):
+        """Updates the rows of the param and the running average in the row
+        sparse gradient; the other rows are not changed."""
+        param_grad = param_grad.coalesce()
+        indices, values = param_grad.indices, param_grad.values
+
+        if self.weight_decay.init_value != 0:
+            rows = tensor.gather_rows(param_value, indices)
+            singa.Axpy(self.decay_value.data, rows.data, values.data)
+
+        if param_name not in self.running_average:
+            flag = param_value.device.graph_enabled()
+            param_value.device.EnableGraph(False)
+            self.running_average[param_name] = tensor.zeros_like(param_value)
+            param_value.device.EnableGraph(flag)
+
+        running_average = tensor.gather_rows(self.running_average[param_name],
+                                             indices)
+        running_average *= self.rho_value
+        tmp1 = singa.Square(values.data)
+        tmp2 = 1.0 - self.rho_value
+        singa.Axpy(tmp2.data, tmp1, running_average.data)
+        tensor.scatter_rows(running_average, indices,
+                            self.running_average[param_name])
+
+        minus_lr = 0.0 - self.lr_value
+        tmp3 = tensor.sqrt(running_average + self.epsilon_value)
+        tmp3 = values / tmp3 * minus_lr
+        tensor.scatter_add_rows(tmp3, indices, param_value)
+
     def step(self):
         # increment step counter, lr and moment
         super().step()
@@ -492,6 +612,10 @@ class AdaGrad(Optimizer):
         self.device_check(param_value, self.step_counter, self.lr_value,
                           self.epsilon_value, self.decay_value)
 
+        if isinstance(param_grad, tensor.RowSparseTensor):
+            self._apply_row_sparse(param_name, param_value, param_grad)
+            return
+
         # if self.decay_value != 0:
         if self.weight_decay.init_value != 0:
             singa.Axpy(self.decay_value.data, param_value.data, param_grad.data)
@@ -514,6 +638,31 @@ class AdaGrad(Optimizer):
         tmp = singa.__div__(param_grad.data, tmp)
         singa.Axpy(minus_lr.data, tmp, param_value.data)
 
+    def _apply_row_sparse(self, param_name, param_value, param_grad):
+        """Updates the rows of the param and the history in the row sparse
+        gradient; the other rows are not changed."""
+        param_grad = param_grad.coalesce()
+        indices, values = param_grad.indices, param_grad.values
+
+        if self.weight_decay.init_value != 0:
+            rows = tensor.gather_rows(param_value, indices)
+            singa.Axpy(self.decay_value.data, rows.data, values.data)
+
+        if param_name not in self.history:
+            flag = param_value.device.graph_enabled()
+            param_value.device.EnableGraph(False)
+            self.history[param_name] = tensor.zeros_like(param_value)
+            param_value.device.EnableGraph(flag)
+
+        history = tensor.gather_rows(self.history[param_name], indices)
+        history += tensor.square(values)
+        tensor.scatter_rows(history, indices, self.history[param_name])
+
+        minus_lr = 0.0 - self.lr_value
+        tmp = tensor.sqrt(history + self.epsilon_value)
+        tmp = values / tmp * minus_lr
+        tensor.scatter_add_rows(tmp, indices, param_value)
+
     def step(self):
         # increment step counter, lr and moment
         super().step()
@@ -542,6 +691,8 @@ class Adam(Optimizer):
         beta_1(float): coefficient of momentum
         beta_2(float): coefficient of aggregated squared gradient
         epsilon (float): small value for preventing numeric error
+        fused (bool): updates all dense float32 params in one fused
+            operation when called with the loss
     '''
 
     def __init__(self,
@@ -549,8 +700,10 @@ class Adam(Optimizer):
                  beta_1=0.9,
                  beta_2=0.999,
                  epsilon=1e-8,
-                 weight_decay=0):
+                 weight_decay=0,
+                 fused=False):
         super(Adam, self).__init__(lr)
+        self.fused = fused
 
         # init weight_decay
         if type(weight_decay) == float or type(weight_decay) == int:
@@ -611,6 +764,10 @@ class Adam(Optimizer):
                           self.beta_1_value, self.beta_2_value,
                           self.epsilon_value, self.decay_value)
 
+        if isinstance(param_grad, tensor.RowSparseTensor):
+            self._apply_row_sparse(param_name, param_value, param_grad)
+            return
+
         # if self.decay_value != 0:
         if self.weight_decay.init_value != 0:
             singa.Axpy(self.decay_value.data, param_value.data, param_grad.data)
@@ -659,6 +816,68 @@ class Adam(Optimizer):
         minus_lr = 0.0 - self.lr_value
         singa.Axpy(minus_lr.data, tmp.data, param_value.data)
 
+    def apply_fused(self, param_names, param_values, param_grads):
+        self.device_check(param_values[0], self.step_counter, self.lr_value,
+                          self.beta_1_value, self.beta_2_value,
+                          self.epsilon_value, self.decay_value)
+
+        for name, param_value in zip(param_names, param_values):
+            if name not in self.m:
+                flag = param_value.device.graph_enabled()
+                param_value.device.EnableGraph(False)
+                self.m[name] = tensor.zeros_like(param_value)
+                self.v[name] = tensor.zeros_like(param_value)
+                param_value.device.EnableGraph(flag)
+
+        singa.MultiTensorAdam([g.data for g in param_grads],
+                              [p.data for p in param_values],
+                              [self.m[name].data for name in param_names],
+                              [self.v[name].data for name in param_names],
+                              self.lr_value.data, self.beta_1_value.data,
+                              self.beta_2_value.data, self.epsilon_value.data,
+                              self.decay_value.data, self.step_counter.data)
+
+    def _apply_row_sparse(self, param_name, param_value, param_grad):
+        """Updates the rows of the param, m and v in the row sparse gradient;
+        the other rows are not changed (i.e., lazy Adam)."""
+        param_grad = param_grad.coalesce()
+        indices, values = param_grad.indices, param_grad.values
+
+        if self.weight_decay.init_value != 0:
+            rows = tensor.gather_rows(param_value, indices)
+            singa.Axpy(self.decay_value.data, rows.data, values.data)
+
+        if param_name not in self.m:
+            flag = param_value.device.graph_enabled()
+            param_value.device.EnableGraph(False)
+            self.m[param_name] = tensor.zeros_like(param_value)
+            self.v[param_name] = tensor.zeros_like(param_value)
+            param_value.device.EnableGraph(flag)
+
+        step = self.step_counter + 1.0
+
+        # m := beta_1 * m + (1 - beta_1) * grad
+        m = tensor.gather_rows(self.m[param_name], indices)
+        tmp = 1.0 - self.beta_1_value
+        m *= self.beta_1_value
+        singa.Axpy(tmp.data, values.data, m.data)
+        tensor.scatter_rows(m, indices, self.m[param_name])
+
+        # v := beta_2 * v + (1 - beta_2) * grad * grad
+        v = tensor.gather_rows(self.v[param_name], indices)
+        tmp = 1.0 - self.beta_2_value
+        v *= self.beta_2_value
+        singa.Axpy(tmp.data, singa.Square(values.data), v.data)
+        tensor.scatter_rows(v, indices, self.v[param_name])
+
+        m_norm = m / (1.0 - tensor.pow(self.beta_1_value, step))
+        v_norm = v / (1.0 - tensor.pow(self.beta_2_value, step))
+
+        # param := param - (lr * m_norm) / ( sqrt(v_norm) + epsilon) )
+        a = tensor.sqrt(v_norm) + self.epsilon_value
+        minus_lr = 0.0 - self.lr_value
+        tensor.scatter_add_rows(m_norm / a * minus_lr, indices, param_value)
+
     def step(self):
         # increment step counter, lr and moment
         super().step()
@@ -844,6 +1063,8 @@ class DistOpt(object):
         acc = 0
         glist = []
         for p, g in autograd.backward(loss):
+            if isinstance(g, tensor.RowSparseTensor):
+                g = g.to_dense()
             if g.size() > threshold:
                 # larger than threshold -> reduced directly
                 self.all_reduce(g.data)
@@ -894,6 +1115,8 @@ class DistOpt(object):
         acc = 0
         glist = []
         for p, g in autograd.backward(loss):
+            if isinstance(g, tensor.RowSparseTensor):
+                g = g.to_dense()
             assert p.dtype == tensor.float32, (
                 'This function is only available for input tensor precision 32 bit, '
                 'which are converted into 16 bits before transmit')
@@ -1033,6 +1256,8 @@ class DistOpt(object):
         k = -1
         glist = []
         for p, g in autograd.backward(loss):
+            if isinstance(g, tensor.RowSparseTensor):
+                g = g.to_dense()
             if g.size() > threshold:
                 # larger than threshold -> reduced directly
                 k += 1
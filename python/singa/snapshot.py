@@ -59,9 +59,15 @@ class Snapshot(object):
 
         Args:
             param_name (string): name of the parameter
-            param_val (Tensor): value tensor of the parameter
+            param_val (Tensor or RowSparseTensor): value tensor of the
+                parameter; only the rows of a RowSparseTensor are written and
+                it is read back as a dense Tensor
         '''
-        self.snapshot.Write(param_name.encode(), param_val.data)
+        if isinstance(param_val, tensor.RowSparseTensor):
+            self.snapshot.Write(param_name.encode(), param_val.indices.data,
+                                param_val.values.data, param_val.shape)
+        else:
+            self.snapshot.Write(param_name.encode(), param_val.data)
 
     def read(self):
         '''Call read method to load all (param_name, param_val)
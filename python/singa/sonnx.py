@@ -1034,6 +1034,455 @@ class OnnxAttributes(dict):
         return d
 
 
+class GraphOptimizer(object):
+    """
+    Rewrite an ONNX graph in place before it is mapped to singa operators,
+    so that the work which does not depend on the inputs is done once at
+    prepare time instead of on every forward. Each pass returns the number
+    of nodes it removed.
+    """
+
+    # the passes in the order they are run
+    passes = ('fold_constants', 'fuse_conv_bn', 'fuse_gemm_add',
+              'cancel_transpose_reshape', 'eliminate_dead_nodes')
+
+    # fuse_conv_bn folds the running statistics into the convolution, which
+    # is only valid for inference
+    training_passes = ('fold_constants', 'fuse_gemm_add',
+                       'cancel_transpose_reshape', 'eliminate_dead_nodes')
+
+    # the operators evaluated by numpy when all their inputs are constant
+    _foldable_operators = ('Constant', 'ConstantOfShape', 'Shape', 'Gather',
+                           'Unsqueeze', 'Squeeze', 'Concat', 'Cast', 'Slice',
+                           'Reshape', 'Add', 'Sub', 'Mul', 'Div')
+
+    def __init__(self, graph):
+        """
+        Args:
+            graph (GraphProto): the graph to optimize, modified in place
+        """
+        self.graph = graph
+
+    def optimize(self, passes=None):
+        """
+        run the passes on the graph
+        Args:
+            passes (str[]): the names of the passes to run, all by default
+        Returns:
+            an OrderedDict of the number of nodes removed by each pass
+        """
+        passes = self.passes if passes is None else passes
+        unknown = set(passes) - set(self.passes)
+        if unknown:
+            raise ValueError("Unknown optimization passes: {}".format(
+                sorted(unknown)))
+        report = OrderedDict()
+        for name in self.passes:
+            if name in passes:
+                report[name] = getattr(self, name)()
+        self._prune_initializers()
+        return report
+
+    def fold_constants(self):
+        """
+        evaluate the nodes whose inputs are all constant, e.g., the chains of
+        Shape, Gather, Unsqueeze and Concat computing the target shape of a
+        Reshape, and replace their outputs by initializers
+        """
+        nodes = list(self.graph.node)
+        outputs = self._graph_outputs()
+        # the declared shapes of the graph inputs, and hence of the tensors
+        # computed from them, may differ from the shapes at runtime, e.g., for
+        # another batch size, thus only the shapes of constants are folded
+        shapes = {tp.name: list(tp.dims) for tp in self.graph.initializer}
+        # float initializers are the weights, which may be trained later
+        values = {}
+        for tp in self.graph.initializer:
+            if tp.data_type not in (TensorProto.FLOAT, TensorProto.DOUBLE,
+                                    TensorProto.FLOAT16):
+                values[tp.name] = numpy_helper.to_array(tp)
+        folded = []
+        for node in nodes:
+            if (node.op_type not in self._foldable_operators or
+                    len(node.output) != 1 or node.output[0] in outputs):
+                continue
+            if node.op_type != 'Shape' and not all(name in values
+                                                   for name in node.input):
+                continue
+            value = self._evaluate(node,
+                                   [values.get(name) for name in node.input],
+                                   shapes)
+            if value is None:
+                continue
+            value = np.asarray(value)
+            values[node.output[0]] = value
+            shapes[node.output[0]] = list(value.shape)
+            folded.append(node)
+        # the folded tensors read by the remaining nodes become initializers
+        names = [node.output[0] for node in folded]
+        removed = self._remove_nodes(nodes, folded)
+        consumers = self._consumers()
+        for name in names:
+            if name in consumers:
+                self._add_initializer(name, values[name])
+        return removed
+
+    def fuse_conv_bn(self):
+        """
+        fold the BatchNormalization following a Conv into the weights and the
+        bias of the Conv
+        """
+        nodes = list(self.graph.node)
+        initializers = self._initializers()
+        producers = self._producers(nodes)
+        consumers = self._consumers()
+        outputs = self._graph_outputs()
+        fused = []
+        for node in nodes:
+            if node.op_type != 'BatchNormalization' or len(
+                [name for name in node.output if name]) != 1:
+                continue
+            conv = producers.get(node.input[0])
+            if (conv is None or conv.op_type != 'Conv' or
+                    consumers[conv.output[0]] != 1 or
+                    conv.output[0] in outputs):
+                continue
+            if not all(name in initializers
+                       for name in list(conv.input[1:]) + list(node.input[1:])):
+                continue
+            scale, bias, mean, var = [
+                numpy_helper.to_array(initializers[name])
+                for name in node.input[1:5]
+            ]
+            epsilon = OnnxAttributes.from_onnx(node.attribute).get(
+                'epsilon', 1e-5)
+            W = numpy_helper.to_array(initializers[conv.input[1]])
+            if len(conv.input) == 3:
+                b = numpy_helper.to_array(initializers[conv.input[2]])
+            else:
+                b = np.zeros(W.shape[0], dtype=W.dtype)
+            factor = scale / np.sqrt(var + epsilon)
+            W = W * factor.reshape((-1,) + (1,) * (W.ndim - 1))
+            b = (b - mean) * factor + bias
+            W_name = self._unique_name(conv.input[1] + '_fused')
+            self._add_initializer(W_name, W.astype(np.float32))
+            b_name = self._unique_name(W_name + '_bias')
+            self._add_initializer(b_name, b.astype(np.float32))
+            del conv.input[1:]
+            conv.input.extend([W_name, b_name])
+            conv.output[0] = node.output[0]
+            fused.append(node)
+        return self._remove_nodes(nodes, fused)
+
+    def fuse_gemm_add(self):
+        """
+        fold the Add of a constant vector following a Gemm into the bias of
+        the Gemm
+        """
+        nodes = list(self.graph.node)
+        initializers = self._initializers()
+        producers = self._producers(nodes)
+        consumers = self._consumers()
+        outputs = self._graph_outputs()
+        fused = []
+        for node in nodes:
+            if node.op_type != 'Add':
+                continue
+            for i in range(2):
+                gemm = producers.get(node.input[i])
+                bias_name = node.input[1 - i]
+                if gemm is not None and gemm.op_type == 'Gemm':
+                    break
+            else:
+                continue
+            if (consumers[gemm.output[0]] != 1 or gemm.output[0] in outputs or
+                    bias_name not in initializers or
+                    not all(name in initializers for name in gemm.input[1:])):
+                continue
+            attrs = OnnxAttributes.from_onnx(gemm.attribute)
+            W = numpy_helper.to_array(initializers[gemm.input[1]])
+            n = W.shape[0] if attrs.get('transB', 0) else W.shape[1]
+            bias = self._as_row(numpy_helper.to_array(initializers[bias_name]),
+                                n)
+            if bias is None:
+                continue
+            if len(gemm.input) == 3:
+                C = self._as_row(
+                    numpy_helper.to_array(initializers[gemm.input[2]]), n)
+                if C is None:
+                    continue
+                bias = attrs.get('beta', 1.) * C + bias
+            b_name = self._unique_name(gemm.input[1] + '_bias')
+            self._add_initializer(b_name, bias.astype(np.float32))
+            del gemm.input[2:]
+            gemm.input.append(b_name)
+            attributes = [a for a in gemm.attribute if a.name != 'beta']
+            del gemm.attribute[:]
+            gemm.attribute.extend(attributes +
+                                  [helper.make_attribute('beta', 1.)])
+            gemm.output[0] = node.output[0]
+            fused.append(node)
+        return self._remove_nodes(nodes, fused)
+
+    def cancel_transpose_reshape(self):
+        """
+        merge the consecutive Transposes and Reshapes, and remove the ones
+        which do not change their input
+        """
+        nodes = list(self.graph.node)
+        initializers = self._initializers()
+        producers = self._producers(nodes)
+        consumers = self._consumers()
+        outputs = self._graph_outputs()
+        ranks = self._ranks()
+        removed = []
+
+        def mergeable(prev, op_type):
+            # the previous node is read only by the current node
+            return (prev is not None and prev.op_type == op_type and
+                    all(prev is not node for node in removed) and
+                    consumers[prev.output[0]] == 1 and
+                    prev.output[0] not in outputs)
+
+        def cancel(node):
+            # the node does not change its input
+            if self._rewire(node.output[0], node.input[0]):
+                consumers[node.input[0]] += consumers.pop(node.output[0], 0) - 1
+                removed.append(node)
+
+        for node in nodes:
+            if node.op_type == 'Transpose':
+                perm = OnnxAttributes.from_onnx(node.attribute).get('perm')
+                if perm is None:
+                    continue
+                prev = producers.get(node.input[0])
+                if mergeable(prev, 'Transpose'):
+                    prev_perm = OnnxAttributes.from_onnx(
+                        prev.attribute).get('perm')
+                    if prev_perm is not None:
+                        perm = [prev_perm[axis] for axis in perm]
+                        node.input[0] = prev.input[0]
+                        del node.attribute[:]
+                        node.attribute.extend(
+                            [helper.make_attribute('perm', perm)])
+                        removed.append(prev)
+                if list(perm) == list(range(len(perm))):
+                    cancel(node)
+            elif node.op_type == 'Reshape':
+                if node.input[1] not in initializers:
+                    continue
+                shape = numpy_helper.to_array(initializers[node.input[1]])
+                prev = producers.get(node.input[0])
+                if mergeable(prev, 'Reshape') and 0 not in shape:
+                    node.input[0] = prev.input[0]
+                    removed.append(prev)
+                if node.input[0] in initializers:
+                    in_shape = list(initializers[node.input[0]].dims)
+                    if self._resolve_shape(in_shape, shape) == in_shape:
+                        cancel(node)
+                elif node.input[0] in ranks:
+                    # the declared dims may change at runtime, but copying all
+                    # the dims but at most one keeps any input of the same rank
+                    copied = [dim for dim in shape if dim != -1]
+                    if (len(shape) == ranks[node.input[0]] and
+                            len(shape) - len(copied) <= 1 and
+                            all(dim == 0 for dim in copied)):
+                        cancel(node)
+        return self._remove_nodes(nodes, removed)
+
+    def eliminate_dead_nodes(self):
+        """
+        remove the nodes whose outputs are not used to compute the outputs of
+        the graph
+        """
+        nodes = list(self.graph.node)
+        needed = self._graph_outputs()
+        dead = []
+        for node in reversed(nodes):
+            if any(name in needed for name in node.output):
+                needed.update(node.input)
+            else:
+                dead.append(node)
+        return self._remove_nodes(nodes, dead)
+
+    @classmethod
+    def _evaluate(cls, node, inputs, shapes):
+        """
+        evaluate a foldable node by numpy
+        Args:
+            node (NodeProto): the node
+            inputs (ndarray[]): the constant inputs
+            shapes (dict): the shapes of the constant tensors
+        Returns:
+            the output, or None if the node cannot be evaluated
+        """
+        attrs = OnnxAttributes.from_onnx(node.attribute)
+        op_type = node.op_type
+        if op_type == 'Constant':
+            if 'value' not in attrs:
+                return None
+            return numpy_helper.to_array(attrs['value'])
+        elif op_type == 'ConstantOfShape':
+            value = np.zeros(1, dtype=np.float32)
+            if 'value' in attrs:
+                value = numpy_helper.to_array(attrs['value'])
+            return np.full(inputs[0], value.flatten()[0], dtype=value.dtype)
+        elif op_type == 'Shape':
+            if node.input[0] not in shapes:
+                return None
+            return np.array(shapes[node.input[0]], dtype=np.int64)
+        elif op_type == 'Gather':
+            return np.take(inputs[0], inputs[1], axis=attrs.get('axis', 0))
+        elif op_type == 'Unsqueeze':
+            if 'axes' not in attrs:
+                return None
+            y = inputs[0]
+            ndim = y.ndim + len(attrs['axes'])
+            for axis in sorted(a + ndim if a < 0 else a for a in attrs['axes']):
+                y = np.expand_dims(y, axis)
+            return y
+        elif op_type == 'Squeeze':
+            axes = attrs.get('axes')
+            return np.squeeze(inputs[0],
+                              axis=None if axes is None else tuple(axes))
+        elif op_type == 'Concat':
+            return np.concatenate(inputs, axis=attrs['axis'])
+        elif op_type == 'Cast':
+            return inputs[0].astype(mapping.TENSOR_TYPE_TO_NP_TYPE[attrs['to']])
+        elif op_type == 'Slice':
+            if '' in node.input:
+                return None
+            x, starts, ends = inputs[:3]
+            axes = inputs[3] if len(inputs) > 3 else range(len(starts))
+            steps = inputs[4] if len(inputs) > 4 else [1] * len(starts)
+            index = [slice(None)] * x.ndim
+            for start, end, axis, step in zip(starts, ends, axes, steps):
+                index[axis] = slice(int(start), int(end), int(step))
+            return inputs[0][tuple(index)]
+        elif op_type == 'Reshape':
+            return inputs[0].reshape(
+                cls._resolve_shape(inputs[0].shape, inputs[1]))
+        elif op_type == 'Add':
+            return inputs[0] + inputs[1]
+        elif op_type == 'Sub':
+            return inputs[0] - inputs[1]
+        elif op_type == 'Mul':
+            return inputs[0] * inputs[1]
+        elif op_type == 'Div':
+            if np.issubdtype(inputs[0].dtype, np.integer):
+                # the integer division of onnx truncates toward zero
+                return np.trunc(inputs[0] / inputs[1]).astype(inputs[0].dtype)
+            return inputs[0] / inputs[1]
+        return None
+
+    @staticmethod
+    def _resolve_shape(in_shape, shape):
+        """
+        resolve the 0 and -1 in the target shape of a Reshape
+        """
+        shape = [
+            in_shape[i] if dim == 0 else int(dim) for i, dim in enumerate(shape)
+        ]
+        if -1 in shape:
+            known = int(np.prod([dim for dim in shape if dim != -1]))
+            shape[shape.index(-1)] = int(np.prod(in_shape)) // max(known, 1)
+        return shape
+
+    @staticmethod
+    def _as_row(value, n):
+        """
+        return a bias broadcast along the rows of a (m, n) matrix as a (1, n)
+        array, or None if it is not such a bias
+        """
+        if value.size not in (1, n) or value.ndim > 2 or (value.ndim == 2 and
+                                                          value.shape[0] != 1):
+            return None
+        return np.broadcast_to(value.reshape(1, -1), (1, n))
+
+    def _initializers(self):
+        return {tp.name: tp for tp in self.graph.initializer}
+
+    def _producers(self, nodes):
+        return {name: node for node in nodes for name in node.output}
+
+    def _consumers(self):
+        """
+        count the nodes reading each tensor
+        """
+        return collections.Counter(
+            name for node in self.graph.node for name in node.input)
+
+    def _graph_outputs(self):
+        return set(outp.name for outp in self.graph.output)
+
+    def _ranks(self):
+        """
+        collect the ranks of the tensors with declared shapes; their dims are
+        not collected as they may differ at runtime, e.g., the batch size
+        """
+        ranks = {}
+        for info in list(self.graph.input) + list(self.graph.value_info) + list(
+                self.graph.output):
+            tensor_type = info.type.tensor_type
+            if tensor_type.HasField('shape'):
+                ranks[info.name] = len(tensor_type.shape.dim)
+        for tp in self.graph.initializer:
+            ranks[tp.name] = len(tp.dims)
+        return ranks
+
+    def _unique_name(self, name):
+        names = set(self._initializers())
+        for node in self.graph.node:
+            names.update(node.output)
+        unique, i = name, 0
+        while unique in names:
+            unique, i = "%s_%d" % (name, i), i + 1
+        return unique
+
+    def _add_initializer(self, name, value):
+        self.graph.initializer.extend([numpy_helper.from_array(value, name)])
+
+    def _rewire(self, old, new):
+        """
+        let the consumers of the tensor old read the tensor new instead,
+        unless old is an output of the graph
+        """
+        if old in self._graph_outputs():
+            return False
+        for node in self.graph.node:
+            for i, name in enumerate(node.input):
+                if name == old:
+                    node.input[i] = new
+        return True
+
+    def _remove_nodes(self, nodes, removed):
+        """
+        remove some nodes from the graph
+        Args:
+            nodes (NodeProto[]): all the nodes of the graph
+            removed (NodeProto[]): the nodes to remove
+        Returns:
+            the number of removed nodes
+        """
+        removed = set(id(node) for node in removed)
+        for i in reversed(range(len(nodes))):
+            if id(nodes[i]) in removed:
+                del self.graph.node[i]
+        return len(removed)
+
+    def _prune_initializers(self):
+        """
+        remove the initializers which are no longer read by any node, and
+        their entries in the inputs of the graph for ir version < 4
+        """
+        used = set(self._consumers()) | self._graph_outputs()
+        removed = set(tp.name for tp in self.graph.initializer) - used
+        for field in (self.graph.initializer, self.graph.input):
+            for i in reversed(range(len(field))):
+                if field[i].name in removed:
+                    del field[i]
+
+
 class SingaBackend(Backend):
 
     # This number indicates the onnx operator set version
@@ -1908,12 +2357,14 @@ class SingaBackend(Backend):
         return params, inputs, outputs, operators
 
     @classmethod
-    def prepare(cls, model, device='CPU', **kwargs):
+    def prepare(cls, model, device='CPU', optimize=True, **kwargs):
         """
         parse the ONNX and to create layers
         Args:
             model (ModelProto): the loaded ONNX model
             device (string): CPU or CUDA
+            optimize (bool or str[]): run all the passes of GraphOptimizer,
+                none of them, or the given ones
         Returns:
             a SingaRep instance to stores the layers and weights
         """
@@ -1943,9 +2394,15 @@ class SingaBackend(Backend):
                 .format(cls._ir_version, imp.version))
 
         graph = model.graph
+        report = OrderedDict()
+        if optimize:
+            passes = None if optimize is True else optimize
+            report = GraphOptimizer(graph).optimize(passes)
         params, inputs, outputs, layers = cls._onnx_model_to_singa_ops(
             graph, device, opset_version)
-        return SingaRep(params, inputs, outputs, layers, device)
+        rep = SingaRep(params, inputs, outputs, layers, device)
+        rep.optimization_report = report
+        return rep
 
 
 class SingaRep(BackendRep):
@@ -1970,13 +2427,15 @@ class SingaRep(BackendRep):
         self.outputs = outputs
         self.dev = cpu_dev if device == "CPU" else gpu_dev
         self.layers = layers
-        self.tensor_count = {}
         self.has_initialized = False
         self.is_graph = False
+        # the number of nodes removed by each optimization pass
+        self.optimization_report = OrderedDict()
+        self.initialize()
 
     def initialize(self):
         """
-        Init the instance
+        Init the instance and compile the layers into the execution plan
         """
         self.outputs_info = {outp.name: outp for outp in self.outputs}
         _layers = []  # layers by topo order
@@ -1992,21 +2451,110 @@ class SingaRep(BackendRep):
             self.__dict__[node.name] = operator
             _layers.append(node)
         self._layers = _layers
-
-    def init_tensor_count(self):
-        """
-        Init the tensor count dict
-        """
-        self.tensor_count = {}
-        for node, operator in self.layers:
-            # init the tensor count
-            all_possible_inputs = node.inputs + list(
-                node.attr_inputs.keys()) + list(node.weight_inputs.keys())
-            for inp in all_possible_inputs:
-                if inp not in self.tensor_count:
-                    self.tensor_count[inp] = 1
+        self.compile()
+
+    def compile(self):
+        """
+        Compile the layers into a flat list of instructions, which refer to
+        the tensors by their slot indices. The lookups of the inputs, the
+        constant attrs and the points to release the tensors are resolved
+        here once, so that run only executes the operators.
+        """
+        instruction = namedtuple(
+            'instruction',
+            ['node', 'op', 'inputs', 'outputs', 'attrs', 'special', 'release'])
+        slots = {}  # tensor name -> slot index
+        consts = {}  # slot index -> state used as an input tensor
+
+        def slot(name):
+            if name not in slots:
+                slots[name] = len(slots)
+            return slots[name]
+
+        self._input_slots = [slot(inp.name) for inp in self.inputs]
+        # the states which are set to the operators by the first run
+        self._init_states = {}
+        instructions = []
+        for node in self._layers:
+            op = self.__dict__[node.name]
+            inputs = []
+            for inp in node.inputs:
+                if inp in node.weight_inputs or inp in node.attr_inputs:
+                    continue
+                if inp not in slots and inp in self.states:
+                    consts[slot(inp)] = self.states[inp]
+                elif inp not in slots:
+                    raise KeyError(
+                        "Not found the input {} for operation {}".format(
+                            inp, node.name))
+                inputs.append(slots[inp])
+
+            weights, states = {}, {}
+            for key, name in node.weight_inputs.items():
+                if key not in node.attr_inputs:
+                    # find the weights and not in the inputs
+                    weights[name] = self.states[key]
+            # the attrs from other tensors are converted by each run
+            attrs = []
+            for key, name in node.attr_inputs.items():
+                if key in slots:
+                    attrs.append((name, slots[key]))
+                elif key in self.states:
+                    ts = self.states[key]
+                    if isinstance(ts, tensor.Tensor):
+                        ts = tensor.to_numpy(ts)
+                    states[name] = ts
                 else:
-                    self.tensor_count[inp] += 1
+                    raise KeyError(
+                        "Not found the input {} for operation {}".format(
+                            key, node.name))
+            self._init_states[len(instructions)] = (weights, states)
+
+            special = None
+            if node.op_type in ("Conv", "Gemm"):
+                special = {
+                    key: slots[key]
+                    for key in node.inputs[1:3]
+                    if key in node.attr_inputs and key in slots
+                }
+                if not special:
+                    # the weights are known, no need to check them by run
+                    self.handle_special_ops(node, op, {})
+                    special = None
+
+            outputs = [slot(outp) for outp in node.outputs]
+            instructions.append(
+                instruction(node, op, inputs, outputs, attrs, special, []))
+
+        # release each tensor after its last use, except the constants
+        last_use = {}
+        for i, ins in enumerate(instructions):
+            used = ins.inputs + ins.outputs + [idx for _, idx in ins.attrs]
+            if ins.special:
+                used += list(ins.special.values())
+            for idx in used:
+                last_use[idx] = i
+        for idx, i in last_use.items():
+            if idx not in consts:
+                instructions[i].release.append(idx)
+
+        self._instructions = instructions
+        self._num_slots = len(slots)
+        self._consts = consts
+        self._placed_slots = None
+
+    def place_constants(self):
+        """
+        Create the tensors of the constant inputs on the device, which are
+        copied into the slots by each run
+        """
+        placed = [None] * self._num_slots
+        for idx, val in self._consts.items():
+            # todo, scalar
+            val = tensor.from_numpy(np.atleast_1d(val))
+            val.to_device(self.dev)
+            placed[idx] = val
+        self._placed_slots = (self.dev, placed)
 
     def to_input_tensor(self, x):
         """
@@ -2083,6 +2631,29 @@ class SingaRep(BackendRep):
                 shape = self.get_s(node.inputs[2], node, tensor_dict).shape
                 op.bias_shape = shape
 
+    def set_states(self, op, states):
+        """
+        set the states of an operator
+        Args:
+            op (Operator): the operator or layer
+            states ({}): the states keyed by the attr names
+        """
+        if callable(getattr(op, "set_states", None)):
+            # rename the layer's states
+            states = {
+                getattr(op, key).name: val for (key, val) in states.items()
+            }
+            if self.is_graph and not self.has_initialized:
+                prev_state = self.dev.graph_enabled()
+                self.dev.EnableGraph(False)
+                op.set_states(states)
+                self.dev.EnableGraph(prev_state)
+            else:
+                op.set_states(states)
+        else:
+            for key, value in states.items():
+                setattr(op, key, value)
+
     def run(self, x, **kwargs):
         """
         run the forward of singa model
@@ -2091,10 +2662,10 @@ class SingaRep(BackendRep):
         Returns: 
             a list of outputs
         """
-        if not self.has_initialized:
-            self.initialize()
-            if isinstance(x[0], tensor.Tensor):
-                self.dev = x[0].device
+        if not self.has_initialized and isinstance(x[0], tensor.Tensor):
+            self.dev = x[0].device
+        if self._placed_slots is None or self._placed_slots[0] != self.dev:
+            self.place_constants()
 
         outputs_dict = OrderedDict([])
 
@@ -2113,96 +2684,68 @@ class SingaRep(BackendRep):
         for outp in aux_output:
             outputs_dict[outp] = None
 
+        slots = list(self._placed_slots[1])
         tensor_dict = self.to_input_tensor(x)
-        self.init_tensor_count()
+        for inp, idx in zip(self.inputs, self._input_slots):
+            slots[idx] = tensor_dict[inp.name]
+
+        # run the instructions by the topo order
+        for i, ins in enumerate(self._instructions[:last_layers + 1]):
+            op = ins.op
+            if ins.special is not None:
+                self.handle_special_ops(
+                    ins.node, op,
+                    {key: slots[idx] for key, idx in ins.special.items()})
+            inputs = [slots[idx] for idx in ins.inputs]
 
-        # run the layer by the topo order
-        for node in self._layers[:last_layers + 1]:
-            op = self.__dict__[node.name]
-            self.handle_special_ops(node, op, tensor_dict)
-            # make input
-            inputs = []
-            for inp in node.inputs:
-                if inp not in node.weight_inputs and inp not in node.attr_inputs:
-                    if inp in tensor_dict:
-                        inputs.append(tensor_dict[inp])
-                    elif inp in self.states:
-                        # todo, scalar
-                        val = np.atleast_1d(self.states[inp])
-                        val = tensor.from_numpy(val)
-                        val.to_device(self.dev)
-                        inputs.append(val)
-                    else:
-                        raise KeyError(
-                            "Not found the input {} for operation {}".format(
-                                inp, node.name))
             states = {}
-            if callable(getattr(op, "initialize",
-                                None)) and not op._initialized:
-                # init the operator
-                op.initialize(*inputs)
-                op._initialized = True
-                for key, name in node.weight_inputs.items():
-                    if key not in node.attr_inputs:
-                        # find the weights and not in the inputs
-                        states[name] = self.states[key]
-
+            if i in self._init_states:
+                weights, states = self._init_states.pop(i)
+                if callable(getattr(op, "initialize",
+                                    None)) and not op._initialized:
+                    # init the operator
+                    op.initialize(*inputs)
+                    op._initialized = True
+                    states.update(weights)
             # replace attrs by inputs
-            for key, name in node.attr_inputs.items():
-                if key in tensor_dict:
-                    ts = tensor_dict[key]
-                elif key in self.states:
-                    ts = self.states[key]
+            for name, idx in ins.attrs:
+                ts = slots[idx]
                 if isinstance(ts, tensor.Tensor):
                     ts = tensor.to_numpy(ts)
                 states[name] = ts
             # set states
             if states:
-                if callable(getattr(op, "set_states", None)):
-                    # rename the layer's states
-                    states = {
-                        getattr(op, key).name: val
-                        for (key, val) in states.items()
-                    }
-                    if self.is_graph and not self.has_initialized:
-                        prev_state = self.dev.graph_enabled()
-                        self.dev.EnableGraph(False)
-                        op.set_states(states)
-                        self.dev.EnableGraph(prev_state)
-                    else:
-                        op.set_states(states)
-                else:
-                    for key, value in states.items():
-                        setattr(op, key, value)
+                self.set_states(op, states)
             # run the node
             outputs = _run_node(op, inputs)
-            # release the input tensor
-            for inp in node.inputs:
-                if inp in self.tensor_count:
-                    self.tensor_count[inp] -= 1
-                if self.tensor_count[inp] == 0:
-                    if inp in tensor_dict:
-                        del tensor_dict[inp]
-                    del self.tensor_count[inp]
             # store the output
-            for (outp, val) in zip(node.outputs, outputs):
-                tensor_dict[outp] = val
+            for (outp, idx, val) in zip(ins.node.outputs, ins.outputs, outputs):
+                slots[idx] = val
                 if outp in outputs_dict:
                     outputs_dict[outp] = self.to_output_tensor(val, outp)
+            # release the tensors which are not used later
+            for idx in ins.release:
+                slots[idx] = None
         self.has_initialized = True
         return list(outputs_dict.values())
 
 
 class SONNXModel(model.Model):
 
-    def __init__(self, onnx_model):
+    def __init__(self, onnx_model, optimize=False):
         """
         Init a SIGNA Model
         Args:
             onnx_model (ModelProto): a loaded onnx model
+            optimize (bool or str[]): run GraphOptimizer.training_passes if
+                True, or the given passes. Off by default, since the passes
+                remove nodes and hence change the layers counted by the
+                last_layers of forward
         """
         super(SONNXModel, self).__init__()
-        self.sg_ir = prepare(onnx_model)
+        if optimize is True:
+            optimize = GraphOptimizer.training_passes
+        self.sg_ir = prepare(onnx_model, optimize=optimize)
         for node, operator in self.sg_ir.layers:
             self.__dict__[node.name] = operator
         self.sg_ir.is_graph = True
@@ -2226,4 +2769,4 @@ prepare = SingaBackend.prepare
 get_op = SingaBackend._onnx_node_to_singa_op
 to_onnx = SingaFrontend.singa_to_onnx_model
 save = onnx.save
-load = onnx.load
\ No newline at end of file
+load = onnx.load
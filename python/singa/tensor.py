@@ -779,6 +779,73 @@ class Tensor(object):
             to_numpy(self)), self.dtype_name[self.dtype])
 
 
+class RowSparseTensor(object):
+    '''A 2-D tensor whose values are zeros except a few rows, e.g., the
+    gradient of an embedding table. Row indices[i] of the dense tensor is
+    values[i]; the values of duplicated indices are summed.
+
+    Args:
+        indices (Tensor): 1-D int tensor of the row indices.
+        values (Tensor): 2-D tensor of shape (indices.size(), shape[1]).
+        shape (tuple<int>): shape of the dense tensor.
+        name (str): name of the tensor.
+    '''
+
+    def __init__(self, indices, values, shape, name=None):
+        assert len(shape) == 2, 'only 2-D row sparse tensors are supported'
+        assert values.shape == (indices.size(), shape[1]), (
+            'shape mismatch', values.shape, indices.size(), shape)
+        self.indices = indices
+        self.values = values
+        self.shape = tuple(shape)
+        self.device = values.device
+        self.dtype = values.dtype
+        self.name = name
+
+    def to_dense(self):
+        '''
+        Returns:
+            a new Tensor with the dense values
+        '''
+        ret = Tensor(self.shape, self.device, self.dtype)
+        ret.set_value(0.0)
+        singa.ScatterAddRows(self.values.data, self.indices.data, ret.data)
+        return ret
+
+    def coalesce(self):
+        '''Merge the rows of duplicated indices. The first occurrence of
+        each index gets the sum of its rows, while the other occurrences get
+        index -1 and zero values, which are skipped by the row updates.
+
+        Returns:
+            a new RowSparseTensor with unique non-negative indices
+        '''
+        indices = Tensor(self.indices.shape, self.device, int32)
+        values = Tensor(self.values.shape, self.device, self.dtype)
+        singa.CoalesceRows(self.indices.data, self.values.data, indices.data,
+                           values.data)
+        return RowSparseTensor(indices, values, self.shape, self.name)
+
+    def __add__(self, rhs):
+        '''Add a RowSparseTensor or a CTensor.
+
+        Returns:
+            a RowSparseTensor if rhs is a RowSparseTensor, otherwise a
+            new CTensor with the dense values.
+        '''
+        if isinstance(rhs, RowSparseTensor):
+            assert self.shape == rhs.shape, ('shape mismatch', self.shape,
+                                             rhs.shape)
+            indices = concatenate([self.indices, rhs.indices], 0)
+            values = concatenate([self.values, rhs.values], 0)
+            return RowSparseTensor(indices, values, self.shape, self.name)
+        ret = rhs.Clone()
+        singa.ScatterAddRows(self.values.data, self.indices.data, ret)
+        return ret
+
+    __radd__ = __add__
+
+
 ''' alias Tensor to PlaceHolder
 '''
 PlaceHolder = Tensor
@@ -874,15 +941,20 @@ def copy_data_to_from(dst, src, size, dst_offset=0, src_offset=0):
     singa.CopyDataToFrom(dst.data, src.data, size, dst_offset, src_offset)
 
 
-def from_numpy(np_array, dev=None):
+def from_numpy(np_array, dev=None, copy=True):
     '''Create a Tensor instance with the shape, dtype and values from the numpy
     array.
 
     Args:
         np_array: the numpy array.
+        dev: the target device; the default CppCPU device is used if it is None.
+        copy (bool): if False and the target device is a CppCPU device, the
+            tensor shares the memory of the C-contiguous and writable array
+            (which is kept alive by the tensor) instead of copying it.
+            Otherwise, or if the array has to be converted, the data is copied.
 
     Returns:
-        A Tensor instance allocated on the default CppCPU device.
+        A Tensor instance allocated on the given device.
     '''
     assert type(np_array) is np.ndarray, 'Must input numpy array'
     # convert to float32 array
@@ -900,6 +972,12 @@ def from_numpy(np_array, dev=None):
         assert np_array.dtype == np.int32, \
             'Only float and int tensors are supported'
         dtype = int32
+    if not copy and np_array.flags.c_contiguous and np_array.flags.writeable:
+        target = dev if dev else get_default_device()
+        if target.lang() == singa.kCpp:
+            return from_raw_tensor(
+                singa.TensorFromBuffer(np_array, list(np_array.shape), dtype,
+                                       target))
     ret = Tensor(np_array.shape, dtype=dtype)
     ret.copy_from_numpy(np_array)
     if dev:
@@ -921,16 +999,42 @@ def to_host(t):
     return ret
 
 
-def to_numpy(t):
+class _NumpyView(object):
+    '''Expose the memory of a contiguous CppCPU tensor via the numpy array
+    interface. The block is kept alive by the CTensor held here, which is
+    referenced by the numpy array as its base.
+    '''
+
+    _typestr = {float32: '<f4', float16: '<f2', int32: '<i4'}
+
+    def __init__(self, t):
+        self.data = singa.Tensor(t.data)
+        self.__array_interface__ = {
+            'shape': tuple(self.data.shape()),
+            'typestr': self._typestr[t.dtype],
+            'data': (self.data.data_address(), False),
+            'version': 3
+        }
+
+
+def to_numpy(t, copy=True):
     '''Copy the tensor into a numpy array.
 
     Args:
         t (Tensor): a Tensor
+        copy (bool): if False and the tensor is a contiguous tensor on a
+            CppCPU device, the returned array shares the memory of the tensor,
+            which is kept alive by the array. Otherwise the data is copied.
 
     Returns:
         a numpy array
     '''
-    th = to_host(t)
+    if t.device.lang() == singa.kCpp and t.data.is_contiguous() and \
+            t.dtype in _NumpyView._typestr and t.size() > 0:
+        np_array = np.asarray(_NumpyView(t))
+        return np_array.copy() if copy else np_array
+    # host tensors are transformed by GetValue directly without a clone
+    th = t if t.device.lang() == singa.kCpp else to_host(t)
     if th.dtype == float32:
         np_array = th.data.GetFloatValue(int(th.size()))
     elif th.dtype == float16:
@@ -939,7 +1043,7 @@ def to_numpy(t):
         np_array = th.data.GetIntValue(int(th.size()))
     else:
         print('Not implemented yet for ', th.dtype)
-    return np_array.reshape(th.shape)
+    return np_array.reshape(th.data.shape())
 
 
 def abs(t):
@@ -1814,6 +1918,51 @@ def concatenate(tensors, axis):
     return _call_singa_func(singa.ConcatOn, ctensors, axis)
 
 
+def gather_rows(t, indices):
+    '''Select the rows of a 2-D tensor.
+
+    Args:
+        t (Tensor): a 2-D tensor.
+        indices (Tensor): int or float tensor of the row indices.
+
+    Returns:
+        new tensor of shape indices.shape + (t.shape[1], )
+    '''
+    return _call_singa_func(singa.GatherRows, t.data, indices.data)
+
+
+def scatter_add_rows(t, indices, out):
+    '''Add the rows of t to the rows of out, i.e.,
+    out[indices[i]] += t[i]. Rows with the same index are accumulated.
+
+    Args:
+        t (Tensor): tensor of shape (indices.size(), out.shape[1]).
+        indices (Tensor): int or float tensor of the row indices.
+        out (Tensor): a 2-D tensor updated in-place.
+
+    Returns:
+        out
+    '''
+    singa.ScatterAddRows(t.data, indices.data, out.data)
+    return out
+
+
+def scatter_rows(t, indices, out):
+    '''Copy the rows of t to the rows of out, i.e., out[indices[i]] = t[i].
+    The non-negative indices should be unique; negative ones are skipped.
+
+    Args:
+        t (Tensor): tensor of shape (indices.size(), out.shape[1]).
+        indices (Tensor): int or float tensor of the row indices.
+        out (Tensor): a 2-D tensor updated in-place.
+
+    Returns:
+        out
+    '''
+    singa.ScatterRows(t.data, indices.data, out.data)
+    return out
+
+
 def random(shape, device=get_default_device()):
     ''' return a random tensor with given shape
 
@@ -38,25 +38,44 @@ namespace std{
 %template(PairSizeT) std::pair<size_t, size_t>;
 %template(VecPairSizeT) std::vector<std::pair<size_t, size_t>>;
 %template(VecSharedPtrDevice) std::vector<std::shared_ptr<singa::Device>>;
-%template(VecInt) std::vector<int>;
 }
 
+#if USE_PYTHON
+// return the profile as a dict of the per-op and per-node tables
+%pythonappend singa::Device::GetProfile %{
+  import json
+  val = json.loads(val)
+%}
+#endif // USE_PYTHON
+
 namespace singa{
 
+enum LangType { kCpp, kCuda, kOpencl, kNumDeviceType = 4 };
+
 class Device {
  public:
   virtual void SetRandSeed(unsigned seed) = 0;
   std::shared_ptr<Device> host();
   void Reset();
   int id() const;
+  LangType lang() const;
+  int num_executors() const;
+  size_t GetAllocatedMem();
   virtual void Sync();
   void ResetGraph();
   void RunGraph(bool serial = false);
+  void EnableMemoryPlan(bool enable);
+  size_t GetPlannedPeakMemory();
+  size_t GetNaivePeakMemory();
   bool graph_enabled() const;
   void EnableGraph(bool enable);
   void PrintTimeProfiling();
   void SetVerbosity(int verbosity);
   void SetSkipIteration(int skip_iteration);
+  void EnableProfiling(bool enable);
+  void ClearProfile();
+  std::string GetProfile();
+  void ExportProfile(const std::string& path);
   static void EnableLazyAlloc(bool enbale);
 };
 
@@ -87,6 +106,9 @@ class Platform {
 #endif // USE_OPENCL
 
   static std::shared_ptr<Device> GetDefaultDevice();
+  static std::shared_ptr<Device> CreateCppCPU(int num_executors = 1);
+  static void SetNumCpuThreads(int num_threads);
+  static int GetNumCpuThreads();
 };
 
 }
@@ -80,6 +80,7 @@ namespace std {
 }
 
 %template(Shape) std::vector<size_t>;
+%template(VecInt) std::vector<int>;
 
 namespace singa{
 
@@ -119,6 +120,7 @@ namespace singa{
     const std::vector<size_t> &shape() const;
     const size_t shape(size_t idx) const;
     bool transpose() const;
+    bool is_contiguous() const;
     size_t nDim() const;
 
     bool initialized() const;
@@ -229,6 +231,8 @@ namespace singa{
   Tensor SoftMax(const Tensor &t);
   Tensor SoftMax(const Tensor &t, int axis);
   Tensor SoftMaxBackward(const Tensor &t, int axis, const Tensor &fdout);
+  Tensor RowDot(const Tensor &a, const Tensor &b);
+  Tensor RowNorm(const Tensor &in);
 
   Tensor Pow(const Tensor &base, const Tensor &exp);
 
@@ -278,6 +282,28 @@ namespace singa{
 
   Tensor ConcatOn(const std::vector<Tensor> &in, int axis);
   Tensor SliceOn(const Tensor&in, const size_t start, const size_t end, int axis);
+  Tensor GatherRows(const Tensor &in, const Tensor &indices);
+  void ScatterAddRows(const Tensor &in, const Tensor &indices, Tensor *out);
+  void ScatterRows(const Tensor &in, const Tensor &indices, Tensor *out);
+  void CoalesceRows(const Tensor &indices, const Tensor &values,
+                    Tensor *out_indices, Tensor *out_values);
+  Tensor Gather(const Tensor &in, const Tensor &indices, int axis);
+  void ScatterAdd(const Tensor &in, const Tensor &indices, int axis,
+                  Tensor *out);
+  Tensor StridedSlice(const Tensor &in, const std::vector<int> &starts,
+                      const std::vector<int> &ends,
+                      const std::vector<int> &steps);
+  Tensor StridedSliceBackward(const Tensor &dy, const std::vector<size_t> &shape,
+                              const std::vector<int> &starts,
+                              const std::vector<int> &ends,
+                              const std::vector<int> &steps);
+  Tensor IndexMap(const Tensor &in, const std::vector<size_t> &shape,
+                  const Tensor &maps, const float value = 0.f);
+  Tensor IndexMapBackward(const Tensor &dy, const std::vector<size_t> &shape,
+                          const Tensor &maps);
+  Tensor PackedDropout(const Tensor &in, const float ratio, Tensor *mask);
+  Tensor PackedDropoutBackward(const Tensor &dy, const float ratio,
+                               const Tensor &mask);
 
 
   /* ========== Arithmetic operations ========== */
@@ -345,6 +371,18 @@ namespace singa{
   void Axpy(SType alpha, const Tensor &in, Tensor *out);
   %template(Axpy) Axpy<float>;
   void Axpy(const Tensor &alpha, const Tensor &in, Tensor *out);
+  void MultiTensorSGD(const std::vector<Tensor> &grads,
+                      const std::vector<Tensor> &params,
+                      const std::vector<Tensor> &moments, const Tensor &lr,
+                      const Tensor &momentum, const Tensor &dampening,
+                      const Tensor &weight_decay, bool nesterov);
+  void MultiTensorAdam(const std::vector<Tensor> &grads,
+                       const std::vector<Tensor> &params,
+                       const std::vector<Tensor> &m,
+                       const std::vector<Tensor> &v, const Tensor &lr,
+                       const Tensor &beta_1, const Tensor &beta_2,
+                       const Tensor &epsilon, const Tensor &weight_decay,
+                       const Tensor &step);
 
   Tensor Mult(const Tensor &A, const Tensor &B);
   %rename(MultWithRet) Mult(const Tensor &A, const Tensor &B, Tensor *C);
@@ -386,6 +424,54 @@ namespace singa{
 
   Tensor CrossEntropyFwd(const Tensor& p, const Tensor& t);
   Tensor SoftmaxCrossEntropyBwd(const Tensor& p, const Tensor& t);
+  Tensor SoftmaxCrossEntropyFwdBwd(const Tensor &x, const Tensor &t,
+                                   Tensor *grad, const float smoothing = 0.f,
+                                   const int ignore_index = -1);
+  Tensor CrossEntropyFwdBwd(const Tensor &p, const Tensor &t, Tensor *grad,
+                            const float smoothing = 0.f,
+                            const int ignore_index = -1);
 
   void InitLogging(const char* argv);
 }
+
+#if USE_PYTHON
+// zero-copy interop with numpy for tensors on CppCPU devices
+%extend singa::Tensor {
+  // address of the first element, which is used to create numpy views
+  size_t data_address() {
+    CHECK_EQ($self->device()->lang(), singa::kCpp);
+    if ($self->block() == nullptr) return 0;
+    return reinterpret_cast<size_t>($self->block()->mutable_data());
+  }
+}
+
+%inline %{
+// Create a tensor sharing the memory of a C-contiguous and writable python
+// object (e.g., a numpy array), which is kept alive by the tensor.
+singa::Tensor TensorFromBuffer(PyObject *obj, const std::vector<size_t> &shape,
+                               singa::DataType dtype,
+                               std::shared_ptr<singa::Device> dev) {
+  Py_buffer *view = new Py_buffer;
+  if (PyObject_GetBuffer(obj, view, PyBUF_C_CONTIGUOUS | PyBUF_WRITABLE)) {
+    delete view;
+    PyErr_Clear();
+    LOG(FATAL) << "The object should be C-contiguous and writable";
+  }
+  if ((size_t)view->len != singa::Product(shape) * singa::SizeOf(dtype)) {
+    PyBuffer_Release(view);
+    delete view;
+    LOG(FATAL) << "The buffer size does not match the shape and dtype";
+  }
+  std::shared_ptr<void> owner(view, [](Py_buffer *v) {
+    // the tensor may be released without holding the GIL
+    if (Py_IsInitialized()) {
+      PyGILState_STATE state = PyGILState_Ensure();
+      PyBuffer_Release(v);
+      PyGILState_Release(state);
+    }
+    delete v;
+  });
+  return singa::Tensor(shape, dev, dtype, view->buf, owner);
+}
+%}
+#endif // USE_PYTHON
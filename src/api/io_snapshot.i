@@ -41,6 +41,8 @@ class Snapshot {
   ~Snapshot() {}
   std::vector<std::pair<std::string, Tensor>> Read();
   void Write(const std::string& key, const Tensor& param);
+  void Write(const std::string& key, const Tensor& indices,
+             const Tensor& values, const std::vector<size_t>& shape);
 };
 
 }
@@ -51,6 +51,7 @@ class ConvHandle {
   size_t channels;
   size_t num_filters;
   size_t group;
+  bool use_dnnl;
 };
 
 Tensor CpuConvForward(const Tensor &x, Tensor &W,  Tensor &b, const ConvHandle &ch);
@@ -68,9 +69,9 @@ class BatchNormHandle{
 
     size_t batchsize;
     float factor;
+    bool use_dnnl;
 };
 
-#if USE_DNNL
 Tensor CpuBatchNormForwardInference(const BatchNormHandle &bnh,
                                     const Tensor &x,
                                     const Tensor &bnScale,
@@ -90,7 +91,6 @@ const std::vector<Tensor> CpuBatchNormBackwardx(const BatchNormHandle &bnh,
                                                 const Tensor &x,
                                                 const Tensor &bnScale, const Tensor &bnBias,
                                                 const Tensor &mean, const Tensor &var);
-#endif //USE_DNNL
 
 
 class PoolingHandle {
@@ -109,13 +109,44 @@ class PoolingHandle {
   int pooled_height;
   int pooled_width;
   bool is_max_pooling;
+  bool use_dnnl;
 };
 
-#if USE_DNNL
 Tensor CpuPoolingForward(const PoolingHandle &ph, const Tensor &x);
 Tensor CpuPoolingBackward(const PoolingHandle &ph, const Tensor &dy,
                               const Tensor& x, const Tensor& y);
-#endif //USE_DNNL
+
+class RNNHandle {
+ public:
+  RNNHandle(const Tensor &x,
+            const int hidden_size, const int mode = 0,
+            const int num_layers = 1, const int bias = 1,
+            const float dropout = 0.0f, const int bidirectional = 0);
+  int bias;
+  int mode;
+  float dropout;
+  int bidirectional;
+  size_t feature_size;
+  size_t hidden_size;
+  size_t weights_size;
+  size_t num_layers;
+  size_t batch_size;
+  size_t seq_length;
+  Tensor reserve_space;
+};
+
+std::vector<Tensor> CpuRNNForwardTraining(const Tensor &x, const Tensor &hx, const Tensor &cx, const Tensor &W, RNNHandle &h);
+std::vector<Tensor> CpuRNNForwardInference(const Tensor &x, const Tensor &hx, const Tensor &cx, const Tensor &W, RNNHandle &h);
+std::vector<Tensor> CpuRNNBackwardx(const Tensor &y, const Tensor &dy, const Tensor &dhy, const Tensor &dcy, const Tensor &W, const Tensor &hx, const Tensor &cx, RNNHandle &h);
+Tensor CpuRNNBackwardW(const Tensor &x, const Tensor &hx, const Tensor &y, RNNHandle &h);
+
+void CpuRNNSetParam(int linLayerID, int pseudoLayer, Tensor &weights, Tensor &paramValues, bool is_bias, RNNHandle &h);
+Tensor CpuRNNGetParamCopy(int linLayerID, int pseudoLayer, Tensor &weights, bool is_bias, RNNHandle &h);
+
+std::vector<Tensor> CpuRNNForwardTrainingEx(const Tensor &x, const Tensor &hx, const Tensor &cx, const Tensor &W, const Tensor &seq_lengths, RNNHandle &h);
+std::vector<Tensor> CpuRNNForwardInferenceEx(const Tensor &x, const Tensor &hx, const Tensor &cx, const Tensor &W, const Tensor &seq_lengths, RNNHandle &h);
+std::vector<Tensor> CpuRNNBackwardxEx(const Tensor &y, const Tensor &dy, const Tensor &dhy, const Tensor &dcy, const Tensor &W, const Tensor &hx, const Tensor &cx, const Tensor &seq_lengths, RNNHandle &h);
+Tensor CpuRNNBackwardWEx(const Tensor &x, const Tensor &hx, const Tensor &y, const Tensor &seq_lengths, RNNHandle &h);
 
 
 #if USE_CUDNN
@@ -19,14 +19,20 @@
 #include "singa/core/common.h"
 
 #include "singa/core/device.h"
+#include "singa/core/profiler.h"
 
 namespace singa {
 
+// the last version assigned to the blocks
+static std::atomic<size_t> last_version(0);
+
 void* Block::mutable_data() {
   if (data_ == nullptr && size_ > 0) {
     data_ = device_->Malloc((int)size_);
+    Profiler::CountAlloc(size_);
   }
   initialized_ = true;
+  version_ = ++last_version;
   return static_cast<char*>(data_) + offset_;
 }
 
@@ -36,8 +42,10 @@ const void* Block::data() const {
 }
 
 void Block::free_data() {
-  if (data_) {
+  // the external memory is kept until the block is deleted
+  if (data_ && owner_ == nullptr) {
     device_->Free(data_);
+    Profiler::CountFree(size_);
     data_ = nullptr;
     initialized_ = false;
   }
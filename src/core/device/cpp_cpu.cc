@@ -18,34 +18,63 @@
 
 #include "singa/core/device.h"
 
+#ifdef USE_OPENMP
+#include <omp.h>
+#endif  // USE_OPENMP
+
 namespace singa {
 
 std::shared_ptr<Device> defaultDevice = std::make_shared<CppCPU>();
 
-CppCPU::CppCPU() : Device(-1, 1) {
+CppCPU::CppCPU(int num_executors, int id) : Device(id, num_executors) {
+  CHECK_LT(id, 0) << "CPU devices have negative IDs";
+  CHECK_GE(num_executors, 1);
   lang_ = kCpp;
+  pool_ = std::make_shared<CppMemPool>();
 #ifdef USE_DNNL
   ctx_.dnnl_engine = dnnl::engine(dnnl::engine::kind::cpu, 0);
   ctx_.dnnl_stream = dnnl::stream(ctx_.dnnl_engine);
 #endif  // USE_DNNL
   // host_ = nullptr;
+
+  // each executor has its own random generator (and dnnl stream) as the
+  // operations run concurrently
+  executor_ctx_.resize(num_executors - 1);
+  for (size_t i = 0; i < executor_ctx_.size(); ++i) {
+    executor_ctx_[i].random_generator.seed(i + 1);
+#ifdef USE_DNNL
+    executor_ctx_[i].dnnl_engine = ctx_.dnnl_engine;
+    executor_ctx_[i].dnnl_stream = dnnl::stream(ctx_.dnnl_engine);
+#endif  // USE_DNNL
+  }
 }
 
 CppCPU::~CppCPU(){};
 
-void CppCPU::SetRandSeed(unsigned seed) { ctx_.random_generator.seed(seed); }
+void CppCPU::SetRandSeed(unsigned seed) {
+  ctx_.random_generator.seed(seed);
+  for (size_t i = 0; i < executor_ctx_.size(); ++i) {
+    executor_ctx_[i].random_generator.seed(seed + i + 1);
+  }
+}
+
+Context* CppCPU::executor_context(int executor) {
+  CHECK_GE(executor, 0);
+  CHECK_LT(executor, num_executors_);
+  if (executor == 0) return &ctx_;
+  return &executor_ctx_[executor - 1];
+}
 
 void CppCPU::DoExec(function<void(Context*)>&& fn, int executor) {
-  CHECK_EQ(executor, 0);
-  fn(&ctx_);
+  fn(executor_context(executor));
 }
 
 void CppCPU::TimeProfilingDoExec(function<void(Context*)>&& fn, int executor,
                                  Node* node) {
-  CHECK_EQ(executor, 0);
+  Context* ctx = executor_context(executor);
 
   auto t_start = std::chrono::high_resolution_clock::now();
-  fn(&ctx_);
+  fn(ctx);
   std::chrono::duration<float> duration =
       std::chrono::high_resolution_clock::now() - t_start;
   node->time_elapsed_inc(duration.count());
@@ -53,18 +82,20 @@ void CppCPU::TimeProfilingDoExec(function<void(Context*)>&& fn, int executor,
 
 void CppCPU::EvaluateTimeElapsed(Node* node) {}
 
+size_t CppCPU::GetAllocatedMem() {
+  auto ret = pool_->GetMemUsage();
+  return ret.second - ret.first;
+}
+
 void* CppCPU::Malloc(int size) {
-  if (size > 0) {
-    void* ptr = malloc(size);
-    memset(ptr, 0, size);
-    return ptr;
-  } else {
-    return nullptr;
-  }
+  void* ptr = nullptr;
+  // the blocks of CppCPU are zero-initialized, as they were before the pool
+  if (size > 0) pool_->Calloc(&ptr, size);
+  return ptr;
 }
 
 void CppCPU::Free(void* ptr) {
-  if (ptr != nullptr) free(ptr);
+  if (ptr != nullptr) pool_->Free(ptr);
 }
 
 void CppCPU::CopyToFrom(void* dst, const void* src, size_t nBytes,
@@ -72,4 +103,27 @@ void CppCPU::CopyToFrom(void* dst, const void* src, size_t nBytes,
   memcpy(dst, src, nBytes);
 }
 
+std::shared_ptr<Device> Platform::CreateCppCPU(int num_executors) {
+  static std::atomic<int> next_id(-2);
+  return std::make_shared<CppCPU>(num_executors, next_id--);
+}
+
+// 0 to follow the default of OpenMP
+static std::atomic<int> num_cpu_threads(0);
+
+void Platform::SetNumCpuThreads(int num_threads) {
+  CHECK_GE(num_threads, 0);
+  num_cpu_threads = num_threads;
+}
+
+int Platform::GetNumCpuThreads() {
+  int num_threads = num_cpu_threads;
+  if (num_threads > 0) return num_threads;
+#ifdef USE_OPENMP
+  return omp_get_max_threads();
+#else
+  return 1;
+#endif  // USE_OPENMP
+}
+
 }  // namespace singa
@@ -100,10 +100,15 @@ Block* Device::NewBlock(int size) {
   }
 }
 
+Block* Device::NewBlock(void* ptr, size_t size, std::shared_ptr<void> owner) {
+  CHECK(owner != nullptr) << "The owner of the external memory is required";
+  return new Block(ptr, size, this, owner);
+}
+
 // TODO(wangwei) return Block to the memory manager
 void Device::FreeBlock(Block* block) {
   if (block != nullptr) {
-    Free(block->mutable_data());
+    if (!block->external()) Free(block->mutable_data());
     delete block;
   }
 }
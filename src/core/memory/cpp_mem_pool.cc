@@ -0,0 +1,124 @@
+/**
+ * Licensed to the Apache Software Foundation (ASF) under one
+ * or more contributor license agreements.  See the NOTICE file
+ * distributed with this work for additional information
+ * regarding copyright ownership.  The ASF licenses this file
+ * to you under the Apache License, Version 2.0 (the
+ * "License"); you may not use this file except in compliance
+ * with the License.  You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+
+#include <cstdlib>
+#include <cstring>
+
+#include "singa/core/memory.h"
+#include "singa/utils/logging.h"
+
+namespace singa {
+
+namespace {
+// blocks smaller than this are rounded up to a multiple of the alignment;
+// larger blocks are rounded up to a multiple of kLargeGranularity
+const size_t kSmallSize = 1 << 20;
+const size_t kLargeGranularity = 1 << 16;
+
+void *AlignedAlloc(const size_t size) {
+  void *ptr = nullptr;
+#ifdef _WIN32
+  ptr = _aligned_malloc(size, CppMemPool::kAlignment);
+#else
+  if (posix_memalign(&ptr, CppMemPool::kAlignment, size) != 0) ptr = nullptr;
+#endif
+  return ptr;
+}
+
+void AlignedFree(void *ptr) {
+#ifdef _WIN32
+  _aligned_free(ptr);
+#else
+  free(ptr);
+#endif
+}
+}  // namespace
+
+CppMemPool::CppMemPool(size_t max_cached) : max_cached_(max_cached) {}
+
+CppMemPool::~CppMemPool() {
+  ReleaseCache();
+  for (auto &it : used_blocks_) AlignedFree(it.first);
+  used_blocks_.clear();
+}
+
+size_t CppMemPool::BucketSize(const size_t size) {
+  size_t unit = size <= kSmallSize ? kAlignment : kLargeGranularity;
+  return (size + unit - 1) / unit * unit;
+}
+
+void CppMemPool::Malloc(void **ptr, const size_t size) {
+  size_t bucket = BucketSize(size);
+  std::lock_guard<std::mutex> lock(mtx_);
+  auto it = free_blocks_.find(bucket);
+  if (it != free_blocks_.end() && !it->second.empty()) {
+    *ptr = it->second.back();
+    it->second.pop_back();
+    cached_ -= bucket;
+  } else {
+    *ptr = AlignedAlloc(bucket);
+    if (*ptr == nullptr) {
+      // return the cached blocks to the system and try again
+      FreeCachedBlocks();
+      *ptr = AlignedAlloc(bucket);
+    }
+    CHECK(*ptr != nullptr) << "Failed to allocate " << bucket << " bytes";
+    total_ += bucket;
+  }
+  used_blocks_[*ptr] = bucket;
+}
+
+void CppMemPool::Calloc(void **ptr, const size_t size) {
+  Malloc(ptr, size);
+  memset(*ptr, 0, size);
+}
+
+void CppMemPool::Free(void *ptr) {
+  std::lock_guard<std::mutex> lock(mtx_);
+  auto it = used_blocks_.find(ptr);
+  CHECK(it != used_blocks_.end())
+      << "The memory was not allocated by this pool";
+  size_t bucket = it->second;
+  used_blocks_.erase(it);
+  if (max_cached_ > 0 && cached_ + bucket > max_cached_) {
+    AlignedFree(ptr);
+    total_ -= bucket;
+  } else {
+    free_blocks_[bucket].push_back(ptr);
+    cached_ += bucket;
+  }
+}
+
+std::pair<size_t, size_t> CppMemPool::GetMemUsage() {
+  std::lock_guard<std::mutex> lock(mtx_);
+  return std::make_pair(cached_, total_);
+}
+
+void CppMemPool::ReleaseCache() {
+  std::lock_guard<std::mutex> lock(mtx_);
+  FreeCachedBlocks();
+}
+
+void CppMemPool::FreeCachedBlocks() {
+  for (auto &blocks : free_blocks_)
+    for (void *ptr : blocks.second) AlignedFree(ptr);
+  free_blocks_.clear();
+  total_ -= cached_;
+  cached_ = 0;
+}
+}  // namespace singa
@@ -0,0 +1,253 @@
+/**
+ * Licensed to the Apache Software Foundation (ASF) under one
+ * or more contributor license agreements.  See the NOTICE file
+ * distributed with this work for additional information
+ * regarding copyright ownership.  The ASF licenses this file
+ * to you under the Apache License, Version 2.0 (the
+ * "License"); you may not use this file except in compliance
+ * with the License.  You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+
+#include "singa/core/profiler.h"
+
+#include <algorithm>
+#include <fstream>
+#include <iomanip>
+#include <map>
+#include <set>
+#include <sstream>
+#include <utility>
+
+#include "singa/utils/logging.h"
+
+namespace singa {
+
+namespace {
+// memory allocated and freed by the blocks on this thread
+thread_local size_t allocated_bytes = 0;
+thread_local size_t freed_bytes = 0;
+
+// the node being profiled on this thread, between Start() and Record(); the
+// profiler may be enabled or disabled in between, so a node is recorded only
+// if Start() was called for it
+struct PendingOp {
+  bool started = false;
+  int executor = 0;
+  double start = 0;
+  double end = 0;
+  size_t allocated = 0;
+  size_t freed = 0;
+};
+thread_local PendingOp pending;
+
+struct OpStat {
+  std::string name;
+  int count = 0;
+  double total = 0;
+  double min = 0;
+  double max = 0;
+  size_t bytes_allocated = 0;
+  size_t bytes_freed = 0;
+  const OpRecord *last = nullptr;
+
+  void Add(const OpRecord &r) {
+    double t = (r.end - r.start) * 1e-6;
+    min = count ? std::min(min, t) : t;
+    max = count ? std::max(max, t) : t;
+    total += t;
+    count++;
+    bytes_allocated += r.bytes_allocated;
+    bytes_freed += r.bytes_freed;
+    last = &r;
+  }
+};
+
+std::string Quote(const std::string &str) {
+  std::string ret = "\"";
+  for (char c : str) {
+    if (c == '"' || c == '\\') {
+      ret += '\\';
+      ret += c;
+    } else if (static_cast<unsigned char>(c) < 0x20) {
+      ret += ' ';
+    } else {
+      ret += c;
+    }
+  }
+  return ret + "\"";
+}
+
+std::string IntList(const std::vector<int> &ids) {
+  std::stringstream ss;
+  ss << "[";
+  for (size_t i = 0; i < ids.size(); ++i) ss << (i ? "," : "") << ids[i];
+  ss << "]";
+  return ss.str();
+}
+
+void WriteStat(std::stringstream &ss, const OpStat &s, double total) {
+  ss << "\"name\":" << Quote(s.name) << ",\"count\":" << s.count
+     << ",\"total\":" << s.total << ",\"mean\":" << s.total / s.count
+     << ",\"min\":" << s.min << ",\"max\":" << s.max
+     << ",\"percent\":" << (total > 0 ? 100 * s.total / total : 0)
+     << ",\"bytes_allocated\":" << s.bytes_allocated
+     << ",\"bytes_freed\":" << s.bytes_freed;
+}
+}  // namespace
+
+Profiler::Profiler() : origin_(std::chrono::steady_clock::now()) {}
+
+double Profiler::Now() const {
+  std::chrono::duration<double, std::micro> duration =
+      std::chrono::steady_clock::now() - origin_;
+  return duration.count();
+}
+
+void Profiler::Clear() {
+  std::lock_guard<std::mutex> lock(mutex_);
+  records_.clear();
+  origin_ = std::chrono::steady_clock::now();
+}
+
+void Profiler::CountAlloc(size_t bytes) { allocated_bytes += bytes; }
+
+void Profiler::CountFree(size_t bytes) { freed_bytes += bytes; }
+
+void Profiler::Start(int executor) {
+  pending.started = true;
+  pending.executor = executor;
+  pending.allocated = allocated_bytes;
+  pending.freed = freed_bytes;
+  pending.start = Now();
+}
+
+void Profiler::Stop() {
+  if (pending.started) pending.end = Now();
+}
+
+void Profiler::Record(int iteration, int node, const std::string &op_name,
+                      std::vector<int> &&read_blocks,
+                      std::vector<int> &&write_blocks) {
+  if (!pending.started) return;
+  pending.started = false;
+  OpRecord r;
+  r.iteration = iteration;
+  r.node = node;
+  r.op_name = op_name;
+  r.executor = pending.executor;
+  r.start = pending.start;
+  r.end = pending.end;
+  r.bytes_allocated = allocated_bytes - pending.allocated;
+  r.bytes_freed = freed_bytes - pending.freed;
+  r.read_blocks = std::move(read_blocks);
+  r.write_blocks = std::move(write_blocks);
+
+  std::lock_guard<std::mutex> lock(mutex_);
+  records_.push_back(std::move(r));
+}
+
+std::vector<OpRecord> Profiler::records() const {
+  std::lock_guard<std::mutex> lock(mutex_);
+  return records_;
+}
+
+std::string Profiler::ChromeTrace() const {
+  std::lock_guard<std::mutex> lock(mutex_);
+  std::stringstream ss;
+  ss << std::fixed << std::setprecision(3);
+  ss << "{\"displayTimeUnit\":\"ms\",\"traceEvents\":[";
+
+  std::set<int> executors;
+  for (auto &r : records_) executors.insert(r.executor);
+  bool first = true;
+  for (int k : executors) {
+    ss << (first ? "" : ",") << "\n{\"name\":\"thread_name\",\"ph\":\"M\","
+       << "\"pid\":0,\"tid\":" << k << ",\"args\":{\"name\":\"executor " << k
+       << "\"}}";
+    first = false;
+  }
+
+  // net memory allocated since the first record, as a counter track
+  long long memory = 0;
+  for (auto &r : records_) {
+    ss << (first ? "" : ",") << "\n{\"name\":" << Quote(r.op_name)
+       << ",\"cat\":\"op\",\"ph\":\"X\",\"pid\":0,\"tid\":" << r.executor
+       << ",\"ts\":" << r.start << ",\"dur\":" << r.end - r.start
+       << ",\"args\":{\"iteration\":" << r.iteration << ",\"node\":" << r.node
+       << ",\"bytes_allocated\":" << r.bytes_allocated
+       << ",\"bytes_freed\":" << r.bytes_freed
+       << ",\"read_blocks\":" << IntList(r.read_blocks)
+       << ",\"write_blocks\":" << IntList(r.write_blocks) << "}}";
+    first = false;
+    if (r.bytes_allocated || r.bytes_freed) {
+      memory += static_cast<long long>(r.bytes_allocated) -
+                static_cast<long long>(r.bytes_freed);
+      ss << ",\n{\"name\":\"memory\",\"ph\":\"C\",\"pid\":0,\"ts\":" << r.end
+         << ",\"args\":{\"bytes\":" << memory << "}}";
+    }
+  }
+  ss << "]}\n";
+  return ss.str();
+}
+
+void Profiler::ExportChromeTrace(const std::string &path) const {
+  std::ofstream ofs(path);
+  CHECK(ofs.is_open()) << "Cannot open the trace file " << path;
+  ofs << ChromeTrace();
+}
+
+std::string Profiler::Summary() const {
+  std::lock_guard<std::mutex> lock(mutex_);
+  std::map<std::string, OpStat> ops;
+  std::map<std::pair<int, std::string>, OpStat> nodes;
+  std::set<int> iterations;
+  double total = 0;
+  for (auto &r : records_) {
+    ops[r.op_name].Add(r);
+    nodes[std::make_pair(r.node, r.op_name)].Add(r);
+    iterations.insert(r.iteration);
+    total += (r.end - r.start) * 1e-6;
+  }
+
+  std::vector<OpStat> sorted;
+  for (auto &it : ops) {
+    sorted.push_back(it.second);
+    sorted.back().name = it.first;
+  }
+  std::stable_sort(
+      sorted.begin(), sorted.end(),
+      [](const OpStat &a, const OpStat &b) { return a.total > b.total; });
+
+  std::stringstream ss;
+  ss << std::setprecision(9);
+  ss << "{\"iterations\":" << iterations.size() << ",\"total\":" << total
+     << ",\"ops\":[";
+  for (size_t i = 0; i < sorted.size(); ++i) {
+    ss << (i ? "," : "") << "\n{";
+    WriteStat(ss, sorted[i], total);
+    ss << "}";
+  }
+  ss << "],\"nodes\":[";
+  bool first = true;
+  for (auto &it : nodes) {
+    OpStat &s = it.second;
+    s.name = it.first.second;
+    ss << (first ? "" : ",") << "\n{\"node\":" << it.first.first << ",";
+    WriteStat(ss, s, total);
+    ss << ",\"read_blocks\":" << IntList(s.last->read_blocks)
+       << ",\"write_blocks\":" << IntList(s.last->write_blocks) << "}";
+    first = false;
+  }
+  ss << "]}\n";
+  return ss.str();
+}
+
+}  // namespace singa
@@ -21,6 +21,7 @@
 #include <algorithm>
 #include <functional>
 #include <iomanip>
+#include <limits>
 #include <sstream>
 #include <thread>
 
@@ -29,6 +30,19 @@
 
 namespace singa {
 
+namespace {
+// alignment (in bytes) of the blocks placed in the memory arena
+const size_t kPlanAlignment = 64;
+
+struct BlkLifetime {
+  Block *blk;
+  size_t size;
+  size_t begin;  // position of the first user in the order of execution
+  size_t end;    // position of the last user in the order of execution
+  size_t offset;
+};
+}  // namespace
+
 void Node::AddInEdge(Edge *in_edge) { in_edges_.push_back(in_edge); }
 
 void Node::AddOutEdge(Edge *out_edge) { out_edges_.push_back(out_edge); }
@@ -41,7 +55,10 @@ void Edge::SetDstNode(Node *dst_node) { dst_node_ = dst_node; }
 
 Graph::Graph(Device *device) : device_(device) {}
 
-Graph::~Graph() { Reset(); }
+Graph::~Graph() {
+  StopWorkers();
+  Reset();
+}
 
 Node *BlkInfo::used_node(const size_t idx) const {
   CHECK_LT(idx, used_nodes_.size());
@@ -97,6 +114,10 @@ void Graph::Reset() {
 
   leaf_blocks_.clear();
 
+  block_offsets_.clear();
+  planned_peak_ = 0;
+  naive_peak_ = 0;
+
   iteration_ = 0;
 
   time_elapsed_ = 0;
@@ -294,12 +315,29 @@ void Graph::PrintTimeProfiling() {
   printf("%s", ss.str().c_str());
 }
 
-void Graph::TimeProfilingDoExec(Node *curNode) {
+void Graph::TimeProfilingDoExec(Node *curNode, int executor) {
+  if (profiler_.enabled()) profiler_.Start(executor);
+
   if ((device_->verbosity() > 0) && (curNode->op_name_ != "Waiting") &&
       (iteration_ >= device_->skip_iteration()))
-    device_->TimeProfilingDoExec(std::move(curNode->op_), 0, curNode);
+    device_->TimeProfilingDoExec(std::move(curNode->op_), executor, curNode);
   else
-    device_->DoExec(std::move(curNode->op_), 0);
+    device_->DoExec(std::move(curNode->op_), executor);
+
+  if (profiler_.enabled()) {
+    // the operations of other devices run asynchronously
+    if (device_->lang() != kCpp) device_->Sync();
+    profiler_.Stop();
+  }
+}
+
+void Graph::ProfileRecord(Node *curNode) {
+  if (!profiler_.enabled()) return;
+  std::vector<int> read_ids, write_ids;
+  for (auto it : curNode->read_blocks_) read_ids.push_back(block(it)->id_);
+  for (auto it : curNode->write_blocks_) write_ids.push_back(block(it)->id_);
+  profiler_.Record(iteration_, curNode->id_, curNode->op_name_,
+                   std::move(read_ids), std::move(write_ids));
 }
 
 void Graph::EvaluateTimeElapsed(const TimePoint &start) {
@@ -329,55 +367,163 @@ void Graph::RunGraph() {
   if (dirty_) Analyze();
 
   TimePoint start;
-  SafeQueue<Node *> node_queue;
+  TakeStartTime(start);
+  AssignPlannedBlocks();
 
-  // activate nodes
-  for (auto it : begin_nodes_) {
-    node_queue.Push(it);
-  }
+  if (RunInParallel()) {
+    ExecInParallel();
+  } else {
+    SafeQueue<Node *> node_queue;
 
-  TakeStartTime(start);
+    // activate nodes
+    for (auto it : begin_nodes_) {
+      node_queue.Push(it);
+    }
 
-  // run graph
-  while (node_queue.Size()) {
-    // step 1: pop the first element, get the node corresponding to the index
-    Node *curNode = nullptr;
-    node_queue.Pop(curNode);
-    int curIndex = curNode->id_;
+    // run graph
+    while (node_queue.Size()) {
+      // step 1: pop the first element, get the node corresponding to the index
+      Node *curNode = nullptr;
+      node_queue.Pop(curNode);
+      int curIndex = curNode->id_;
 
-    // step 2: execute the operation
-    TimeProfilingDoExec(curNode);
+      // step 2: execute the operation
+      TimeProfilingDoExec(curNode);
 
-    // step 3: release some blocks' data that won't be used later
-    for (auto it : free_blocks_[curIndex]) {
-      it->free_data();
-    }
+      // step 3: release some blocks' data that won't be used later
+      for (auto it : free_blocks_[curIndex]) {
+        RecycleBlock(it);
+      }
+      ProfileRecord(curNode);
 
-    /*
-    if (free_blocks_[curIndex].size()) {
-      CBData *cb_data = new CBData(this, curNode);
-      cudaStreamAddCallback(device_->ctx_.stream, Graph::Callback, (void
-    *)(cb_data), 0);
-    }
-    */
+      /*
+      if (free_blocks_[curIndex].size()) {
+        CBData *cb_data = new CBData(this, curNode);
+        cudaStreamAddCallback(device_->ctx_.stream, Graph::Callback, (void
+      *)(cb_data), 0);
+      }
+      */
 
-    // step 4: activate the following nodes
-    for (auto it : next_nodes_[curIndex]) {
-      node_queue.Push(it);
+      // step 4: activate the following nodes
+      for (auto it : next_nodes_[curIndex]) {
+        node_queue.Push(it);
+      }
     }
   }
 
+  ReleaseArena();
+
   // increment iteration counter
   step();
   EvaluateTimeElapsed(start);
 }
 
+bool Graph::RunInParallel() const {
+  // only the cpp device runs the operations on multiple threads; the
+  // executors of other devices (e.g., cuda streams) are not thread workers
+  return device_->lang() == kCpp && device_->num_executors() > 1;
+}
+
+void Graph::ExecInParallel() {
+  if (nodes_.size() == 0) return;
+  StartWorkers(device_->num_executors());
+
+  // reset the counters of this iteration
+  pending_deps_ = node_deps_;
+  pending_users_ = block_users_;
+  num_finished_ = 0;
+
+  // activate nodes without dependencies; collect them before pushing as the
+  // workers start updating the counters once the first node is pushed
+  NodeVec ready_nodes;
+  for (size_t i = 0; i < nodes_.size(); ++i) {
+    if (pending_deps_[i] == 0) {
+      ready_nodes.push_back(nodes_[i]);
+    }
+  }
+  for (auto it : ready_nodes) {
+    ready_queue_.Push(it);
+  }
+
+  // wait for all nodes to finish
+  std::unique_lock<std::mutex> lock(exec_mutex_);
+  exec_cond_.wait(lock, [this]() { return num_finished_ == nodes_.size(); });
+}
+
+void Graph::StartWorkers(int num_workers) {
+  if (workers_.size() == static_cast<size_t>(num_workers)) return;
+  StopWorkers();
+  for (int i = 0; i < num_workers; ++i) {
+    workers_.emplace_back(&Graph::WorkerLoop, this, i);
+  }
+}
+
+void Graph::StopWorkers() {
+  // a null node tells a worker to exit
+  for (size_t i = 0; i < workers_.size(); ++i) {
+    ready_queue_.Push(nullptr);
+  }
+  for (auto &it : workers_) {
+    it.join();
+  }
+  workers_.clear();
+}
+
+void Graph::WorkerLoop(int executor) {
+  for (;;) {
+    Node *curNode = nullptr;
+    ready_queue_.Pop(curNode);
+    if (!curNode) break;
+
+    TimeProfilingDoExec(curNode, executor);
+    FinishNode(curNode);
+  }
+}
+
+void Graph::FinishNode(Node *curNode) {
+  BlockVec blks;
+  NodeVec ready_nodes;
+  {
+    std::lock_guard<std::mutex> lock(exec_mutex_);
+
+    // blocks are released after all the nodes using them have finished
+    for (auto it : node_blocks_[curNode->id_]) {
+      if (--pending_users_[it] == 0) {
+        blks.push_back(it);
+      }
+    }
+
+    // activate the following nodes whose dependencies are all satisfied
+    for (auto it : curNode->out_edges_) {
+      Node *nextNode = it->dst_node_;
+      if (nextNode && --pending_deps_[nextNode->id_] == 0) {
+        ready_nodes.push_back(nextNode);
+      }
+    }
+  }
+
+  for (auto it : blks) {
+    it->free_data();
+  }
+  ProfileRecord(curNode);
+
+  for (auto it : ready_nodes) {
+    ready_queue_.Push(it);
+  }
+
+  std::lock_guard<std::mutex> lock(exec_mutex_);
+  if (++num_finished_ == nodes_.size()) {
+    exec_cond_.notify_all();
+  }
+}
+
 void Graph::RunInSerial() {
   in_serial_ = true;
   if (dirty_) Analyze();
 
   TimePoint start;
   TakeStartTime(start);
+  AssignPlannedBlocks();
 
   for (size_t i = 0; i < nodes_.size(); ++i) {
     Node *curNode = nodes_[i];
@@ -387,8 +533,9 @@ void Graph::RunInSerial() {
 
     // step 2: release some blocks' data that won't be used later
     for (auto it : free_blocks_[i]) {
-      it->free_data();
+      RecycleBlock(it);
     }
+    ProfileRecord(curNode);
 
     /*
     // Wait for calculation to complete and then recyle the data
@@ -398,6 +545,8 @@ void Graph::RunInSerial() {
     */
   }
 
+  ReleaseArena();
+
   // increment iteration counter
   step();
   EvaluateTimeElapsed(start);
@@ -416,6 +565,8 @@ void Graph::AddOperation(OpFunc &&op, const BlockVec &read_blocks,
 
   // create new node
   Node *node = new Node(nodes_.size(), std::move(op), op_name);
+  node->read_blocks_ = read_blocks;
+  node->write_blocks_ = write_blocks;
 
   // create edges for read_blocks
   for (size_t i = 0; i < read_blocks.size(); ++i) {
@@ -460,6 +611,8 @@ void Graph::AddOperation(OpFunc &&op, const BlockVec &read_blocks,
     blkInfo->graph_ref_ += 1;
     if (src_node) {
       src_node->AddOutEdge(edge);
+    } else if (blkInfo->readers_.empty() || blkInfo->readers_.back() != node) {
+      blkInfo->readers_.push_back(node);
     }
 
     node->AddInEdge(edge);
@@ -484,6 +637,17 @@ void Graph::AddOperation(OpFunc &&op, const BlockVec &read_blocks,
         blkInfo->type_ = BlockType::kParam;
       }
 
+      // the nodes reading blk before its first writer, e.g., the nodes
+      // reading a param that is then updated, must finish before this node
+      for (auto reader : blkInfo->readers_) {
+        if (reader == node) continue;
+        Edge *edge = new Edge(edges_.size(), blk, reader, node);
+        reader->AddOutEdge(edge);
+        node->AddInEdge(edge);
+        edges_.push_back(edge);
+      }
+      blkInfo->readers_.clear();
+
       Edge *write_edge = blkInfo->write_edge_;
       if (write_edge) {
         if (!write_edge->dst_node_) {
@@ -571,6 +735,10 @@ void Graph::Analyze() {
 
   AnalyzeEdges();
 
+  AnalyzeDependencies();
+
+  PlanMemory();
+
   dirty_ = false;
 
   // Debug();
@@ -687,6 +855,159 @@ void Graph::AnalyzeEdges() {
   }
 }
 
+void Graph::AnalyzeDependencies() {
+  // the number of nodes that must finish before a node can run
+  node_deps_.assign(nodes_.size(), 0);
+  for (auto node : nodes_) {
+    for (auto edge : node->in_edges_) {
+      if (edge->src_node_) {
+        node_deps_[node->id_] += 1;
+      }
+    }
+  }
+
+  // the recyclable blocks and the number of nodes using them
+  node_blocks_.clear();
+  node_blocks_.resize(nodes_.size());
+  block_users_.clear();
+  for (auto &it : free_blocks_) {
+    for (auto blk : it) {
+      BlkInfo *blkInfo = blocks_[blk];
+      block_users_[blk] = blkInfo->used_nodes_.size();
+      for (auto node : blkInfo->used_nodes_) {
+        node_blocks_[node->id_].push_back(blk);
+      }
+    }
+  }
+}
+
+void Graph::PlanMemory() {
+  block_offsets_.clear();
+  planned_peak_ = 0;
+  naive_peak_ = 0;
+  if (!plan_memory_ || RunInParallel()) return;
+
+  // the position of each node in the order of execution
+  std::vector<size_t> pos(nodes_.size());
+  if (in_serial_) {
+    for (size_t i = 0; i < nodes_.size(); ++i) pos[i] = i;
+  } else {
+    NodeVec order(begin_nodes_);
+    for (size_t i = 0; i < order.size(); ++i) {
+      pos[order[i]->id_] = i;
+      for (auto it : next_nodes_[order[i]->id_]) order.push_back(it);
+    }
+  }
+
+  // the lifetime of a recyclable block spans from its first user to its last
+  // user, i.e., the node that frees it
+  std::vector<BlkLifetime> lifetimes;
+  for (auto &it : free_blocks_) {
+    for (auto blk : it) {
+      BlkInfo *blkInfo = blocks_[blk];
+      size_t size =
+          (blk->size() + kPlanAlignment - 1) / kPlanAlignment * kPlanAlignment;
+      lifetimes.push_back({blk, size, pos[blkInfo->used_nodes_.front()->id_],
+                           pos[blkInfo->used_nodes_.back()->id_], 0});
+    }
+  }
+
+  // place large blocks first; each block takes the lowest offset that does
+  // not overlap with the placed blocks whose lifetime overlaps with its own
+  std::sort(lifetimes.begin(), lifetimes.end(),
+            [](const BlkLifetime &a, const BlkLifetime &b) {
+              return a.size != b.size ? a.size > b.size : a.begin < b.begin;
+            });
+  for (size_t i = 0; i < lifetimes.size(); ++i) {
+    BlkLifetime &cur = lifetimes[i];
+    std::vector<std::pair<size_t, size_t>> occupied;
+    for (size_t j = 0; j < i; ++j) {
+      const BlkLifetime &other = lifetimes[j];
+      if (other.begin <= cur.end && cur.begin <= other.end) {
+        occupied.push_back({other.offset, other.offset + other.size});
+      }
+    }
+    std::sort(occupied.begin(), occupied.end());
+    for (auto &range : occupied) {
+      if (cur.offset + cur.size <= range.first) break;
+      cur.offset = std::max(cur.offset, range.second);
+    }
+
+    block_offsets_[cur.blk] = cur.offset;
+    planned_peak_ = std::max(planned_peak_, cur.offset + cur.size);
+    naive_peak_ += cur.size;
+  }
+
+  if (naive_peak_ > 0) {
+    LOG(INFO) << "Memory plan for " << lifetimes.size()
+              << " intermediate blocks: " << planned_peak_ << " bytes, "
+              << naive_peak_ - planned_peak_ << " bytes ("
+              << 100.0 * (naive_peak_ - planned_peak_) / naive_peak_
+              << "%) less than allocating each block separately";
+  }
+
+  // the arena is allocated by Device::Malloc, whose size is an int
+  if (planned_peak_ > static_cast<size_t>(std::numeric_limits<int>::max())) {
+    LOG(WARNING) << "The planned arena of " << planned_peak_
+                 << " bytes is too large, allocate each block separately";
+    block_offsets_.clear();
+    planned_peak_ = 0;
+    naive_peak_ = 0;
+  }
+}
+
+void Graph::EnableMemoryPlan(bool enable) {
+  if (plan_memory_ != enable) {
+    plan_memory_ = enable;
+    if (nodes_.size()) dirty_ = true;
+  }
+}
+
+size_t Graph::GetPlannedPeakMemory() {
+  if (dirty_) Analyze();
+  return planned_peak_;
+}
+
+size_t Graph::GetNaivePeakMemory() {
+  if (dirty_) Analyze();
+  return naive_peak_;
+}
+
+void Graph::AssignPlannedBlocks() {
+  if (block_offsets_.empty()) return;
+
+  arena_ = device_->Malloc((int)planned_peak_);
+  CHECK(arena_ != nullptr) << "Failed to allocate the arena of "
+                           << planned_peak_ << " bytes";
+  for (auto &it : block_offsets_) {
+    Block *blk = it.first;
+    // blocks that already have memory, e.g., allocated outside of the graph,
+    // keep using their own memory
+    if (blk->data_ == nullptr) {
+      blk->data_ = static_cast<char *>(arena_) + it.second;
+    }
+  }
+}
+
+void Graph::RecycleBlock(Block *blk) {
+  auto it = block_offsets_.find(blk);
+  if (arena_ && it != block_offsets_.end() &&
+      blk->data_ == static_cast<char *>(arena_) + it->second) {
+    // the memory belongs to the arena, only detach it from the block
+    blk->data_ = nullptr;
+    blk->initialized_ = false;
+  } else {
+    blk->free_data();
+  }
+}
+
+void Graph::ReleaseArena() {
+  if (arena_) {
+    device_->Free(arena_);
+    arena_ = nullptr;
+  }
+}
+
 void Graph::FreeLoop() {
   int id = 0;
   for (;;) {
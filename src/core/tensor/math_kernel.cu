@@ -485,6 +485,247 @@ __global__ void KernelBLT(const size_t num, const float *in1, const float *in2,
     out[idx] = in1[idx] < in2[idx] ? 1.0f : 0.0f;
   }
 }
+__global__ void KernelGatherRows(const size_t n, const size_t dim,
+                                 const int *idx, const float *in, float *out) {
+  for (int i = blockIdx.x * blockDim.x + threadIdx.x; i < n;
+       i += blockDim.x * gridDim.x) {
+    int row = idx[i / dim];
+    out[i] = row < 0 ? 0.0f : in[row * dim + i % dim];
+  }
+}
+
+__global__ void KernelScatterAddRows(const size_t n, const size_t dim,
+                                     const int *idx, const float *in,
+                                     float *out) {
+  for (int i = blockIdx.x * blockDim.x + threadIdx.x; i < n;
+       i += blockDim.x * gridDim.x) {
+    int row = idx[i / dim];
+    if (row >= 0) atomicAdd(out + row * dim + i % dim, in[i]);
+  }
+}
+
+__global__ void KernelScatterRows(const size_t n, const size_t dim,
+                                  const int *idx, const float *in,
+                                  float *out) {
+  for (int i = blockIdx.x * blockDim.x + threadIdx.x; i < n;
+       i += blockDim.x * gridDim.x) {
+    int row = idx[i / dim];
+    if (row >= 0) out[row * dim + i % dim] = in[i];
+  }
+}
+
+template <typename DType>
+__global__ void KernelGather(const size_t n, const size_t dim,
+                             const size_t inner, const size_t num,
+                             const int *idx, const DType *in, DType *out) {
+  for (size_t i = blockIdx.x * blockDim.x + threadIdx.x; i < n;
+       i += blockDim.x * gridDim.x) {
+    const size_t row = i / inner, o = row / num;
+    const int k = idx[row % num];
+    out[i] = k < 0 ? DType(0) : in[(o * dim + k) * inner + i % inner];
+  }
+}
+
+__global__ void KernelScatterAdd(const size_t n, const size_t dim,
+                                 const size_t inner, const size_t num,
+                                 const int *idx, const float *in, float *out) {
+  for (size_t i = blockIdx.x * blockDim.x + threadIdx.x; i < n;
+       i += blockDim.x * gridDim.x) {
+    const size_t row = i / inner, o = row / num;
+    const int k = idx[row % num];
+    if (k >= 0) atomicAdd(out + (o * dim + k) * inner + i % inner, in[i]);
+  }
+}
+
+// The shape and the strides of a strided copy, which are passed by value to
+// the kernel
+struct StridedDims {
+  int ndim;
+  size_t shape[kMaxStridedDim];
+  int in_stride[kMaxStridedDim];
+  int out_stride[kMaxStridedDim];
+};
+
+template <typename DType>
+__global__ void KernelStridedCopy(const size_t n, StridedDims dims,
+                                  const DType *in, DType *out) {
+  for (size_t i = blockIdx.x * blockDim.x + threadIdx.x; i < n;
+       i += blockDim.x * gridDim.x) {
+    size_t r = i;
+    long long src = 0, dst = 0;
+    for (int k = dims.ndim - 1; k >= 0; k--) {
+      const long long x = r % dims.shape[k];
+      r /= dims.shape[k];
+      src += x * dims.in_stride[k];
+      dst += x * dims.out_stride[k];
+    }
+    out[dst] = in[src];
+  }
+}
+
+// the offset of the element of the mapped tensor (whose strides are
+// dims.in_stride) for the i-th element of a contiguous tensor of dims.shape,
+// or -1 if any index is negative; nmaps is the sum of dims.shape
+__device__ long long IndexMapOffset(size_t i, const StridedDims &dims,
+                                    const int *maps, size_t nmaps) {
+  long long offset = 0;
+  for (int k = dims.ndim - 1; k >= 0; k--) {
+    nmaps -= dims.shape[k];
+    const int x = maps[nmaps + i % dims.shape[k]];
+    i /= dims.shape[k];
+    if (x < 0) return -1;
+    offset += static_cast<long long>(x) * dims.in_stride[k];
+  }
+  return offset;
+}
+
+template <typename DType>
+__global__ void KernelIndexMap(const size_t n, StridedDims dims,
+                               const int *maps, const size_t nmaps,
+                               const DType *in, const DType value, DType *out) {
+  for (size_t i = blockIdx.x * blockDim.x + threadIdx.x; i < n;
+       i += blockDim.x * gridDim.x) {
+    const long long src = IndexMapOffset(i, dims, maps, nmaps);
+    out[i] = src < 0 ? value : in[src];
+  }
+}
+
+__global__ void KernelIndexMapBackward(const size_t n, StridedDims dims,
+                                       const int *maps, const size_t nmaps,
+                                       const float *in, float *out) {
+  for (size_t i = blockIdx.x * blockDim.x + threadIdx.x; i < n;
+       i += blockDim.x * gridDim.x) {
+    const long long dst = IndexMapOffset(i, dims, maps, nmaps);
+    if (dst >= 0) atomicAdd(out + dst, in[i]);
+  }
+}
+
+// out holds the uniform random numbers of the elements; each thread handles
+// the 32 elements of a word of the mask
+__global__ void KernelPackedDropout(const size_t n, const float ratio,
+                                    const float scale, const float *in,
+                                    uint32_t *mask, float *out) {
+  for (size_t w = blockIdx.x * blockDim.x + threadIdx.x; w < (n + 31) / 32;
+       w += blockDim.x * gridDim.x) {
+    const size_t begin = w * 32, end = min(n, begin + 32);
+    uint32_t bits = 0;
+    for (size_t i = begin; i < end; i++) {
+      const bool keep = out[i] > ratio;
+      bits |= static_cast<uint32_t>(keep) << (i - begin);
+      out[i] = keep ? in[i] * scale : 0.0f;
+    }
+    mask[w] = bits;
+  }
+}
+
+__global__ void KernelPackedDropoutBackward(const size_t n, const float scale,
+                                            const float *in,
+                                            const uint32_t *mask, float *out) {
+  for (size_t i = blockIdx.x * blockDim.x + threadIdx.x; i < n;
+       i += blockDim.x * gridDim.x) {
+    out[i] = (mask[i >> 5] >> (i & 31)) & 1u ? in[i] * scale : 0.0f;
+  }
+}
+
+// pos[i] is the first position of idx[i] in idx, or -1 if idx[i] < 0
+__global__ void KernelFirstRow(const size_t num, const int *idx, int *pos) {
+  for (int i = blockIdx.x * blockDim.x + threadIdx.x; i < num;
+       i += blockDim.x * gridDim.x) {
+    int row = idx[i], p = row < 0 ? -1 : i;
+    for (int j = 0; j < i && p == i; j++)
+      if (idx[j] == row) p = j;
+    pos[i] = p;
+  }
+}
+
+__global__ void KernelAddToFirstRow(const size_t n, const size_t dim,
+                                    const int *pos, const float *in,
+                                    float *out) {
+  for (int i = blockIdx.x * blockDim.x + threadIdx.x; i < n;
+       i += blockDim.x * gridDim.x) {
+    int p = pos[i / dim];
+    if (p >= 0) atomicAdd(out + p * dim + i % dim, in[i]);
+  }
+}
+
+__global__ void KernelUniqueRows(const size_t num, const int *idx, int *pos) {
+  for (int i = blockIdx.x * blockDim.x + threadIdx.x; i < num;
+       i += blockDim.x * gridDim.x) {
+    pos[i] = pos[i] == i ? idx[i] : -1;
+  }
+}
+
+// The pointers and sizes of a chunk of tensors, which are passed by value
+// to the multi-tensor kernels; blockIdx.y is the index of the tensor.
+const size_t kMultiTensorChunk = 48;
+struct MultiTensorPtrs {
+  const float *grads[kMultiTensorChunk];
+  float *params[kMultiTensorChunk];
+  float *slot1[kMultiTensorChunk];
+  float *slot2[kMultiTensorChunk];
+  size_t sizes[kMultiTensorChunk];
+};
+
+__global__ void KernelMultiTensorSGD(MultiTensorPtrs ptrs, const float *lr,
+                                     const float *momentum,
+                                     const float *dampening,
+                                     const float *weight_decay, bool nesterov) {
+  const size_t k = blockIdx.y, n = ptrs.sizes[k];
+  const float *g = ptrs.grads[k];
+  float *p = ptrs.params[k], *m = ptrs.slot1[k];
+  const float minus_lr = -*lr, mom = *momentum, alpha = 1.0f - *dampening;
+  const float decay = *weight_decay;
+  for (size_t i = blockIdx.x * blockDim.x + threadIdx.x; i < n;
+       i += blockDim.x * gridDim.x) {
+    float gi = g[i] + decay * p[i];
+    if (m != nullptr) {
+      m[i] = m[i] * mom + alpha * gi;
+      gi = nesterov ? gi + mom * m[i] : m[i];
+    }
+    p[i] += minus_lr * gi;
+  }
+}
+
+__global__ void KernelMultiTensorAdam(MultiTensorPtrs ptrs, const float *lr,
+                                      const float *beta_1, const float *beta_2,
+                                      const float *epsilon,
+                                      const float *weight_decay,
+                                      const float *step) {
+  const size_t k = blockIdx.y, n = ptrs.sizes[k];
+  const float *g = ptrs.grads[k];
+  float *p = ptrs.params[k], *m = ptrs.slot1[k], *v = ptrs.slot2[k];
+  const float minus_lr = -*lr, b1 = *beta_1, b2 = *beta_2, eps = *epsilon;
+  const float decay = *weight_decay, t = *step + 1.0f;
+  const float bias1 = 1.0f - powf(b1, t), bias2 = 1.0f - powf(b2, t);
+  for (size_t i = blockIdx.x * blockDim.x + threadIdx.x; i < n;
+       i += blockDim.x * gridDim.x) {
+    float gi = g[i] + decay * p[i];
+    m[i] = m[i] * b1 + (1.0f - b1) * gi;
+    v[i] = v[i] * b2 + (1.0f - b2) * gi * gi;
+    p[i] += minus_lr * ((m[i] / bias1) / (sqrtf(v[i] / bias2) + eps));
+  }
+}
+
+// one block per row; blockDim.x must be a power of 2 not above CU1DBLOCK
+__global__ void KernelRowDot(const size_t nrow, const size_t ncol,
+                             const float *a, const float *b, float *out) {
+  __shared__ float aux[CU1DBLOCK];
+  const unsigned int tid = threadIdx.x;
+  for (size_t r = blockIdx.x; r < nrow; r += gridDim.x) {
+    const float *x = a + r * ncol, *y = b + r * ncol;
+    float sum = 0.0f;
+    for (size_t c = tid; c < ncol; c += blockDim.x) sum += x[c] * y[c];
+    __syncthreads();  // aux of the previous row has been read
+    aux[tid] = sum;
+    __syncthreads();
+    for (unsigned int h = blockDim.x >> 1; h > 0; h >>= 1) {
+      if (tid < h) aux[tid] += aux[tid + h];
+      __syncthreads();
+    }
+    if (tid == 0) out[r] = aux[0];
+  }
+}
+
 __global__ void KernelRowMax(const size_t nrow, const size_t ncol,
                              const float *inPtr, float *outPtr) {
   for (size_t idx = blockIdx.x * blockDim.x + threadIdx.x; idx < nrow;
@@ -561,6 +802,83 @@ __global__ void KernelComputeCrossEntropy(const bool int_target,
   }
 }
 
+// one block per row; blockDim.x must be a power of 2 not above CU1DBLOCK
+__global__ void KernelCrossEntropyFwdBwd(
+    const bool logits, const float smoothing, const int ignore_index,
+    const size_t batchsize, const size_t dim, const float *in, const int *t,
+    float *loss, float *grad) {
+  __shared__ float aux_max[CU1DBLOCK], aux_sum[CU1DBLOCK], aux_x[CU1DBLOCK];
+  __shared__ int aux_valid[CU1DBLOCK];
+  const unsigned int tid = threadIdx.x;
+  int valid = 0;
+  for (size_t i = tid; i < batchsize; i += blockDim.x)
+    valid += t[i] != ignore_index;
+  aux_valid[tid] = valid;
+  __syncthreads();
+  for (unsigned int h = blockDim.x >> 1; h > 0; h >>= 1) {
+    if (tid < h) aux_valid[tid] += aux_valid[tid + h];
+    __syncthreads();
+  }
+  const float scale = 1.0f / max(aux_valid[0], 1);
+  const float off = smoothing / dim, on = 1.0f - smoothing;
+
+  for (size_t r = blockIdx.x; r < batchsize; r += gridDim.x) {
+    const float *x = in + r * dim;
+    float *g = grad == nullptr ? nullptr : grad + r * dim;
+    const int label = t[r];
+    if (label == ignore_index) {
+      if (tid == 0) loss[r] = 0.0f;
+      if (g != nullptr)
+        for (size_t j = tid; j < dim; j += blockDim.x) g[j] = 0.0f;
+      continue;
+    }
+    // the max and the sum of exp(x - max) of the logits, or the sum of the
+    // log probabilities for label smoothing
+    float x_max = -INFINITY, sum = 0.0f, sum_x = 0.0f;
+    for (size_t j = tid; j < dim; j += blockDim.x) {
+      if (logits) {
+        if (x[j] > x_max) {
+          sum = sum * expf(x_max - x[j]) + 1.0f;
+          x_max = x[j];
+        } else {
+          sum += expf(x[j] - x_max);
+        }
+        sum_x += x[j];
+      } else if (off > 0.0f) {
+        sum_x += logf(max(x[j], FLT_MIN));
+      }
+    }
+    __syncthreads();  // aux of the previous row has been read
+    aux_max[tid] = x_max;
+    aux_sum[tid] = sum;
+    aux_x[tid] = sum_x;
+    __syncthreads();
+    for (unsigned int h = blockDim.x >> 1; h > 0; h >>= 1) {
+      if (tid < h) {
+        const float m = max(aux_max[tid], aux_max[tid + h]);
+        if (m != -INFINITY)
+          aux_sum[tid] = aux_sum[tid] * expf(aux_max[tid] - m) +
+                         aux_sum[tid + h] * expf(aux_max[tid + h] - m);
+        aux_max[tid] = m;
+        aux_x[tid] += aux_x[tid + h];
+      }
+      __syncthreads();
+    }
+    const float lse = aux_max[0] + logf(aux_sum[0]);
+    const float p = max(x[label], FLT_MIN);
+    if (tid == 0)
+      loss[r] = logits ? (lse - on * x[label] - off * aux_x[0]) * scale
+                       : -(on * logf(p) + off * aux_x[0]) * scale;
+    if (g != nullptr) {
+      for (size_t j = tid; j < dim; j += blockDim.x) {
+        float v = logits ? expf(x[j] - lse) - off : -off / max(x[j], FLT_MIN);
+        if (j == static_cast<size_t>(label)) v -= logits ? on : on / p;
+        g[j] = v * scale;
+      }
+    }
+  }
+}
+
 __global__ void KernelSoftmaxCrossEntropyBwd(const bool int_target,
                                              const size_t batchsize,
                                              const size_t dim, const float *p,
@@ -973,6 +1291,18 @@ void ComputeCrossEntropy(const bool int_target, size_t batchsize,
                               stream>>>(int_target, batchsize, dim, p, t, loss);
 }
 
+void CrossEntropyFwdBwd(const bool logits, const float smoothing,
+                        const int ignore_index, const size_t batchsize,
+                        const size_t dim, const float *in, const int *t,
+                        float *loss, float *grad, cudaStream_t stream) {
+  // a block of threads per row, with fewer threads for short rows
+  unsigned int threads = 32;
+  while (threads < CU1DBLOCK && threads < dim) threads <<= 1;
+  const size_t blocks = std::min(batchsize, size_t(4096));
+  KernelCrossEntropyFwdBwd<<<blocks, threads, 0, stream>>>(
+      logits, smoothing, ignore_index, batchsize, dim, in, t, loss, grad);
+}
+
 void SoftmaxCrossEntropyBwd(const bool int_target, size_t batchsize,
                             const size_t dim, const float *p, const int *t,
                             float *grad, cudaStream_t stream) {
@@ -989,12 +1319,200 @@ void SoftmaxCrossEntropyBwd(const bool int_target, size_t batchsize,
                                            grad);
 }
 
+void RowDot(const size_t nrow, const size_t ncol, const float *a,
+            const float *b, float *out, cudaStream_t stream) {
+  // a block of threads per row, with fewer threads for short rows
+  unsigned int threads = 32;
+  while (threads < CU1DBLOCK && threads < ncol) threads <<= 1;
+  const size_t blocks = std::min(nrow, size_t(4096));
+  KernelRowDot<<<blocks, threads, 0, stream>>>(nrow, ncol, a, b, out);
+}
+
 void RowMax(const size_t nrow, const size_t ncol, const float *inPtr,
             float *outPtr, cudaStream_t stream) {
   KernelRowMax<<<ceil(nrow / CU1DBLOCKF), CU1DBLOCKF, 0, stream>>>(
       nrow, ncol, inPtr, outPtr);
 }
 
+void GatherRows(const size_t num, const size_t dim, const int *idx,
+                const float *in, float *out, cudaStream_t s) {
+  size_t n = num * dim;
+  KernelGatherRows<<<ceil(n / CU1DBLOCKF), CU1DBLOCKF, 0, s>>>(n, dim, idx, in,
+                                                               out);
+}
+
+void ScatterAddRows(const size_t num, const size_t dim, const int *idx,
+                    const float *in, float *out, cudaStream_t s) {
+  size_t n = num * dim;
+  KernelScatterAddRows<<<ceil(n / CU1DBLOCKF), CU1DBLOCKF, 0, s>>>(n, dim, idx,
+                                                                   in, out);
+}
+
+void ScatterRows(const size_t num, const size_t dim, const int *idx,
+                 const float *in, float *out, cudaStream_t s) {
+  size_t n = num * dim;
+  KernelScatterRows<<<ceil(n / CU1DBLOCKF), CU1DBLOCKF, 0, s>>>(n, dim, idx, in,
+                                                                out);
+}
+
+void Gather(const size_t outer, const size_t dim, const size_t inner,
+            const size_t num, const int *idx, const float *in, float *out,
+            cudaStream_t s) {
+  size_t n = outer * num * inner;
+  KernelGather<<<ceil(n / CU1DBLOCKF), CU1DBLOCKF, 0, s>>>(n, dim, inner, num,
+                                                           idx, in, out);
+}
+
+void Gather(const size_t outer, const size_t dim, const size_t inner,
+            const size_t num, const int *idx, const int *in, int *out,
+            cudaStream_t s) {
+  size_t n = outer * num * inner;
+  KernelGather<<<ceil(n / CU1DBLOCKF), CU1DBLOCKF, 0, s>>>(n, dim, inner, num,
+                                                           idx, in, out);
+}
+
+void ScatterAdd(const size_t outer, const size_t dim, const size_t inner,
+                const size_t num, const int *idx, const float *in, float *out,
+                cudaStream_t s) {
+  size_t n = outer * num * inner;
+  KernelScatterAdd<<<ceil(n / CU1DBLOCKF), CU1DBLOCKF, 0, s>>>(
+      n, dim, inner, num, idx, in, out);
+}
+
+// the shape and the strides are copied into the StridedDims by value
+static StridedDims MakeStridedDims(const size_t ndim, const size_t *shape,
+                                   const int *in_stride, const int *out_stride,
+                                   size_t *n) {
+  StridedDims dims;
+  dims.ndim = ndim;
+  for (size_t k = 0; k < ndim; k++) {
+    dims.shape[k] = shape[k];
+    dims.in_stride[k] = in_stride[k];
+    dims.out_stride[k] = out_stride[k];
+    *n *= shape[k];
+  }
+  return dims;
+}
+
+void StridedCopy(const size_t ndim, const size_t *shape, const int *in_stride,
+                 const int *out_stride, const float *in, float *out,
+                 cudaStream_t s) {
+  size_t n = 1;
+  StridedDims dims = MakeStridedDims(ndim, shape, in_stride, out_stride, &n);
+  KernelStridedCopy<<<ceil(n / CU1DBLOCKF), CU1DBLOCKF, 0, s>>>(n, dims, in,
+                                                                out);
+}
+
+void StridedCopy(const size_t ndim, const size_t *shape, const int *in_stride,
+                 const int *out_stride, const int *in, int *out,
+                 cudaStream_t s) {
+  size_t n = 1;
+  StridedDims dims = MakeStridedDims(ndim, shape, in_stride, out_stride, &n);
+  KernelStridedCopy<<<ceil(n / CU1DBLOCKF), CU1DBLOCKF, 0, s>>>(n, dims, in,
+                                                                out);
+}
+
+void IndexMap(const size_t ndim, const size_t *shape, const int *in_stride,
+              const int *maps, const float *in, const float value, float *out,
+              cudaStream_t s) {
+  size_t n = 1;
+  StridedDims dims = MakeStridedDims(ndim, shape, in_stride, in_stride, &n);
+  size_t nmaps = 0;
+  for (size_t k = 0; k < ndim; k++) nmaps += shape[k];
+  KernelIndexMap<<<ceil(n / CU1DBLOCKF), CU1DBLOCKF, 0, s>>>(
+      n, dims, maps, nmaps, in, value, out);
+}
+
+void IndexMap(const size_t ndim, const size_t *shape, const int *in_stride,
+              const int *maps, const int *in, const int value, int *out,
+              cudaStream_t s) {
+  size_t n = 1;
+  StridedDims dims = MakeStridedDims(ndim, shape, in_stride, in_stride, &n);
+  size_t nmaps = 0;
+  for (size_t k = 0; k < ndim; k++) nmaps += shape[k];
+  KernelIndexMap<<<ceil(n / CU1DBLOCKF), CU1DBLOCKF, 0, s>>>(
+      n, dims, maps, nmaps, in, value, out);
+}
+
+void IndexMapBackward(const size_t ndim, const size_t *shape,
+                      const int *out_stride, const int *maps, const float *in,
+                      float *out, cudaStream_t s) {
+  size_t n = 1;
+  StridedDims dims = MakeStridedDims(ndim, shape, out_stride, out_stride, &n);
+  size_t nmaps = 0;
+  for (size_t k = 0; k < ndim; k++) nmaps += shape[k];
+  KernelIndexMapBackward<<<ceil(n / CU1DBLOCKF), CU1DBLOCKF, 0, s>>>(
+      n, dims, maps, nmaps, in, out);
+}
+
+void PackedDropout(const size_t n, const float ratio, const float *in,
+                   uint32_t *mask, float *out, cudaStream_t s) {
+  const size_t nword = (n + 31) / 32;
+  KernelPackedDropout<<<ceil(nword / CU1DBLOCKF), CU1DBLOCKF, 0, s>>>(
+      n, ratio, 1.0f / (1.0f - ratio), in, mask, out);
+}
+
+void PackedDropoutBackward(const size_t n, const float ratio, const float *in,
+                           const uint32_t *mask, float *out, cudaStream_t s) {
+  KernelPackedDropoutBackward<<<ceil(n / CU1DBLOCKF), CU1DBLOCKF, 0, s>>>(
+      n, 1.0f / (1.0f - ratio), in, mask, out);
+}
+
+void CoalesceRows(const size_t num, const size_t dim, const int *idx,
+                  const float *in, int *out_idx, float *out, cudaStream_t s) {
+  size_t n = num * dim;
+  cudaMemsetAsync(out, 0, n * sizeof(float), s);
+  KernelFirstRow<<<ceil(num / CU1DBLOCKF), CU1DBLOCKF, 0, s>>>(num, idx,
+                                                               out_idx);
+  KernelAddToFirstRow<<<ceil(n / CU1DBLOCKF), CU1DBLOCKF, 0, s>>>(
+      n, dim, out_idx, in, out);
+  KernelUniqueRows<<<ceil(num / CU1DBLOCKF), CU1DBLOCKF, 0, s>>>(num, idx,
+                                                                 out_idx);
+}
+
+// Launch 'kernel' for each chunk of tensors, with one row of blocks per
+// tensor; 'slot1' and 'slot2' could be nullptr.
+template <typename Kernel, typename... Args>
+static void LaunchMultiTensor(const size_t num, const size_t *sizes,
+                              const float *const *grads, float *const *params,
+                              float *const *slot1, float *const *slot2,
+                              cudaStream_t s, Kernel kernel, Args... args) {
+  MultiTensorPtrs ptrs;
+  for (size_t start = 0; start < num; start += kMultiTensorChunk) {
+    size_t count = std::min(num - start, kMultiTensorChunk), max_size = 0;
+    for (size_t k = 0; k < count; k++) {
+      ptrs.grads[k] = grads[start + k];
+      ptrs.params[k] = params[start + k];
+      ptrs.slot1[k] = slot1 == nullptr ? nullptr : slot1[start + k];
+      ptrs.slot2[k] = slot2 == nullptr ? nullptr : slot2[start + k];
+      ptrs.sizes[k] = sizes[start + k];
+      max_size = std::max(max_size, sizes[start + k]);
+    }
+    dim3 grid((unsigned)ceil(max_size / CU1DBLOCKF), (unsigned)count);
+    kernel<<<grid, CU1DBLOCK, 0, s>>>(ptrs, args...);
+  }
+}
+
+void MultiTensorSGD(const size_t num, const size_t *sizes,
+                    const float *const *grads, float *const *params,
+                    float *const *moments, const float *lr,
+                    const float *momentum, const float *dampening,
+                    const float *weight_decay, bool nesterov, cudaStream_t s) {
+  LaunchMultiTensor(num, sizes, grads, params, moments, nullptr, s,
+                    KernelMultiTensorSGD, lr, momentum, dampening,
+                    weight_decay, nesterov);
+}
+
+void MultiTensorAdam(const size_t num, const size_t *sizes,
+                     const float *const *grads, float *const *params,
+                     float *const *m, float *const *v, const float *lr,
+                     const float *beta_1, const float *beta_2,
+                     const float *epsilon, const float *weight_decay,
+                     const float *step, cudaStream_t s) {
+  LaunchMultiTensor(num, sizes, grads, params, m, v, s, KernelMultiTensorAdam,
+                    lr, beta_1, beta_2, epsilon, weight_decay, step);
+}
+
 /*
 void square_grad(int n, const float *in, float *out, cudaStream_t s) {
   kernel_square_grad <<<ceil(n / CU1DBLOCKF), CU1DBLOCKF, 0, s>>> (in, out, n);
@@ -28,6 +28,8 @@
 #include <thrust/remove.h>
 #include <thrust/sort.h>
 
+#include <cstdint>
+
 #include "cuda_fp16.h"
 
 /// TODO(wangwei) Clean the function APIs as commented in tensor_math.h
@@ -171,10 +173,94 @@ void SoftmaxCrossEntropyBwd(bool int_target, const size_t batchsize,
 void SoftmaxCrossEntropyBwd(bool int_target, const size_t batchsize,
                             const size_t dim, const __half *p, const int *t,
                             __half *grad, cudaStream_t stream);
+void CrossEntropyFwdBwd(const bool logits, const float smoothing,
+                        const int ignore_index, const size_t batchsize,
+                        const size_t dim, const float *in, const int *t,
+                        float *loss, float *grad, cudaStream_t stream);
 
 void RowMax(const size_t nrow, const size_t ncol, const float *inPtr,
             float *outPtr, cudaStream_t stream);
 
+void RowDot(const size_t nrow, const size_t ncol, const float *a,
+            const float *b, float *out, cudaStream_t stream);
+
+void GatherRows(const size_t num, const size_t dim, const int *idx,
+                const float *in, float *out, cudaStream_t s);
+
+void ScatterAddRows(const size_t num, const size_t dim, const int *idx,
+                    const float *in, float *out, cudaStream_t s);
+
+void ScatterRows(const size_t num, const size_t dim, const int *idx,
+                 const float *in, float *out, cudaStream_t s);
+
+// out[o][j] = in[o][idx[j]] for outer x num slices of length inner
+void Gather(const size_t outer, const size_t dim, const size_t inner,
+            const size_t num, const int *idx, const float *in, float *out,
+            cudaStream_t s);
+void Gather(const size_t outer, const size_t dim, const size_t inner,
+            const size_t num, const int *idx, const int *in, int *out,
+            cudaStream_t s);
+
+// out[o][idx[j]] += in[o][j] for outer x num slices of length inner
+void ScatterAdd(const size_t outer, const size_t dim, const size_t inner,
+                const size_t num, const int *idx, const float *in, float *out,
+                cudaStream_t s);
+
+// the max number of dims of StridedCopy
+const size_t kMaxStridedDim = 8;
+
+// copy the elements of a tensor of 'shape' from 'in' to 'out', whose strides
+// are 'in_stride' and 'out_stride'; 'shape' and the strides are host arrays
+void StridedCopy(const size_t ndim, const size_t *shape, const int *in_stride,
+                 const int *out_stride, const float *in, float *out,
+                 cudaStream_t s);
+void StridedCopy(const size_t ndim, const size_t *shape, const int *in_stride,
+                 const int *out_stride, const int *in, int *out,
+                 cudaStream_t s);
+
+// out[j_0, j_1, ...] = in[maps_0[j_0], maps_1[j_1], ...] for the contiguous
+// 'out' of 'shape', or value if any index is negative; the maps of the dims
+// are concatenated in the device array 'maps', and 'in_stride' is a host array
+void IndexMap(const size_t ndim, const size_t *shape, const int *in_stride,
+              const int *maps, const float *in, const float value, float *out,
+              cudaStream_t s);
+void IndexMap(const size_t ndim, const size_t *shape, const int *in_stride,
+              const int *maps, const int *in, const int value, int *out,
+              cudaStream_t s);
+
+// out[maps_0[j_0], maps_1[j_1], ...] += in[j_0, j_1, ...] for the contiguous
+// 'in' of 'shape', skipping the negative indices
+void IndexMapBackward(const size_t ndim, const size_t *shape,
+                      const int *out_stride, const int *maps, const float *in,
+                      float *out, cudaStream_t s);
+
+// out = in / (1 - ratio) if the uniform random number in out is above ratio,
+// otherwise 0; the kept elements are set in the bits of mask
+void PackedDropout(const size_t n, const float ratio, const float *in,
+                   uint32_t *mask, float *out, cudaStream_t s);
+
+// out = in / (1 - ratio) if the bit of the element is set in mask, otherwise 0
+void PackedDropoutBackward(const size_t n, const float ratio, const float *in,
+                           const uint32_t *mask, float *out, cudaStream_t s);
+
+void CoalesceRows(const size_t num, const size_t dim, const int *idx,
+                  const float *in, int *out_idx, float *out, cudaStream_t s);
+
+// 'grads', 'params', 'moments', 'm' and 'v' are host arrays of num device
+// pointers; 'moments' could be nullptr
+void MultiTensorSGD(const size_t num, const size_t *sizes,
+                    const float *const *grads, float *const *params,
+                    float *const *moments, const float *lr,
+                    const float *momentum, const float *dampening,
+                    const float *weight_decay, bool nesterov, cudaStream_t s);
+
+void MultiTensorAdam(const size_t num, const size_t *sizes,
+                     const float *const *grads, float *const *params,
+                     float *const *m, float *const *v, const float *lr,
+                     const float *beta_1, const float *beta_2,
+                     const float *epsilon, const float *weight_decay,
+                     const float *step, cudaStream_t s);
+
 void float2half(const size_t n, const float *in, __half *out, cudaStream_t s);
 
 void half2float(const size_t n, const __half *in, float *out, cudaStream_t s);
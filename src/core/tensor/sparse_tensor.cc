@@ -15,9 +15,63 @@
  * See the License for the specific language governing permissions and
  * limitations under the License.
  */
-#ifndef DISABLE_WARNINGS
 
 #include "singa/core/tensor.h"
-namespace singa {}
+namespace singa {
 
-#endif
+// Append the rows of 'values' at 'pos' into the repeated 'field'.
+template <typename DType, typename Field>
+static void AddRows(const Tensor &values, const vector<size_t> &pos,
+                    size_t dim, Field *field) {
+  const DType *data_ptr = values.data<DType>();
+  field->Reserve((int)(pos.size() * dim));
+  for (size_t p : pos)
+    for (size_t j = 0; j < dim; ++j) field->Add(data_ptr[p * dim + j]);
+}
+
+void RowSparseToProto(const Tensor &indices, const Tensor &values,
+                      const Shape &shape, singa::TensorProto *proto) {
+  CHECK_GT(shape.size(), 0u);
+  size_t nrow = shape[0], dim = Product(shape) / nrow;
+  CHECK_EQ(values.Size(), indices.Size() * dim);
+  Tensor idx = indices.data_type() == kInt ? indices : indices.AsType(kInt);
+  idx = idx.Clone(defaultDevice);
+  Tensor val = Contiguous(values).Clone(defaultDevice);
+
+  proto->Clear();
+  for (auto s : shape) proto->add_shape(s);
+  proto->set_data_type(values.data_type());
+  // the restored dense tensor is contiguous
+  int stride = 1;
+  vector<int> strides(shape.size());
+  for (size_t i = shape.size(); i > 0; --i) {
+    strides[i - 1] = stride;
+    stride *= (int)shape[i - 1];
+  }
+  for (auto s : strides) proto->add_stride(s);
+
+  // skip the rows of negative indices, e.g., from CoalesceRows
+  vector<size_t> pos;
+  const int *idx_ptr = idx.data<int>();
+  for (size_t i = 0; i < idx.Size(); ++i) {
+    if (idx_ptr[i] < 0) continue;
+    CHECK_LT((size_t)idx_ptr[i], nrow) << "Row index out of range";
+    proto->add_row_index(idx_ptr[i]);
+    pos.push_back(i);
+  }
+  switch (values.data_type()) {
+    case kFloat32:
+      AddRows<float>(val, pos, dim, proto->mutable_float_data());
+      break;
+    case kDouble:
+      AddRows<double>(val, pos, dim, proto->mutable_double_data());
+      break;
+    case kInt:
+      AddRows<int>(val, pos, dim, proto->mutable_int_data());
+      break;
+    default:
+      LOG(FATAL) << "Unsupported Type" << DataType_Name(values.data_type());
+  }
+}
+
+}  // namespace singa
@@ -16,7 +16,9 @@
  * limitations under the License.
  */
 #include "singa/core/tensor.h"
+
 #include <algorithm>
+#include <numeric>
 #include <utility>
 
 #include "./tensor_math.h"
@@ -66,6 +68,17 @@ Tensor::Tensor(const Shape &shape, std::shared_ptr<Device> device,
   generate_stride();
 }
 
+Tensor::Tensor(const Shape &shape, std::shared_ptr<Device> device,
+               DataType dtype, void *ptr, std::shared_ptr<void> owner)
+    : data_type_(dtype), device_(device), shape_(shape) {
+  CHECK_EQ(device_->lang(), kCpp) << "Only host memory could be shared";
+  size_t size = Product(shape_) * SizeOf(data_type_);
+  if (size) {
+    block_ = device_->NewBlock(ptr, size, owner);
+  }
+  generate_stride();
+}
+
 Tensor::Tensor(const Tensor &in)
     : data_type_(in.data_type_),
       device_(in.device_),
@@ -304,6 +317,28 @@ void Tensor::RepeatData(const vector<size_t> &repeats, int axis,
   }
 }
 
+// Copy the serialized 'field' into 'data' which has 'size' elements. The
+// field has only the rows in proto.row_index() if the tensor is row sparse,
+// which could have no rows.
+template <typename DType, typename Field>
+static void CopyFromProtoField(const singa::TensorProto &proto,
+                               const Field &field, size_t size, DType *data) {
+  if (proto.row_index_size() == 0 && (size_t)field.size() == size) {
+    for (size_t i = 0; i < size; ++i)
+      data[i] = static_cast<DType>(field.Get((int)i));
+    return;
+  }
+  size_t nrow = proto.shape(0), dim = size / nrow;
+  CHECK_EQ((size_t)field.size(), proto.row_index_size() * dim);
+  std::fill(data, data + size, static_cast<DType>(0));
+  for (int r = 0; r < proto.row_index_size(); ++r) {
+    size_t row = proto.row_index(r);
+    CHECK_LT(row, nrow) << "Row index out of range: " << row;
+    for (size_t j = 0; j < dim; ++j)
+      data[row * dim + j] += static_cast<DType>(field.Get((int)(r * dim + j)));
+  }
+}
+
 void Tensor::FromProto(const singa::TensorProto &proto) {
   if (block_ != nullptr && block_->DecRefCount() == 0)
     device_->FreeBlock(block_);
@@ -317,22 +352,21 @@ void Tensor::FromProto(const singa::TensorProto &proto) {
   switch (data_type_) {
     case kFloat32: {
       std::unique_ptr<float[]> data_ptr(new float[Product(shape_)]);
-      for (size_t i = 0; i < Product(shape_); ++i)
-        data_ptr[i] = static_cast<float>(proto.float_data((int)i));
+      CopyFromProtoField(proto, proto.float_data(), Product(shape_),
+                         data_ptr.get());
       CopyDataFromHostPtr<float>(data_ptr.get(), Product(shape_));
       break;
     }
     case kDouble: {
       std::unique_ptr<double[]> data(new double[Product(shape_)]);
-      for (size_t i = 0; i < Product(shape_); ++i)
-        data[i] = proto.double_data((int)i);
+      CopyFromProtoField(proto, proto.double_data(), Product(shape_),
+                         data.get());
       CopyDataFromHostPtr<double>(data.get(), Product(shape_));
       break;
     }
     case kInt: {
       std::unique_ptr<int[]> data(new int[Product(shape_)]);
-      for (size_t i = 0; i < Product(shape_); ++i)
-        data[i] = proto.int_data((int)i);
+      CopyFromProtoField(proto, proto.int_data(), Product(shape_), data.get());
       CopyDataFromHostPtr<int>(data.get(), Product(shape_));
       break;
     }
@@ -866,7 +900,7 @@ template void Tensor::SetValue<int>(const int x);
 
 template <typename SType>
 void Tensor::get_value(SType *value, const size_t num) const {
-  CHECK(device_ == defaultDevice);
+  CHECK(device_->lang() == kCpp);
   Tensor t(shape_, device_, data_type_);
   // transform function arrange data in memory considering stride
   singa::Transform(*this, &t);
@@ -1268,6 +1302,26 @@ Tensor RowMax(const Tensor &in) {
   return ret;
 }
 
+Tensor RowDot(const Tensor &a, const Tensor &b) {
+  CHECK_EQ(a.nDim(), 2u);
+  CHECK(a.shape() == b.shape()) << "The shapes of the rows mismatch";
+  CHECK_EQ(a.device()->lang(), b.device()->lang());
+  CHECK_EQ(a.data_type(), b.data_type());
+  Tensor ret({a.shape(0)}, a.device(), a.data_type());
+  if (ret.Size() == 0) return ret;
+  Tensor lhs = Contiguous(a), rhs = Contiguous(b);
+  TYPE_LANG_SWITCH(a.data_type(), DType, a.device()->lang(), Lang, {
+    ret.device()->Exec(
+        [lhs, rhs, ret](Context *ctx) mutable {
+          RowDot<DType, Lang>(lhs, rhs, &ret, ctx);
+        },
+        {lhs.block(), rhs.block()}, {ret.block()}, "RowDot");
+  });
+  return ret;
+}
+
+Tensor RowNorm(const Tensor &in) { return Sqrt(RowDot(in, in)); }
+
 void AddColumn(const Tensor &v, Tensor *M) { AddColumn(1, 1, v, M); }
 /// Add column 'v' onto each column of matrix M;
 template <typename SType>
@@ -1460,6 +1514,282 @@ Tensor SliceColumns(const Tensor &in, const size_t start, const size_t end) {
   return CopyColumns(in, start, end);
 }
 
+Tensor GatherRows(const Tensor &in, const Tensor &indices) {
+  CHECK_EQ(in.nDim(), 2u);
+  CHECK_EQ(in.device()->lang(), indices.device()->lang());
+  Tensor idx = indices.data_type() == kInt ? indices : indices.AsType(kInt);
+  Tensor src = Contiguous(in);
+  Shape out_shape = idx.shape();
+  out_shape.push_back(in.shape(1));
+  Tensor out(out_shape, in.device(), in.data_type());
+  size_t nrow = in.shape(0), dim = in.shape(1), num = idx.Size();
+  TYPE_LANG_SWITCH(in.data_type(), DType, in.device()->lang(), Lang, {
+    out.device()->Exec(
+        [nrow, dim, num, src, idx, out](Context *ctx) mutable {
+          GatherRows<DType, Lang>(nrow, dim, num, src, idx, &out, ctx);
+        },
+        {src.block(), idx.block()}, {out.block()}, "GatherRows");
+  });
+  return out;
+}
+
+void ScatterAddRows(const Tensor &in, const Tensor &indices, Tensor *out) {
+  CHECK_EQ(out->nDim(), 2u);
+  CHECK(out->is_contiguous());
+  CHECK_EQ(in.Size(), indices.Size() * out->shape(1));
+  CHECK_EQ(in.device()->lang(), indices.device()->lang());
+  Tensor idx = indices.data_type() == kInt ? indices : indices.AsType(kInt);
+  Tensor src = Contiguous(in);
+  size_t nrow = out->shape(0), dim = out->shape(1), num = idx.Size();
+  TYPE_LANG_SWITCH(out->data_type(), DType, out->device()->lang(), Lang, {
+    Tensor &outRef = *out;
+    out->device()->Exec(
+        [nrow, dim, num, src, idx, outRef](Context *ctx) mutable {
+          ScatterAddRows<DType, Lang>(nrow, dim, num, src, idx, &outRef, ctx);
+        },
+        {src.block(), idx.block(), out->block()}, {out->block()},
+        "ScatterAddRows");
+  });
+}
+
+void ScatterRows(const Tensor &in, const Tensor &indices, Tensor *out) {
+  CHECK_EQ(out->nDim(), 2u);
+  CHECK(out->is_contiguous());
+  CHECK_EQ(in.Size(), indices.Size() * out->shape(1));
+  CHECK_EQ(in.device()->lang(), indices.device()->lang());
+  Tensor idx = indices.data_type() == kInt ? indices : indices.AsType(kInt);
+  Tensor src = Contiguous(in);
+  size_t nrow = out->shape(0), dim = out->shape(1), num = idx.Size();
+  TYPE_LANG_SWITCH(out->data_type(), DType, out->device()->lang(), Lang, {
+    Tensor &outRef = *out;
+    out->device()->Exec(
+        [nrow, dim, num, src, idx, outRef](Context *ctx) mutable {
+          ScatterRows<DType, Lang>(nrow, dim, num, src, idx, &outRef, ctx);
+        },
+        {src.block(), idx.block(), out->block()}, {out->block()},
+        "ScatterRows");
+  });
+}
+
+Tensor Gather(const Tensor &in, const Tensor &indices, int axis) {
+  CHECK_EQ(in.device()->lang(), indices.device()->lang());
+  if (axis < 0) axis += static_cast<int>(in.nDim());
+  CHECK(axis >= 0 && axis < static_cast<int>(in.nDim()))
+      << "Invalid axis " << axis;
+  Tensor idx = indices.data_type() == kInt ? indices : indices.AsType(kInt);
+  Tensor src = Contiguous(in);
+  const Shape &shape = in.shape();
+  Shape out_shape(shape.begin(), shape.begin() + axis);
+  out_shape.insert(out_shape.end(), idx.shape().begin(), idx.shape().end());
+  out_shape.insert(out_shape.end(), shape.begin() + axis + 1, shape.end());
+  Tensor out(out_shape, in.device(), in.data_type());
+  size_t outer = 1, inner = 1, dim = shape[axis], num = idx.Size();
+  for (int k = 0; k < axis; k++) outer *= shape[k];
+  for (size_t k = axis + 1; k < shape.size(); k++) inner *= shape[k];
+  TYPE_LANG_SWITCH(in.data_type(), DType, in.device()->lang(), Lang, {
+    out.device()->Exec(
+        [outer, dim, inner, num, src, idx, out](Context *ctx) mutable {
+          Gather<DType, Lang>(outer, dim, inner, num, src, idx, &out, ctx);
+        },
+        {src.block(), idx.block()}, {out.block()}, "Gather");
+  });
+  return out;
+}
+
+void ScatterAdd(const Tensor &in, const Tensor &indices, int axis,
+                Tensor *out) {
+  CHECK(out->is_contiguous());
+  CHECK_EQ(in.device()->lang(), indices.device()->lang());
+  if (axis < 0) axis += static_cast<int>(out->nDim());
+  CHECK(axis >= 0 && axis < static_cast<int>(out->nDim()))
+      << "Invalid axis " << axis;
+  Tensor idx = indices.data_type() == kInt ? indices : indices.AsType(kInt);
+  Tensor src = Contiguous(in);
+  const Shape &shape = out->shape();
+  size_t outer = 1, inner = 1, dim = shape[axis], num = idx.Size();
+  for (int k = 0; k < axis; k++) outer *= shape[k];
+  for (size_t k = axis + 1; k < shape.size(); k++) inner *= shape[k];
+  CHECK_EQ(in.Size(), outer * num * inner);
+  TYPE_LANG_SWITCH(out->data_type(), DType, out->device()->lang(), Lang, {
+    Tensor &outRef = *out;
+    out->device()->Exec(
+        [outer, dim, inner, num, src, idx, outRef](Context *ctx) mutable {
+          ScatterAdd<DType, Lang>(outer, dim, inner, num, src, idx, &outRef,
+                                  ctx);
+        },
+        {src.block(), idx.block(), out->block()}, {out->block()}, "ScatterAdd");
+  });
+}
+
+/// Normalize the python slicing start:end:step along a dim of size n, i.e.,
+/// set 'start' to the index of the first sliced element and return the
+/// number of sliced elements.
+static size_t NormalizeSlice(const int n, int *start, const int end,
+                             const int step) {
+  CHECK_NE(step, 0) << "The step of slicing cannot be 0";
+  // the bounds of the indices, -1 means before the first element
+  const long long lo = step > 0 ? 0 : -1, hi = step > 0 ? n : n - 1;
+  auto clamp = [n, lo, hi](long long x) {
+    if (x < 0) x += n;
+    return x < lo ? lo : (x > hi ? hi : x);
+  };
+  const long long first = clamp(*start), last = clamp(end);
+  *start = static_cast<int>(first);
+  if (step > 0) return last > first ? (last - first + step - 1) / step : 0;
+  return first > last ? (first - last - step - 1) / (-step) : 0;
+}
+
+Tensor StridedSlice(const Tensor &in, const vector<int> &starts,
+                    const vector<int> &ends, const vector<int> &steps) {
+  CHECK_EQ(starts.size(), in.nDim());
+  CHECK_EQ(ends.size(), in.nDim());
+  CHECK_EQ(steps.size(), in.nDim());
+  vector<int> begins(starts);
+  Shape out_shape(in.nDim());
+  for (size_t k = 0; k < in.nDim(); k++)
+    out_shape[k] = NormalizeSlice(in.shape(k), &begins[k], ends[k], steps[k]);
+  Tensor out(out_shape, in.device(), in.data_type());
+  if (out.Size() == 0) return out;
+  TYPE_LANG_SWITCH(in.data_type(), DType, in.device()->lang(), Lang, {
+    out.device()->Exec(
+        [in, begins, steps, out](Context *ctx) mutable {
+          StridedSlice<DType, Lang>(in, begins, steps, &out, ctx);
+        },
+        {in.block()}, {out.block()}, "StridedSlice");
+  });
+  return out;
+}
+
+Tensor StridedSliceBackward(const Tensor &dy, const Shape &shape,
+                            const vector<int> &starts, const vector<int> &ends,
+                            const vector<int> &steps) {
+  CHECK_EQ(starts.size(), shape.size());
+  CHECK_EQ(ends.size(), shape.size());
+  CHECK_EQ(steps.size(), shape.size());
+  CHECK_EQ(dy.nDim(), shape.size());
+  vector<int> begins(starts);
+  for (size_t k = 0; k < shape.size(); k++)
+    CHECK_EQ(NormalizeSlice(shape[k], &begins[k], ends[k], steps[k]),
+             dy.shape(k));
+  Tensor dx(shape, dy.device(), dy.data_type());
+  if (dy.Size() == 0) {
+    dx.SetValue(0.f);
+    return dx;
+  }
+  TYPE_LANG_SWITCH(dy.data_type(), DType, dy.device()->lang(), Lang, {
+    dx.device()->Exec(
+        [dy, begins, steps, dx](Context *ctx) mutable {
+          StridedSliceBackward<DType, Lang>(dy, begins, steps, &dx, ctx);
+        },
+        {dy.block()}, {dx.block()}, "StridedSliceBackward");
+  });
+  return dx;
+}
+
+Tensor IndexMap(const Tensor &in, const Shape &shape, const Tensor &maps,
+                const float value) {
+  CHECK_GT(shape.size(), 0u);
+  CHECK_EQ(in.nDim(), shape.size());
+  CHECK_EQ(maps.Size(), std::accumulate(shape.begin(), shape.end(), size_t(0)));
+  CHECK_EQ(in.device()->lang(), maps.device()->lang());
+  Tensor idx = maps.data_type() == kInt ? maps : maps.AsType(kInt);
+  Tensor out(shape, in.device(), in.data_type());
+  if (out.Size() == 0) return out;
+  TYPE_LANG_SWITCH(in.data_type(), DType, in.device()->lang(), Lang, {
+    out.device()->Exec(
+        [in, idx, value, out](Context *ctx) mutable {
+          IndexMap<DType, Lang>(in, idx, static_cast<DType>(value), &out, ctx);
+        },
+        {in.block(), idx.block()}, {out.block()}, "IndexMap");
+  });
+  return out;
+}
+
+Tensor IndexMapBackward(const Tensor &dy, const Shape &shape,
+                        const Tensor &maps) {
+  CHECK_GT(shape.size(), 0u);
+  CHECK_EQ(dy.nDim(), shape.size());
+  CHECK_EQ(maps.Size(),
+           std::accumulate(dy.shape().begin(), dy.shape().end(), size_t(0)));
+  CHECK_EQ(dy.device()->lang(), maps.device()->lang());
+  Tensor idx = maps.data_type() == kInt ? maps : maps.AsType(kInt);
+  Tensor src = Contiguous(dy);
+  Tensor dx(shape, dy.device(), dy.data_type());
+  if (dx.Size() == 0) return dx;
+  if (dy.Size() == 0) {
+    dx.SetValue(0.f);
+    return dx;
+  }
+  TYPE_LANG_SWITCH(dy.data_type(), DType, dy.device()->lang(), Lang, {
+    dx.device()->Exec(
+        [src, idx, dx](Context *ctx) mutable {
+          IndexMapBackward<DType, Lang>(src, idx, &dx, ctx);
+        },
+        {src.block(), idx.block()}, {dx.block()}, "IndexMapBackward");
+  });
+  return dx;
+}
+
+Tensor PackedDropout(const Tensor &in, const float ratio, Tensor *mask) {
+  CHECK(ratio >= 0.f && ratio < 1.f) << "Invalid dropout ratio " << ratio;
+  CHECK_EQ(mask->data_type(), kInt);
+  CHECK_EQ(mask->Size(), (in.Size() + 31) / 32);
+  CHECK_EQ(in.device()->lang(), mask->device()->lang());
+  Tensor src = Contiguous(in);
+  Tensor out(in.shape(), in.device(), in.data_type());
+  if (out.Size() == 0) return out;
+  TYPE_LANG_SWITCH(in.data_type(), DType, in.device()->lang(), Lang, {
+    Tensor &maskRef = *mask;
+    out.device()->Exec(
+        [ratio, src, maskRef, out](Context *ctx) mutable {
+          PackedDropout<DType, Lang>(ratio, src, &maskRef, &out, ctx);
+        },
+        {src.block()}, {mask->block(), out.block()}, "PackedDropout", true);
+  });
+  return out;
+}
+
+Tensor PackedDropoutBackward(const Tensor &dy, const float ratio,
+                             const Tensor &mask) {
+  CHECK(ratio >= 0.f && ratio < 1.f) << "Invalid dropout ratio " << ratio;
+  CHECK_EQ(mask.data_type(), kInt);
+  CHECK_EQ(mask.Size(), (dy.Size() + 31) / 32);
+  CHECK_EQ(dy.device()->lang(), mask.device()->lang());
+  Tensor src = Contiguous(dy);
+  Tensor dx(dy.shape(), dy.device(), dy.data_type());
+  if (dx.Size() == 0) return dx;
+  TYPE_LANG_SWITCH(dy.data_type(), DType, dy.device()->lang(), Lang, {
+    dx.device()->Exec(
+        [ratio, src, mask, dx](Context *ctx) mutable {
+          PackedDropoutBackward<DType, Lang>(ratio, src, mask, &dx, ctx);
+        },
+        {src.block(), mask.block()}, {dx.block()}, "PackedDropoutBackward");
+  });
+  return dx;
+}
+
+void CoalesceRows(const Tensor &indices, const Tensor &values,
+                  Tensor *out_indices, Tensor *out_values) {
+  CHECK_EQ(values.Size() % indices.Size(), 0u);
+  CHECK_EQ(out_indices->data_type(), kInt);
+  CHECK_EQ(out_indices->Size(), indices.Size());
+  CHECK_EQ(out_values->Size(), values.Size());
+  CHECK(out_indices->is_contiguous() && out_values->is_contiguous());
+  CHECK_EQ(values.device()->lang(), indices.device()->lang());
+  Tensor idx = indices.data_type() == kInt ? indices : indices.AsType(kInt);
+  Tensor src = Contiguous(values);
+  size_t num = idx.Size(), dim = values.Size() / num;
+  TYPE_LANG_SWITCH(values.data_type(), DType, values.device()->lang(), Lang, {
+    Tensor &idxRef = *out_indices, &valRef = *out_values;
+    values.device()->Exec(
+        [dim, num, src, idx, idxRef, valRef](Context *ctx) mutable {
+          CoalesceRows<DType, Lang>(dim, num, idx, src, &idxRef, &valRef, ctx);
+        },
+        {src.block(), idx.block()}, {out_indices->block(), out_values->block()},
+        "CoalesceRows");
+  });
+}
+
 /// Divide row 'v' by each row of matrix M; write results into 'out'
 void DivRow(const Tensor &v, Tensor *M) {
   Tensor inv;
@@ -1514,6 +1844,15 @@ void SumColumns(const Tensor &M, Tensor *v) {
     // CHECK_EQ(v->nDim(), 1u); (chonho) shape of v is 2-element tuple
     size_t nb_row = M.shape().at(0), nb_col = M.shape().at(1);
     CHECK_EQ(nb_row, v->Size());
+    if (M.device()->lang() == kCpp && M.data_type() == kFloat32) {
+      Tensor &vRef = *v;
+      M.device()->Exec(
+          [M, vRef](Context *ctx) mutable {
+            SumColumns<float, lang::Cpp>(M, &vRef, ctx);
+          },
+          {M.block()}, {v->block()}, "SumColumns");
+      return;
+    }
 
     Tensor one(Shape{nb_col}, M.device(), M.data_type());
     one.SetValue(1.0f);  // TODO(wangwei) cast type
@@ -1529,6 +1868,15 @@ void SumRows(const Tensor &M, Tensor *v) {
     // CHECK_EQ(v->nDim(), 1u); (chonho) shape of v is 2-element tuple
     size_t nb_row = M.shape(0), nb_col = M.shape(1);
     CHECK_EQ(nb_col, v->Size());
+    if (M.device()->lang() == kCpp && M.data_type() == kFloat32) {
+      Tensor &vRef = *v;
+      M.device()->Exec(
+          [M, vRef](Context *ctx) mutable {
+            SumRows<float, lang::Cpp>(M, &vRef, ctx);
+          },
+          {M.block()}, {v->block()}, "SumRows");
+      return;
+    }
 
     Tensor one(Shape{nb_row}, M.device(), M.data_type());
     one.SetValue(1.0f);  // TODO(wangwei) cast type
@@ -1613,6 +1961,77 @@ void Axpy(const Tensor &alpha, const Tensor &in, Tensor *out) {
     });
 }
 
+// Check the tensors of a multi-tensor op, whose i-th tensor has the same
+// size as params[i], and add their blocks into 'blocks'.
+static void AddMultiTensorBlocks(const vector<Tensor> &params,
+                                 const vector<Tensor> &tensors,
+                                 vector<Block *> *blocks) {
+  CHECK_EQ(tensors.size(), params.size());
+  for (size_t i = 0; i < tensors.size(); i++) {
+    CHECK_EQ(tensors[i].Size(), params[i].Size());
+    CHECK(tensors[i].is_contiguous());
+    CHECK_EQ(tensors[i].data_type(), params[i].data_type());
+    CHECK(tensors[i].device() == params[0].device());
+    blocks->push_back(tensors[i].block());
+  }
+}
+
+void MultiTensorSGD(const vector<Tensor> &grads, const vector<Tensor> &params,
+                    const vector<Tensor> &moments, const Tensor &lr,
+                    const Tensor &momentum, const Tensor &dampening,
+                    const Tensor &weight_decay, bool nesterov) {
+  if (params.empty()) return;
+  vector<Tensor> g;
+  for (const auto &t : grads) g.push_back(Contiguous(t));
+  vector<Block *> read_blocks, write_blocks;
+  AddMultiTensorBlocks(params, params, &write_blocks);
+  if (!moments.empty()) AddMultiTensorBlocks(params, moments, &write_blocks);
+  AddMultiTensorBlocks(params, g, &read_blocks);
+  read_blocks.insert(read_blocks.end(), write_blocks.begin(),
+                     write_blocks.end());
+  for (const Tensor *t : {&lr, &momentum, &dampening, &weight_decay})
+    read_blocks.push_back(t->block());
+  auto dev = params[0].device();
+  TYPE_LANG_SWITCH(params[0].data_type(), DType, dev->lang(), Lang, {
+    dev->Exec(
+        [g, params, moments, lr, momentum, dampening, weight_decay,
+         nesterov](Context *ctx) mutable {
+          MultiTensorSGD<DType, Lang>(g, params, moments, lr, momentum,
+                                      dampening, weight_decay, nesterov, ctx);
+        },
+        read_blocks, write_blocks, "MultiTensorSGD");
+  });
+}
+
+void MultiTensorAdam(const vector<Tensor> &grads, const vector<Tensor> &params,
+                     const vector<Tensor> &m, const vector<Tensor> &v,
+                     const Tensor &lr, const Tensor &beta_1,
+                     const Tensor &beta_2, const Tensor &epsilon,
+                     const Tensor &weight_decay, const Tensor &step) {
+  if (params.empty()) return;
+  vector<Tensor> g;
+  for (const auto &t : grads) g.push_back(Contiguous(t));
+  vector<Block *> read_blocks, write_blocks;
+  AddMultiTensorBlocks(params, params, &write_blocks);
+  AddMultiTensorBlocks(params, m, &write_blocks);
+  AddMultiTensorBlocks(params, v, &write_blocks);
+  AddMultiTensorBlocks(params, g, &read_blocks);
+  read_blocks.insert(read_blocks.end(), write_blocks.begin(),
+                     write_blocks.end());
+  for (const Tensor *t : {&lr, &beta_1, &beta_2, &epsilon, &weight_decay, &step})
+    read_blocks.push_back(t->block());
+  auto dev = params[0].device();
+  TYPE_LANG_SWITCH(params[0].data_type(), DType, dev->lang(), Lang, {
+    dev->Exec(
+        [g, params, m, v, lr, beta_1, beta_2, epsilon, weight_decay,
+         step](Context *ctx) mutable {
+          MultiTensorAdam<DType, Lang>(g, params, m, v, lr, beta_1, beta_2,
+                                       epsilon, weight_decay, step, ctx);
+        },
+        read_blocks, write_blocks, "MultiTensorAdam");
+  });
+}
+
 Tensor Mult(const Tensor &A, const Tensor &B) {
   auto A_ = Broadcast(A, B.shape(), 2);
   auto B_ = Broadcast(B, A.shape(), 2);
@@ -1720,6 +2139,52 @@ Tensor SoftmaxCrossEntropyBwd(const Tensor &p, const Tensor &t) {
   return g;
 }
 
+// The loss and the gradient of the cross entropy of the label indices 't',
+// from the logits or the probabilities 'in'.
+static Tensor LabelCrossEntropy(bool logits, const Tensor &in, const Tensor &t,
+                                Tensor *grad, const float smoothing,
+                                const int ignore_index) {
+  CHECK_EQ(in.nDim(), 2u);
+  CHECK_EQ(t.data_type(), kInt);
+  CHECK_EQ(t.Size(), in.shape(0));
+  CHECK(smoothing >= 0.f && smoothing <= 1.f)
+      << "Invalid label smoothing " << smoothing;
+  const size_t batchsize = in.shape(0), dim = in.shape(1);
+  Tensor src = Contiguous(in);
+  Tensor loss({batchsize}, in.device(), in.data_type());
+  if (in.Size() == 0) return loss;
+  const bool has_grad = grad != nullptr;
+  vector<Block *> write_blocks{loss.block()};
+  Tensor gradRef;
+  if (has_grad) {
+    CHECK(grad->shape() == in.shape()) << "The gradient shape mismatches";
+    gradRef = *grad;
+    write_blocks.push_back(grad->block());
+  }
+  TYPE_LANG_SWITCH(in.data_type(), DType, in.device()->lang(), Lang, {
+    loss.device()->Exec(
+        [logits, smoothing, ignore_index, batchsize, dim, src, t, loss, gradRef,
+         has_grad](Context *ctx) mutable {
+          CrossEntropyFwdBwd<DType, Lang>(logits, smoothing, ignore_index,
+                                          batchsize, dim, src, t, &loss,
+                                          has_grad ? &gradRef : nullptr, ctx);
+        },
+        {src.block(), t.block()}, write_blocks, "CrossEntropyFwdBwd");
+  });
+  return loss;
+}
+
+Tensor SoftmaxCrossEntropyFwdBwd(const Tensor &x, const Tensor &t, Tensor *grad,
+                                 const float smoothing,
+                                 const int ignore_index) {
+  return LabelCrossEntropy(true, x, t, grad, smoothing, ignore_index);
+}
+
+Tensor CrossEntropyFwdBwd(const Tensor &p, const Tensor &t, Tensor *grad,
+                          const float smoothing, const int ignore_index) {
+  return LabelCrossEntropy(false, p, t, grad, smoothing, ignore_index);
+}
+
 void ComputeCrossEntropy(const Tensor &p, const Tensor &t, Tensor *loss) {
   CHECK_LE(p.nDim(), 2u);
   CHECK_LE(t.nDim(), 2u);
@@ -1762,6 +2227,7 @@ Tensor &Tensor::Contiguous() {
     Tensor t(shape_, device_, data_type_);
     singa::Transform(*this, &t);
     std::swap(t.block_, block_);
+    generate_stride();
   }
   return *this;
 }
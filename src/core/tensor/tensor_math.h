@@ -479,10 +479,159 @@ void SoftmaxCrossEntropyBwd(bool int_target, const size_t batchsize,
   LOG_FATAL("ComputeCrossEntropyBwd", DType, Lang);
 }
 
+/// The loss and the gradient (if grad is not nullptr) of the cross entropy of
+/// int labels, from the logits if 'logits' is true or the probabilities
+template <typename DType, typename Lang>
+void CrossEntropyFwdBwd(bool logits, const float smoothing,
+                        const int ignore_index, const size_t batchsize,
+                        const size_t dim, const Tensor &in, const Tensor &t,
+                        Tensor *loss, Tensor *grad, Context *ctx) {
+  LOG_FATAL("CrossEntropyFwdBwd", DType, Lang);
+}
+
 template <typename DType, typename Lang>
 void RowMax(const Tensor &in, Tensor *out, Context *ctx) {
   LOG_FATAL("RowMax", DType, Lang);
 }
 
+/// out[r] = the dot product of the r-th rows of the 2-d tensors 'a' and 'b'
+template <typename DType, typename Lang>
+void RowDot(const Tensor &a, const Tensor &b, Tensor *out, Context *ctx) {
+  LOG_FATAL("RowDot", DType, Lang);
+}
+
+/// out[i] = sum of the i-th row of the 2d (non-transposed) matrix in
+template <typename DType, typename Lang>
+void SumColumns(const Tensor &in, Tensor *out, Context *ctx) {
+  LOG_FATAL("SumColumns", DType, Lang);
+}
+
+/// out[j] = sum of the j-th column of the 2d (non-transposed) matrix in
+template <typename DType, typename Lang>
+void SumRows(const Tensor &in, Tensor *out, Context *ctx) {
+  LOG_FATAL("SumRows", DType, Lang);
+}
+
+/// out[i] = in[indices[i]] for num rows of length dim; 'in' has nrow rows
+template <typename DType, typename Lang>
+void GatherRows(const size_t nrow, const size_t dim, const size_t num,
+                const Tensor &in, const Tensor &indices, Tensor *out,
+                Context *ctx) {
+  LOG_FATAL("GatherRows", DType, Lang);
+}
+
+/// out[indices[i]] += in[i] for num rows of length dim; 'out' has nrow rows
+template <typename DType, typename Lang>
+void ScatterAddRows(const size_t nrow, const size_t dim, const size_t num,
+                    const Tensor &in, const Tensor &indices, Tensor *out,
+                    Context *ctx) {
+  LOG_FATAL("ScatterAddRows", DType, Lang);
+}
+
+/// out[indices[i]] = in[i] for num rows of length dim; 'out' has nrow rows
+template <typename DType, typename Lang>
+void ScatterRows(const size_t nrow, const size_t dim, const size_t num,
+                 const Tensor &in, const Tensor &indices, Tensor *out,
+                 Context *ctx) {
+  LOG_FATAL("ScatterRows", DType, Lang);
+}
+
+/// out[o][j] = in[o][indices[j]] for outer x num slices of length inner;
+/// 'in' has dim slices for each o
+template <typename DType, typename Lang>
+void Gather(const size_t outer, const size_t dim, const size_t inner,
+            const size_t num, const Tensor &in, const Tensor &indices,
+            Tensor *out, Context *ctx) {
+  LOG_FATAL("Gather", DType, Lang);
+}
+
+/// out[o][indices[j]] += in[o][j] for outer x num slices of length inner;
+/// 'out' has dim slices for each o
+template <typename DType, typename Lang>
+void ScatterAdd(const size_t outer, const size_t dim, const size_t inner,
+                const size_t num, const Tensor &in, const Tensor &indices,
+                Tensor *out, Context *ctx) {
+  LOG_FATAL("ScatterAdd", DType, Lang);
+}
+
+/// out[i_0, i_1, ...] = in[starts[0] + i_0 * steps[0], starts[1] + i_1 *
+/// steps[1], ...] for each index of out
+template <typename DType, typename Lang>
+void StridedSlice(const Tensor &in, const vector<int> &starts,
+                  const vector<int> &steps, Tensor *out, Context *ctx) {
+  LOG_FATAL("StridedSlice", DType, Lang);
+}
+
+/// out[starts[0] + i_0 * steps[0], starts[1] + i_1 * steps[1], ...] =
+/// in[i_0, i_1, ...] for each index of in, and the other elements of out are
+/// zeros
+template <typename DType, typename Lang>
+void StridedSliceBackward(const Tensor &in, const vector<int> &starts,
+                          const vector<int> &steps, Tensor *out, Context *ctx) {
+  LOG_FATAL("StridedSliceBackward", DType, Lang);
+}
+
+/// out[j_0, j_1, ...] = in[maps_0[j_0], maps_1[j_1], ...], or value if any
+/// index is negative; maps_k is the k-th segment of maps (of out->shape(k))
+template <typename DType, typename Lang>
+void IndexMap(const Tensor &in, const Tensor &maps, const DType value,
+              Tensor *out, Context *ctx) {
+  LOG_FATAL("IndexMap", DType, Lang);
+}
+
+/// out[i_0, i_1, ...] = sum of in[j_0, j_1, ...] with maps_k[j_k] = i_k for
+/// every k; maps_k is the k-th segment of maps (of in.shape(k))
+template <typename DType, typename Lang>
+void IndexMapBackward(const Tensor &in, const Tensor &maps, Tensor *out,
+                      Context *ctx) {
+  LOG_FATAL("IndexMapBackward", DType, Lang);
+}
+
+/// out = in / (1 - ratio) for the elements kept with probability 1 - ratio and
+/// 0 for the others; the i-th bit of mask (of 32 bits per element) is set if
+/// the i-th element is kept
+template <typename DType, typename Lang>
+void PackedDropout(const float ratio, const Tensor &in, Tensor *mask,
+                   Tensor *out, Context *ctx) {
+  LOG_FATAL("PackedDropout", DType, Lang);
+}
+
+/// out = in / (1 - ratio) for the elements whose bits are set in mask, and 0
+/// for the others
+template <typename DType, typename Lang>
+void PackedDropoutBackward(const float ratio, const Tensor &in,
+                           const Tensor &mask, Tensor *out, Context *ctx) {
+  LOG_FATAL("PackedDropoutBackward", DType, Lang);
+}
+
+/// Sum the rows of duplicated indices into the row of the first occurrence
+/// and set the indices of the other occurrences to -1
+template <typename DType, typename Lang>
+void CoalesceRows(const size_t dim, const size_t num, const Tensor &indices,
+                  const Tensor &in, Tensor *out_indices, Tensor *out,
+                  Context *ctx) {
+  LOG_FATAL("CoalesceRows", DType, Lang);
+}
+
+/// One SGD step over all the params; see singa::MultiTensorSGD
+template <typename DType, typename Lang>
+void MultiTensorSGD(const vector<Tensor> &grads, const vector<Tensor> &params,
+                    const vector<Tensor> &moments, const Tensor &lr,
+                    const Tensor &momentum, const Tensor &dampening,
+                    const Tensor &weight_decay, bool nesterov, Context *ctx) {
+  LOG_FATAL("MultiTensorSGD", DType, Lang);
+}
+
+/// One Adam step over all the params; see singa::MultiTensorAdam
+template <typename DType, typename Lang>
+void MultiTensorAdam(const vector<Tensor> &grads, const vector<Tensor> &params,
+                     const vector<Tensor> &m, const vector<Tensor> &v,
+                     const Tensor &lr, const Tensor &beta_1,
+                     const Tensor &beta_2, const Tensor &epsilon,
+                     const Tensor &weight_decay, const Tensor &step,
+                     Context *ctx) {
+  LOG_FATAL("MultiTensorAdam", DType, Lang);
+}
+
 }  // namespace singa
 #endif  // SINGA_CORE_MATH_H_
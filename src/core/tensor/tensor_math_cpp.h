@@ -27,6 +27,8 @@
 #include <iostream>
 #include <iterator>
 #include <sstream>
+#include <type_traits>
+#include <unordered_map>
 
 #include "singa/core/common.h"
 #include "singa/core/tensor.h"
@@ -39,6 +41,16 @@ namespace singa {
 
 // ===================== Helper Functions =============================
 
+// min number of elements processed by a kernel for it to run in parallel,
+// below which forking the threads costs more than it saves
+const size_t kParallelSize = 1 << 15;
+
+// elements are reduced in blocks of this size, whose partial results are then
+// combined in order, so the result does not depend on the number of threads
+const size_t kReduceBlock = 1 << 12;
+
+inline int NumCpuThreads() { return Platform::GetNumCpuThreads(); }
+
 // generate a traversal_info vector based on the tensor's shape for the
 // traverse_next function to work
 vector<int> generate_traversal_info(const Tensor &x) {
@@ -123,109 +135,194 @@ void traverse_next(const Tensor &x, vector<int> &shape_multipliers,
       x.stride()[x.stride().size() - traversal_info[x.shape().size() + 1] - 1];
 };
 
-inline int next_offset(int offset, const vector<size_t> &shape,
-                       const vector<int> &stride, vector<int> *index) {
-  for (int k = shape.size() - 1; k >= 0; k--) {
-    if (index->at(k) + 1 < int(shape.at(k))) {
-      offset += stride.at(k);
-      index->at(k) += 1;
-      break;
+// merge the adjacent dims which are laid out contiguously w.r.t each other in
+// every stride vector, and drop the dims of size 1, e.g., a (2,3,4) tensor
+// broadcast from (1,3,4) has shape (2,12) and strides (0,1) after collapsing;
+// the strided kernels below then loop over a few long dims instead of
+// updating a full index per element
+inline Shape collapse_dims(const Shape &shape, vector<vector<int>> *strides) {
+  Shape ret;
+  vector<vector<int>> ret_strides(strides->size());
+  for (size_t k = 0; k < shape.size(); k++) {
+    if (shape[k] == 1) continue;
+    bool merge = !ret.empty();
+    for (size_t t = 0; merge && t < strides->size(); t++)
+      merge = ret_strides[t].back() ==
+              strides->at(t)[k] * static_cast<int>(shape[k]);
+    if (merge) {
+      ret.back() *= shape[k];
+      for (size_t t = 0; t < strides->size(); t++)
+        ret_strides[t].back() = strides->at(t)[k];
+    } else {
+      ret.push_back(shape[k]);
+      for (size_t t = 0; t < strides->size(); t++)
+        ret_strides[t].push_back(strides->at(t)[k]);
     }
-    index->at(k) = 0;
-    offset -= stride.at(k) * (shape.at(k) - 1);
+  }
+  if (ret.empty()) {
+    ret.push_back(1);
+    for (auto &st : ret_strides) st.push_back(1);
+  }
+  *strides = ret_strides;
+  return ret;
+}
+
+// offset of the first element of the r-th row (i.e., all dims except the
+// last one) of a collapsed tensor; the strides could be negative, e.g., for
+// the slices with negative steps
+inline ptrdiff_t row_offset(size_t r, const Shape &shape,
+                            const vector<int> &st) {
+  ptrdiff_t offset = 0;
+  for (int k = static_cast<int>(shape.size()) - 2; k >= 0; k--) {
+    offset += static_cast<ptrdiff_t>(r % shape[k]) * st[k];
+    r /= shape[k];
   }
   return offset;
 }
 
+// tile size of the blocked 2d transpose; a tile of floats from both the
+// source and the destination fits into L1 cache
+const size_t kTransposeTile = 32;
+
+// the identity op of Transform, for which contiguous rows are memcpy'ed
 template <typename DType>
-void traverse_unary(const Tensor &in, Tensor *out,
-                    std::function<DType(DType)> func) {
-  DType *outPtr = static_cast<DType *>(out->block()->mutable_data());
-  const DType *inPtr = static_cast<const DType *>(in.block()->data());
-  /*
-  vector<int> traversal_info = generate_traversal_info(in);
-  vector<int> shape_multipliers = generate_shape_multipliers(in);
+struct CopyOp {
+  DType operator()(DType x) const { return x; }
+};
 
-  for (size_t i = 0; i < in.Size(); i++) {
-    outPtr[i] = func(inPtr[traversal_info[in.shape().size()]]);
-    traverse_next(in, shape_multipliers, traversal_info, i + 1);
+// out = func(in) for tensors whose strides differ, e.g., the transposed or
+// broadcast tensors
+template <typename DType, typename Op>
+void strided_unary(const DType *inPtr, const vector<int> &in_stride,
+                   DType *outPtr, const Shape &out_shape,
+                   const vector<int> &out_stride, Op func) {
+  vector<vector<int>> st = {out_stride, in_stride};
+  const Shape shape = collapse_dims(out_shape, &st);
+  const vector<int> &os = st[0], &is = st[1];
+  const size_t ndim = shape.size(), ncol = shape.back();
+  const size_t size = Product(shape), nrow = size / ncol;
+
+  if (ndim == 2 && os[1] == 1 && is[0] == 1 && is[1] != 1) {
+    // 2d transpose, blocked so that both sides are accessed by cache lines
+    const size_t nr = shape[0], nc = shape[1];
+    const size_t ntile = (nr + kTransposeTile - 1) / kTransposeTile;
+#ifdef USE_OPENMP
+#pragma omp parallel for num_threads(NumCpuThreads()) if (size >= kParallelSize)
+#endif  // USE_OPENMP
+    for (size_t t = 0; t < ntile; t++) {
+      const size_t r0 = t * kTransposeTile;
+      const size_t r1 = std::min(nr, r0 + kTransposeTile);
+      for (size_t c0 = 0; c0 < nc; c0 += kTransposeTile) {
+        const size_t c1 = std::min(nc, c0 + kTransposeTile);
+        for (size_t r = r0; r < r1; r++)
+          for (size_t c = c0; c < c1; c++) {
+            const ptrdiff_t i = r, j = c;
+            outPtr[i * os[0] + j] = func(inPtr[i + j * is[1]]);
+          }
+      }
+    }
+    return;
+  }
+
+#ifdef USE_OPENMP
+#pragma omp parallel for num_threads(NumCpuThreads()) if (size >= kParallelSize)
+#endif  // USE_OPENMP
+  for (size_t r = 0; r < nrow; r++) {
+    DType *dst = outPtr + row_offset(r, shape, os);
+    const DType *src = inPtr + row_offset(r, shape, is);
+    if (os.back() == 1 && is.back() == 1) {
+      if (std::is_same<Op, CopyOp<DType>>::value)
+        memcpy(dst, src, ncol * sizeof(DType));
+      else
+        for (size_t c = 0; c < ncol; c++) dst[c] = func(src[c]);
+    } else if (os.back() == 1 && is.back() == 0) {
+      const DType v = func(src[0]);
+      std::fill(dst, dst + ncol, v);
+    } else {
+      const ptrdiff_t o = os.back(), i = is.back();
+      for (size_t c = 0; c < ncol; c++)
+        dst[static_cast<ptrdiff_t>(c) * o] =
+            func(src[static_cast<ptrdiff_t>(c) * i]);
+    }
   }
-  */
+}
+
+// out = func(in1, in2) for tensors whose strides differ, which covers the
+// broadcast operands of the binary ops without materializing them
+template <typename DType, typename Op>
+void strided_binary(const DType *in1Ptr, const vector<int> &in1_stride,
+                    const DType *in2Ptr, const vector<int> &in2_stride,
+                    DType *outPtr, const Shape &out_shape,
+                    const vector<int> &out_stride, Op func) {
+  vector<vector<int>> st = {out_stride, in1_stride, in2_stride};
+  const Shape shape = collapse_dims(out_shape, &st);
+  const vector<int> &os = st[0], &is1 = st[1], &is2 = st[2];
+  const size_t ncol = shape.back();
+  const size_t size = Product(shape), nrow = size / ncol;
+  const ptrdiff_t o = os.back(), s1 = is1.back(), s2 = is2.back();
+
+#ifdef USE_OPENMP
+#pragma omp parallel for num_threads(NumCpuThreads()) if (size >= kParallelSize)
+#endif  // USE_OPENMP
+  for (size_t r = 0; r < nrow; r++) {
+    DType *dst = outPtr + row_offset(r, shape, os);
+    const DType *src1 = in1Ptr + row_offset(r, shape, is1);
+    const DType *src2 = in2Ptr + row_offset(r, shape, is2);
+    if (o == 1 && s1 == 1 && s2 == 1) {
+      for (size_t c = 0; c < ncol; c++) dst[c] = func(src1[c], src2[c]);
+    } else if (o == 1 && s1 == 1 && s2 == 0) {
+      const DType v = src2[0];
+      for (size_t c = 0; c < ncol; c++) dst[c] = func(src1[c], v);
+    } else if (o == 1 && s1 == 0 && s2 == 1) {
+      const DType v = src1[0];
+      for (size_t c = 0; c < ncol; c++) dst[c] = func(v, src2[c]);
+    } else {
+      for (size_t c = 0; c < ncol; c++) {
+        const ptrdiff_t k = static_cast<ptrdiff_t>(c);
+        dst[k * o] = func(src1[k * s1], src2[k * s2]);
+      }
+    }
+  }
+}
+
+// the op is a template parameter instead of a std::function, so that it is
+// inlined into the loop of the contiguous case which is then vectorized
+template <typename DType, typename Op>
+void traverse_unary(const Tensor &in, Tensor *out, Op func) {
+  DType *outPtr = static_cast<DType *>(out->block()->mutable_data());
+  const DType *inPtr = static_cast<const DType *>(in.block()->data());
   CHECK(in.shape() == out->shape());
   if (in.stride() == out->stride()) {
-    for (size_t i = 0; i < in.Size(); i++) outPtr[i] = func(inPtr[i]);
-  } else {
-    // LOG(INFO) << "not equal stride";
-    size_t in_offset = 0, out_offset = 0;
-    vector<int> in_idx(in.nDim(), 0), out_idx(out->nDim(), 0);
-    for (size_t i = 0; i < Product(in.shape()); i++) {
-      outPtr[out_offset] = func(inPtr[in_offset]);
-      out_offset =
-          next_offset(out_offset, out->shape(), out->stride(), &out_idx);
-      in_offset = next_offset(in_offset, in.shape(), in.stride(), &in_idx);
-    }
+    const size_t size = in.Size();
+#ifdef USE_OPENMP
+#pragma omp parallel for simd num_threads(NumCpuThreads()) \
+    if (size >= kParallelSize)
+#endif  // USE_OPENMP
+    for (size_t i = 0; i < size; i++) outPtr[i] = func(inPtr[i]);
+  } else if (in.Size() > 0) {
+    strided_unary<DType>(inPtr, in.stride(), outPtr, out->shape(),
+                         out->stride(), func);
   }
 }
 
-template <typename DType>
+template <typename DType, typename Op>
 void traverse_binary(const Tensor &in1, const Tensor &in2, Tensor *out,
-                     std::function<DType(DType, DType)> func) {
+                     Op func) {
   DType *outPtr = static_cast<DType *>(out->block()->mutable_data());
   const DType *in1Ptr = static_cast<const DType *>(in1.block()->data());
   const DType *in2Ptr = static_cast<const DType *>(in2.block()->data());
-  /*
-  vector<int> traversal_info_in1 = generate_traversal_info(in1);
-  vector<int> traversal_info_in2 = generate_traversal_info(in2);
-  vector<int> shape_multipliers_in1 = generate_shape_multipliers(in1);
-  vector<int> shape_multipliers_in2 = generate_shape_multipliers(in2);
-
-  for (size_t i = 0; i < in1.Size(); i++) {
-    outPtr[i] = func(in1Ptr[traversal_info_in1[in1.shape().size()]],
-                     in2Ptr[traversal_info_in2[in2.shape().size()]]);
-    traverse_next(in1, shape_multipliers_in1, traversal_info_in1, i + 1);
-    traverse_next(in2, shape_multipliers_in2, traversal_info_in2, i + 1);
-  }
-  */
   auto prod = Product(in1.shape());
   CHECK(in1.shape() == out->shape());
   CHECK(in2.shape() == out->shape());
   if ((in1.stride() == out->stride()) && (in2.stride() == in1.stride())) {
+#ifdef USE_OPENMP
+#pragma omp parallel for simd num_threads(NumCpuThreads()) \
+    if (prod >= kParallelSize)
+#endif  // USE_OPENMP
     for (size_t i = 0; i < prod; i++) outPtr[i] = func(in1Ptr[i], in2Ptr[i]);
-  } else {
-    /*
-    LOG(INFO) << "not equal stride";
-    std::ostringstream s1, s2, s3, s4, s5, s6;
-    std::copy(in1.stride().begin(), in1.stride().end(),
-    std::ostream_iterator<int>(s1, ", "));
-    std::copy(in2.stride().begin(), in2.stride().end(),
-    std::ostream_iterator<int>(s2, ", "));
-    std::copy(out->stride().begin(), out->stride().end(),
-    std::ostream_iterator<int>(s3, ", "));
-
-    std::copy(in1.shape().begin(), in1.shape().end(),
-    std::ostream_iterator<int>(s4, ", "));
-    std::copy(in2.shape().begin(), in2.shape().end(),
-    std::ostream_iterator<int>(s5, ", "));
-    std::copy(out->shape().begin(), out->shape().end(),
-    std::ostream_iterator<int>(s6, ", "));
-
-    LOG(INFO) << s1.str() << ": " << s4.str();
-    LOG(INFO) << s2.str() << ": " << s5.str();
-    LOG(INFO) << s3.str() << ": " << s6.str();
-    LOG(INFO) << Backtrace();
-    */
-
-    size_t in1_offset = 0, in2_offset = 0, out_offset = 0;
-    vector<int> in1_idx(in1.nDim(), 0), in2_idx(in2.nDim(), 0),
-        out_idx(out->nDim(), 0);
-    for (size_t i = 0; i < prod; i++) {
-      outPtr[out_offset] = func(in1Ptr[in1_offset], in2Ptr[in2_offset]);
-      out_offset =
-          next_offset(out_offset, out->shape(), out->stride(), &out_idx);
-      in1_offset = next_offset(in1_offset, in1.shape(), in1.stride(), &in1_idx);
-      in2_offset = next_offset(in2_offset, in2.shape(), in2.stride(), &in2_idx);
-      // LOG(INFO) <<  in1_offset << ", " << in2_offset << ", " << out_offset;
-    }
+  } else if (prod > 0) {
+    strided_binary<DType>(in1Ptr, in1.stride(), in2Ptr, in2.stride(), outPtr,
+                          out->shape(), out->stride(), func);
   }
 }
 
@@ -357,25 +454,42 @@ void SoftMaxBackward<float, lang::Cpp>(const Tensor &in, Tensor *out,
   ctx->dnnl_stream.wait();
 }
 #else
-// native Softmax without DNNL
+// native Softmax without DNNL, which computes each row in one pass over the
+// max, the sum of the exponentials and the normalization
 template <>
 void SoftMax<float, lang::Cpp>(const Tensor &in, Tensor *out, Context *ctx) {
   CHECK_LE(in.nDim(), 2u)
       << "Axis is required for SoftMax on multi dimemsional tensor";
-  out->CopyData(in);
-  size_t nrow = 1, ncol = in.Size(), size = ncol;
+  Tensor x = in.transpose() ? Contiguous(in) : in;
+  size_t nrow = 1, ncol = in.Size();
   if (in.nDim() == 2u) {
     nrow = in.shape(0);
-    ncol = size / nrow;
-    out->Reshape(Shape{nrow, ncol});
+    ncol = ncol / nrow;
+  }
+  const float *inPtr = static_cast<const float *>(x.block()->data());
+  float *outPtr = static_cast<float *>(out->block()->mutable_data());
+#ifdef USE_OPENMP
+#pragma omp parallel for num_threads(NumCpuThreads()) \
+    if (nrow * ncol >= kParallelSize)
+#endif  // USE_OPENMP
+  for (size_t r = 0; r < nrow; r++) {
+    const float *src = inPtr + r * ncol;
+    float *dst = outPtr + r * ncol;
+    float maxval = -FLT_MAX, sum = 0.f;
+#ifdef USE_OPENMP
+#pragma omp simd reduction(max : maxval)
+#endif  // USE_OPENMP
+    for (size_t c = 0; c < ncol; c++) maxval = std::max(maxval, src[c]);
+    for (size_t c = 0; c < ncol; c++) {
+      dst[c] = std::exp(src[c] - maxval);
+      sum += dst[c];
+    }
+    const float scale = 1.f / sum;
+#ifdef USE_OPENMP
+#pragma omp simd
+#endif  // USE_OPENMP
+    for (size_t c = 0; c < ncol; c++) dst[c] *= scale;
   }
-  Tensor tmp = RowMax(*out);
-  SubColumn(tmp, out);
-  Exp(*out, out);
-
-  SumColumns(*out, &tmp);
-  DivColumn(tmp, out);
-  out->Reshape(in.shape());
 }
 #endif  // USE_DNNL
 
@@ -650,14 +764,26 @@ void Sub<float, lang::Cpp>(const Tensor &in1, const Tensor &in2, Tensor *out,
 }
 
 // sum all elements of input into out
-// TODO(wangwei) optimize using omp
 template <>
 void Sum<float, lang::Cpp>(const Tensor &in, float *out, Context *ctx) {
-  float s = 0.f;
   const float *inPtr = static_cast<const float *>(in.block()->data());
-  for (size_t i = 0; i < in.Size(); i++) {
-    s += inPtr[i];
+  const size_t size = in.Size();
+  const size_t nblock = (size + kReduceBlock - 1) / kReduceBlock;
+  vector<float> partial(nblock);
+#ifdef USE_OPENMP
+#pragma omp parallel for num_threads(NumCpuThreads()) if (size >= kParallelSize)
+#endif  // USE_OPENMP
+  for (size_t b = 0; b < nblock; b++) {
+    const size_t end = std::min(size, (b + 1) * kReduceBlock);
+    float s = 0.f;
+#ifdef USE_OPENMP
+#pragma omp simd reduction(+ : s)
+#endif  // USE_OPENMP
+    for (size_t i = b * kReduceBlock; i < end; i++) s += inPtr[i];
+    partial[b] = s;
   }
+  float s = 0.f;
+  for (float p : partial) s += p;
   *out = s;
 }
 
@@ -683,21 +809,18 @@ GenUnaryTensorCppFn(Atanh, atanh);
 
 template <>
 void Transform<float, lang::Cpp>(const Tensor &in, Tensor *out, Context *ctx) {
-  auto identity = [](float a) { return a; };
-  traverse_unary<float>(in, out, identity);
+  traverse_unary<float>(in, out, CopyOp<float>());
 }
 
 template <>
 void Transform<int, lang::Cpp>(const Tensor &in, Tensor *out, Context *ctx) {
-  auto identity = [](int a) { return a; };
-  traverse_unary<int>(in, out, identity);
+  traverse_unary<int>(in, out, CopyOp<int>());
 }
 
 template <>
 void Transform<half_float::half, lang::Cpp>(const Tensor &in, Tensor *out,
                                             Context *ctx) {
-  auto identity = [](half_float::half a) { return a; };
-  traverse_unary<half_float::half>(in, out, identity);
+  traverse_unary<half_float::half>(in, out, CopyOp<half_float::half>());
 }
 
 template <>
@@ -1118,18 +1241,101 @@ void SoftmaxCrossEntropyBwd<float, lang::Cpp>(bool int_target,
   }
 }
 
+template <>
+void CrossEntropyFwdBwd<float, lang::Cpp>(bool logits, const float smoothing,
+                                          const int ignore_index,
+                                          const size_t batchsize,
+                                          const size_t dim, const Tensor &in,
+                                          const Tensor &t, Tensor *loss,
+                                          Tensor *grad, Context *ctx) {
+  const float *inPtr = static_cast<const float *>(in.block()->data());
+  const int *tPtr = static_cast<const int *>(t.block()->data());
+  float *lossPtr = static_cast<float *>(loss->block()->mutable_data());
+  float *gradPtr = grad == nullptr
+                       ? nullptr
+                       : static_cast<float *>(grad->block()->mutable_data());
+  size_t valid = 0;
+  for (size_t i = 0; i < batchsize; i++) valid += tPtr[i] != ignore_index;
+  const float scale = 1.0f / (std::max)(valid, size_t(1));
+  // the target of a row is off for every label plus on for its label
+  const float off = smoothing / dim, on = 1.0f - smoothing;
+#ifdef USE_OPENMP
+#pragma omp parallel for num_threads(NumCpuThreads()) if (batchsize * dim >= kParallelSize)
+#endif  // USE_OPENMP
+  for (size_t i = 0; i < batchsize; i++) {
+    const float *x = inPtr + i * dim;
+    float *g = gradPtr == nullptr ? nullptr : gradPtr + i * dim;
+    const int label = tPtr[i];
+    if (label == ignore_index) {
+      lossPtr[i] = 0.0f;
+      if (g != nullptr) std::fill(g, g + dim, 0.0f);
+      continue;
+    }
+    CHECK(label >= 0 && static_cast<size_t>(label) < dim)
+        << "Invalid label " << label;
+    if (logits) {
+      // the max and the sum of exp(x - max) are updated in the same pass
+      float x_max = x[0], sum = 1.0f, sum_x = x[0];
+      for (size_t j = 1; j < dim; j++) {
+        if (x[j] > x_max) {
+          sum = sum * std::exp(x_max - x[j]) + 1.0f;
+          x_max = x[j];
+        } else {
+          sum += std::exp(x[j] - x_max);
+        }
+        sum_x += x[j];
+      }
+      const float lse = x_max + std::log(sum);
+      lossPtr[i] = (lse - on * x[label] - off * sum_x) * scale;
+      if (g != nullptr) {
+        for (size_t j = 0; j < dim; j++)
+          g[j] = (std::exp(x[j] - lse) - off) * scale;
+        g[label] -= on * scale;
+      }
+    } else {
+      const float p = (std::max)(x[label], FLT_MIN);
+      float sum_log = 0.0f;
+      if (off > 0.0f)
+        for (size_t j = 0; j < dim; j++)
+          sum_log += std::log((std::max)(x[j], FLT_MIN));
+      lossPtr[i] = -(on * std::log(p) + off * sum_log) * scale;
+      if (g != nullptr) {
+        for (size_t j = 0; j < dim; j++)
+          g[j] = -off / (std::max)(x[j], FLT_MIN) * scale;
+        g[label] -= on / p * scale;
+      }
+    }
+  }
+}
+
 template <>
 void RowMax<float, lang::Cpp>(const Tensor &in, Tensor *out, Context *ctx) {
   const float *inPtr = static_cast<const float *>(in.block()->data());
   float *outPtr = static_cast<float *>(out->block()->mutable_data());
   const size_t nrow = in.shape()[0];
   const size_t ncol = in.shape()[1];
+  if (!in.transpose()) {
+#ifdef USE_OPENMP
+#pragma omp parallel for num_threads(NumCpuThreads()) \
+    if (nrow * ncol >= kParallelSize)
+#endif  // USE_OPENMP
+    for (size_t r = 0; r < nrow; r++) {
+      const float *row = inPtr + r * ncol;
+      float maxval = -FLT_MAX;
+#ifdef USE_OPENMP
+#pragma omp simd reduction(max : maxval)
+#endif  // USE_OPENMP
+      for (size_t c = 0; c < ncol; c++) maxval = std::max(maxval, row[c]);
+      outPtr[r] = maxval;
+    }
+    return;
+  }
   vector<int> traversal_info = generate_traversal_info(in);
   vector<int> shape_multipliers = generate_shape_multipliers(in);
 
   for (size_t r = 0; r < nrow; r++) {
     int counter_offset = (r * ncol);
-    float maxval = 0;
+    float maxval = -FLT_MAX;
     for (size_t c = 0; c < ncol; c++) {
       maxval = (std::max)(maxval, inPtr[traversal_info[in.shape().size()]]);
       traverse_next(in, shape_multipliers, traversal_info,
@@ -1139,6 +1345,536 @@ void RowMax<float, lang::Cpp>(const Tensor &in, Tensor *out, Context *ctx) {
   }
 }
 
+template <>
+void RowDot<float, lang::Cpp>(const Tensor &a, const Tensor &b, Tensor *out,
+                              Context *ctx) {
+  const float *aPtr = static_cast<const float *>(a.block()->data());
+  const float *bPtr = static_cast<const float *>(b.block()->data());
+  float *outPtr = static_cast<float *>(out->block()->mutable_data());
+  const size_t nrow = a.shape(0), ncol = a.shape(1);
+#ifdef USE_OPENMP
+#pragma omp parallel for num_threads(NumCpuThreads()) \
+    if (nrow * ncol >= kParallelSize)
+#endif  // USE_OPENMP
+  for (size_t r = 0; r < nrow; r++) {
+    const float *x = aPtr + r * ncol, *y = bPtr + r * ncol;
+    float sum = 0.0f;
+#ifdef USE_OPENMP
+#pragma omp simd reduction(+ : sum)
+#endif  // USE_OPENMP
+    for (size_t c = 0; c < ncol; c++) sum += x[c] * y[c];
+    outPtr[r] = sum;
+  }
+}
+
+// sum the elements of each row of the 2d matrix into out
+template <>
+void SumColumns<float, lang::Cpp>(const Tensor &in, Tensor *out, Context *ctx) {
+  const float *inPtr = static_cast<const float *>(in.block()->data());
+  float *outPtr = static_cast<float *>(out->block()->mutable_data());
+  const size_t nrow = in.shape(0), ncol = in.shape(1);
+#ifdef USE_OPENMP
+#pragma omp parallel for num_threads(NumCpuThreads()) \
+    if (nrow * ncol >= kParallelSize)
+#endif  // USE_OPENMP
+  for (size_t r = 0; r < nrow; r++) {
+    const float *row = inPtr + r * ncol;
+    float s = 0.f;
+#ifdef USE_OPENMP
+#pragma omp simd reduction(+ : s)
+#endif  // USE_OPENMP
+    for (size_t c = 0; c < ncol; c++) s += row[c];
+    outPtr[r] = s;
+  }
+}
+
+// sum the rows of the 2d matrix into out; each thread accumulates a block of
+// columns over all rows, which keeps the partial sums in cache
+template <>
+void SumRows<float, lang::Cpp>(const Tensor &in, Tensor *out, Context *ctx) {
+  const float *inPtr = static_cast<const float *>(in.block()->data());
+  float *outPtr = static_cast<float *>(out->block()->mutable_data());
+  const size_t nrow = in.shape(0), ncol = in.shape(1);
+  const size_t bcol = 256, nblock = (ncol + bcol - 1) / bcol;
+#ifdef USE_OPENMP
+#pragma omp parallel for num_threads(NumCpuThreads()) \
+    if (nrow * ncol >= kParallelSize)
+#endif  // USE_OPENMP
+  for (size_t b = 0; b < nblock; b++) {
+    const size_t begin = b * bcol, end = std::min(ncol, begin + bcol);
+    float *dst = outPtr + begin;
+    std::fill(dst, dst + end - begin, 0.f);
+    for (size_t r = 0; r < nrow; r++) {
+      const float *row = inPtr + r * ncol + begin;
+#ifdef USE_OPENMP
+#pragma omp simd
+#endif  // USE_OPENMP
+      for (size_t c = 0; c < end - begin; c++) dst[c] += row[c];
+    }
+  }
+}
+
+template <>
+void GatherRows<float, lang::Cpp>(const size_t nrow, const size_t dim,
+                                  const size_t num, const Tensor &in,
+                                  const Tensor &indices, Tensor *out,
+                                  Context *ctx) {
+  const float *inPtr = static_cast<const float *>(in.block()->data());
+  const int *idxPtr = static_cast<const int *>(indices.block()->data());
+  float *outPtr = static_cast<float *>(out->block()->mutable_data());
+  for (size_t i = 0; i < num; i++) {
+    int row = idxPtr[i];
+    if (row < 0) {
+      memset(outPtr + i * dim, 0, dim * sizeof(float));
+      continue;
+    }
+    CHECK_LT((size_t)row, nrow) << "Row index out of range: " << row;
+    memcpy(outPtr + i * dim, inPtr + row * dim, dim * sizeof(float));
+  }
+}
+
+template <>
+void ScatterAddRows<float, lang::Cpp>(const size_t nrow, const size_t dim,
+                                      const size_t num, const Tensor &in,
+                                      const Tensor &indices, Tensor *out,
+                                      Context *ctx) {
+  const float *inPtr = static_cast<const float *>(in.block()->data());
+  const int *idxPtr = static_cast<const int *>(indices.block()->data());
+  float *outPtr = static_cast<float *>(out->block()->mutable_data());
+  for (size_t i = 0; i < num; i++) {
+    int row = idxPtr[i];
+    if (row < 0) continue;
+    CHECK_LT((size_t)row, nrow) << "Row index out of range: " << row;
+    const float *src = inPtr + i * dim;
+    float *dst = outPtr + row * dim;
+    for (size_t j = 0; j < dim; j++) dst[j] += src[j];
+  }
+}
+
+template <>
+void ScatterRows<float, lang::Cpp>(const size_t nrow, const size_t dim,
+                                   const size_t num, const Tensor &in,
+                                   const Tensor &indices, Tensor *out,
+                                   Context *ctx) {
+  const float *inPtr = static_cast<const float *>(in.block()->data());
+  const int *idxPtr = static_cast<const int *>(indices.block()->data());
+  float *outPtr = static_cast<float *>(out->block()->mutable_data());
+  for (size_t i = 0; i < num; i++) {
+    int row = idxPtr[i];
+    if (row < 0) continue;
+    CHECK_LT((size_t)row, nrow) << "Row index out of range: " << row;
+    memcpy(outPtr + row * dim, inPtr + i * dim, dim * sizeof(float));
+  }
+}
+
+// gather the slices of the in tensor, which is viewed as (outer, dim, inner),
+// along the middle axis; the types of the data are not restricted as the
+// slices are copied, e.g., for the int tensors of shapes
+template <typename DType>
+void gather_slices(const size_t outer, const size_t dim, const size_t inner,
+                   const size_t num, const Tensor &in, const Tensor &indices,
+                   Tensor *out) {
+  const DType *inPtr = static_cast<const DType *>(in.block()->data());
+  const int *idxPtr = static_cast<const int *>(indices.block()->data());
+  DType *outPtr = static_cast<DType *>(out->block()->mutable_data());
+  for (size_t j = 0; j < num; j++)
+    CHECK_LT(idxPtr[j], static_cast<int>(dim))
+        << "Index out of range: " << idxPtr[j];
+  const size_t size = outer * num * inner;
+#ifdef USE_OPENMP
+#pragma omp parallel for num_threads(NumCpuThreads()) if (size >= kParallelSize)
+#endif  // USE_OPENMP
+  for (size_t i = 0; i < outer * num; i++) {
+    const size_t o = i / num;
+    const int k = idxPtr[i % num];
+    DType *dst = outPtr + i * inner;
+    if (k < 0)
+      memset(dst, 0, inner * sizeof(DType));
+    else
+      memcpy(dst, inPtr + (o * dim + k) * inner, inner * sizeof(DType));
+  }
+}
+
+template <>
+void Gather<float, lang::Cpp>(const size_t outer, const size_t dim,
+                              const size_t inner, const size_t num,
+                              const Tensor &in, const Tensor &indices,
+                              Tensor *out, Context *ctx) {
+  gather_slices<float>(outer, dim, inner, num, in, indices, out);
+}
+
+template <>
+void Gather<int, lang::Cpp>(const size_t outer, const size_t dim,
+                            const size_t inner, const size_t num,
+                            const Tensor &in, const Tensor &indices,
+                            Tensor *out, Context *ctx) {
+  gather_slices<int>(outer, dim, inner, num, in, indices, out);
+}
+
+template <>
+void ScatterAdd<float, lang::Cpp>(const size_t outer, const size_t dim,
+                                  const size_t inner, const size_t num,
+                                  const Tensor &in, const Tensor &indices,
+                                  Tensor *out, Context *ctx) {
+  const float *inPtr = static_cast<const float *>(in.block()->data());
+  const int *idxPtr = static_cast<const int *>(indices.block()->data());
+  float *outPtr = static_cast<float *>(out->block()->mutable_data());
+  for (size_t j = 0; j < num; j++)
+    CHECK_LT(idxPtr[j], static_cast<int>(dim))
+        << "Index out of range: " << idxPtr[j];
+  // the slices of the same index are accumulated in order by one thread,
+  // hence the threads split the outer dim, or the columns if outer is 1
+  const size_t size = outer * num * inner;
+  const size_t nblock =
+      outer > 1 ? outer : (inner + kReduceBlock - 1) / kReduceBlock;
+#ifdef USE_OPENMP
+#pragma omp parallel for num_threads(NumCpuThreads()) if (size >= kParallelSize)
+#endif  // USE_OPENMP
+  for (size_t b = 0; b < nblock; b++) {
+    const size_t o = outer > 1 ? b : 0;
+    const size_t begin = outer > 1 ? 0 : b * kReduceBlock;
+    const size_t end =
+        outer > 1 ? inner : std::min(inner, begin + kReduceBlock);
+    for (size_t j = 0; j < num; j++) {
+      const int k = idxPtr[j];
+      if (k < 0) continue;
+      const float *src = inPtr + (o * num + j) * inner;
+      float *dst = outPtr + (o * dim + k) * inner;
+#ifdef USE_OPENMP
+#pragma omp simd
+#endif  // USE_OPENMP
+      for (size_t c = begin; c < end; c++) dst[c] += src[c];
+    }
+  }
+}
+
+// the offset of the first sliced element of a tensor and the strides between
+// the sliced elements, i.e., the strides of the tensor scaled by the steps
+inline ptrdiff_t slice_strides(const Tensor &t, const vector<int> &starts,
+                               const vector<int> &steps, vector<int> *strides) {
+  ptrdiff_t offset = 0;
+  strides->resize(t.nDim());
+  for (size_t k = 0; k < t.nDim(); k++) {
+    offset += static_cast<ptrdiff_t>(starts[k]) * t.stride()[k];
+    strides->at(k) = steps[k] * t.stride()[k];
+  }
+  return offset;
+}
+
+template <typename DType>
+void strided_slice(const Tensor &in, const vector<int> &starts,
+                   const vector<int> &steps, Tensor *out) {
+  vector<int> strides;
+  const ptrdiff_t offset = slice_strides(in, starts, steps, &strides);
+  const DType *inPtr = static_cast<const DType *>(in.block()->data()) + offset;
+  DType *outPtr = static_cast<DType *>(out->block()->mutable_data());
+  strided_unary(inPtr, strides, outPtr, out->shape(), out->stride(),
+                CopyOp<DType>());
+}
+
+template <>
+void StridedSlice<float, lang::Cpp>(const Tensor &in, const vector<int> &starts,
+                                    const vector<int> &steps, Tensor *out,
+                                    Context *ctx) {
+  strided_slice<float>(in, starts, steps, out);
+}
+
+template <>
+void StridedSlice<int, lang::Cpp>(const Tensor &in, const vector<int> &starts,
+                                  const vector<int> &steps, Tensor *out,
+                                  Context *ctx) {
+  strided_slice<int>(in, starts, steps, out);
+}
+
+template <>
+void StridedSliceBackward<float, lang::Cpp>(const Tensor &in,
+                                            const vector<int> &starts,
+                                            const vector<int> &steps,
+                                            Tensor *out, Context *ctx) {
+  vector<int> strides;
+  const ptrdiff_t offset = slice_strides(*out, starts, steps, &strides);
+  const float *inPtr = static_cast<const float *>(in.block()->data());
+  float *outPtr = static_cast<float *>(out->block()->mutable_data());
+  memset(outPtr, 0, out->Size() * sizeof(float));
+  strided_unary(inPtr, in.stride(), outPtr + offset, in.shape(), strides,
+                CopyOp<float>());
+}
+
+// the offsets of the elements selected by the index maps of the dims, i.e.,
+// maps_k[j] * stride[k] for the j-th index of the k-th dim, or -1 if the
+// index is negative
+inline vector<vector<ptrdiff_t>> index_map_offsets(const int *maps,
+                                                   const Shape &shape,
+                                                   const Shape &in_shape,
+                                                   const vector<int> &stride) {
+  vector<vector<ptrdiff_t>> offsets(shape.size());
+  for (size_t k = 0; k < shape.size(); k++) {
+    offsets[k].resize(shape[k]);
+    for (size_t j = 0; j < shape[k]; j++) {
+      CHECK_LT(maps[j], static_cast<int>(in_shape[k]))
+          << "Index out of range: " << maps[j];
+      offsets[k][j] =
+          maps[j] < 0 ? -1 : static_cast<ptrdiff_t>(maps[j]) * stride[k];
+    }
+    maps += shape[k];
+  }
+  return offsets;
+}
+
+template <typename DType>
+void index_map(const Tensor &in, const Tensor &maps, const DType value,
+               Tensor *out) {
+  const DType *inPtr = static_cast<const DType *>(in.block()->data());
+  const int *mapPtr = static_cast<const int *>(maps.block()->data());
+  DType *outPtr = static_cast<DType *>(out->block()->mutable_data());
+  const Shape &shape = out->shape();
+  const vector<vector<ptrdiff_t>> offsets =
+      index_map_offsets(mapPtr, shape, in.shape(), in.stride());
+  const ptrdiff_t *colOffsets = offsets.back().data();
+  const size_t ndim = shape.size(), cols = shape.back();
+  const size_t rows = out->Size() / cols;
+#ifdef USE_OPENMP
+#pragma omp parallel for num_threads(NumCpuThreads()) if (out->Size() >= \
+                                                          kParallelSize)
+#endif  // USE_OPENMP
+  for (size_t r = 0; r < rows; r++) {
+    // the offset of the row in 'in' from the indices of the outer dims
+    ptrdiff_t base = 0;
+    size_t q = r;
+    for (size_t k = ndim - 1; k-- > 0 && base >= 0; q /= shape[k]) {
+      const ptrdiff_t o = offsets[k][q % shape[k]];
+      base = o < 0 ? -1 : base + o;
+    }
+    DType *dst = outPtr + r * cols;
+    if (base < 0) {
+      std::fill(dst, dst + cols, value);
+      continue;
+    }
+    const DType *src = inPtr + base;
+    for (size_t c = 0; c < cols; c++)
+      dst[c] = colOffsets[c] < 0 ? value : src[colOffsets[c]];
+  }
+}
+
+template <>
+void IndexMap<float, lang::Cpp>(const Tensor &in, const Tensor &maps,
+                                const float value, Tensor *out, Context *ctx) {
+  index_map<float>(in, maps, value, out);
+}
+
+template <>
+void IndexMap<int, lang::Cpp>(const Tensor &in, const Tensor &maps,
+                              const int value, Tensor *out, Context *ctx) {
+  index_map<int>(in, maps, value, out);
+}
+
+template <>
+void IndexMapBackward<float, lang::Cpp>(const Tensor &in, const Tensor &maps,
+                                        Tensor *out, Context *ctx) {
+  const float *inPtr = static_cast<const float *>(in.block()->data());
+  const int *mapPtr = static_cast<const int *>(maps.block()->data());
+  float *outPtr = static_cast<float *>(out->block()->mutable_data());
+  const Shape &shape = in.shape(), &out_shape = out->shape();
+  const size_t ndim = shape.size(), cols = out_shape.back();
+  const size_t rows = out->Size() / cols;
+  // the elements of 'in' mapped from each index of each dim of 'out', stored
+  // as the offsets pre[k][begin[k][i]:begin[k][i + 1]] for the index i of the
+  // k-th dim; each element of 'out' then gathers the products of the offsets
+  // of its indices, so that the threads do not write to the same element
+  vector<vector<size_t>> begin(ndim);
+  vector<vector<ptrdiff_t>> pre(ndim);
+  for (size_t k = 0; k < ndim; mapPtr += shape[k++]) {
+    begin[k].assign(out_shape[k] + 1, 0);
+    for (size_t j = 0; j < shape[k]; j++) {
+      CHECK_LT(mapPtr[j], static_cast<int>(out_shape[k]))
+          << "Index out of range: " << mapPtr[j];
+      if (mapPtr[j] >= 0) begin[k][mapPtr[j] + 1]++;
+    }
+    for (size_t i = 0; i < out_shape[k]; i++) begin[k][i + 1] += begin[k][i];
+    pre[k].resize(begin[k][out_shape[k]]);
+    vector<size_t> next(begin[k].begin(), begin[k].end() - 1);
+    for (size_t j = 0; j < shape[k]; j++)
+      if (mapPtr[j] >= 0)
+        pre[k][next[mapPtr[j]]++] = static_cast<ptrdiff_t>(j) * in.stride()[k];
+  }
+  const size_t *colBegin = begin.back().data();
+  const ptrdiff_t *colPre = pre.back().data();
+#ifdef USE_OPENMP
+#pragma omp parallel num_threads(NumCpuThreads()) if (in.Size() >= \
+                                                      kParallelSize)
+#endif  // USE_OPENMP
+  {
+    // the ranges of the offsets of the outer indices of a row, and the
+    // current offset of each outer dim when enumerating their products
+    vector<size_t> lo(ndim), hi(ndim), pos(ndim);
+#ifdef USE_OPENMP
+#pragma omp for
+#endif  // USE_OPENMP
+    for (size_t r = 0; r < rows; r++) {
+      float *dst = outPtr + r * cols;
+      std::fill(dst, dst + cols, 0.f);
+      bool mapped = true;
+      size_t q = r;
+      for (size_t k = ndim - 1; k-- > 0; q /= out_shape[k]) {
+        const size_t i = q % out_shape[k];
+        lo[k] = pos[k] = begin[k][i];
+        hi[k] = begin[k][i + 1];
+        mapped &= lo[k] < hi[k];
+      }
+      while (mapped) {
+        ptrdiff_t base = 0;
+        for (size_t k = 0; k + 1 < ndim; k++) base += pre[k][pos[k]];
+        const float *src = inPtr + base;
+        for (size_t c = 0; c < cols; c++)
+          for (size_t p = colBegin[c]; p < colBegin[c + 1]; p++)
+            dst[c] += src[colPre[p]];
+        // move to the next product of the outer offsets
+        int k = static_cast<int>(ndim) - 2;
+        for (; k >= 0 && ++pos[k] == hi[k]; k--) pos[k] = lo[k];
+        mapped = k >= 0;
+      }
+    }
+  }
+}
+
+// a counter-based random number of 32 bits, i.e., the upper half of the
+// splitmix64 hash of the i-th number after seed, so that the random numbers
+// of different elements could be generated in parallel
+inline uint32_t counter_random(const uint64_t seed, const uint64_t i) {
+  uint64_t z = seed + (i + 1) * 0x9E3779B97F4A7C15ULL;
+  z = (z ^ (z >> 30)) * 0xBF58476D1CE4E5B9ULL;
+  z = (z ^ (z >> 27)) * 0x94D049BB133111EBULL;
+  return static_cast<uint32_t>((z ^ (z >> 31)) >> 32);
+}
+
+template <>
+void PackedDropout<float, lang::Cpp>(const float ratio, const Tensor &in,
+                                     Tensor *mask, Tensor *out, Context *ctx) {
+  const float *inPtr = static_cast<const float *>(in.block()->data());
+  uint32_t *maskPtr = static_cast<uint32_t *>(mask->block()->mutable_data());
+  float *outPtr = static_cast<float *>(out->block()->mutable_data());
+  const size_t size = in.Size(), nword = mask->Size();
+  const float scale = 1.0f / (1.0f - ratio);
+  // an element is kept if its random number is below (1 - ratio) * 2^32
+  const uint64_t threshold =
+      static_cast<uint64_t>((1.0 - ratio) * 4294967296.0);
+  const uint64_t seed = (static_cast<uint64_t>(ctx->random_generator()) << 32) |
+                        ctx->random_generator();
+#ifdef USE_OPENMP
+#pragma omp parallel for num_threads(NumCpuThreads()) if (size >= kParallelSize)
+#endif  // USE_OPENMP
+  for (size_t w = 0; w < nword; w++) {
+    const size_t begin = w * 32, end = std::min(size, begin + 32);
+    uint32_t bits = 0;
+    for (size_t i = begin; i < end; i++) {
+      const bool keep = counter_random(seed, i) < threshold;
+      bits |= static_cast<uint32_t>(keep) << (i - begin);
+      outPtr[i] = keep ? inPtr[i] * scale : 0.0f;
+    }
+    maskPtr[w] = bits;
+  }
+}
+
+template <>
+void PackedDropoutBackward<float, lang::Cpp>(const float ratio,
+                                             const Tensor &in,
+                                             const Tensor &mask, Tensor *out,
+                                             Context *ctx) {
+  const float *inPtr = static_cast<const float *>(in.block()->data());
+  const uint32_t *maskPtr = static_cast<const uint32_t *>(mask.block()->data());
+  float *outPtr = static_cast<float *>(out->block()->mutable_data());
+  const size_t size = in.Size();
+  const float scale = 1.0f / (1.0f - ratio);
+#ifdef USE_OPENMP
+#pragma omp parallel for num_threads(NumCpuThreads()) if (size >= kParallelSize)
+#endif  // USE_OPENMP
+  for (size_t i = 0; i < size; i++)
+    outPtr[i] = (maskPtr[i >> 5] >> (i & 31)) & 1u ? inPtr[i] * scale : 0.0f;
+}
+
+template <>
+void CoalesceRows<float, lang::Cpp>(const size_t dim, const size_t num,
+                                    const Tensor &indices, const Tensor &in,
+                                    Tensor *out_indices, Tensor *out,
+                                    Context *ctx) {
+  const float *inPtr = static_cast<const float *>(in.block()->data());
+  const int *idxPtr = static_cast<const int *>(indices.block()->data());
+  int *outIdxPtr = static_cast<int *>(out_indices->block()->mutable_data());
+  float *outPtr = static_cast<float *>(out->block()->mutable_data());
+  memset(outPtr, 0, num * dim * sizeof(float));
+  std::unordered_map<int, size_t> first;
+  for (size_t i = 0; i < num; i++) {
+    int row = idxPtr[i];
+    if (row < 0) {
+      outIdxPtr[i] = -1;
+      continue;
+    }
+    size_t pos = first.emplace(row, i).first->second;
+    outIdxPtr[i] = pos == i ? row : -1;
+    const float *src = inPtr + i * dim;
+    float *dst = outPtr + pos * dim;
+    for (size_t j = 0; j < dim; j++) dst[j] += src[j];
+  }
+}
+
+template <>
+void MultiTensorSGD<float, lang::Cpp>(
+    const vector<Tensor> &grads, const vector<Tensor> &params,
+    const vector<Tensor> &moments, const Tensor &lr, const Tensor &momentum,
+    const Tensor &dampening, const Tensor &weight_decay, bool nesterov,
+    Context *ctx) {
+  const float minus_lr = -*static_cast<const float *>(lr.block()->data());
+  const float mom = *static_cast<const float *>(momentum.block()->data());
+  const float alpha =
+      1.0f - *static_cast<const float *>(dampening.block()->data());
+  const float decay = *static_cast<const float *>(weight_decay.block()->data());
+  for (size_t k = 0; k < params.size(); k++) {
+    const float *gPtr = static_cast<const float *>(grads[k].block()->data());
+    float *pPtr = static_cast<float *>(params[k].block()->mutable_data());
+    float *mPtr = nullptr;
+    if (!moments.empty())
+      mPtr = static_cast<float *>(moments[k].block()->mutable_data());
+    const size_t num = params[k].Size();
+    for (size_t i = 0; i < num; i++) {
+      float g = gPtr[i] + decay * pPtr[i];
+      if (mPtr != nullptr) {
+        mPtr[i] = mPtr[i] * mom + alpha * g;
+        g = nesterov ? g + mom * mPtr[i] : mPtr[i];
+      }
+      pPtr[i] += minus_lr * g;
+    }
+  }
+}
+
+template <>
+void MultiTensorAdam<float, lang::Cpp>(
+    const vector<Tensor> &grads, const vector<Tensor> &params,
+    const vector<Tensor> &m, const vector<Tensor> &v, const Tensor &lr,
+    const Tensor &beta_1, const Tensor &beta_2, const Tensor &epsilon,
+    const Tensor &weight_decay, const Tensor &step, Context *ctx) {
+  const float minus_lr = -*static_cast<const float *>(lr.block()->data());
+  const float b1 = *static_cast<const float *>(beta_1.block()->data());
+  const float b2 = *static_cast<const float *>(beta_2.block()->data());
+  const float eps = *static_cast<const float *>(epsilon.block()->data());
+  const float decay = *static_cast<const float *>(weight_decay.block()->data());
+  const float t = *static_cast<const float *>(step.block()->data()) + 1.0f;
+  const float bias1 = 1.0f - powf(b1, t), bias2 = 1.0f - powf(b2, t);
+  for (size_t k = 0; k < params.size(); k++) {
+    const float *gPtr = static_cast<const float *>(grads[k].block()->data());
+    float *pPtr = static_cast<float *>(params[k].block()->mutable_data());
+    float *mPtr = static_cast<float *>(m[k].block()->mutable_data());
+    float *vPtr = static_cast<float *>(v[k].block()->mutable_data());
+    const size_t num = params[k].Size();
+    for (size_t i = 0; i < num; i++) {
+      float g = gPtr[i] + decay * pPtr[i];
+      mPtr[i] = mPtr[i] * b1 + (1.0f - b1) * g;
+      vPtr[i] = vPtr[i] * b2 + (1.0f - b2) * g * g;
+      float m_norm = mPtr[i] / bias1, v_norm = vPtr[i] / bias2;
+      pPtr[i] += minus_lr * (m_norm / (sqrtf(v_norm) + eps));
+    }
+  }
+}
+
 
 }  // namespace singa
 
@@ -1424,6 +1424,23 @@ void SoftmaxCrossEntropyBwd<half_float::half, lang::Cuda>(
                                ctx->stream);
 }
 
+template <>
+void CrossEntropyFwdBwd<float, lang::Cuda>(bool logits, const float smoothing,
+                                           const int ignore_index,
+                                           const size_t batchsize,
+                                           const size_t dim, const Tensor& in,
+                                           const Tensor& t, Tensor* loss,
+                                           Tensor* grad, Context* ctx) {
+  const float* inPtr = static_cast<const float*>(in.block()->data());
+  const int* tPtr = static_cast<const int*>(t.block()->data());
+  float* lossPtr = static_cast<float*>(loss->block()->mutable_data());
+  float* gradPtr = grad == nullptr
+                       ? nullptr
+                       : static_cast<float*>(grad->block()->mutable_data());
+  cuda::CrossEntropyFwdBwd(logits, smoothing, ignore_index, batchsize, dim,
+                           inPtr, tPtr, lossPtr, gradPtr, ctx->stream);
+}
+
 // template <>
 // void RowMax<float, lang::Cuda>(const Tensor& in, Tensor* out,
 //                                Context* ctx) {
@@ -1506,6 +1523,15 @@ void RowMax<float, lang::Cuda>(const Tensor& in, Tensor* out, Context* ctx) {
   }
 }
 
+template <>
+void RowDot<float, lang::Cuda>(const Tensor& a, const Tensor& b, Tensor* out,
+                               Context* ctx) {
+  const float* aPtr = static_cast<const float*>(a.block()->data());
+  const float* bPtr = static_cast<const float*>(b.block()->data());
+  float* outPtr = static_cast<float*>(out->block()->mutable_data());
+  cuda::RowDot(a.shape(0), a.shape(1), aPtr, bPtr, outPtr, ctx->stream);
+}
+
 // must put this function after Set and Dot functions due to the error from
 // instantiation before specialization
 template <>
@@ -1562,6 +1588,252 @@ void Sum<float, lang::Cuda>(const Tensor& in, float* out, Context* ctx) {
 #endif  // CUDNN_MAJOR < 7
 }
 
+template <>
+void GatherRows<float, lang::Cuda>(const size_t nrow, const size_t dim,
+                                   const size_t num, const Tensor& in,
+                                   const Tensor& indices, Tensor* out,
+                                   Context* ctx) {
+  const float* inPtr = static_cast<const float*>(in.block()->data());
+  const int* idxPtr = static_cast<const int*>(indices.block()->data());
+  float* outPtr = static_cast<float*>(out->block()->mutable_data());
+  cuda::GatherRows(num, dim, idxPtr, inPtr, outPtr, ctx->stream);
+}
+
+template <>
+void ScatterAddRows<float, lang::Cuda>(const size_t nrow, const size_t dim,
+                                       const size_t num, const Tensor& in,
+                                       const Tensor& indices, Tensor* out,
+                                       Context* ctx) {
+  const float* inPtr = static_cast<const float*>(in.block()->data());
+  const int* idxPtr = static_cast<const int*>(indices.block()->data());
+  float* outPtr = static_cast<float*>(out->block()->mutable_data());
+  cuda::ScatterAddRows(num, dim, idxPtr, inPtr, outPtr, ctx->stream);
+}
+
+template <>
+void ScatterRows<float, lang::Cuda>(const size_t nrow, const size_t dim,
+                                    const size_t num, const Tensor& in,
+                                    const Tensor& indices, Tensor* out,
+                                    Context* ctx) {
+  const float* inPtr = static_cast<const float*>(in.block()->data());
+  const int* idxPtr = static_cast<const int*>(indices.block()->data());
+  float* outPtr = static_cast<float*>(out->block()->mutable_data());
+  cuda::ScatterRows(num, dim, idxPtr, inPtr, outPtr, ctx->stream);
+}
+
+template <typename DType>
+void gather_slices_cuda(const size_t outer, const size_t dim,
+                        const size_t inner, const size_t num, const Tensor& in,
+                        const Tensor& indices, Tensor* out, Context* ctx) {
+  const DType* inPtr = static_cast<const DType*>(in.block()->data());
+  const int* idxPtr = static_cast<const int*>(indices.block()->data());
+  DType* outPtr = static_cast<DType*>(out->block()->mutable_data());
+  cuda::Gather(outer, dim, inner, num, idxPtr, inPtr, outPtr, ctx->stream);
+}
+
+template <>
+void Gather<float, lang::Cuda>(const size_t outer, const size_t dim,
+                               const size_t inner, const size_t num,
+                               const Tensor& in, const Tensor& indices,
+                               Tensor* out, Context* ctx) {
+  gather_slices_cuda<float>(outer, dim, inner, num, in, indices, out, ctx);
+}
+
+template <>
+void Gather<int, lang::Cuda>(const size_t outer, const size_t dim,
+                             const size_t inner, const size_t num,
+                             const Tensor& in, const Tensor& indices,
+                             Tensor* out, Context* ctx) {
+  gather_slices_cuda<int>(outer, dim, inner, num, in, indices, out, ctx);
+}
+
+template <>
+void ScatterAdd<float, lang::Cuda>(const size_t outer, const size_t dim,
+                                   const size_t inner, const size_t num,
+                                   const Tensor& in, const Tensor& indices,
+                                   Tensor* out, Context* ctx) {
+  const float* inPtr = static_cast<const float*>(in.block()->data());
+  const int* idxPtr = static_cast<const int*>(indices.block()->data());
+  float* outPtr = static_cast<float*>(out->block()->mutable_data());
+  cuda::ScatterAdd(outer, dim, inner, num, idxPtr, inPtr, outPtr, ctx->stream);
+}
+
+template <typename DType>
+void strided_slice_cuda(const Tensor& in, const vector<int>& starts,
+                        const vector<int>& steps, Tensor* out, Context* ctx) {
+  CHECK_LE(in.nDim(), cuda::kMaxStridedDim);
+  const DType* inPtr = static_cast<const DType*>(in.block()->data());
+  DType* outPtr = static_cast<DType*>(out->block()->mutable_data());
+  vector<int> strides(in.nDim());
+  for (size_t k = 0; k < in.nDim(); k++) {
+    inPtr += static_cast<ptrdiff_t>(starts[k]) * in.stride()[k];
+    strides[k] = steps[k] * in.stride()[k];
+  }
+  cuda::StridedCopy(in.nDim(), out->shape().data(), strides.data(),
+                    out->stride().data(), inPtr, outPtr, ctx->stream);
+}
+
+template <>
+void StridedSlice<float, lang::Cuda>(const Tensor& in,
+                                     const vector<int>& starts,
+                                     const vector<int>& steps, Tensor* out,
+                                     Context* ctx) {
+  strided_slice_cuda<float>(in, starts, steps, out, ctx);
+}
+
+template <>
+void StridedSlice<int, lang::Cuda>(const Tensor& in, const vector<int>& starts,
+                                   const vector<int>& steps, Tensor* out,
+                                   Context* ctx) {
+  strided_slice_cuda<int>(in, starts, steps, out, ctx);
+}
+
+template <>
+void StridedSliceBackward<float, lang::Cuda>(const Tensor& in,
+                                             const vector<int>& starts,
+                                             const vector<int>& steps,
+                                             Tensor* out, Context* ctx) {
+  CHECK_LE(out->nDim(), cuda::kMaxStridedDim);
+  const float* inPtr = static_cast<const float*>(in.block()->data());
+  float* outPtr = static_cast<float*>(out->block()->mutable_data());
+  CUDA_CHECK(
+      cudaMemsetAsync(outPtr, 0, out->Size() * sizeof(float), ctx->stream));
+  vector<int> strides(out->nDim());
+  for (size_t k = 0; k < out->nDim(); k++) {
+    outPtr += static_cast<ptrdiff_t>(starts[k]) * out->stride()[k];
+    strides[k] = steps[k] * out->stride()[k];
+  }
+  cuda::StridedCopy(in.nDim(), in.shape().data(), in.stride().data(),
+                    strides.data(), inPtr, outPtr, ctx->stream);
+}
+
+template <typename DType>
+void index_map_cuda(const Tensor& in, const Tensor& maps, const DType value,
+                    Tensor* out, Context* ctx) {
+  CHECK_LE(out->nDim(), cuda::kMaxStridedDim);
+  const DType* inPtr = static_cast<const DType*>(in.block()->data());
+  const int* mapPtr = static_cast<const int*>(maps.block()->data());
+  DType* outPtr = static_cast<DType*>(out->block()->mutable_data());
+  cuda::IndexMap(out->nDim(), out->shape().data(), in.stride().data(), mapPtr,
+                 inPtr, value, outPtr, ctx->stream);
+}
+
+template <>
+void IndexMap<float, lang::Cuda>(const Tensor& in, const Tensor& maps,
+                                 const float value, Tensor* out, Context* ctx) {
+  index_map_cuda<float>(in, maps, value, out, ctx);
+}
+
+template <>
+void IndexMap<int, lang::Cuda>(const Tensor& in, const Tensor& maps,
+                               const int value, Tensor* out, Context* ctx) {
+  index_map_cuda<int>(in, maps, value, out, ctx);
+}
+
+template <>
+void IndexMapBackward<float, lang::Cuda>(const Tensor& in, const Tensor& maps,
+                                         Tensor* out, Context* ctx) {
+  CHECK_LE(in.nDim(), cuda::kMaxStridedDim);
+  const float* inPtr = static_cast<const float*>(in.block()->data());
+  const int* mapPtr = static_cast<const int*>(maps.block()->data());
+  float* outPtr = static_cast<float*>(out->block()->mutable_data());
+  CUDA_CHECK(
+      cudaMemsetAsync(outPtr, 0, out->Size() * sizeof(float), ctx->stream));
+  cuda::IndexMapBackward(in.nDim(), in.shape().data(), out->stride().data(),
+                         mapPtr, inPtr, outPtr, ctx->stream);
+}
+
+template <>
+void PackedDropout<float, lang::Cuda>(const float ratio, const Tensor& in,
+                                      Tensor* mask, Tensor* out, Context* ctx) {
+  const float* inPtr = static_cast<const float*>(in.block()->data());
+  uint32_t* maskPtr = static_cast<uint32_t*>(mask->block()->mutable_data());
+  float* outPtr = static_cast<float*>(out->block()->mutable_data());
+  // the random numbers are generated into out and replaced by the outputs
+  CURAND_CHECK(curandGenerateUniform(ctx->curand_generator, outPtr, in.Size()));
+  cuda::PackedDropout(in.Size(), ratio, inPtr, maskPtr, outPtr, ctx->stream);
+}
+
+template <>
+void PackedDropoutBackward<float, lang::Cuda>(const float ratio,
+                                              const Tensor& in,
+                                              const Tensor& mask, Tensor* out,
+                                              Context* ctx) {
+  const float* inPtr = static_cast<const float*>(in.block()->data());
+  const uint32_t* maskPtr = static_cast<const uint32_t*>(mask.block()->data());
+  float* outPtr = static_cast<float*>(out->block()->mutable_data());
+  cuda::PackedDropoutBackward(in.Size(), ratio, inPtr, maskPtr, outPtr,
+                              ctx->stream);
+}
+
+template <>
+void CoalesceRows<float, lang::Cuda>(const size_t dim, const size_t num,
+                                     const Tensor& indices, const Tensor& in,
+                                     Tensor* out_indices, Tensor* out,
+                                     Context* ctx) {
+  const float* inPtr = static_cast<const float*>(in.block()->data());
+  const int* idxPtr = static_cast<const int*>(indices.block()->data());
+  int* outIdxPtr = static_cast<int*>(out_indices->block()->mutable_data());
+  float* outPtr = static_cast<float*>(out->block()->mutable_data());
+  cuda::CoalesceRows(num, dim, idxPtr, inPtr, outIdxPtr, outPtr, ctx->stream);
+}
+
+// Return the mutable data pointers of the tensors
+inline vector<float*> MutableDataPtrs(const vector<Tensor>& tensors) {
+  vector<float*> ptrs;
+  for (const auto& t : tensors)
+    ptrs.push_back(static_cast<float*>(t.block()->mutable_data()));
+  return ptrs;
+}
+
+template <>
+void MultiTensorSGD<float, lang::Cuda>(
+    const vector<Tensor>& grads, const vector<Tensor>& params,
+    const vector<Tensor>& moments, const Tensor& lr, const Tensor& momentum,
+    const Tensor& dampening, const Tensor& weight_decay, bool nesterov,
+    Context* ctx) {
+  vector<size_t> sizes;
+  vector<const float*> gPtrs;
+  for (size_t k = 0; k < params.size(); k++) {
+    sizes.push_back(params[k].Size());
+    gPtrs.push_back(static_cast<const float*>(grads[k].block()->data()));
+  }
+  vector<float*> pPtrs = MutableDataPtrs(params);
+  vector<float*> mPtrs = MutableDataPtrs(moments);
+  cuda::MultiTensorSGD(
+      params.size(), sizes.data(), gPtrs.data(), pPtrs.data(),
+      moments.empty() ? nullptr : mPtrs.data(),
+      static_cast<const float*>(lr.block()->data()),
+      static_cast<const float*>(momentum.block()->data()),
+      static_cast<const float*>(dampening.block()->data()),
+      static_cast<const float*>(weight_decay.block()->data()), nesterov,
+      ctx->stream);
+}
+
+template <>
+void MultiTensorAdam<float, lang::Cuda>(
+    const vector<Tensor>& grads, const vector<Tensor>& params,
+    const vector<Tensor>& m, const vector<Tensor>& v, const Tensor& lr,
+    const Tensor& beta_1, const Tensor& beta_2, const Tensor& epsilon,
+    const Tensor& weight_decay, const Tensor& step, Context* ctx) {
+  vector<size_t> sizes;
+  vector<const float*> gPtrs;
+  for (size_t k = 0; k < params.size(); k++) {
+    sizes.push_back(params[k].Size());
+    gPtrs.push_back(static_cast<const float*>(grads[k].block()->data()));
+  }
+  vector<float*> pPtrs = MutableDataPtrs(params);
+  vector<float*> mPtrs = MutableDataPtrs(m), vPtrs = MutableDataPtrs(v);
+  cuda::MultiTensorAdam(
+      params.size(), sizes.data(), gPtrs.data(), pPtrs.data(), mPtrs.data(),
+      vPtrs.data(), static_cast<const float*>(lr.block()->data()),
+      static_cast<const float*>(beta_1.block()->data()),
+      static_cast<const float*>(beta_2.block()->data()),
+      static_cast<const float*>(epsilon.block()->data()),
+      static_cast<const float*>(weight_decay.block()->data()),
+      static_cast<const float*>(step.block()->data()), ctx->stream);
+}
+
 }  // namespace singa
 
 #endif  // USE_CUDA
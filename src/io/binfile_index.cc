@@ -0,0 +1,57 @@
+/**
+ * Licensed to the Apache Software Foundation (ASF) under one
+ * or more contributor license agreements.  See the NOTICE file
+ * distributed with this work for additional information
+ * regarding copyright ownership.  The ASF licenses this file
+ * to you under the Apache License, Version 2.0 (the
+ * "License"); you may not use this file except in compliance
+ * with the License.  You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+ */
+
+#include "singa/io/binfile_index.h"
+
+#include <fstream>
+
+namespace singa {
+namespace io {
+bool BinFileIndexMatches(const BinFileIndexEntry* index, size_t num,
+                         const std::string& path, size_t filesize) {
+  // magic word + value length
+  const uint64_t kMinTupleSize = 4 + sizeof(size_t);
+  if (num == 0) return filesize == 0;
+  if (index[0].offset != 0) return false;
+  for (size_t i = 1; i < num; i++)
+    if (index[i].offset < index[i - 1].offset + kMinTupleSize) return false;
+  uint64_t last = index[num - 1].offset;
+  if (last + kMinTupleSize > filesize) return false;
+
+  // parse the header of the last tuple to get its end
+  std::ifstream fin(path, std::ios::in | std::ios::binary);
+  if (!fin.is_open()) return false;
+  fin.seekg(last);
+  char magic[4];
+  size_t len;
+  uint64_t end = last + sizeof(magic);
+  fin.read(magic, sizeof(magic));
+  if (!fin.good() || magic[0] != 's' || magic[1] != 'g') return false;
+  if (magic[2] == 1) {
+    fin.read(reinterpret_cast<char*>(&len), sizeof(len));
+    if (!fin.good()) return false;
+    end += sizeof(len) + len;
+    fin.seekg(len, std::ios_base::cur);
+  }
+  fin.read(reinterpret_cast<char*>(&len), sizeof(len));
+  if (!fin.good()) return false;
+  end += sizeof(len) + len;
+  return end == filesize;
+}
+}  // namespace io
+}  // namespace singa
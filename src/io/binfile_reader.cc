@@ -16,6 +16,14 @@
  * limitations under the License.
  */
 
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+
+#include <algorithm>
+#include <numeric>
+
 #include "singa/io/reader.h"
 #include "singa/utils/logging.h"
 
@@ -38,10 +46,26 @@ void BinFileReader::Close() {
     buf_ = nullptr;
   }
   if (fdat_.is_open()) fdat_.close();
+  if (index_ != nullptr) {
+    munmap(const_cast<BinFileIndexEntry*>(index_),
+           num_entries_ * sizeof(BinFileIndexEntry));
+    index_ = nullptr;
+    num_entries_ = 0;
+  }
+  if (fd_ >= 0) {
+    close(fd_);
+    fd_ = -1;
+  }
+  shuffle_ = false;
+  order_.clear();
 }
 
 bool BinFileReader::Read(std::string* key, std::string* value) {
   CHECK(fdat_.is_open()) << "File not open!";
+  if (shuffle_) {
+    if (pos_ >= order_.size()) return false;
+    return ReadAt(order_[pos_++], key, value);
+  }
   char magic[4];
   int smagic = sizeof(magic);
   if (!PrepareNextField(smagic)) return false;
@@ -62,6 +86,7 @@ bool BinFileReader::Read(std::string* key, std::string* value) {
 }
 
 int BinFileReader::Count() {
+  if (has_index()) return static_cast<int>(num_entries_);
   std::ifstream fin(path_, std::ios::in | std::ios::binary);
   CHECK(fin.is_open()) << "Cannot create file " << path_;
   int count = 0;
@@ -92,6 +117,104 @@ void BinFileReader::SeekToFirst() {
   fdat_.clear();
   fdat_.seekg(0);
   CHECK(fdat_.is_open()) << "Cannot create file " << path_;
+  if (shuffle_) {
+    std::shuffle(order_.begin(), order_.end(), rng_);
+    pos_ = 0;
+  }
+}
+
+void BinFileReader::Seek(int i) {
+  CHECK(has_index()) << "Seek requires the index file of " << path_;
+  CHECK(i >= 0 && static_cast<size_t>(i) < num_entries_)
+      << "Tuple index " << i << " is out of range [0, " << num_entries_ << ")";
+  if (shuffle_) {
+    pos_ = i;
+  } else {
+    bufsize_ = 0;
+    offset_ = 0;
+    fdat_.clear();
+    fdat_.seekg(index_[i].offset);
+  }
+}
+
+bool BinFileReader::ReadAt(int i, std::string* key, std::string* value) const {
+  CHECK(has_index()) << "ReadAt requires the index file of " << path_;
+  if (i < 0 || static_cast<size_t>(i) >= num_entries_) return false;
+  size_t begin = index_[i].offset;
+  size_t end = static_cast<size_t>(i) + 1 < num_entries_ ? index_[i + 1].offset
+                                                         : filesize_;
+  // read the whole tuple with one pread, which does not share the file offset
+  std::string buf(end - begin, '\0');
+  size_t done = 0;
+  while (done < buf.size()) {
+    ssize_t ret = pread(fd_, &buf[done], buf.size() - done, begin + done);
+    CHECK_GT(ret, 0) << "Cannot read tuple " << i << " of " << path_;
+    done += ret;
+  }
+
+  size_t pos = 4;
+  auto read_field = [&buf, &pos](std::string* content) {
+    size_t len;
+    CHECK_LE(pos + sizeof(len), buf.size()) << "File format error!";
+    memcpy(&len, &buf[pos], sizeof(len));
+    pos += sizeof(len);
+    CHECK_LE(pos + len, buf.size()) << "File format error!";
+    content->assign(buf, pos, len);
+    pos += len;
+  };
+  if (buf.size() < 4 || buf[0] != kMagicWord[0] || buf[1] != kMagicWord[1] ||
+      (buf[2] != 0 && buf[2] != 1))
+    LOG(FATAL) << "File format error: magic word does not match!";
+  if (buf[2] == 1)
+    read_field(key);
+  else
+    key->clear();
+  read_field(value);
+  return true;
+}
+
+void BinFileReader::ReadMany(const std::vector<int>& indices,
+                             std::vector<std::string>* keys,
+                             std::vector<std::string>* values) const {
+  CHECK(has_index()) << "ReadMany requires the index file of " << path_;
+  for (int i : indices)
+    CHECK(i >= 0 && static_cast<size_t>(i) < num_entries_)
+        << "Tuple index " << i << " is out of range [0, " << num_entries_
+        << ")";
+  keys->resize(indices.size());
+  values->resize(indices.size());
+#ifdef USE_OPENMP
+#pragma omp parallel for schedule(dynamic)
+#endif  // USE_OPENMP
+  for (int k = 0; k < static_cast<int>(indices.size()); k++)
+    ReadAt(indices[k], &keys->at(k), &values->at(k));
+}
+
+int BinFileReader::Find(const std::string& key) const {
+  CHECK(has_index()) << "Find requires the index file of " << path_;
+  uint64_t hash = BinFileKeyHash(key);
+  std::string k, v;
+  for (size_t i = 0; i < num_entries_; i++) {
+    if (index_[i].key_hash != hash) continue;
+    // confirm the key in case of hash collisions
+    ReadAt(static_cast<int>(i), &k, &v);
+    if (k == key) return static_cast<int>(i);
+  }
+  return -1;
+}
+
+void BinFileReader::Shuffle(bool shuffle, unsigned seed) {
+  shuffle_ = shuffle;
+  pos_ = 0;
+  if (!shuffle) {
+    order_.clear();
+    return;
+  }
+  CHECK(has_index()) << "Shuffle requires the index file of " << path_;
+  order_.resize(num_entries_);
+  std::iota(order_.begin(), order_.end(), 0);
+  rng_.seed(seed);
+  std::shuffle(order_.begin(), order_.end(), rng_);
 }
 
 bool BinFileReader::OpenFile() {
@@ -99,9 +222,39 @@ bool BinFileReader::OpenFile() {
   fdat_.open(path_, std::ios::in | std::ios::binary);
   if (!fdat_.is_open())
     LOG(WARNING) << "Cannot open file " << path_;
+  else
+    OpenIndex();
   return fdat_.is_open();
 }
 
+void BinFileReader::OpenIndex() {
+  int fidx = open((path_ + kBinFileIndexSuffix).c_str(), O_RDONLY);
+  if (fidx < 0) return;
+  struct stat st;
+  fd_ = open(path_.c_str(), O_RDONLY);
+  CHECK_GE(fd_, 0) << "Cannot open file " << path_;
+  CHECK_EQ(fstat(fd_, &st), 0);
+  filesize_ = st.st_size;
+  CHECK_EQ(fstat(fidx, &st), 0);
+  size_t num = st.st_size / sizeof(BinFileIndexEntry);
+  if (st.st_size % sizeof(BinFileIndexEntry) != 0) {
+    LOG(WARNING) << "Ignore the truncated index file of " << path_;
+  } else if (num > 0) {
+    void* addr = mmap(nullptr, num * sizeof(BinFileIndexEntry), PROT_READ,
+                      MAP_SHARED, fidx, 0);
+    CHECK(addr != MAP_FAILED) << "Cannot map the index file of " << path_;
+    index_ = static_cast<const BinFileIndexEntry*>(addr);
+    num_entries_ = num;
+    if (!BinFileIndexMatches(index_, num, path_, filesize_)) {
+      LOG(WARNING) << "Ignore the index file that does not match " << path_;
+      munmap(addr, num * sizeof(BinFileIndexEntry));
+      index_ = nullptr;
+      num_entries_ = 0;
+    }
+  }
+  close(fidx);
+}
+
 bool BinFileReader::ReadField(std::string* content) {
   content->clear();
   int ssize = sizeof(size_t);
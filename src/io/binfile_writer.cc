@@ -16,6 +16,8 @@
  * limitations under the License.
  */
 
+#include <cstdio>
+
 #include "singa/io/writer.h"
 #include "singa/utils/logging.h"
 
@@ -35,6 +37,12 @@ bool BinFileWriter::Open(const std::string& path, Mode mode, int capacity) {
   return OpenFile();
 }
 
+bool BinFileWriter::Open(const std::string& path, Mode mode, int capacity,
+                         bool index) {
+  index_ = index;
+  return Open(path, mode, capacity);
+}
+
 void BinFileWriter::Close() {
   Flush();
   if (buf_ != nullptr) {
@@ -42,6 +50,8 @@ void BinFileWriter::Close() {
     buf_ = nullptr;
   }
   if (fdat_.is_open()) fdat_.close();
+  if (fidx_.is_open()) fidx_.close();
+  index_ = false;
 }
 
 bool BinFileWriter::Write(const std::string& key, const std::string& value) {
@@ -62,10 +72,12 @@ bool BinFileWriter::Write(const std::string& key, const std::string& value) {
 
   if (bufsize_ + size > capacity_) {
     fdat_.write(buf_, bufsize_);
+    written_ += bufsize_;
     bufsize_ = 0;
     CHECK_LE(size, capacity_) << "Tuple size is larger than capacity "
                               << "Try a larger capacity size";
   }
+  if (index_) entries_.push_back({written_ + bufsize_, BinFileKeyHash(key)});
 
   memcpy(buf_ + bufsize_, magic, sizeof(magic));
   bufsize_ += sizeof(magic);
@@ -86,8 +98,16 @@ void BinFileWriter::Flush() {
   if (bufsize_ > 0) {
     fdat_.write(buf_, bufsize_);
     fdat_.flush();
+    written_ += bufsize_;
     bufsize_ = 0;
   }
+  if (entries_.size() > 0) {
+    fdat_.flush();
+    fidx_.write(reinterpret_cast<const char*>(entries_.data()),
+                entries_.size() * sizeof(BinFileIndexEntry));
+    fidx_.flush();
+    entries_.clear();
+  }
 }
 
 bool BinFileWriter::OpenFile() {
@@ -106,7 +126,63 @@ bool BinFileWriter::OpenFile() {
       LOG(FATAL) << "unknown mode to open binary file " << mode_;
       break;
   }
+  written_ = 0;
+  if (mode_ == kAppend) {
+    std::ifstream fin(path_, std::ios::in | std::ios::binary | std::ios::ate);
+    written_ = static_cast<size_t>(fin.tellg());
+  }
+  if (index_)
+    OpenIndexFile();
+  else  // the tuples written now would not be in the index file
+    std::remove((path_ + kBinFileIndexSuffix).c_str());
   return fdat_.is_open();
 }
+
+void BinFileWriter::OpenIndexFile() {
+  std::string path = path_ + kBinFileIndexSuffix;
+  if (mode_ == kAppend) {
+    std::ifstream fin(path, std::ios::in | std::ios::binary | std::ios::ate);
+    if (fin.is_open()) {
+      size_t size = static_cast<size_t>(fin.tellg());
+      std::vector<BinFileIndexEntry> index(size / sizeof(BinFileIndexEntry));
+      fin.seekg(0);
+      fin.read(reinterpret_cast<char*>(index.data()),
+               index.size() * sizeof(BinFileIndexEntry));
+      fin.close();
+      if (size % sizeof(BinFileIndexEntry) == 0 &&
+          BinFileIndexMatches(index.data(), index.size(), path_, written_)) {
+        fidx_.open(path, std::ios::app | std::ios::binary);
+        CHECK(fidx_.is_open()) << "Cannot open file " << path;
+        return;
+      }
+      LOG(WARNING) << "Rebuild the index file that does not match " << path_;
+    }
+  }
+  fidx_.open(path, std::ios::binary | std::ios::out | std::ios::trunc);
+  CHECK(fidx_.is_open()) << "Cannot create file " << path;
+  if (written_ == 0) return;
+  // index the tuples written without a valid index file
+  std::ifstream fdat(path_, std::ios::in | std::ios::binary);
+  size_t offset = 0;
+  while (offset < written_) {
+    char magic[4];
+    size_t len;
+    std::string key;
+    fdat.read(magic, sizeof(magic));
+    CHECK(fdat.good() && magic[0] == kMagicWord[0] && magic[1] == kMagicWord[1])
+        << "File format error: magic word does not match!";
+    if (magic[2] == 1) {
+      fdat.read(reinterpret_cast<char*>(&len), sizeof(len));
+      key.resize(len);
+      fdat.read(&key[0], len);
+    }
+    fdat.read(reinterpret_cast<char*>(&len), sizeof(len));
+    fdat.seekg(len, std::ios_base::cur);
+    CHECK(fdat.good()) << "File format error: incomplete tuple";
+    entries_.push_back({offset, BinFileKeyHash(key)});
+    offset = static_cast<size_t>(fdat.tellg());
+  }
+  Flush();
+}
 }  // namespace io
 }  // namespace singa
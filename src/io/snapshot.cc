@@ -85,18 +85,30 @@ Snapshot::Snapshot(const std::string& prefix, Mode mode, int max_param_size /*in
 
 void Snapshot::Write(const std::string& key, const Tensor& param) {
   CHECK(mode_ == kWrite);
-  CHECK(param_names_.count(key) == 0);
-  param_names_.insert(key);
   TensorProto tp;
   param.ToProto(&tp);
+  WriteProto(key, tp);
+}
+
+void Snapshot::Write(const std::string& key, const Tensor& indices,
+                     const Tensor& values, const Shape& shape) {
+  CHECK(mode_ == kWrite);
+  TensorProto tp;
+  RowSparseToProto(indices, values, shape, &tp);
+  WriteProto(key, tp);
+}
+
+void Snapshot::WriteProto(const std::string& key, const TensorProto& tp) {
+  CHECK(param_names_.count(key) == 0);
+  param_names_.insert(key);
   std::string serialized_str;
   CHECK(tp.SerializeToString(&serialized_str));
   bin_writer_ptr_->Write(key, serialized_str);
 //  bin_writer_ptr_->Flush();
 
   std::string desc_str = "parameter name: " + key;
-  Shape shape = param.shape();
-  desc_str += "\tdata type: " + std::to_string(param.data_type());
+  Shape shape(tp.shape().begin(), tp.shape().end());
+  desc_str += "\tdata type: " + std::to_string(tp.data_type());
   desc_str += "\tdim: " + std::to_string(shape.size());
   desc_str += "\tshape:";
   for (size_t s : shape) desc_str += " " + std::to_string(s);
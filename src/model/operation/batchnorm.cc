@@ -21,9 +21,86 @@
 #include "batchnorm.h"
 
 #include <cctype>
+#include <cmath>
 
 namespace singa {
 
+namespace {
+
+// mean and (biased) variance of each channel of x viewed as (n, c, s); the
+// statistics of each contiguous run of s elements, which are computed while
+// the run is in cache, are merged by Chan's formula, i.e., the parallel form
+// of Welford's algorithm, to avoid the cancellation of E[x^2] - E[x]^2
+void NativeBatchNormStats(const float* x, size_t n, size_t c, size_t s,
+                          float* mean, float* var) {
+#ifdef USE_OPENMP
+#pragma omp parallel for num_threads(Platform::GetNumCpuThreads())
+#endif  // USE_OPENMP
+  for (long k = 0; k < (long)c; k++) {
+    double count = 0, m = 0, m2 = 0;
+    for (size_t i = 0; i < n; i++) {
+      const float* run = x + (i * c + k) * s;
+      float sum = 0.0f;
+      for (size_t j = 0; j < s; j++) sum += run[j];
+      float run_mean = sum / s, run_m2 = 0.0f;
+      for (size_t j = 0; j < s; j++)
+        run_m2 += (run[j] - run_mean) * (run[j] - run_mean);
+      double delta = run_mean - m, total = count + s;
+      m += delta * s / total;
+      m2 += run_m2 + delta * delta * count * s / total;
+      count = total;
+    }
+    mean[k] = m;
+    var[k] = m2 / count;
+  }
+}
+
+// y = x * a + b, where a and b are per channel
+void NativeBatchNormApply(const float* x, size_t n, size_t c, size_t s,
+                          const float* a, const float* b, float* y) {
+#ifdef USE_OPENMP
+#pragma omp parallel for num_threads(Platform::GetNumCpuThreads())
+#endif  // USE_OPENMP
+  for (long i = 0; i < (long)(n * c); i++) {
+    const float *in = x + i * s, ak = a[i % c], bk = b[i % c];
+    float* out = y + i * s;
+    for (size_t j = 0; j < s; j++) out[j] = in[j] * ak + bk;
+  }
+}
+
+void NativeBatchNormBackward(const float* x, const float* dy, size_t n,
+                             size_t c, size_t s, const float* scale,
+                             const float* mean, const float* var, float eps,
+                             float* dx, float* dscale, float* dbias) {
+  const float m = n * s;
+#ifdef USE_OPENMP
+#pragma omp parallel for num_threads(Platform::GetNumCpuThreads())
+#endif  // USE_OPENMP
+  for (long k = 0; k < (long)c; k++) {
+    const float inv_std = 1.0f / std::sqrt(var[k] + eps), mk = mean[k];
+    float sum_dy = 0.0f, sum_dy_xhat = 0.0f;
+    for (size_t i = 0; i < n; i++) {
+      const float *xr = x + (i * c + k) * s, *dyr = dy + (i * c + k) * s;
+      for (size_t j = 0; j < s; j++) {
+        sum_dy += dyr[j];
+        sum_dy_xhat += dyr[j] * (xr[j] - mk) * inv_std;
+      }
+    }
+    dbias[k] = sum_dy;
+    dscale[k] = sum_dy_xhat;
+    const float factor = scale[k] * inv_std / m;
+    for (size_t i = 0; i < n; i++) {
+      const float *xr = x + (i * c + k) * s, *dyr = dy + (i * c + k) * s;
+      float* dxr = dx + (i * c + k) * s;
+      for (size_t j = 0; j < s; j++)
+        dxr[j] = factor *
+                 (m * dyr[j] - sum_dy - (xr[j] - mk) * inv_std * sum_dy_xhat);
+    }
+  }
+}
+
+}  // namespace
+
 BatchNormHandle::BatchNormHandle(const float momentum, const Tensor& input) {
   factor = momentum;
   batchsize = input.shape(0);
@@ -43,7 +120,6 @@ BatchNormHandle::BatchNormHandle(const float momentum, const Tensor& input) {
 #ifdef USE_DNNL
   if (input.device()->lang() == kCpp) {
     use_dnnl = true;
-    epsilon = 1e-5f;
     x_dims = dnnl::memory::dims(input.shape().begin(), input.shape().end());
 
     // support f32 only
@@ -57,65 +133,110 @@ BatchNormHandle::BatchNormHandle(const float momentum, const Tensor& input) {
         dnnl::normalization_flags::use_scale_shift);
 
     auto eng = input.device()->context(0)->dnnl_engine;
+    auto key = dnnl_key("CpuBatchNormForwardTraining", eng, x_dims, epsilon,
+                        (int)dnnl::normalization_flags::use_scale_shift);
     bn_fwd_training_pd = new dnnl::batch_normalization_forward::primitive_desc(
-        *bn_fwd_training_d, eng);
+        dnnl_cached<dnnl::batch_normalization_forward::primitive_desc>(
+            key, [&]() {
+              return dnnl::batch_normalization_forward::primitive_desc(
+                  *bn_fwd_training_d, eng);
+            }));
   }
 #endif  // USE_DNNL
 };
 
 BatchNormHandle::~BatchNormHandle() {
 #ifdef USE_DNNL
-  if (use_dnnl) {
-    delete (bn_fwd_training_d);
-    delete (bn_fwd_training_pd);
-  }
+  delete (bn_fwd_training_d);
+  delete (bn_fwd_training_pd);
 #endif  // USE_DNNL
 }
 
-#ifdef USE_DNNL
-
 Tensor CpuBatchNormForwardInference(const BatchNormHandle& bnh, const Tensor& x,
                                     const Tensor& bnScale, const Tensor& bnBias,
                                     Tensor& running_mean, Tensor& running_var) {
   CHECK_EQ(x.device()->lang(), kCpp);
+
+#ifdef USE_DNNL
+  if (bnh.use_dnnl) {
+    Tensor y;
+    y.ResetLike(x);
+
+    Tensor w = get_bn_weight_from(bnScale, bnBias);
+
+    y.device()->Exec(
+        [y, w, x, &running_mean, &running_var, &bnh](Context* ctx) mutable {
+          auto eng = ctx->dnnl_engine;
+          using namespace dnnl;
+
+          auto x_mem = memory(bnh.x_md, eng, x.block()->mutable_data());
+          auto y_mem = memory(bnh.x_md, eng, y.block()->mutable_data());
+          // indicates using scale&bias and running mean&var
+          auto flags_ = normalization_flags::use_scale_shift |
+                        normalization_flags::use_global_stats;
+
+          auto key = dnnl_key("CpuBatchNormForwardInference", eng, bnh.x_dims,
+                              bnh.epsilon, (int)flags_);
+          auto bn_fwd_pd =
+              dnnl_cached<batch_normalization_forward::primitive_desc>(
+                  key, [&]() {
+                    auto bn_fwd_d = batch_normalization_forward::desc(
+                        prop_kind::forward_inference, bnh.x_md, bnh.epsilon,
+                        flags_);
+                    return batch_normalization_forward::primitive_desc(bn_fwd_d,
+                                                                       eng);
+                  });
+          auto m_mem = memory(bn_fwd_pd.mean_desc(), eng,
+                              running_mean.block()->mutable_data());
+          auto v_mem = memory(bn_fwd_pd.variance_desc(), eng,
+                              running_var.block()->mutable_data());
+          auto w_mem =
+              memory(bn_fwd_pd.weights_desc(), eng, w.block()->mutable_data());
+
+          // execution
+          dnnl_cached<batch_normalization_forward>(
+              key, [&]() { return batch_normalization_forward(bn_fwd_pd); })
+              .execute(ctx->dnnl_stream, {{DNNL_ARG_SRC, x_mem},
+                                          {DNNL_ARG_DST, y_mem},
+                                          {DNNL_ARG_SCALE_SHIFT, w_mem},
+                                          {DNNL_ARG_MEAN, m_mem},
+                                          {DNNL_ARG_VARIANCE, v_mem}});
+          ctx->dnnl_stream.wait();
+        },
+        {x.block(), w.block(), running_mean.block(), running_var.block()},
+        {y.block(), running_mean.block(), running_var.block()},
+        "CpuBatchNormForwardInference");
+
+    return y;
+  }
+#endif  // USE_DNNL
+
+  CHECK_EQ(x.data_type(), kFloat32)
+      << "the native batchnorm only supports float32";
   Tensor y;
   y.ResetLike(x);
 
-  Tensor w = get_bn_weight_from(bnScale, bnBias);
-
   y.device()->Exec(
-      [y, w, x, &running_mean, &running_var, &bnh](Context* ctx) mutable {
-        auto eng = ctx->dnnl_engine;
-        using namespace dnnl;
-
-        auto x_mem = memory(bnh.x_md, eng, x.block()->mutable_data());
-        auto y_mem = memory(bnh.x_md, eng, y.block()->mutable_data());
-        // indicates using scale&bias and running mean&var
-        auto flags_ = normalization_flags::use_scale_shift |
-                      normalization_flags::use_global_stats;
-
-        auto bn_fwd_d = batch_normalization_forward::desc(
-            prop_kind::forward_inference, bnh.x_md, bnh.epsilon, flags_);
-        auto bn_fwd_pd =
-            batch_normalization_forward::primitive_desc(bn_fwd_d, eng);
-        auto m_mem = memory(bn_fwd_pd.mean_desc(), eng,
-                            running_mean.block()->mutable_data());
-        auto v_mem = memory(bn_fwd_pd.variance_desc(), eng,
-                            running_var.block()->mutable_data());
-        auto w_mem =
-            memory(bn_fwd_pd.weights_desc(), eng, w.block()->mutable_data());
-
-        // execution
-        batch_normalization_forward(bn_fwd_pd).execute(
-            ctx->dnnl_stream, {{DNNL_ARG_SRC, x_mem},
-                               {DNNL_ARG_DST, y_mem},
-                               {DNNL_ARG_SCALE_SHIFT, w_mem},
-                               {DNNL_ARG_MEAN, m_mem},
-                               {DNNL_ARG_VARIANCE, v_mem}});
-        ctx->dnnl_stream.wait();
+      [y, x, bnScale, bnBias, running_mean, running_var,
+       &bnh](Context* ctx) mutable {
+        const size_t c = bnh.channels;
+        auto rm = static_cast<const float*>(running_mean.block()->data());
+        auto rv = static_cast<const float*>(running_var.block()->data());
+        auto scale = static_cast<const float*>(bnScale.block()->data());
+        auto bias = static_cast<const float*>(bnBias.block()->data());
+        std::vector<float> a(c), b(c);
+        for (size_t i = 0; i < c; i++) {
+          a[i] = scale[i] / std::sqrt(rv[i] + bnh.epsilon);
+          b[i] = bias[i] - rm[i] * a[i];
+        }
+        NativeBatchNormApply(static_cast<const float*>(x.block()->data()),
+                             x.shape(0), c, bnh.height * bnh.width, a.data(),
+                             b.data(),
+                             static_cast<float*>(y.block()->mutable_data()));
       },
-      {x.block(), w.block(), running_mean.block(), running_var.block()},
-      {y.block(), running_mean.block(), running_var.block()}, "CpuBatchNormForwardInference");
+      {x.block(), bnScale.block(), bnBias.block(), running_mean.block(),
+       running_var.block()},
+      {y.block()}, "CpuBatchNormForwardInference");
 
   return y;
 }
@@ -124,56 +245,111 @@ const std::vector<Tensor> CpuBatchNormForwardTraining(
     const BatchNormHandle& bnh, const Tensor& x, const Tensor& bnScale,
     const Tensor& bnBias, Tensor& running_mean, Tensor& running_var) {
   CHECK_EQ(x.device()->lang(), kCpp);
+
+#ifdef USE_DNNL
+  if (bnh.use_dnnl) {
+    Tensor y;
+    y.ResetLike(x);
+
+    // mean and var for local batch
+    Tensor mean;
+    mean.ResetLike(running_mean);
+    Tensor var;
+    var.ResetLike(running_var);
+
+    // combine scale and bias to construct weight tensor in required format for
+    // backward
+    Tensor w = get_bn_weight_from(bnScale, bnBias);
+
+    y.device()->Exec(
+        [y, mean, var, w, x, &running_mean, &running_var,
+         &bnh](Context* ctx) mutable {
+          auto eng = ctx->dnnl_engine;
+          using namespace dnnl;
+
+          auto x_mem = memory(bnh.x_md, eng, x.block()->mutable_data());
+          auto y_mem = memory(bnh.x_md, eng, y.block()->mutable_data());
+          auto m_mem = memory(bnh.bn_fwd_training_pd->mean_desc(), eng,
+                              mean.block()->mutable_data());
+          auto v_mem = memory(bnh.bn_fwd_training_pd->variance_desc(), eng,
+                              var.block()->mutable_data());
+          auto w_mem = memory(bnh.bn_fwd_training_pd->weights_desc(), eng,
+                              w.block()->mutable_data());
+
+          auto key =
+              dnnl_key("CpuBatchNormForwardTraining", eng, bnh.x_dims,
+                       bnh.epsilon, (int)normalization_flags::use_scale_shift);
+          dnnl_cached<batch_normalization_forward>(
+              key,
+              [&]() {
+                return batch_normalization_forward(*bnh.bn_fwd_training_pd);
+              })
+              .execute(ctx->dnnl_stream, {{DNNL_ARG_SRC, x_mem},
+                                          {DNNL_ARG_DST, y_mem},
+                                          {DNNL_ARG_SCALE_SHIFT, w_mem},
+                                          {DNNL_ARG_MEAN, m_mem},
+                                          {DNNL_ARG_VARIANCE, v_mem}});
+          ctx->dnnl_stream.wait();
+
+          // local implemented running mean as mkldnn does not support it yet:
+          // https://github.com/intel/mkl-dnn/issues/371
+          // https://github.com/intel/mkl-dnn/issues/517
+          // https://arxiv.org/pdf/1502.03167.pdf
+          auto s = x.shape();
+          s[1] = 1;
+          float p = Product(s);  // for unbiased variance
+          running_mean = running_mean * (1 - bnh.factor) + mean * bnh.factor;
+          running_var =
+              running_var * (1 - bnh.factor) + var * (p / (p - 1)) * bnh.factor;
+        },
+        {x.block(), w.block(), running_mean.block(), running_var.block()},
+        {y.block(), running_mean.block(), running_var.block(), mean.block(),
+         var.block()},
+        "CpuBatchNormForwardTraining");
+
+    return {y, mean, var};
+  }
+#endif  // USE_DNNL
+
+  CHECK_EQ(x.data_type(), kFloat32)
+      << "the native batchnorm only supports float32";
   Tensor y;
   y.ResetLike(x);
-
-  // mean and var for local batch
   Tensor mean;
   mean.ResetLike(running_mean);
   Tensor var;
   var.ResetLike(running_var);
 
-  // combine scale and bias to construct weight tensor in required format for
-  // backward
-  Tensor w = get_bn_weight_from(bnScale, bnBias);
-
   y.device()->Exec(
-      [y, mean, var, w, x, &running_mean, &running_var,
+      [y, mean, var, x, bnScale, bnBias, running_mean, running_var,
        &bnh](Context* ctx) mutable {
-        auto eng = ctx->dnnl_engine;
-        using namespace dnnl;
-
-        auto x_mem = memory(bnh.x_md, eng, x.block()->mutable_data());
-        auto y_mem = memory(bnh.x_md, eng, y.block()->mutable_data());
-        auto m_mem = memory(bnh.bn_fwd_training_pd->mean_desc(), eng,
-                            mean.block()->mutable_data());
-        auto v_mem = memory(bnh.bn_fwd_training_pd->variance_desc(), eng,
-                            var.block()->mutable_data());
-        auto w_mem = memory(bnh.bn_fwd_training_pd->weights_desc(), eng,
-                            w.block()->mutable_data());
-
-        batch_normalization_forward(*bnh.bn_fwd_training_pd)
-            .execute(ctx->dnnl_stream, {{DNNL_ARG_SRC, x_mem},
-                                        {DNNL_ARG_DST, y_mem},
-                                        {DNNL_ARG_SCALE_SHIFT, w_mem},
-                                        {DNNL_ARG_MEAN, m_mem},
-                                        {DNNL_ARG_VARIANCE, v_mem}});
-        ctx->dnnl_stream.wait();
-
-        // local implemented running mean as mkldnn does not support it yet:
-        // https://github.com/intel/mkl-dnn/issues/371
-        // https://github.com/intel/mkl-dnn/issues/517
-        // https://arxiv.org/pdf/1502.03167.pdf
-        auto s = x.shape();
-        s[1] = 1;
-        float p = Product(s);  // for unbiased variance
-        running_mean = running_mean * (1 - bnh.factor) + mean * bnh.factor;
-        running_var =
-            running_var * (1 - bnh.factor) + var * (p / (p - 1)) * bnh.factor;
+        const size_t n = x.shape(0), c = bnh.channels;
+        const size_t s = bnh.height * bnh.width;
+        auto m = static_cast<float*>(mean.block()->mutable_data());
+        auto v = static_cast<float*>(var.block()->mutable_data());
+        auto x_data = static_cast<const float*>(x.block()->data());
+        NativeBatchNormStats(x_data, n, c, s, m, v);
+
+        auto scale = static_cast<const float*>(bnScale.block()->data());
+        auto bias = static_cast<const float*>(bnBias.block()->data());
+        auto rm = static_cast<float*>(running_mean.block()->mutable_data());
+        auto rv = static_cast<float*>(running_var.block()->mutable_data());
+        float p = n * s;  // for unbiased variance
+        std::vector<float> a(c), b(c);
+        for (size_t i = 0; i < c; i++) {
+          a[i] = scale[i] / std::sqrt(v[i] + bnh.epsilon);
+          b[i] = bias[i] - m[i] * a[i];
+          rm[i] = rm[i] * (1 - bnh.factor) + m[i] * bnh.factor;
+          rv[i] = rv[i] * (1 - bnh.factor) + v[i] * (p / (p - 1)) * bnh.factor;
+        }
+        NativeBatchNormApply(x_data, n, c, s, a.data(), b.data(),
+                             static_cast<float*>(y.block()->mutable_data()));
       },
-      {x.block(), w.block(), running_mean.block(), running_var.block()},
+      {x.block(), bnScale.block(), bnBias.block(), running_mean.block(),
+       running_var.block()},
       {y.block(), running_mean.block(), running_var.block(), mean.block(),
-       var.block()}, "CpuBatchNormForwardTraining");
+       var.block()},
+      "CpuBatchNormForwardTraining");
 
   return {y, mean, var};
 }
@@ -190,73 +366,114 @@ const std::vector<Tensor> CpuBatchNormBackwardx(
   CHECK_EQ(bnScale.device()->lang(), kCpp);
   CHECK_EQ(bnBias.device()->lang(), kCpp);
 
+#ifdef USE_DNNL
+  if (bnh.use_dnnl) {
+    Tensor dx;
+    dx.ResetLike(dy);
+
+    // combine scale and bias to construct weight tensor in required format for
+    // backward
+    Tensor w = get_bn_weight_from(bnScale, bnBias);
+
+    // Tensor dw(Shape{bnScale.Size(), 2});
+    Tensor dw;
+    dw.ResetLike(w);
+
+    dx.device()->Exec(
+        [w, dw, dx, dy, x, y, mean, var, &bnh](Context* ctx) mutable {
+          auto eng = ctx->dnnl_engine;
+          using namespace dnnl;
+
+          auto x_mem = memory(bnh.x_md, eng, x.block()->mutable_data());
+          auto dx_mem = memory(bnh.x_md, eng, dx.block()->mutable_data());
+          auto y_mem = memory(bnh.x_md, eng, y.block()->mutable_data());
+          auto dy_mem = memory(bnh.x_md, eng, dy.block()->mutable_data());
+
+          auto m_mem = memory(bnh.bn_fwd_training_pd->mean_desc(), eng,
+                              mean.block()->mutable_data());
+          auto v_mem = memory(bnh.bn_fwd_training_pd->variance_desc(), eng,
+                              var.block()->mutable_data());
+          auto w_mem = memory(bnh.bn_fwd_training_pd->weights_desc(), eng,
+                              w.block()->mutable_data());
+
+          auto key =
+              dnnl_key("CpuBatchNormBackwardx", eng, bnh.x_dims, bnh.epsilon,
+                       (int)normalization_flags::use_scale_shift,
+                       (int)prop_kind::backward);
+          auto bn_bwd_pd =
+              dnnl_cached<batch_normalization_backward::primitive_desc>(
+                  key, [&]() {
+                    auto bn_bwd_d = batch_normalization_backward::desc(
+                        prop_kind::backward, bnh.x_md, bnh.x_md, bnh.epsilon,
+                        normalization_flags::use_scale_shift);
+                    return batch_normalization_backward::primitive_desc(
+                        bn_bwd_d, eng, *bnh.bn_fwd_training_pd);
+                  });
+
+          auto dw_mem = memory(bn_bwd_pd.diff_weights_desc(), eng,
+                               dw.block()->mutable_data());
+
+          dnnl_cached<batch_normalization_backward>(
+              key, [&]() { return batch_normalization_backward(bn_bwd_pd); })
+              .execute(ctx->dnnl_stream, {{DNNL_ARG_SRC, x_mem},
+                                          {DNNL_ARG_DIFF_SRC, dx_mem},
+                                          {DNNL_ARG_DIFF_DST, dy_mem},
+                                          {DNNL_ARG_MEAN, m_mem},
+                                          {DNNL_ARG_VARIANCE, v_mem},
+                                          {DNNL_ARG_DIFF_SCALE_SHIFT, dw_mem},
+                                          {DNNL_ARG_SCALE_SHIFT, w_mem}});
+          ctx->dnnl_stream.wait();
+        },
+        {x.block(), dy.block(), mean.block(), var.block(), w.block(),
+         y.block()},
+        {dx.block(), dw.block()}, "CpuBatchNormBackwardx");
+
+    singa::Tensor dbnScale(bnScale.shape());
+    CopyDataToFrom(&dbnScale, dw, bnScale.Size(), 0, 0);
+    singa::Tensor dbnBias(bnBias.shape());
+    CopyDataToFrom(&dbnBias, dw, bnBias.Size(), 0, bnScale.Size());
+
+    CHECK(dbnScale.nDim() == bnScale.nDim())
+        << "dbnScale ndim not match bnScale";
+    CHECK(dbnBias.nDim() == bnBias.nDim()) << "dbnScale ndim not match bnScale";
+    CHECK(dbnScale.shape()[0] == bnScale.shape()[0])
+        << "dbnScale shape not match bnScale";
+    CHECK(dbnBias.shape()[0] == bnBias.shape()[0])
+        << "dbnBias shape not match bnBias";
+
+    return {dx, dbnScale, dbnBias};
+  }
+#endif  // USE_DNNL
+
+  CHECK_EQ(dy.data_type(), kFloat32)
+      << "the native batchnorm only supports float32";
   Tensor dx;
   dx.ResetLike(dy);
-
-  // combine scale and bias to construct weight tensor in required format for
-  // backward
-  Tensor w = get_bn_weight_from(bnScale, bnBias);
-
-  // Tensor dw(Shape{bnScale.Size(), 2});
-  Tensor dw;
-  dw.ResetLike(w);
+  Tensor dbnScale;
+  dbnScale.ResetLike(bnScale);
+  Tensor dbnBias;
+  dbnBias.ResetLike(bnBias);
 
   dx.device()->Exec(
-      [w, dw, dx, dy, x, y, mean, var, &bnh](Context* ctx) mutable {
-        auto eng = ctx->dnnl_engine;
-        using namespace dnnl;
-
-        auto x_mem = memory(bnh.x_md, eng, x.block()->mutable_data());
-        auto dx_mem = memory(bnh.x_md, eng, dx.block()->mutable_data());
-        auto y_mem = memory(bnh.x_md, eng, y.block()->mutable_data());
-        auto dy_mem = memory(bnh.x_md, eng, dy.block()->mutable_data());
-
-        auto m_mem = memory(bnh.bn_fwd_training_pd->mean_desc(), eng,
-                            mean.block()->mutable_data());
-        auto v_mem = memory(bnh.bn_fwd_training_pd->variance_desc(), eng,
-                            var.block()->mutable_data());
-        auto w_mem = memory(bnh.bn_fwd_training_pd->weights_desc(), eng,
-                            w.block()->mutable_data());
-
-        auto bn_bwd_d = batch_normalization_backward::desc(
-            prop_kind::backward, bnh.x_md, bnh.x_md, bnh.epsilon,
-            normalization_flags::use_scale_shift);
-        auto bn_bwd_pd = batch_normalization_backward::primitive_desc(
-            bn_bwd_d, eng, *bnh.bn_fwd_training_pd);
-
-        auto dw_mem = memory(bn_bwd_pd.diff_weights_desc(), eng,
-                             dw.block()->mutable_data());
-
-        batch_normalization_backward(bn_bwd_pd).execute(
-            ctx->dnnl_stream, {{DNNL_ARG_SRC, x_mem},
-                               {DNNL_ARG_DIFF_SRC, dx_mem},
-                               {DNNL_ARG_DIFF_DST, dy_mem},
-                               {DNNL_ARG_MEAN, m_mem},
-                               {DNNL_ARG_VARIANCE, v_mem},
-                               {DNNL_ARG_DIFF_SCALE_SHIFT, dw_mem},
-                               {DNNL_ARG_SCALE_SHIFT, w_mem}});
-        ctx->dnnl_stream.wait();
+      [dx, dbnScale, dbnBias, dy, x, bnScale, mean, var,
+       &bnh](Context* ctx) mutable {
+        NativeBatchNormBackward(
+            static_cast<const float*>(x.block()->data()),
+            static_cast<const float*>(dy.block()->data()), x.shape(0),
+            bnh.channels, bnh.height * bnh.width,
+            static_cast<const float*>(bnScale.block()->data()),
+            static_cast<const float*>(mean.block()->data()),
+            static_cast<const float*>(var.block()->data()), bnh.epsilon,
+            static_cast<float*>(dx.block()->mutable_data()),
+            static_cast<float*>(dbnScale.block()->mutable_data()),
+            static_cast<float*>(dbnBias.block()->mutable_data()));
       },
-      {x.block(), dy.block(), mean.block(), var.block(), w.block(), y.block()},
-      {dx.block(), dw.block()}, "CpuBatchNormBackwardx");
-
-  singa::Tensor dbnScale(bnScale.shape());
-  CopyDataToFrom(&dbnScale, dw, bnScale.Size(), 0, 0);
-  singa::Tensor dbnBias(bnBias.shape());
-  CopyDataToFrom(&dbnBias, dw, bnBias.Size(), 0, bnScale.Size());
-
-  CHECK(dbnScale.nDim() == bnScale.nDim()) << "dbnScale ndim not match bnScale";
-  CHECK(dbnBias.nDim() == bnBias.nDim()) << "dbnScale ndim not match bnScale";
-  CHECK(dbnScale.shape()[0] == bnScale.shape()[0])
-      << "dbnScale shape not match bnScale";
-  CHECK(dbnBias.shape()[0] == bnBias.shape()[0])
-      << "dbnBias shape not match bnBias";
+      {x.block(), dy.block(), bnScale.block(), mean.block(), var.block()},
+      {dx.block(), dbnScale.block(), dbnBias.block()}, "CpuBatchNormBackwardx");
 
   return {dx, dbnScale, dbnBias};
 }
 
-#endif  // USE_DNNL
-
 #ifdef USE_CUDNN
 CudnnBatchNormHandle::CudnnBatchNormHandle(const float momentum,
                                            const Tensor& input)
@@ -60,19 +60,20 @@ class BatchNormHandle {
   bool is_2d;
   // bool train = true;
   bool use_dnnl =
-      false;  // useful flag if both USE_CUDNN and USE_DNNL are enabled
+      false;  // useful flag if both USE_CUDNN and USE_DNNL are enabled;
+              // set it to false to run the native cpp path
+  float epsilon = 1e-5f;
 
 #ifdef USE_DNNL
-  float epsilon;
   dnnl::memory::dims x_dims;
   dnnl::memory::desc x_md;
   // as no default constructor, we need to declare it as pointer
-  dnnl::batch_normalization_forward::desc *bn_fwd_training_d;
-  dnnl::batch_normalization_forward::primitive_desc *bn_fwd_training_pd;
+  dnnl::batch_normalization_forward::desc *bn_fwd_training_d = nullptr;
+  dnnl::batch_normalization_forward::primitive_desc *bn_fwd_training_pd =
+      nullptr;
 #endif  // USE_DNNL
 };
 
-#ifdef USE_DNNL
 Tensor CpuBatchNormForwardInference(const BatchNormHandle &bnh, const Tensor &x,
                                     const Tensor &bnScale, const Tensor &bnBias,
                                     Tensor &running_mean, Tensor &running_var);
@@ -85,7 +86,6 @@ const std::vector<Tensor> CpuBatchNormBackwardx(
     const BatchNormHandle &bnh, const Tensor &y, const Tensor &dy,
     const Tensor &x, const Tensor &bnScale, const Tensor &bnBias,
     const Tensor &mean, const Tensor &var);
-#endif  // USE_DNNL
 
 #ifdef USE_CUDNN
 
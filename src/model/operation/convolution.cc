@@ -22,10 +22,261 @@
 
 #include "convolution.h"
 
+#include <algorithm>
 #include <cctype>
 
+#include "sgemm.h"
+
 namespace singa {
 
+namespace {
+
+// max number of floats in the col buffer of the native cpp path (256MB);
+// a batch is processed in chunks of samples if its columns exceed it
+const size_t kMaxColBufferSize = 1 << 26;
+
+// 1x1 kernel without stride and padding, whose columns are the input itself
+bool IsPointwise(const ConvHandle &ch) {
+  return ch.kernel_h == 1 && ch.kernel_w == 1 && ch.stride_h == 1 &&
+         ch.stride_w == 1 && ch.pad_h == 0 && ch.pad_w == 0;
+}
+
+// one group per input channel, which is computed by direct loops
+bool IsDepthwise(const ConvHandle &ch) {
+  return ch.group > 1 && ch.group == ch.channels;
+}
+
+// number of samples whose columns are put into the col buffer together
+size_t ColBatch(const ConvHandle &ch, size_t batchsize) {
+  size_t sample = (ch.channels * ch.kernel_h * ch.kernel_w + ch.num_filters) *
+                  ch.conv_height * ch.conv_width;
+  return std::max<size_t>(1, std::min(batchsize, kMaxColBufferSize / sample));
+}
+
+// the buffer is allocated from the device pool for each native call and is
+// released once the call is done, hence the handles do not hold the memory
+Tensor ColBuffer(const ConvHandle &ch, size_t batchsize,
+                 std::shared_ptr<Device> dev) {
+  size_t size = 1;
+  if (!IsPointwise(ch) && !IsDepthwise(ch))
+    size = ColBatch(ch, batchsize) *
+           (ch.channels * ch.kernel_h * ch.kernel_w + ch.num_filters) *
+           ch.conv_height * ch.conv_width;
+  return Tensor(Shape{size}, dev);
+}
+
+// im2col of nb samples; the columns of sample n are at [n * conv_size,
+// (n + 1) * conv_size) of each row, so that one gemm covers all of them
+void BatchIm2col(const float *x, size_t nb, const ConvHandle &ch, float *col) {
+  const size_t conv_size = ch.conv_height * ch.conv_width;
+  const int h = ch.height, w = ch.width;
+  for (size_t c = 0; c < ch.channels; c++)
+    for (size_t i = 0; i < ch.kernel_h; i++)
+      for (size_t j = 0; j < ch.kernel_w; j++) {
+        float *dst =
+            col + ((c * ch.kernel_h + i) * ch.kernel_w + j) * nb * conv_size;
+        for (size_t n = 0; n < nb; n++) {
+          const float *im = x + (n * ch.channels + c) * h * w;
+          for (size_t oh = 0; oh < ch.conv_height; oh++) {
+            int ih = (int)(oh * ch.stride_h + i) - (int)ch.pad_h;
+            if (ih < 0 || ih >= h) {
+              std::fill(dst, dst + ch.conv_width, 0.0f);
+              dst += ch.conv_width;
+              continue;
+            }
+            for (size_t ow = 0; ow < ch.conv_width; ow++) {
+              int iw = (int)(ow * ch.stride_w + j) - (int)ch.pad_w;
+              *dst++ = (iw >= 0 && iw < w) ? im[ih * w + iw] : 0.0f;
+            }
+          }
+        }
+      }
+}
+
+// the reverse of BatchIm2col, which accumulates the columns into x
+void BatchCol2im(const float *col, size_t nb, const ConvHandle &ch, float *x) {
+  const size_t conv_size = ch.conv_height * ch.conv_width;
+  const int h = ch.height, w = ch.width;
+  for (size_t c = 0; c < ch.channels; c++)
+    for (size_t i = 0; i < ch.kernel_h; i++)
+      for (size_t j = 0; j < ch.kernel_w; j++) {
+        const float *src =
+            col + ((c * ch.kernel_h + i) * ch.kernel_w + j) * nb * conv_size;
+        for (size_t n = 0; n < nb; n++) {
+          float *im = x + (n * ch.channels + c) * h * w;
+          for (size_t oh = 0; oh < ch.conv_height; oh++) {
+            int ih = (int)(oh * ch.stride_h + i) - (int)ch.pad_h;
+            if (ih < 0 || ih >= h) {
+              src += ch.conv_width;
+              continue;
+            }
+            for (size_t ow = 0; ow < ch.conv_width; ow++, src++) {
+              int iw = (int)(ow * ch.stride_w + j) - (int)ch.pad_w;
+              if (iw >= 0 && iw < w) im[ih * w + iw] += *src;
+            }
+          }
+        }
+      }
+}
+
+// copy nb samples of y from (n, f, p) to (f, n, p), i.e., the gemm layout
+void ToFilterMajor(const float *y, size_t nb, size_t num_filters,
+                   size_t conv_size, float *t) {
+  for (size_t n = 0; n < nb; n++)
+    for (size_t f = 0; f < num_filters; f++)
+      std::copy(y + (n * num_filters + f) * conv_size,
+                y + (n * num_filters + f + 1) * conv_size,
+                t + (f * nb + n) * conv_size);
+}
+
+// copy nb samples of y from (f, n, p) back to (n, f, p) and add the bias
+void ToSampleMajor(const float *t, const float *bias, size_t nb,
+                   size_t num_filters, size_t conv_size, float *y) {
+  for (size_t n = 0; n < nb; n++)
+    for (size_t f = 0; f < num_filters; f++) {
+      const float *src = t + (f * nb + n) * conv_size;
+      float *dst = y + (n * num_filters + f) * conv_size;
+      float v = bias == nullptr ? 0.0f : bias[f];
+      for (size_t p = 0; p < conv_size; p++) dst[p] = src[p] + v;
+    }
+}
+
+// the three loops of the depthwise convolution share the index computation;
+// op is called with (input index, weight index, output index) of each term
+template <typename Op>
+void DepthwiseLoop(size_t batchsize, const ConvHandle &ch, Op op) {
+  const size_t multiplier = ch.num_filters / ch.channels;
+  const int h = ch.height, w = ch.width;
+  for (size_t n = 0; n < batchsize; n++)
+    for (size_t f = 0; f < ch.num_filters; f++) {
+      size_t x_offset = (n * ch.channels + f / multiplier) * h * w;
+      size_t w_offset = f * ch.kernel_h * ch.kernel_w;
+      size_t y_offset =
+          (n * ch.num_filters + f) * ch.conv_height * ch.conv_width;
+      for (size_t oh = 0; oh < ch.conv_height; oh++)
+        for (size_t ow = 0; ow < ch.conv_width; ow++, y_offset++)
+          for (size_t i = 0; i < ch.kernel_h; i++) {
+            int ih = (int)(oh * ch.stride_h + i) - (int)ch.pad_h;
+            if (ih < 0 || ih >= h) continue;
+            for (size_t j = 0; j < ch.kernel_w; j++) {
+              int iw = (int)(ow * ch.stride_w + j) - (int)ch.pad_w;
+              if (iw < 0 || iw >= w) continue;
+              op(x_offset + ih * w + iw, w_offset + i * ch.kernel_w + j,
+                 y_offset);
+            }
+          }
+    }
+}
+
+void NativeConvForward(const float *x, const float *W, const float *b,
+                       size_t batchsize, const ConvHandle &ch, float *buf,
+                       float *y) {
+  const size_t conv_size = ch.conv_height * ch.conv_width;
+  const size_t cg = ch.channels / ch.group, fg = ch.num_filters / ch.group;
+  if (IsDepthwise(ch)) {
+    for (size_t n = 0; n < batchsize; n++)
+      for (size_t f = 0; f < ch.num_filters; f++)
+        std::fill(y + (n * ch.num_filters + f) * conv_size,
+                  y + (n * ch.num_filters + f + 1) * conv_size,
+                  b == nullptr ? 0.0f : b[f]);
+    DepthwiseLoop(batchsize, ch, [x, W, y](size_t xi, size_t wi, size_t yi) {
+      y[yi] += x[xi] * W[wi];
+    });
+  } else if (IsPointwise(ch)) {
+    for (size_t n = 0; n < batchsize; n++)
+      for (size_t g = 0; g < ch.group; g++)
+        Sgemm(false, false, fg, conv_size, cg, W + g * fg * cg, cg,
+              x + (n * ch.channels + g * cg) * conv_size, conv_size, 0.0f,
+              y + (n * ch.num_filters + g * fg) * conv_size, conv_size);
+    if (b != nullptr)
+      for (size_t n = 0; n < batchsize; n++)
+        for (size_t f = 0; f < ch.num_filters; f++) {
+          float *dst = y + (n * ch.num_filters + f) * conv_size;
+          for (size_t p = 0; p < conv_size; p++) dst[p] += b[f];
+        }
+  } else {
+    const size_t k = cg * ch.kernel_h * ch.kernel_w;
+    const size_t chunk = ColBatch(ch, batchsize);
+    for (size_t n = 0; n < batchsize; n += chunk) {
+      size_t nb = std::min(chunk, batchsize - n), cols = nb * conv_size;
+      float *col = buf, *t = buf + ch.group * k * cols;
+      BatchIm2col(x + n * ch.imagesize, nb, ch, col);
+      for (size_t g = 0; g < ch.group; g++)
+        Sgemm(false, false, fg, cols, k, W + g * fg * k, k, col + g * k * cols,
+              cols, 0.0f, t + g * fg * cols, cols);
+      ToSampleMajor(t, b, nb, ch.num_filters, conv_size,
+                    y + n * ch.num_filters * conv_size);
+    }
+  }
+}
+
+void NativeConvBackwardx(const float *dy, const float *W, size_t batchsize,
+                         const ConvHandle &ch, float *buf, float *dx) {
+  const size_t conv_size = ch.conv_height * ch.conv_width;
+  const size_t cg = ch.channels / ch.group, fg = ch.num_filters / ch.group;
+  if (IsDepthwise(ch)) {
+    std::fill(dx, dx + batchsize * ch.imagesize, 0.0f);
+    DepthwiseLoop(batchsize, ch, [dy, W, dx](size_t xi, size_t wi, size_t yi) {
+      dx[xi] += dy[yi] * W[wi];
+    });
+  } else if (IsPointwise(ch)) {
+    for (size_t n = 0; n < batchsize; n++)
+      for (size_t g = 0; g < ch.group; g++)
+        Sgemm(true, false, cg, conv_size, fg, W + g * fg * cg, cg,
+              dy + (n * ch.num_filters + g * fg) * conv_size, conv_size, 0.0f,
+              dx + (n * ch.channels + g * cg) * conv_size, conv_size);
+  } else {
+    std::fill(dx, dx + batchsize * ch.imagesize, 0.0f);
+    const size_t k = cg * ch.kernel_h * ch.kernel_w;
+    const size_t chunk = ColBatch(ch, batchsize);
+    for (size_t n = 0; n < batchsize; n += chunk) {
+      size_t nb = std::min(chunk, batchsize - n), cols = nb * conv_size;
+      float *col = buf, *t = buf + ch.group * k * cols;
+      ToFilterMajor(dy + n * ch.num_filters * conv_size, nb, ch.num_filters,
+                    conv_size, t);
+      for (size_t g = 0; g < ch.group; g++)
+        Sgemm(true, false, k, cols, fg, W + g * fg * k, k, t + g * fg * cols,
+              cols, 0.0f, col + g * k * cols, cols);
+      BatchCol2im(col, nb, ch, dx + n * ch.imagesize);
+    }
+  }
+}
+
+void NativeConvBackwardW(const float *dy, const float *x, size_t batchsize,
+                         const ConvHandle &ch, float *buf, float *dW) {
+  const size_t conv_size = ch.conv_height * ch.conv_width;
+  const size_t cg = ch.channels / ch.group, fg = ch.num_filters / ch.group;
+  if (IsDepthwise(ch)) {
+    std::fill(dW, dW + ch.num_filters * ch.kernel_h * ch.kernel_w, 0.0f);
+    DepthwiseLoop(batchsize, ch, [dy, x, dW](size_t xi, size_t wi, size_t yi) {
+      dW[wi] += dy[yi] * x[xi];
+    });
+  } else if (IsPointwise(ch)) {
+    for (size_t n = 0; n < batchsize; n++)
+      for (size_t g = 0; g < ch.group; g++)
+        Sgemm(false, true, fg, cg, conv_size,
+              dy + (n * ch.num_filters + g * fg) * conv_size, conv_size,
+              x + (n * ch.channels + g * cg) * conv_size, conv_size,
+              n == 0 ? 0.0f : 1.0f, dW + g * fg * cg, cg);
+  } else {
+    const size_t k = cg * ch.kernel_h * ch.kernel_w;
+    const size_t chunk = ColBatch(ch, batchsize);
+    for (size_t n = 0; n < batchsize; n += chunk) {
+      size_t nb = std::min(chunk, batchsize - n), cols = nb * conv_size;
+      float *col = buf, *t = buf + ch.group * k * cols;
+      BatchIm2col(x + n * ch.imagesize, nb, ch, col);
+      ToFilterMajor(dy + n * ch.num_filters * conv_size, nb, ch.num_filters,
+                    conv_size, t);
+      for (size_t g = 0; g < ch.group; g++)
+        Sgemm(false, true, fg, k, cols, t + g * fg * cols, cols,
+              col + g * k * cols, cols, n == 0 ? 0.0f : 1.0f, dW + g * fg * k,
+              k);
+    }
+  }
+}
+
+}  // namespace
+
 ConvHandle::ConvHandle(const Tensor &input,
                        const std::vector<size_t> &kernel_size,
                        const std::vector<size_t> &stride,
@@ -44,6 +295,8 @@ ConvHandle::ConvHandle(const Tensor &input,
   channels = in_channels;
   num_filters = out_channels;
   group = groups;
+  CHECK(group > 0 && channels % group == 0 && num_filters % group == 0)
+      << "the number of channels and filters should be divisible by group";
 
   bias_term = bias;
 
@@ -64,8 +317,9 @@ ConvHandle::ConvHandle(const Tensor &input,
 
 #ifdef USE_DNNL
   if (input.device()->lang() == kCpp) {
-    use_dnnl = true;
-    const int groups = 1;  // only groups 1 is supported for now
+    // only groups 1 is supported for now, otherwise the native path is used
+    use_dnnl = group == 1;
+    const int groups = 1;
     auto dtype_ = dnnl::memory::data_type::f32;
 
     x_dims = dnnl::memory::dims{(int)input.shape(0), (int)in_channels,
@@ -87,9 +341,7 @@ ConvHandle::ConvHandle(const Tensor &input,
 
 ConvHandle::~ConvHandle() {
 #ifdef USE_DNNL
-  if (use_dnnl) {
-    delete (db);
-  }
+  delete (db);
 #endif  // USE_DNNL
 }
 
@@ -101,127 +353,141 @@ Tensor CpuConvForward(const Tensor &x, Tensor &W, Tensor &b,
         x.shape(3) == ch.width)
       << "input sample shape should not change";
 
-  CHECK(W.shape(0) == ch.num_filters && W.shape(1) == ch.channels &&
+  CHECK(W.shape(0) == ch.num_filters && W.shape(1) == ch.channels / ch.group &&
         W.shape(2) == ch.kernel_h && W.shape(3) == ch.kernel_w)
       << "weights shape should not change";
 
 #ifdef USE_DNNL
-  DataType dtype = x.data_type();
-  auto dev = x.device();
+  if (ch.use_dnnl) {
+    DataType dtype = x.data_type();
+    auto dev = x.device();
 
-  Shape shape{ch.batchsize, ch.num_filters, ch.conv_height, ch.conv_width};
-  Tensor output(shape, dev, dtype);
+    Shape shape{ch.batchsize, ch.num_filters, ch.conv_height, ch.conv_width};
+    Tensor output(shape, dev, dtype);
 
-  output.device()->Exec(
-      [output, x, &W, &b, &ch](Context *ctx) mutable {
-        using namespace dnnl;
-        using tag = memory::format_tag;
-        auto eng = ctx->dnnl_engine;
-        auto s = ctx->dnnl_stream;
-        auto dtype = dnnl::memory::data_type::f32;
-
-        // dnnl design pattern
-        // xxx_user_xxx_memory(and its format tag) is defined by user, which may
-        // need to be reordered
-        auto conv_user_src_memory = memory({{ch.x_dims}, dtype, tag::nchw}, eng,
-                                           x.block()->mutable_data());
-        auto conv_user_weights_memory = memory({{ch.w_dims}, dtype, tag::goihw},
-                                               eng, W.block()->mutable_data());
-        auto conv_user_bias_memory = memory({{ch.b_dims}, dtype, tag::x}, eng,
-                                            b.block()->mutable_data());
-
-        // xxx_xxx_memory_md is created for creating conv_desc, and format tag
-        // is defined as any
-        auto conv_src_md = memory::desc({ch.x_dims}, dtype, tag::any);
-        auto conv_bias_md = memory::desc({ch.b_dims}, dtype, tag::any);
-        auto conv_weights_md = memory::desc({ch.w_dims}, dtype, tag::any);
-        auto conv_dst_md = memory::desc({ch.o_dims}, dtype,
-                                        tag::nchw);  // could not set to any
-
-        auto conv_desc = convolution_forward::desc(
-            prop_kind::forward, algorithm::convolution_direct, conv_src_md,
-            conv_weights_md, conv_bias_md, conv_dst_md, ch.s_dims, ch.p_dims,
-            ch.p_dims);
-        auto conv_pd = convolution_forward::primitive_desc(conv_desc, eng);
-
-        // auto conv_pd = *ch.conv_pd; // 1ms to 70 ms slower
-
-        // memory placeholder for reorder
-        auto conv_src_memory = conv_user_src_memory;
-        auto conv_weights_memory = conv_user_weights_memory;
-
-        // output memory
-        auto conv_dst_memory =
-            memory(conv_pd.dst_desc(), eng, output.block()->mutable_data());
-
-        // Tensor for reorder  - tesing performance shows no significant improve
-        Tensor x_reo;
-        x_reo.ResetLike(x);
-        Tensor W_reo;
-        W_reo.ResetLike(W);
-
-        if (conv_pd.src_desc() != conv_user_src_memory.get_desc()) {
-          conv_src_memory =
-              memory(conv_pd.src_desc(), eng, x_reo.block()->mutable_data());
-          reorder(conv_user_src_memory, conv_src_memory)
-              .execute(s, {{DNNL_ARG_FROM, conv_user_src_memory},
-                           {DNNL_ARG_TO, conv_src_memory}});
-        }
-        if (conv_pd.weights_desc() != conv_user_weights_memory.get_desc()) {
-          conv_weights_memory = memory(conv_pd.weights_desc(), eng,
-                                       W_reo.block()->mutable_data());
-          reorder(conv_user_weights_memory, conv_weights_memory)
-              .execute(s, {{DNNL_ARG_FROM, conv_user_weights_memory},
-                           {DNNL_ARG_TO, conv_weights_memory}});
-        }
-
-        // execuete forward
-        convolution_forward(conv_pd).execute(
-            s, {{DNNL_ARG_SRC, conv_src_memory},
-                {DNNL_ARG_WEIGHTS, conv_weights_memory},
-                {DNNL_ARG_BIAS, conv_user_bias_memory},
-                {DNNL_ARG_DST, conv_dst_memory}});
-
-        // synchronize stream
-        s.wait();
-      },
-      {x.block(), W.block(), b.block()}, {output.block()}, "CpuConvForward");
+    output.device()->Exec(
+        [output, x, &W, &b, &ch](Context *ctx) mutable {
+          using namespace dnnl;
+          using tag = memory::format_tag;
+          auto eng = ctx->dnnl_engine;
+          auto s = ctx->dnnl_stream;
+          auto dtype = dnnl::memory::data_type::f32;
+
+          // the primitive desc is created once for each configuration and
+          // cached; the formats of src and weights are decided by dnnl (any)
+          auto key = dnnl_key("CpuConvForward", eng, ch.x_dims, ch.w_dims,
+                              ch.b_dims, ch.o_dims, ch.s_dims, ch.p_dims,
+                              (int)dtype, (int)prop_kind::forward);
+          auto conv_pd =
+              dnnl_cached<convolution_forward::primitive_desc>(key, [&]() {
+                auto conv_src_md = memory::desc({ch.x_dims}, dtype, tag::any);
+                auto conv_bias_md = memory::desc({ch.b_dims}, dtype, tag::any);
+                auto conv_weights_md =
+                    memory::desc({ch.w_dims}, dtype, tag::any);
+                auto conv_dst_md = memory::desc({ch.o_dims}, dtype,
+                                                tag::nchw);  // could not be any
+                auto conv_desc = convolution_forward::desc(
+                    prop_kind::forward, algorithm::convolution_direct,
+                    conv_src_md, conv_weights_md, conv_bias_md, conv_dst_md,
+                    ch.s_dims, ch.p_dims, ch.p_dims);
+                return convolution_forward::primitive_desc(conv_desc, eng);
+              });
+
+          // dnnl design pattern
+          // xxx_user_xxx_memory(and its format tag) is defined by user, which
+          // may need to be reordered
+          auto conv_user_src_memory = memory({{ch.x_dims}, dtype, tag::nchw},
+                                             eng, x.block()->mutable_data());
+          auto conv_user_weights_memory =
+              memory({{ch.w_dims}, dtype, tag::goihw}, eng,
+                     const_cast<void *>(W.block()->data()));
+          auto conv_user_bias_memory =
+              memory({{ch.b_dims}, dtype, tag::x}, eng,
+                     const_cast<void *>(b.block()->data()));
+
+          // memory placeholder for reorder
+          auto conv_src_memory = conv_user_src_memory;
+          auto conv_weights_memory = conv_user_weights_memory;
+
+          // output memory
+          auto conv_dst_memory =
+              memory(conv_pd.dst_desc(), eng, output.block()->mutable_data());
+
+          // the reordered src may be larger than x due to padding
+          Tensor x_reo;
+          if (conv_pd.src_desc() != conv_user_src_memory.get_desc()) {
+            x_reo =
+                Tensor(Shape{conv_pd.src_desc().get_size()}, x.device(), kChar);
+            conv_src_memory =
+                memory(conv_pd.src_desc(), eng, x_reo.block()->mutable_data());
+            dnnl_cached<reorder>(key + "src",
+                                 [&]() {
+                                   return reorder(conv_user_src_memory,
+                                                  conv_src_memory);
+                                 })
+                .execute(s, {{DNNL_ARG_FROM, conv_user_src_memory},
+                             {DNNL_ARG_TO, conv_src_memory}});
+          }
+          if (conv_pd.weights_desc() != conv_user_weights_memory.get_desc()) {
+            size_t size = conv_pd.weights_desc().get_size();
+            if (ch.W_reo.Size() != size) {
+              ch.W_reo = Tensor(Shape{size}, W.device(), kChar);
+              ch.W_reo_src = nullptr;
+            }
+            conv_weights_memory = memory(conv_pd.weights_desc(), eng,
+                                         ch.W_reo.block()->mutable_data());
+            // reorder W only if it is written since the last reorder
+            if (ch.W_reo_src != W.block() ||
+                ch.W_reo_version != W.block()->version()) {
+              dnnl_cached<reorder>(key + "weights",
+                                   [&]() {
+                                     return reorder(conv_user_weights_memory,
+                                                    conv_weights_memory);
+                                   })
+                  .execute(s, {{DNNL_ARG_FROM, conv_user_weights_memory},
+                               {DNNL_ARG_TO, conv_weights_memory}});
+              ch.W_reo_src = W.block();
+              ch.W_reo_version = W.block()->version();
+            }
+          }
+
+          // execuete forward
+          dnnl_cached<convolution_forward>(
+              key, [&]() { return convolution_forward(conv_pd); })
+              .execute(s, {{DNNL_ARG_SRC, conv_src_memory},
+                           {DNNL_ARG_WEIGHTS, conv_weights_memory},
+                           {DNNL_ARG_BIAS, conv_user_bias_memory},
+                           {DNNL_ARG_DST, conv_dst_memory}});
+
+          // synchronize stream
+          s.wait();
+        },
+        {x.block(), W.block(), b.block()}, {output.block()}, "CpuConvForward");
 
-  return output;
-#else   // cpp naive, error due to Im2col importing
-/*
-  Shape w_shape = W.shape();
-  Shape b_shape;
-  if (ch.bias_term) b_shape = b.shape();
+    return output;
+  }
+#endif  // USE_DNNL
 
-  W.Reshape(Shape{ch.num_filters, ch.col_height});
-  if (ch.bias_term) b.Reshape(Shape{ch.num_filters});
+  CHECK_EQ(x.data_type(), kFloat32)
+      << "the native convolution only supports float32";
+  const size_t batchsize = x.shape(0);
+  Shape shape{batchsize, ch.num_filters, ch.conv_height, ch.conv_width};
+  Tensor output(shape, x.device(), x.data_type());
+  Tensor buf = ColBuffer(ch, batchsize, x.device());
 
-  DataType dtype = x.data_type();
-  auto dev = x.device();
-  Shape shape{ch.batchsize, ch.num_filters, ch.conv_height, ch.conv_width};
-  Tensor output(shape, dev, dtype);
-  Tensor col_data(Shape{ch.col_height, ch.col_width});  // broadcasted image
-
-  float *data_col = new float[ch.col_height * ch.col_width];
-  auto in_data = x.data<float>();
-  for (size_t num = 0; num < ch.batchsize; num++) {
-    Im2col(in_data + num * ch.imagesize, ch.channels, ch.height, ch.width,
-           ch.kernel_h, ch.kernel_w, ch.pad_h, ch.pad_w, ch.stride_h,
-           ch.stride_w, data_col);
-
-    col_data.CopyDataFromHostPtr(data_col, ch.col_height * ch.col_width);
-    Tensor each = Mult(W, col_data);
-    if (ch.bias_term) {
-      AddColumn(b, &each);
-    }
-    CopyDataToFrom(&output, each, each.Size(), num * each.Size());
-  };
-  W.Reshape(w_shape);
-  if (ch.bias_term) b.Reshape(b_shape);
+  output.device()->Exec(
+      [output, x, W, b, buf, batchsize, &ch](Context *ctx) mutable {
+        NativeConvForward(
+            static_cast<const float *>(x.block()->data()),
+            static_cast<const float *>(W.block()->data()),
+            ch.bias_term ? static_cast<const float *>(b.block()->data())
+                         : nullptr,
+            batchsize, ch, static_cast<float *>(buf.block()->mutable_data()),
+            static_cast<float *>(output.block()->mutable_data()));
+      },
+      {x.block(), W.block(), b.block()}, {output.block(), buf.block()},
+      "CpuConvForward");
   return output;
-*/
-#endif  // USE_DNNL
 }
 
 Tensor CpuConvBackwardx(const Tensor &dy, Tensor &W, const Tensor &x,
@@ -234,80 +500,87 @@ Tensor CpuConvBackwardx(const Tensor &dy, Tensor &W, const Tensor &x,
         dy.shape(3) == ch.conv_width)
       << "input gradients shape should not change";
 
-  CHECK(W.shape(0) == ch.num_filters && W.shape(1) == ch.channels &&
+  CHECK(W.shape(0) == ch.num_filters && W.shape(1) == ch.channels / ch.group &&
         W.shape(2) == ch.kernel_h && W.shape(3) == ch.kernel_w)
       << "weights shape should not change";
 
 #ifdef USE_DNNL
-  Tensor dx;
-  dx.ResetLike(x);
-
-  dy.device()->Exec(
-      [dx, dy, x, &W, &ch](Context *ctx) mutable {
-        using namespace dnnl;
-        auto eng = ctx->dnnl_engine;
-        auto s = ctx->dnnl_stream;
-        using tag = memory::format_tag;
-        auto dtype = dnnl::memory::data_type::f32;
-
-        auto conv_src_md = memory::desc({ch.x_dims}, dtype, tag::nchw);
-        auto conv_weights_md = memory::desc({ch.w_dims}, dtype, tag::goihw);
-        auto conv_bias_md = memory::desc({ch.b_dims}, dtype, tag::x);
-        auto conv_dst_md = memory::desc({ch.o_dims}, dtype, tag::nchw);
-
-        auto conv_user_src_memory =
-            memory(conv_src_md, eng, dx.block()->mutable_data());
-        auto conv_user_diff_dst_memory =
-            memory(conv_dst_md, eng, dy.block()->mutable_data());
-        auto conv_user_weights_memory =
-            memory(conv_weights_md, eng, W.block()->mutable_data());
-
-        auto conv_desc = convolution_forward::desc(
-            prop_kind::forward, algorithm::convolution_direct, conv_src_md,
-            conv_weights_md, conv_bias_md, conv_dst_md, ch.s_dims, ch.p_dims,
-            ch.p_dims);
-        auto conv_pd = convolution_forward::primitive_desc(conv_desc, eng);
-
-        auto conv_bwd_data_d = convolution_backward_data::desc(
-            algorithm::convolution_direct, conv_src_md, conv_weights_md,
-            conv_dst_md, ch.s_dims, ch.p_dims, ch.p_dims);
-        auto conv_bwd_data_pd = convolution_backward_data::primitive_desc(
-            conv_bwd_data_d, eng, conv_pd);
-
-        convolution_backward_data(conv_bwd_data_pd)
-            .execute(ctx->dnnl_stream,
-                     {{DNNL_ARG_DIFF_DST, conv_user_diff_dst_memory},
-                      {DNNL_ARG_WEIGHTS, conv_user_weights_memory},
-                      {DNNL_ARG_DIFF_SRC, conv_user_src_memory}});
-        ctx->dnnl_stream.wait();
-      },
-      {x.block(), dy.block(), W.block()}, {dx.block()}, "CpuConvBackwardx");
-
-  return dx;
+  if (ch.use_dnnl) {
+    Tensor dx;
+    dx.ResetLike(x);
+
+    dy.device()->Exec(
+        [dx, dy, x, &W, &ch](Context *ctx) mutable {
+          using namespace dnnl;
+          auto eng = ctx->dnnl_engine;
+          auto s = ctx->dnnl_stream;
+          using tag = memory::format_tag;
+          auto dtype = dnnl::memory::data_type::f32;
+
+          auto conv_src_md = memory::desc({ch.x_dims}, dtype, tag::nchw);
+          auto conv_weights_md = memory::desc({ch.w_dims}, dtype, tag::goihw);
+          auto conv_bias_md = memory::desc({ch.b_dims}, dtype, tag::x);
+          auto conv_dst_md = memory::desc({ch.o_dims}, dtype, tag::nchw);
+
+          auto conv_user_src_memory =
+              memory(conv_src_md, eng, dx.block()->mutable_data());
+          auto conv_user_diff_dst_memory =
+              memory(conv_dst_md, eng, dy.block()->mutable_data());
+          auto conv_user_weights_memory = memory(
+              conv_weights_md, eng, const_cast<void *>(W.block()->data()));
+
+          auto key = dnnl_key("CpuConvBackwardx", eng, ch.x_dims, ch.w_dims,
+                              ch.b_dims, ch.o_dims, ch.s_dims, ch.p_dims,
+                              (int)dtype, (int)prop_kind::backward_data);
+          auto conv_bwd_data_pd =
+              dnnl_cached<convolution_backward_data::primitive_desc>(
+                  key, [&]() {
+                    auto conv_desc = convolution_forward::desc(
+                        prop_kind::forward, algorithm::convolution_direct,
+                        conv_src_md, conv_weights_md, conv_bias_md, conv_dst_md,
+                        ch.s_dims, ch.p_dims, ch.p_dims);
+                    auto conv_pd =
+                        convolution_forward::primitive_desc(conv_desc, eng);
+                    auto conv_bwd_data_d = convolution_backward_data::desc(
+                        algorithm::convolution_direct, conv_src_md,
+                        conv_weights_md, conv_dst_md, ch.s_dims, ch.p_dims,
+                        ch.p_dims);
+                    return convolution_backward_data::primitive_desc(
+                        conv_bwd_data_d, eng, conv_pd);
+                  });
+
+          dnnl_cached<convolution_backward_data>(
+              key,
+              [&]() { return convolution_backward_data(conv_bwd_data_pd); })
+              .execute(ctx->dnnl_stream,
+                       {{DNNL_ARG_DIFF_DST, conv_user_diff_dst_memory},
+                        {DNNL_ARG_WEIGHTS, conv_user_weights_memory},
+                        {DNNL_ARG_DIFF_SRC, conv_user_src_memory}});
+          ctx->dnnl_stream.wait();
+        },
+        {x.block(), dy.block(), W.block()}, {dx.block()}, "CpuConvBackwardx");
 
-#else   // NOT USE_DNNL
-/*  // error due to importing Col2im
-  Shape w_shape = W.shape();
-  W.Reshape(Shape{ch.num_filters, ch.col_height});
+    return dx;
+  }
+#endif  // USE_DNNL
 
+  CHECK_EQ(dy.data_type(), kFloat32)
+      << "the native convolution only supports float32";
+  const size_t batchsize = dy.shape(0);
   Tensor dx;
   dx.ResetLike(x);
+  Tensor buf = ColBuffer(ch, batchsize, dy.device());
 
-  float *dx_b = new float[ch.imagesize];
-
-  for (size_t num = 0; num < ch.batchsize; num++) {
-    Tensor grad_b(Shape{ch.num_filters, ch.conv_height * ch.conv_width});
-    CopyDataToFrom(&grad_b, dy, grad_b.Size(), 0, num * grad_b.Size());
-    Tensor dcol_b = Mult(Transpose(W), grad_b);
-    auto dcol_data = dcol_b.data<float>();
-    Col2im(dcol_data, ch.channels, ch.height, ch.width, ch.kernel_h,
-           ch.kernel_w, ch.pad_h, ch.pad_w, ch.stride_h, ch.stride_w, dx_b);
-    dx.CopyDataFromHostPtr(dx_b, ch.imagesize, num * ch.imagesize);
-  }
-  W.Reshape(w_shape);
+  dy.device()->Exec(
+      [dx, dy, W, buf, batchsize, &ch](Context *ctx) mutable {
+        NativeConvBackwardx(static_cast<const float *>(dy.block()->data()),
+                            static_cast<const float *>(W.block()->data()),
+                            batchsize, ch,
+                            static_cast<float *>(buf.block()->mutable_data()),
+                            static_cast<float *>(dx.block()->mutable_data()));
+      },
+      {dy.block(), W.block()}, {dx.block(), buf.block()}, "CpuConvBackwardx");
   return dx;
-*/
-#endif  // USE_DNNL
 }
 
 Tensor CpuConvBackwardW(const Tensor &dy, const Tensor &x, const Tensor &W,
@@ -325,87 +598,89 @@ Tensor CpuConvBackwardW(const Tensor &dy, const Tensor &x, const Tensor &W,
       << "input sample shape should not change";
 
 #ifdef USE_DNNL
+  if (ch.use_dnnl) {
+    Tensor dW;
+    dW.ResetLike(W);
+
+    dy.device()->Exec(
+        [dy, dW, x, &W, &ch](Context *ctx) mutable {
+          using namespace dnnl;
+          auto eng = ctx->dnnl_engine;
+          auto s = ctx->dnnl_stream;
+          using tag = memory::format_tag;
+          auto dtype = dnnl::memory::data_type::f32;
+
+          auto conv_src_md = memory::desc({ch.x_dims}, dtype, tag::nchw);
+          auto conv_weights_md = memory::desc({ch.w_dims}, dtype, tag::goihw);
+          auto conv_bias_md = memory::desc({ch.b_dims}, dtype, tag::x);
+          auto conv_dst_md = memory::desc({ch.o_dims}, dtype, tag::nchw);
+
+          auto conv_user_src_memory =
+              memory(conv_src_md, eng, x.block()->mutable_data());
+          auto conv_user_diff_weights_memory =
+              memory(conv_weights_md, eng, dW.block()->mutable_data());
+          auto conv_diff_bias_memory =
+              memory(conv_bias_md, eng, ch.db->block()->mutable_data());
+          auto conv_user_diff_dst_memory =
+              memory(conv_dst_md, eng, dy.block()->mutable_data());
+
+          auto key = dnnl_key("CpuConvBackwardW", eng, ch.x_dims, ch.w_dims,
+                              ch.b_dims, ch.o_dims, ch.s_dims, ch.p_dims,
+                              (int)dtype, (int)prop_kind::backward_weights);
+          auto conv_bwd_weights_pd =
+              dnnl_cached<convolution_backward_weights::primitive_desc>(
+                  key, [&]() {
+                    auto conv_desc = convolution_forward::desc(
+                        prop_kind::forward, algorithm::convolution_direct,
+                        conv_src_md, conv_weights_md, conv_bias_md, conv_dst_md,
+                        ch.s_dims, ch.p_dims, ch.p_dims);
+                    auto conv_pd =
+                        convolution_forward::primitive_desc(conv_desc, eng);
+                    auto conv_bwd_weights_desc =
+                        convolution_backward_weights::desc(
+                            algorithm::convolution_direct, conv_src_md,
+                            conv_weights_md, conv_bias_md, conv_dst_md,
+                            ch.s_dims, ch.p_dims, ch.p_dims);
+                    return convolution_backward_weights::primitive_desc(
+                        conv_bwd_weights_desc, eng, conv_pd);
+                  });
+
+          dnnl_cached<convolution_backward_weights>(
+              key,
+              [&]() {
+                return convolution_backward_weights(conv_bwd_weights_pd);
+              })
+              .execute(ctx->dnnl_stream,
+                       {{DNNL_ARG_DIFF_DST, conv_user_diff_dst_memory},
+                        {DNNL_ARG_SRC, conv_user_src_memory},
+                        {DNNL_ARG_DIFF_WEIGHTS, conv_user_diff_weights_memory},
+                        {DNNL_ARG_DIFF_BIAS, conv_diff_bias_memory}});
+          ctx->dnnl_stream.wait();
+        },
+        {x.block(), dy.block(), W.block()}, {dW.block(), ch.db->block()},
+        "CpuConvBackwardW");
+
+    return dW;
+  }
+#endif  // USE_DNNL
+
+  CHECK_EQ(dy.data_type(), kFloat32)
+      << "the native convolution only supports float32";
+  const size_t batchsize = dy.shape(0);
   Tensor dW;
   dW.ResetLike(W);
+  Tensor buf = ColBuffer(ch, batchsize, dy.device());
 
   dy.device()->Exec(
-      [dy, dW, x, &W, &ch](Context *ctx) mutable {
-        using namespace dnnl;
-        auto eng = ctx->dnnl_engine;
-        auto s = ctx->dnnl_stream;
-        using tag = memory::format_tag;
-        auto dtype = dnnl::memory::data_type::f32;
-
-        auto conv_src_md = memory::desc({ch.x_dims}, dtype, tag::nchw);
-        auto conv_weights_md = memory::desc({ch.w_dims}, dtype, tag::goihw);
-        auto conv_bias_md = memory::desc({ch.b_dims}, dtype, tag::x);
-        auto conv_dst_md = memory::desc({ch.o_dims}, dtype, tag::nchw);
-
-        auto conv_user_src_memory =
-            memory(conv_src_md, eng, x.block()->mutable_data());
-        auto conv_user_diff_weights_memory =
-            memory(conv_weights_md, eng, dW.block()->mutable_data());
-        auto conv_diff_bias_memory =
-            memory(conv_bias_md, eng, ch.db->block()->mutable_data());
-        auto conv_user_diff_dst_memory =
-            memory(conv_dst_md, eng, dy.block()->mutable_data());
-
-        auto conv_desc = convolution_forward::desc(
-            prop_kind::forward, algorithm::convolution_direct, conv_src_md,
-            conv_weights_md, conv_bias_md, conv_dst_md, ch.s_dims, ch.p_dims,
-            ch.p_dims);
-        auto conv_pd = convolution_forward::primitive_desc(conv_desc, eng);
-
-        // auto conv_pd = *ch.conv_pd; // very slow
-
-        auto conv_bwd_src_memory = conv_user_src_memory;
-        auto conv_diff_weights_memory = conv_user_diff_weights_memory;
-        auto conv_diff_dst_memory = conv_user_diff_dst_memory;
-
-        auto conv_bwd_weights_desc = convolution_backward_weights::desc(
-            algorithm::convolution_direct, conv_src_md, conv_weights_md,
-            conv_bias_md, conv_dst_md, ch.s_dims, ch.p_dims, ch.p_dims);
-        auto conv_bwd_weights_pd = convolution_backward_weights::primitive_desc(
-            conv_bwd_weights_desc, eng, conv_pd);
-
-        convolution_backward_weights(conv_bwd_weights_pd)
-            .execute(ctx->dnnl_stream,
-                     {{DNNL_ARG_DIFF_DST, conv_diff_dst_memory},
-                      {DNNL_ARG_SRC, conv_bwd_src_memory},
-                      {DNNL_ARG_DIFF_WEIGHTS, conv_diff_weights_memory},
-                      {DNNL_ARG_DIFF_BIAS, conv_diff_bias_memory}});
-        ctx->dnnl_stream.wait();
+      [dy, dW, x, buf, batchsize, &ch](Context *ctx) mutable {
+        NativeConvBackwardW(static_cast<const float *>(dy.block()->data()),
+                            static_cast<const float *>(x.block()->data()),
+                            batchsize, ch,
+                            static_cast<float *>(buf.block()->mutable_data()),
+                            static_cast<float *>(dW.block()->mutable_data()));
       },
-      {x.block(), dy.block(), W.block()}, {dW.block(), ch.db->block()},
-      "CpuConvBackwardW");
-
-  return dW;
-#else   // native cpp
-/* // error due to importing Im2col
-  Tensor dW;
-  dW.ResetLike(W);
-  dW.SetValue(0.0f);
-
-  Shape w_shape = W.shape();
-  dW.Reshape(Shape{ch.num_filters, ch.col_height});
-
-  Tensor col_data(Shape{ch.col_height, ch.col_width});  // broadcasted image
-
-  float *data_col = new float[ch.col_height * ch.col_width];
-  auto in_data = dy.data<float>();
-  for (size_t num = 0; num < ch.batchsize; num++) {
-    Im2col(in_data + num * ch.imagesize, ch.channels, ch.height, ch.width,
-           ch.kernel_h, ch.kernel_w, ch.pad_h, ch.pad_w, ch.stride_h,
-           ch.stride_w, data_col);
-    col_data.CopyDataFromHostPtr(data_col, ch.col_height * ch.col_width);
-    Tensor grad_b(Shape{ch.num_filters, ch.conv_height * ch.conv_width});
-    CopyDataToFrom(&grad_b, dy, grad_b.Size(), 0, num * grad_b.Size());
-    dW += Mult(grad_b, Transpose(col_data));
-  }
-  dW.Reshape(w_shape);
+      {dy.block(), x.block()}, {dW.block(), buf.block()}, "CpuConvBackwardW");
   return dW;
-*/
-#endif  // USE_DNNL
 }
 
 Tensor CpuConvBackwardb(const Tensor &dy, const Tensor &b,
@@ -420,24 +695,25 @@ Tensor CpuConvBackwardb(const Tensor &dy, const Tensor &b,
   CHECK(b.shape(0) == ch.num_filters) << "bias shape should not change";
 
 #ifdef USE_DNNL
-  Tensor db = ch.db->Clone();
-  return db;
-#else   // Native cpp
+  if (ch.use_dnnl) return ch.db->Clone();
+#endif  // USE_DNNL
+
   Tensor db;
   db.ResetLike(b);
 
-  auto tmpshp = Shape{ch.batchsize * ch.num_filters,
-                      dy.Size() / (ch.batchsize * ch.num_filters)};
+  // the last batch may be smaller than the batch of the handle
+  const size_t batchsize = dy.shape(0);
+  auto tmpshp = Shape{batchsize * ch.num_filters,
+                      dy.Size() / (batchsize * ch.num_filters)};
   Tensor tmp1 = Reshape(dy, tmpshp);
 
-  Tensor tmp2(Shape{ch.batchsize * ch.num_filters});
+  Tensor tmp2(Shape{batchsize * ch.num_filters}, dy.device(), dy.data_type());
   SumColumns(tmp1, &tmp2);
-  Tensor tmp3 = Reshape(tmp2, Shape{ch.batchsize, ch.num_filters});
+  Tensor tmp3 = Reshape(tmp2, Shape{batchsize, ch.num_filters});
 
   SumRows(tmp3, &db);
 
   return db;
-#endif  // USE_DNNL
 };
 
 #ifdef USE_CUDNN
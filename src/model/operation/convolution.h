@@ -74,7 +74,8 @@ class ConvHandle {
   size_t imagesize;
 
   bool use_dnnl =
-      false;  // useful flag if both USE_CUDNN and USE_DNNL are enabled
+      false;  // useful flag if both USE_CUDNN and USE_DNNL are enabled;
+              // set it to false to run the native cpp (im2col + gemm) path
 
 #ifdef USE_DNNL
   dnnl::memory::data_type dtype;
@@ -85,7 +86,13 @@ class ConvHandle {
   dnnl::memory::dims o_dims;
   dnnl::memory::dims w_dims;
 
-  Tensor *db;
+  Tensor *db = nullptr;
+
+  // W reordered into the format of the dnnl primitive, which is reused until
+  // W is written, i.e., the version of its block changes
+  mutable Tensor W_reo;
+  mutable const Block *W_reo_src = nullptr;
+  mutable size_t W_reo_version = 0;
 #endif  // USE_DNNL
 };
 
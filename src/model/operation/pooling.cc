@@ -20,10 +20,92 @@
  ************************************************************/
 #include "pooling.h"
 
+#include <algorithm>
 #include <cmath>
 
 namespace singa {
 
+namespace {
+
+// the native cpp pooling goes over the planes of NCHW in parallel, each
+// plane of the input is small enough to stay in cache for its outputs
+void NativePoolingForward(const float *x, const PoolingHandle &ph, float *y,
+                          int *max_idx) {
+  const int planes = ph.batchsize * ph.channels;
+  const int in_size = ph.height * ph.width;
+  const int out_size = ph.pooled_height * ph.pooled_width;
+#ifdef USE_OPENMP
+#pragma omp parallel for num_threads(Platform::GetNumCpuThreads())
+#endif  // USE_OPENMP
+  for (int c = 0; c < planes; c++) {
+    const float *in = x + c * in_size;
+    for (int oh = 0; oh < ph.pooled_height; oh++) {
+      int hstart = oh * ph.stride_h - ph.pad_h;
+      int hend = std::min(hstart + ph.kernel_h, ph.height);
+      hstart = std::max(hstart, 0);
+      for (int ow = 0; ow < ph.pooled_width; ow++) {
+        int wstart = ow * ph.stride_w - ph.pad_w;
+        int wend = std::min(wstart + ph.kernel_w, ph.width);
+        wstart = std::max(wstart, 0);
+        int o = c * out_size + oh * ph.pooled_width + ow;
+        if (hstart >= hend || wstart >= wend) {  // inside the padding
+          y[o] = 0.0f;
+          if (max_idx != nullptr) max_idx[o] = -1;
+        } else if (max_idx != nullptr) {
+          int idx = hstart * ph.width + wstart;
+          for (int h = hstart; h < hend; h++)
+            for (int w = wstart; w < wend; w++)
+              if (in[h * ph.width + w] > in[idx]) idx = h * ph.width + w;
+          y[o] = in[idx];
+          max_idx[o] = idx;
+        } else {
+          // average over the elements inside the input, excluding padding
+          float sum = 0.0f;
+          for (int h = hstart; h < hend; h++)
+            for (int w = wstart; w < wend; w++) sum += in[h * ph.width + w];
+          y[o] = sum / ((hend - hstart) * (wend - wstart));
+        }
+      }
+    }
+  }
+}
+
+void NativePoolingBackward(const float *dy, const int *max_idx,
+                           const PoolingHandle &ph, float *dx) {
+  const int planes = ph.batchsize * ph.channels;
+  const int in_size = ph.height * ph.width;
+  const int out_size = ph.pooled_height * ph.pooled_width;
+#ifdef USE_OPENMP
+#pragma omp parallel for num_threads(Platform::GetNumCpuThreads())
+#endif  // USE_OPENMP
+  for (int c = 0; c < planes; c++) {
+    float *din = dx + c * in_size;
+    std::fill(din, din + in_size, 0.0f);
+    if (max_idx != nullptr) {
+      for (int o = c * out_size; o < (c + 1) * out_size; o++)
+        if (max_idx[o] >= 0) din[max_idx[o]] += dy[o];
+      continue;
+    }
+    for (int oh = 0; oh < ph.pooled_height; oh++) {
+      int hstart = oh * ph.stride_h - ph.pad_h;
+      int hend = std::min(hstart + ph.kernel_h, ph.height);
+      hstart = std::max(hstart, 0);
+      for (int ow = 0; ow < ph.pooled_width; ow++) {
+        int wstart = ow * ph.stride_w - ph.pad_w;
+        int wend = std::min(wstart + ph.kernel_w, ph.width);
+        wstart = std::max(wstart, 0);
+        if (hstart >= hend || wstart >= wend) continue;
+        float g = dy[c * out_size + oh * ph.pooled_width + ow] /
+                  ((hend - hstart) * (wend - wstart));
+        for (int h = hstart; h < hend; h++)
+          for (int w = wstart; w < wend; w++) din[h * ph.width + w] += g;
+      }
+    }
+  }
+}
+
+}  // namespace
+
 PoolingHandle::PoolingHandle(const Tensor &input,
                              const std::vector<int> &kernel_size,
                              const std::vector<int> &stride,
@@ -53,6 +135,7 @@ PoolingHandle::PoolingHandle(const Tensor &input,
 
 #ifdef USE_DNNL
   if (input.device()->lang() == kCpp) {
+    use_dnnl = true;
     auto x_dims =
         dnnl::memory::dims(input.shape().begin(), input.shape().end());
     auto y_dims =
@@ -71,16 +154,24 @@ PoolingHandle::PoolingHandle(const Tensor &input,
     auto pooling_algo = dnnl::algorithm::pooling_avg_exclude_padding;
     if (is_max_pooling) pooling_algo = dnnl::algorithm::pooling_max;
 
-    auto pool_fwd_d = dnnl::pooling_forward::desc(
-        dnnl::prop_kind::forward_training, pooling_algo, x_md, y_md, s_dims,
-        k_dims, p_dims, p_dims);
-    auto pool_bwd_d = dnnl::pooling_backward::desc(
-        pooling_algo, x_md, y_md, s_dims, k_dims, p_dims, p_dims);
-
+    // the primitive descs are shared by the handles of the same config
     auto eng = input.device()->context(0)->dnnl_engine;
-    pool_fwd_pd = dnnl::pooling_forward::primitive_desc(pool_fwd_d, eng);
+    prim_key = dnnl_key("CpuPooling", eng, x_dims, y_dims, s_dims, k_dims,
+                        p_dims, (int)dtype_, (int)pooling_algo);
+    pool_fwd_pd =
+        dnnl_cached<dnnl::pooling_forward::primitive_desc>(prim_key, [&]() {
+          auto pool_fwd_d = dnnl::pooling_forward::desc(
+              dnnl::prop_kind::forward_training, pooling_algo, x_md, y_md,
+              s_dims, k_dims, p_dims, p_dims);
+          return dnnl::pooling_forward::primitive_desc(pool_fwd_d, eng);
+        });
     pool_bwd_pd =
-        dnnl::pooling_backward::primitive_desc(pool_bwd_d, eng, pool_fwd_pd);
+        dnnl_cached<dnnl::pooling_backward::primitive_desc>(prim_key, [&]() {
+          auto pool_bwd_d = dnnl::pooling_backward::desc(
+              pooling_algo, x_md, y_md, s_dims, k_dims, p_dims, p_dims);
+          return dnnl::pooling_backward::primitive_desc(pool_bwd_d, eng,
+                                                        pool_fwd_pd);
+        });
 
     auto ws_md = pool_fwd_pd.workspace_desc();
     ws_mem = dnnl::memory(ws_md, eng);
@@ -90,29 +181,54 @@ PoolingHandle::PoolingHandle(const Tensor &input,
 
 PoolingHandle::~PoolingHandle() {}
 
-#ifdef USE_DNNL
-
 Tensor CpuPoolingForward(const PoolingHandle &ph, const Tensor &x) {
   CHECK_EQ(x.device()->lang(), kCpp);
   Tensor y({(unsigned long)ph.batchsize, (unsigned long)ph.channels,
             (unsigned long)ph.pooled_height, (unsigned long)ph.pooled_width},
            x.device(), x.data_type());
 
+#ifdef USE_DNNL
+  if (ph.use_dnnl) {
+    y.device()->Exec(
+        [y, x, &ph](Context *ctx) mutable {
+          auto eng = ctx->dnnl_engine;
+          using namespace dnnl;
+
+          memory x_mem(ph.x_md, eng, x.block()->mutable_data());
+          memory y_mem(ph.y_md, eng, y.block()->mutable_data());
+
+          dnnl_cached<pooling_forward>(
+              ph.prim_key, [&]() { return pooling_forward(ph.pool_fwd_pd); })
+              .execute(ctx->dnnl_stream, {{DNNL_ARG_SRC, x_mem},
+                                          {DNNL_ARG_DST, y_mem},
+                                          {DNNL_ARG_WORKSPACE, ph.ws_mem}});
+          ctx->dnnl_stream.wait();
+        },
+        {x.block()}, {y.block()}, "CpuPoolingForward");
+    return y;
+  }
+#endif  // USE_DNNL
+
+  CHECK_EQ(x.data_type(), kFloat32)
+      << "the native pooling only supports float32";
+  if (ph.is_max_pooling &&
+      (ph.max_idx.shape() != y.shape() || ph.max_idx.device() != x.device()))
+    ph.max_idx = Tensor(y.shape(), x.device(), kInt);
+  Tensor max_idx = ph.max_idx;
+  bool is_max = ph.is_max_pooling;
+
   y.device()->Exec(
-      [y, x, &ph](Context *ctx) mutable {
-        auto eng = ctx->dnnl_engine;
-        using namespace dnnl;
-
-        memory x_mem(ph.x_md, eng, x.block()->mutable_data());
-        memory y_mem(ph.y_md, eng, y.block()->mutable_data());
-
-        pooling_forward(ph.pool_fwd_pd)
-            .execute(ctx->dnnl_stream, {{DNNL_ARG_SRC, x_mem},
-                                        {DNNL_ARG_DST, y_mem},
-                                        {DNNL_ARG_WORKSPACE, ph.ws_mem}});
-        ctx->dnnl_stream.wait();
+      [y, x, max_idx, is_max, &ph](Context *ctx) mutable {
+        NativePoolingForward(
+            static_cast<const float *>(x.block()->data()), ph,
+            static_cast<float *>(y.block()->mutable_data()),
+            is_max ? static_cast<int *>(max_idx.block()->mutable_data())
+                   : nullptr);
       },
-      {x.block()}, {y.block()}, "CpuPoolingForward");
+      {x.block()},
+      is_max ? std::vector<Block *>{y.block(), max_idx.block()}
+             : std::vector<Block *>{y.block()},
+      "CpuPoolingForward");
 
   return y;
 }
@@ -125,25 +241,51 @@ Tensor CpuPoolingBackward(const PoolingHandle &ph, const Tensor &grad,
   Tensor in_grad;
   in_grad.ResetLike(x);
 
+#ifdef USE_DNNL
+  if (ph.use_dnnl) {
+    in_grad.device()->Exec(
+        [x, y, in_grad, grad, &ph](Context *ctx) mutable {
+          auto eng = ctx->dnnl_engine;
+          using namespace dnnl;
+
+          memory dx_mem(ph.x_md, eng, in_grad.block()->mutable_data());
+          memory dy_mem(ph.y_md, eng, grad.block()->mutable_data());
+
+          dnnl_cached<pooling_backward>(
+              ph.prim_key, [&]() { return pooling_backward(ph.pool_bwd_pd); })
+              .execute(ctx->dnnl_stream, {{DNNL_ARG_DIFF_DST, dy_mem},
+                                          {DNNL_ARG_DIFF_SRC, dx_mem},
+                                          {DNNL_ARG_WORKSPACE, ph.ws_mem}});
+          ctx->dnnl_stream.wait();
+        },
+        {x.block(), y.block(), grad.block()}, {in_grad.block()},
+        "CpuPoolingBackward");
+    return in_grad;
+  }
+#endif  // USE_DNNL
+
+  CHECK_EQ(grad.data_type(), kFloat32)
+      << "the native pooling only supports float32";
+  Tensor max_idx = ph.max_idx;
+  bool is_max = ph.is_max_pooling;
+  if (is_max)
+    CHECK_EQ(max_idx.Size(), grad.Size())
+        << "CpuPoolingForward should be called before CpuPoolingBackward";
+
   in_grad.device()->Exec(
-      [x, y, in_grad, grad, &ph](Context *ctx) mutable {
-        auto eng = ctx->dnnl_engine;
-        using namespace dnnl;
-
-        memory dx_mem(ph.x_md, eng, in_grad.block()->mutable_data());
-        memory dy_mem(ph.y_md, eng, grad.block()->mutable_data());
-
-        pooling_backward(ph.pool_bwd_pd)
-            .execute(ctx->dnnl_stream, {{DNNL_ARG_DIFF_DST, dy_mem},
-                                        {DNNL_ARG_DIFF_SRC, dx_mem},
-                                        {DNNL_ARG_WORKSPACE, ph.ws_mem}});
-        ctx->dnnl_stream.wait();
+      [in_grad, grad, max_idx, is_max, &ph](Context *ctx) mutable {
+        NativePoolingBackward(
+            static_cast<const float *>(grad.block()->data()),
+            is_max ? static_cast<const int *>(max_idx.block()->data())
+                   : nullptr,
+            ph, static_cast<float *>(in_grad.block()->mutable_data()));
       },
-      {x.block(), y.block(), grad.block()}, {in_grad.block()}, "CpuPoolingBackward");
+      is_max ? std::vector<Block *>{grad.block(), max_idx.block()}
+             : std::vector<Block *>{grad.block()},
+      {in_grad.block()}, "CpuPoolingBackward");
 
   return in_grad;
 }
-#endif  // USE_DNNL
 
 #ifdef USE_CUDNN
 
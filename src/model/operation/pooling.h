@@ -60,21 +60,25 @@ class PoolingHandle {
   int pooled_width;
 
   bool is_max_pooling;
+  bool use_dnnl = false;  // set it to false to run the native cpp path
+
+  // index of the max element in the input plane for each output of the
+  // native max pooling, which is written by the forward for the backward
+  mutable Tensor max_idx;
 
 #ifdef USE_DNNL
   dnnl::memory::desc x_md;
   dnnl::memory::desc y_md;
   dnnl::memory ws_mem;
+  std::string prim_key;  // key of the cached primitives
   dnnl::pooling_forward::primitive_desc pool_fwd_pd;
   dnnl::pooling_backward::primitive_desc pool_bwd_pd;
 #endif  // USE_DNNL
 };
 
-#ifdef USE_DNNL
 Tensor CpuPoolingForward(const PoolingHandle &ph, const Tensor &x);
 Tensor CpuPoolingBackward(const PoolingHandle &ph, const Tensor &dy,
                           const Tensor &x, const Tensor &y);
-#endif  // USE_DNNL
 
 #ifdef USE_CUDNN
 class CudnnPoolingHandle : public PoolingHandle {
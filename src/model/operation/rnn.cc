@@ -21,8 +21,588 @@
 
 #include "rnn.h"
 
+#include <algorithm>
+#include <cmath>
 #include <map>
+#include <random>
+
+#include "sgemm.h"
+
 namespace singa {
+
+RNNHandle::RNNHandle(const Tensor &x, const int hidden_size, const int mode,
+                     const int num_layers, const int bias, const float dropout,
+                     const int bidirectional)
+    : bias(bias),
+      mode(mode),
+      dropout(dropout),
+      bidirectional(bidirectional),
+      hidden_size(hidden_size),
+      num_layers(num_layers) {
+  CHECK_EQ(bias, 1) << "Current implementation always include bias";
+  CHECK(bidirectional == 0 || bidirectional == 1)
+      << "bidirectional should be 0 or 1 not " << bidirectional;
+  CHECK(mode >= 0 && mode <= 3) << "mode should be in [0, 3] not " << mode;
+  CHECK(dropout >= 0.0f && dropout < 1.0f)
+      << "dropout should be in [0, 1) not " << dropout;
+  CHECK_GT(num_layers, 0);
+
+  // x shape {seq, bs, ..}
+  seq_length = x.shape(0);
+  batch_size = x.shape(1);
+  feature_size = x.shape(2);
+
+  if (mode == 2)
+    gates = 4;
+  else if (mode == 3)
+    gates = 3;
+  else
+    gates = 1;
+
+  const size_t directions = bidirectional ? 2 : 1;
+  const size_t gh = gates * hidden_size;
+  weights_size = 0;
+  for (size_t l = 0; l < this->num_layers; l++) {
+    for (size_t d = 0; d < directions; d++) {
+      const size_t in = input_size(l);
+      const int pseudoLayer = l * directions + d;
+      const size_t w_ih = weights_size, w_hh = w_ih + gh * in;
+      const size_t b_ih = w_hh + gh * hidden_size, b_hh = b_ih + gh;
+      weights_offset.push_back(weights_size);
+      for (size_t g = 0; g < gates; g++) {
+        weights_mapping[std::make_tuple((int)g, pseudoLayer, false)] =
+            std::make_tuple(w_ih + g * hidden_size * in, hidden_size * in);
+        weights_mapping[std::make_tuple((int)(g + gates), pseudoLayer, false)] =
+            std::make_tuple(w_hh + g * hidden_size * hidden_size,
+                            hidden_size * hidden_size);
+        weights_mapping[std::make_tuple((int)g, pseudoLayer, true)] =
+            std::make_tuple(b_ih + g * hidden_size, hidden_size);
+        weights_mapping[std::make_tuple((int)(g + gates), pseudoLayer, true)] =
+            std::make_tuple(b_hh + g * hidden_size, hidden_size);
+      }
+      weights_size = b_hh + gh;
+    }
+  }
+}
+
+size_t RNNHandle::input_size(size_t layer) const {
+  return layer == 0 ? feature_size : hidden_size * (bidirectional ? 2 : 1);
+}
+
+size_t RNNHandle::reserve_size() const {
+  const size_t n = seq_length * batch_size;
+  const size_t directions = bidirectional ? 2 : 1;
+  // activations, gradients of the gates, hidden states and cell states (lstm)
+  // or recurrent projections of the new gate (gru) of each pseudo layer
+  size_t size = num_layers * directions * n * (2 * gates + 2) * hidden_size;
+  // outputs of the inner layers and their dropout masks
+  size +=
+      (num_layers - 1) * n * directions * hidden_size * (dropout > 0 ? 2 : 1);
+  return size;
+}
+
+namespace {
+
+inline float Sigmoid(float x) { return 1.0f / (1.0f + std::exp(-x)); }
+
+// views of the parameters and the reserve space of one pseudo layer
+struct RNNLayer {
+  const float *w_ih, *w_hh, *b_ih, *b_hh;
+  float *dw_ih, *dw_hh, *db_ih, *db_hh;
+  float *act;    // {seq, bs, gates * hidden}
+  float *dgate;  // {seq, bs, gates * hidden}
+  float *h;      // {seq, bs, hidden}
+  float *aux;    // {seq, bs, hidden}, cell states of lstm and W_hn * h + b_hn
+                 // of gru
+  const float *in;  // {seq, bs, input}
+  size_t in_size;
+};
+
+// the reserve space holds the states of every pseudo layer, followed by the
+// outputs of the inner layers and their dropout masks
+size_t LayerStatesSize(const RNNHandle &h) {
+  return h.seq_length * h.batch_size * (2 * h.gates + 2) * h.hidden_size;
+}
+
+float *InnerOutput(const RNNHandle &h, size_t l, float *rs) {
+  const size_t directions = h.bidirectional ? 2 : 1;
+  const size_t n = h.seq_length * h.batch_size * directions * h.hidden_size;
+  return rs + h.num_layers * directions * LayerStatesSize(h) + l * n;
+}
+
+float *DropoutMask(const RNNHandle &h, size_t l, float *rs) {
+  return InnerOutput(h, h.num_layers - 1 + l, rs);
+}
+
+RNNLayer GetLayer(const RNNHandle &h, size_t l, size_t d, const float *W,
+                  float *dW, float *rs, const float *x) {
+  const size_t directions = h.bidirectional ? 2 : 1;
+  const size_t p = l * directions + d, n = h.seq_length * h.batch_size;
+  const size_t gh = h.gates * h.hidden_size, in = h.input_size(l);
+  const size_t w_ih = h.weights_offset[p], w_hh = w_ih + gh * in;
+  const size_t b_ih = w_hh + gh * h.hidden_size, b_hh = b_ih + gh;
+  RNNLayer r;
+  r.w_ih = W ? W + w_ih : nullptr;
+  r.w_hh = W ? W + w_hh : nullptr;
+  r.b_ih = W ? W + b_ih : nullptr;
+  r.b_hh = W ? W + b_hh : nullptr;
+  r.dw_ih = dW ? dW + w_ih : nullptr;
+  r.dw_hh = dW ? dW + w_hh : nullptr;
+  r.db_ih = dW ? dW + b_ih : nullptr;
+  r.db_hh = dW ? dW + b_hh : nullptr;
+  r.act = rs + p * LayerStatesSize(h);
+  r.dgate = r.act + n * gh;
+  r.h = r.dgate + n * gh;
+  r.aux = r.h + n * h.hidden_size;
+  r.in = l == 0 ? x : InnerOutput(h, l - 1, rs);
+  r.in_size = in;
+  return r;
+}
+
+// whether step t of sample b is beyond the sequence length
+inline bool Padded(const int *seq_lengths, size_t t, size_t b) {
+  return seq_lengths != nullptr && (int)t >= seq_lengths[b];
+}
+
+// states before the step at t, which are the initial states for the first
+// step of the direction
+const float *PrevState(const RNNHandle &h, size_t d, size_t t,
+                       const float *states, const float *init) {
+  const size_t bh = h.batch_size * h.hidden_size;
+  if (d == 0) return t == 0 ? init : states + (t - 1) * bh;
+  return t + 1 == h.seq_length ? init : states + (t + 1) * bh;
+}
+
+// runs one direction of one layer; the input projections of all steps are
+// computed by a single gemm and the gate math of each step is fused into
+// one loop after the gemm of the recurrent projection
+void NativeRNNLayerForward(const RNNHandle &h, const RNNLayer &r, size_t d,
+                           const float *hx, const float *cx,
+                           const int *seq_lengths, float *out, size_t ld_out,
+                           const float *mask, float *hy, float *cy) {
+  const size_t T = h.seq_length, B = h.batch_size, H = h.hidden_size;
+  const size_t G = h.gates, gh = G * H;
+  Sgemm(false, true, T * B, gh, r.in_size, r.in, r.in_size, r.w_ih, r.in_size,
+        0.0f, r.act, gh);
+  std::vector<float> rec(B * gh);
+  for (size_t s = 0; s < T; s++) {
+    const size_t t = d == 0 ? s : T - 1 - s;
+    const float *hp = PrevState(h, d, t, r.h, hx);
+    const float *cp = PrevState(h, d, t, r.aux, cx);
+    Sgemm(false, true, B, gh, H, hp, H, r.w_hh, H, 0.0f, rec.data(), gh);
+#ifdef USE_OPENMP
+#pragma omp parallel for
+#endif  // USE_OPENMP
+    for (int b = 0; b < (int)B; b++) {
+      float *a = r.act + (t * B + b) * gh;
+      const float *rc = rec.data() + b * gh;
+      const float *hpb = hp + b * H, *cpb = cp + b * H;
+      float *hb = r.h + (t * B + b) * H, *xb = r.aux + (t * B + b) * H;
+      float *ob = out + (t * B + b) * ld_out + d * H;
+      if (Padded(seq_lengths, t, b)) {
+        std::copy(hpb, hpb + H, hb);
+        if (h.mode == 2) std::copy(cpb, cpb + H, xb);
+        std::fill(ob, ob + H, 0.0f);
+        continue;
+      }
+      for (size_t j = 0; j < H; j++) {
+        if (h.mode == 0 || h.mode == 1) {
+          float v = a[j] + r.b_ih[j] + rc[j] + r.b_hh[j];
+          hb[j] = h.mode == 0 ? std::max(v, 0.0f) : std::tanh(v);
+        } else if (h.mode == 2) {
+          float i = Sigmoid(a[j] + r.b_ih[j] + rc[j] + r.b_hh[j]);
+          float f =
+              Sigmoid(a[H + j] + r.b_ih[H + j] + rc[H + j] + r.b_hh[H + j]);
+          float g = std::tanh(a[2 * H + j] + r.b_ih[2 * H + j] + rc[2 * H + j] +
+                              r.b_hh[2 * H + j]);
+          float o = Sigmoid(a[3 * H + j] + r.b_ih[3 * H + j] + rc[3 * H + j] +
+                            r.b_hh[3 * H + j]);
+          a[j] = i, a[H + j] = f, a[2 * H + j] = g, a[3 * H + j] = o;
+          xb[j] = f * cpb[j] + i * g;
+          hb[j] = o * std::tanh(xb[j]);
+        } else {
+          float rg = Sigmoid(a[j] + r.b_ih[j] + rc[j] + r.b_hh[j]);
+          float z =
+              Sigmoid(a[H + j] + r.b_ih[H + j] + rc[H + j] + r.b_hh[H + j]);
+          xb[j] = rc[2 * H + j] + r.b_hh[2 * H + j];
+          float n = std::tanh(a[2 * H + j] + r.b_ih[2 * H + j] + rg * xb[j]);
+          a[j] = rg, a[H + j] = z, a[2 * H + j] = n;
+          hb[j] = (1.0f - z) * n + z * hpb[j];
+        }
+        ob[j] = mask ? hb[j] * mask[(t * B + b) * ld_out + d * H + j] : hb[j];
+      }
+    }
+  }
+  const size_t last = d == 0 ? T - 1 : 0;
+  std::copy(r.h + last * B * H, r.h + (last + 1) * B * H, hy);
+  if (h.mode == 2)
+    std::copy(r.aux + last * B * H, r.aux + (last + 1) * B * H, cy);
+}
+
+void NativeRNNForward(const RNNHandle &h, const float *x, const float *hx,
+                      const float *cx, const float *W, const int *seq_lengths,
+                      bool training, std::mt19937 *gen, float *y, float *hy,
+                      float *cy, float *rs) {
+  const size_t directions = h.bidirectional ? 2 : 1;
+  const size_t bh = h.batch_size * h.hidden_size;
+  const size_t ld_out = directions * h.hidden_size;
+  const size_t n = h.seq_length * h.batch_size * ld_out;
+  std::fill(cy, cy + h.num_layers * directions * bh, 0.0f);
+  for (size_t l = 0; l < h.num_layers; l++) {
+    const bool top = l + 1 == h.num_layers;
+    float *out = top ? y : InnerOutput(h, l, rs);
+    const float *mask = nullptr;
+    if (!top && training && h.dropout > 0) {
+      float *m = DropoutMask(h, l, rs);
+      std::bernoulli_distribution dist(1.0f - h.dropout);
+      const float scale = 1.0f / (1.0f - h.dropout);
+      for (size_t i = 0; i < n; i++) m[i] = dist(*gen) ? scale : 0.0f;
+      mask = m;
+    }
+    for (size_t d = 0; d < directions; d++) {
+      const size_t p = l * directions + d;
+      RNNLayer r = GetLayer(h, l, d, W, nullptr, rs, x);
+      NativeRNNLayerForward(h, r, d, hx + p * bh, cx + p * bh, seq_lengths, out,
+                            ld_out, mask, hy + p * bh, cy + p * bh);
+    }
+  }
+}
+
+// backward of one direction of one layer given the gradients of its outputs
+// in dout; the gradients of the gate pre-activations are kept in the reserve
+// space (input side in dgate, recurrent side in act) for the weight
+// gradients, and the gradient of the layer input is accumulated into din
+void NativeRNNLayerBackward(const RNNHandle &h, const RNNLayer &r, size_t d,
+                            const float *dout, size_t ld_out, const float *hx,
+                            const float *cx, const float *dhy, const float *dcy,
+                            const int *seq_lengths, float *din, float *dhx,
+                            float *dcx) {
+  const size_t T = h.seq_length, B = h.batch_size, H = h.hidden_size;
+  const size_t G = h.gates, gh = G * H;
+  std::vector<float> dh(dhy, dhy + B * H), dc(B * H, 0.0f);
+  if (h.mode == 2) std::copy(dcy, dcy + B * H, dc.begin());
+  for (size_t s = 0; s < T; s++) {
+    const size_t t = d == 0 ? T - 1 - s : s;
+    const float *hp = PrevState(h, d, t, r.h, hx);
+    const float *cp = PrevState(h, d, t, r.aux, cx);
+#ifdef USE_OPENMP
+#pragma omp parallel for
+#endif  // USE_OPENMP
+    for (int b = 0; b < (int)B; b++) {
+      float *a = r.act + (t * B + b) * gh, *dg = r.dgate + (t * B + b) * gh;
+      float *dhb = dh.data() + b * H, *dcb = dc.data() + b * H;
+      if (Padded(seq_lengths, t, b)) {
+        // the states are passed through, so are their gradients
+        std::fill(a, a + gh, 0.0f);
+        std::fill(dg, dg + gh, 0.0f);
+        continue;
+      }
+      const float *hb = r.h + (t * B + b) * H, *xb = r.aux + (t * B + b) * H;
+      const float *hpb = hp + b * H, *cpb = cp + b * H;
+      const float *dob = dout + (t * B + b) * ld_out + d * H;
+      for (size_t j = 0; j < H; j++) {
+        const float g = dob[j] + dhb[j];
+        if (h.mode == 0 || h.mode == 1) {
+          dg[j] =
+              h.mode == 0 ? (hb[j] > 0 ? g : 0.0f) : g * (1.0f - hb[j] * hb[j]);
+          a[j] = dg[j];
+          dhb[j] = 0.0f;
+        } else if (h.mode == 2) {
+          const float i = a[j], f = a[H + j], gg = a[2 * H + j],
+                      o = a[3 * H + j], tc = std::tanh(xb[j]);
+          const float c = dcb[j] + g * o * (1.0f - tc * tc);
+          dg[j] = c * gg * i * (1.0f - i);
+          dg[H + j] = c * cpb[j] * f * (1.0f - f);
+          dg[2 * H + j] = c * i * (1.0f - gg * gg);
+          dg[3 * H + j] = g * tc * o * (1.0f - o);
+          for (size_t k = 0; k < 4; k++) a[k * H + j] = dg[k * H + j];
+          dcb[j] = c * f;
+          dhb[j] = 0.0f;
+        } else {
+          const float rg = a[j], z = a[H + j], n = a[2 * H + j];
+          const float dn = g * (1.0f - z) * (1.0f - n * n);
+          dg[j] = dn * xb[j] * rg * (1.0f - rg);
+          dg[H + j] = g * (hpb[j] - n) * z * (1.0f - z);
+          dg[2 * H + j] = dn;
+          a[j] = dg[j], a[H + j] = dg[H + j], a[2 * H + j] = dn * rg;
+          dhb[j] = g * z;
+        }
+      }
+    }
+    // dh_prev += dgate_rec * W_hh; the padded rows keep their gradients since
+    // their recurrent gradients are zeros
+    Sgemm(false, false, B, H, gh, r.act + t * B * gh, gh, r.w_hh, H, 1.0f,
+          dh.data(), H);
+  }
+  std::copy(dh.begin(), dh.end(), dhx);
+  std::copy(dc.begin(), dc.end(), dcx);
+  Sgemm(false, false, T * B, r.in_size, gh, r.dgate, gh, r.w_ih, r.in_size,
+        1.0f, din, r.in_size);
+}
+
+void NativeRNNBackwardx(const RNNHandle &h, const float *dy, const float *dhy,
+                        const float *dcy, const float *W, const float *hx,
+                        const float *cx, const int *seq_lengths, float *dx,
+                        float *dhx, float *dcx, float *rs) {
+  const size_t directions = h.bidirectional ? 2 : 1;
+  const size_t bh = h.batch_size * h.hidden_size;
+  const size_t ld_out = directions * h.hidden_size;
+  const size_t n = h.seq_length * h.batch_size * ld_out;
+  std::vector<float> dout(dy, dy + n), din;
+  std::fill(dcx, dcx + h.num_layers * directions * bh, 0.0f);
+  for (size_t l = h.num_layers; l-- > 0;) {
+    float *dinp = dx;
+    if (l > 0) {
+      din.assign(n, 0.0f);
+      dinp = din.data();
+    } else {
+      std::fill(dx, dx + h.seq_length * h.batch_size * h.feature_size, 0.0f);
+    }
+    for (size_t d = 0; d < directions; d++) {
+      const size_t p = l * directions + d;
+      RNNLayer r = GetLayer(h, l, d, W, nullptr, rs, nullptr);
+      NativeRNNLayerBackward(h, r, d, dout.data(), ld_out, hx + p * bh,
+                             cx + p * bh, dhy + p * bh, dcy + p * bh,
+                             seq_lengths, dinp, dhx + p * bh, dcx + p * bh);
+    }
+    if (l > 0) {
+      if (h.dropout > 0) {
+        const float *mask = DropoutMask(h, l - 1, rs);
+        for (size_t i = 0; i < n; i++) din[i] *= mask[i];
+      }
+      dout.swap(din);
+    }
+  }
+}
+
+void NativeRNNBackwardW(const RNNHandle &h, const float *x, const float *hx,
+                        float *dW, float *rs) {
+  const size_t directions = h.bidirectional ? 2 : 1;
+  const size_t T = h.seq_length, B = h.batch_size, H = h.hidden_size;
+  const size_t gh = h.gates * H, bh = B * H;
+  for (size_t l = 0; l < h.num_layers; l++)
+    for (size_t d = 0; d < directions; d++) {
+      const size_t p = l * directions + d;
+      RNNLayer r = GetLayer(h, l, d, nullptr, dW, rs, x);
+      Sgemm(true, false, gh, r.in_size, T * B, r.dgate, gh, r.in, r.in_size,
+            0.0f, r.dw_ih, r.in_size);
+      // the previous states of the first step are the initial states and
+      // those of the other steps are the states of the neighbour steps
+      const size_t first = d == 0 ? 0 : T - 1;
+      Sgemm(true, false, gh, H, B, r.act + first * B * gh, gh, hx + p * bh, H,
+            0.0f, r.dw_hh, H);
+      if (T > 1) {
+        const float *drec = r.act + (d == 0 ? B * gh : 0);
+        const float *hp = r.h + (d == 0 ? 0 : bh);
+        Sgemm(true, false, gh, H, (T - 1) * B, drec, gh, hp, H, 1.0f, r.dw_hh,
+              H);
+      }
+      std::fill(r.db_ih, r.db_ih + gh, 0.0f);
+      std::fill(r.db_hh, r.db_hh + gh, 0.0f);
+      for (size_t i = 0; i < T * B; i++)
+        for (size_t j = 0; j < gh; j++) {
+          r.db_ih[j] += r.dgate[i * gh + j];
+          r.db_hh[j] += r.act[i * gh + j];
+        }
+    }
+}
+
+vector<Tensor> CpuRNNForward(const Tensor &x, const Tensor &hx,
+                             const Tensor &cx, const Tensor &W,
+                             const Tensor *seq_lengths, bool training,
+                             RNNHandle &h) {
+  CHECK_EQ(h.feature_size, x.shape(2)) << "feature size should not change";
+  CHECK_EQ(W.Size(), h.weights_size);
+  CHECK_EQ(x.device()->lang(), kCpp);
+
+  // update batch size to accomodate bs change
+  h.seq_length = x.shape(0);
+  h.batch_size = x.shape(1);
+  const size_t directions = h.bidirectional ? 2 : 1;
+  Tensor y(Shape{h.seq_length, h.batch_size, h.hidden_size * directions},
+           x.device());
+  Tensor hy(Shape{h.num_layers * directions, h.batch_size, h.hidden_size},
+            x.device());
+  Tensor cy(Shape{h.num_layers * directions, h.batch_size, h.hidden_size},
+            x.device());
+  if (h.reserve_space.Size() < h.reserve_size() ||
+      h.reserve_space.device() != x.device())
+    h.reserve_space = Tensor(Shape{h.reserve_size()}, x.device());
+
+  Tensor x_con = Contiguous(x), hx_con = Contiguous(hx),
+         cx_con = Contiguous(cx);
+  std::vector<Block *> read_blocks = {x_con.block(), hx_con.block(),
+                                      cx_con.block(), W.block()};
+  Tensor lengths;
+  if (seq_lengths != nullptr) {
+    lengths = seq_lengths->AsType(kInt);
+    read_blocks.push_back(lengths.block());
+  }
+  Tensor rs = h.reserve_space;
+  y.device()->Exec(
+      [y, hy, cy, x_con, hx_con, cx_con, W, lengths, rs, training,
+       &h](Context *ctx) mutable {
+        const int *len = nullptr;
+        if (lengths.Size() > 0)
+          len = static_cast<const int *>(lengths.block()->data());
+        NativeRNNForward(h, static_cast<const float *>(x_con.block()->data()),
+                         static_cast<const float *>(hx_con.block()->data()),
+                         static_cast<const float *>(cx_con.block()->data()),
+                         static_cast<const float *>(W.block()->data()), len,
+                         training, &ctx->random_generator,
+                         static_cast<float *>(y.block()->mutable_data()),
+                         static_cast<float *>(hy.block()->mutable_data()),
+                         static_cast<float *>(cy.block()->mutable_data()),
+                         static_cast<float *>(rs.block()->mutable_data()));
+      },
+      read_blocks, {y.block(), hy.block(), cy.block(), rs.block()},
+      "CpuRNNForward", training && h.dropout > 0);
+  return {y, hy, cy};
+}
+
+vector<Tensor> CpuRNNBackwardx(const Tensor &y, const Tensor &dy,
+                               const Tensor &dhy, const Tensor &dcy,
+                               const Tensor &W, const Tensor &hx,
+                               const Tensor &cx, const Tensor *seq_lengths,
+                               RNNHandle &h) {
+  const size_t directions = h.bidirectional ? 2 : 1;
+  Tensor dx(Shape{h.seq_length, h.batch_size, h.feature_size}, y.device());
+  Tensor dhx(Shape{h.num_layers * directions, h.batch_size, h.hidden_size},
+             y.device());
+  Tensor dcx(Shape{h.num_layers * directions, h.batch_size, h.hidden_size},
+             y.device());
+  CHECK_GE(h.reserve_space.Size(), h.reserve_size())
+      << "the forward training should be run before the backward";
+
+  Tensor dy_con = Contiguous(dy), dhy_con = Contiguous(dhy),
+         dcy_con = Contiguous(dcy), hx_con = Contiguous(hx),
+         cx_con = Contiguous(cx);
+  std::vector<Block *> read_blocks = {dy_con.block(),  dhy_con.block(),
+                                      dcy_con.block(), W.block(),
+                                      hx_con.block(),  cx_con.block()};
+  Tensor lengths;
+  if (seq_lengths != nullptr) {
+    lengths = seq_lengths->AsType(kInt);
+    read_blocks.push_back(lengths.block());
+  }
+  Tensor rs = h.reserve_space;
+  dx.device()->Exec(
+      [dx, dhx, dcx, dy_con, dhy_con, dcy_con, W, hx_con, cx_con, lengths, rs,
+       &h](Context *ctx) mutable {
+        const int *len = nullptr;
+        if (lengths.Size() > 0)
+          len = static_cast<const int *>(lengths.block()->data());
+        NativeRNNBackwardx(
+            h, static_cast<const float *>(dy_con.block()->data()),
+            static_cast<const float *>(dhy_con.block()->data()),
+            static_cast<const float *>(dcy_con.block()->data()),
+            static_cast<const float *>(W.block()->data()),
+            static_cast<const float *>(hx_con.block()->data()),
+            static_cast<const float *>(cx_con.block()->data()), len,
+            static_cast<float *>(dx.block()->mutable_data()),
+            static_cast<float *>(dhx.block()->mutable_data()),
+            static_cast<float *>(dcx.block()->mutable_data()),
+            static_cast<float *>(rs.block()->mutable_data()));
+      },
+      read_blocks, {dx.block(), dhx.block(), dcx.block(), rs.block()},
+      "CpuRNNBackwardx");
+  return {dx, dhx, dcx};
+}
+
+Tensor CpuRNNBackwardW(const Tensor &x, const Tensor &hx, RNNHandle &h) {
+  Tensor dW(Shape{h.weights_size}, x.device());
+  Tensor x_con = Contiguous(x), hx_con = Contiguous(hx);
+  Tensor rs = h.reserve_space;
+  dW.device()->Exec(
+      [dW, x_con, hx_con, rs, &h](Context *ctx) mutable {
+        NativeRNNBackwardW(h, static_cast<const float *>(x_con.block()->data()),
+                           static_cast<const float *>(hx_con.block()->data()),
+                           static_cast<float *>(dW.block()->mutable_data()),
+                           static_cast<float *>(rs.block()->mutable_data()));
+      },
+      {x_con.block(), hx_con.block()}, {dW.block(), rs.block()},
+      "CpuRNNBackwardW");
+  return dW;
+}
+
+}  // namespace
+
+vector<Tensor> CpuRNNForwardTraining(const Tensor &x, const Tensor &hx,
+                                     const Tensor &cx, const Tensor &W,
+                                     RNNHandle &h) {
+  return CpuRNNForward(x, hx, cx, W, nullptr, true, h);
+}
+
+vector<Tensor> CpuRNNForwardInference(const Tensor &x, const Tensor &hx,
+                                      const Tensor &cx, const Tensor &W,
+                                      RNNHandle &h) {
+  return CpuRNNForward(x, hx, cx, W, nullptr, false, h);
+}
+
+vector<Tensor> CpuRNNBackwardx(const Tensor &y, const Tensor &dy,
+                               const Tensor &dhy, const Tensor &dcy,
+                               const Tensor &W, const Tensor &hx,
+                               const Tensor &cx, RNNHandle &h) {
+  return CpuRNNBackwardx(y, dy, dhy, dcy, W, hx, cx, nullptr, h);
+}
+
+Tensor CpuRNNBackwardW(const Tensor &x, const Tensor &hx, const Tensor &y,
+                       RNNHandle &h) {
+  return CpuRNNBackwardW(x, hx, h);
+}
+
+// the padded steps of x with seq_lengths {bs} are skipped, whose outputs are
+// zeros and the states are passed through
+vector<Tensor> CpuRNNForwardTrainingEx(const Tensor &x, const Tensor &hx,
+                                       const Tensor &cx, const Tensor &W,
+                                       const Tensor &seq_lengths,
+                                       RNNHandle &h) {
+  return CpuRNNForward(x, hx, cx, W, &seq_lengths, true, h);
+}
+
+vector<Tensor> CpuRNNForwardInferenceEx(const Tensor &x, const Tensor &hx,
+                                        const Tensor &cx, const Tensor &W,
+                                        const Tensor &seq_lengths,
+                                        RNNHandle &h) {
+  return CpuRNNForward(x, hx, cx, W, &seq_lengths, false, h);
+}
+
+vector<Tensor> CpuRNNBackwardxEx(const Tensor &y, const Tensor &dy,
+                                 const Tensor &dhy, const Tensor &dcy,
+                                 const Tensor &W, const Tensor &hx,
+                                 const Tensor &cx, const Tensor &seq_lengths,
+                                 RNNHandle &h) {
+  return CpuRNNBackwardx(y, dy, dhy, dcy, W, hx, cx, &seq_lengths, h);
+}
+
+Tensor CpuRNNBackwardWEx(const Tensor &x, const Tensor &hx, const Tensor &y,
+                         const Tensor &seq_lengths, RNNHandle &h) {
+  return CpuRNNBackwardW(x, hx, h);
+}
+
+void CpuRNNSetParam(int linLayerID, int pseudoLayer, Tensor &weights,
+                    Tensor &paramValues, bool is_bias, RNNHandle &h) {
+  size_t offset, size;
+  std::tie(offset, size) =
+      h.weights_mapping[std::make_tuple(linLayerID, pseudoLayer, is_bias)];
+  CHECK_EQ(size, paramValues.size()) << "param size is not expected";
+  CopyDataToFrom(&weights, paramValues, size, offset, 0);
+}
+
+Tensor CpuRNNGetParamCopy(int linLayerID, int pseudoLayer, Tensor &weights,
+                          bool is_bias, RNNHandle &h) {
+  size_t offset, size;
+  std::tie(offset, size) =
+      h.weights_mapping[std::make_tuple(linLayerID, pseudoLayer, is_bias)];
+  Tensor paramCopy(
+      Shape{
+          size,
+      },
+      weights.device());
+  CopyDataToFrom(&paramCopy, weights, size, 0, offset);
+  return paramCopy;
+}
+
 #ifdef USE_CUDNN
 CudnnRNNHandle::CudnnRNNHandle(const Tensor &x, const int hidden_size,
                                const int mode, const int num_layers,
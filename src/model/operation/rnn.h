@@ -19,6 +19,7 @@
 #define SRC_MODEL_OPERATION_RNN_H_
 
 #include <iostream>
+#include <map>
 #include <tuple>
 #include <vector>
 
@@ -34,6 +35,79 @@
 
 namespace singa {
 
+class RNNHandle {
+ public:
+  RNNHandle(const Tensor &x, const int hidden_size, const int mode = 0,
+            const int num_layers = 1, const int bias = 1,
+            const float dropout = 0.0f, const int bidirectional = 0);
+
+  // parameters
+  int bias;
+  int mode;  // 0 - RNN RELU, 1 - RNN TANH, 2 - LSTM, 3 - GRU
+  float dropout;
+  int bidirectional;
+  size_t feature_size;
+  size_t hidden_size;
+  size_t num_layers;
+  size_t gates;  // 1 for vanilla rnn, 4 for lstm (i, f, g, o), 3 for gru
+                 // (r, z, n)
+
+  size_t weights_size;
+  size_t batch_size;
+  size_t seq_length;
+
+  // the weights of each pseudo layer (layer * directions + direction) are
+  // stored one after another as W_ih {gates * hidden, input}, W_hh {gates *
+  // hidden, hidden}, b_ih {gates * hidden} and b_hh {gates * hidden}
+  std::vector<size_t> weights_offset;
+
+  // gate activations, hidden (and cell) states of every step and the outputs
+  // of the inner layers, written by the forward and read by the backward;
+  // the backward overwrites the activations with the gate gradients
+  mutable Tensor reserve_space;
+
+  // linLayerID, pseudoLayer, is_bias => offset, size
+  // with the same linLayerID convention as CudnnRNNHandle
+  std::map<std::tuple<int, int, bool>, std::tuple<size_t, size_t>>
+      weights_mapping;
+
+  size_t input_size(size_t layer) const;
+  size_t reserve_size() const;
+};
+
+vector<Tensor> CpuRNNForwardTraining(const Tensor &x, const Tensor &hx,
+                                     const Tensor &cx, const Tensor &W,
+                                     RNNHandle &h);
+vector<Tensor> CpuRNNForwardInference(const Tensor &x, const Tensor &hx,
+                                      const Tensor &cx, const Tensor &W,
+                                      RNNHandle &h);
+vector<Tensor> CpuRNNBackwardx(const Tensor &y, const Tensor &dy,
+                               const Tensor &dhy, const Tensor &dcy,
+                               const Tensor &W, const Tensor &hx,
+                               const Tensor &cx, RNNHandle &h);
+Tensor CpuRNNBackwardW(const Tensor &x, const Tensor &hx, const Tensor &y,
+                       RNNHandle &h);
+
+void CpuRNNSetParam(int linLayerID, int pseudoLayer, Tensor &weights,
+                    Tensor &paramValues, bool is_bias, RNNHandle &h);
+Tensor CpuRNNGetParamCopy(int linLayerID, int pseudoLayer, Tensor &weights,
+                          bool is_bias, RNNHandle &h);
+
+vector<Tensor> CpuRNNForwardTrainingEx(const Tensor &x, const Tensor &hx,
+                                       const Tensor &cx, const Tensor &W,
+                                       const Tensor &seq_lengths, RNNHandle &h);
+vector<Tensor> CpuRNNForwardInferenceEx(const Tensor &x, const Tensor &hx,
+                                        const Tensor &cx, const Tensor &W,
+                                        const Tensor &seq_lengths,
+                                        RNNHandle &h);
+vector<Tensor> CpuRNNBackwardxEx(const Tensor &y, const Tensor &dy,
+                                 const Tensor &dhy, const Tensor &dcy,
+                                 const Tensor &W, const Tensor &hx,
+                                 const Tensor &cx, const Tensor &seq_lengths,
+                                 RNNHandle &h);
+Tensor CpuRNNBackwardWEx(const Tensor &x, const Tensor &hx, const Tensor &y,
+                         const Tensor &seq_lengths, RNNHandle &h);
+
 #ifdef USE_CUDNN
 class CudnnRNNHandle {
  public:
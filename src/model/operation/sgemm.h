@@ -0,0 +1,48 @@
+/*********************************************************
+ *
+ * Licensed to the Apache Software Foundation (ASF) under one
+ * or more contributor license agreements.  See the NOTICE file
+ * distributed with this work for additional information
+ * regarding copyright ownership.  The ASF licenses this file
+ * to you under the Apache License, Version 2.0 (the
+ * "License"); you may not use this file except in compliance
+ * with the License.  You may obtain a copy of the License at
+ *
+ *   http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing,
+ * software distributed under the License is distributed on an
+ * "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+ * KIND, either express or implied.  See the License for the
+ * specific language governing permissions and limitations
+ * under the License.
+ *
+ ************************************************************/
+#ifndef SINGA_MODEL_OPERATION_SGEMM_H_
+#define SINGA_MODEL_OPERATION_SGEMM_H_
+
+#include "singa/singa_config.h"
+#include "singa/utils/logging.h"
+
+#ifdef USE_CBLAS
+#include <cblas.h>
+#endif  // USE_CBLAS
+
+namespace singa {
+
+/// c = op(a) * op(b) + beta * c on row major raw buffers, which is shared by
+/// the native cpu operations, e.g., convolution and rnn.
+inline void Sgemm(bool trans_a, bool trans_b, size_t m, size_t n, size_t k,
+                  const float *a, size_t lda, const float *b, size_t ldb,
+                  float beta, float *c, size_t ldc) {
+#ifdef USE_CBLAS
+  cblas_sgemm(CblasRowMajor, trans_a ? CblasTrans : CblasNoTrans,
+              trans_b ? CblasTrans : CblasNoTrans, m, n, k, 1.0f, a, lda, b,
+              ldb, beta, c, ldc);
+#else
+  LOG(FATAL) << "The native cpu operations require cblas";
+#endif  // USE_CBLAS
+}
+
+}  // namespace singa
+#endif  // SINGA_MODEL_OPERATION_SGEMM_H_
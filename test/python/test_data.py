@@ -0,0 +1,152 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#   http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing,
+# software distributed under the License is distributed on an
+# "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY
+# KIND, either express or implied.  See the License for the
+# specific language governing permissions and limitations
+# under the License.
+# =============================================================================
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from PIL import Image
+
+from singa import data
+
+num_images = 10
+
+
+def load_image(img_path):
+    return [Image.open(img_path)]
+
+
+def load_image_and_fail(img_path):
+    # the first image is loaded by start() in the main process
+    if img_path.endswith('img7.png'):
+        raise IOError('cannot load %s' % img_path)
+    return [Image.open(img_path)]
+
+
+class TestImageBatchIter(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        for i in range(num_images):
+            # the pixel value of each image is its index
+            img = Image.new('RGB', (4, 3), (i, i, i))
+            img.save(os.path.join(self.folder, 'img%d.png' % i))
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _write_list(self, metas):
+        list_file = os.path.join(self.folder, 'list.txt')
+        with open(list_file, 'w') as fd:
+            for i, meta in enumerate(metas):
+                if meta is None:
+                    fd.write('img%d.png\n' % i)
+                else:
+                    fd.write('img%d.png %s\n' % (i, meta))
+        return list_file
+
+    def _iter(self, list_file, transform=load_image, **kwargs):
+        return data.ImageBatchIter(list_file,
+                                   4,
+                                   transform,
+                                   image_folder=self.folder,
+                                   capacity=3,
+                                   **kwargs)
+
+    def _take(self, it, num_batches):
+        it.start()
+        try:
+            return [next(it) for _ in range(num_batches)]
+        finally:
+            it.end()
+
+    def test_order_independent_of_num_workers(self):
+        list_file = self._write_list(range(num_images))
+        # 7 mini-batches of 4 images cover nearly 3 epochs
+        one = self._take(self._iter(list_file, num_workers=1, seed=3), 7)
+        three = self._take(self._iter(list_file, num_workers=3, seed=3), 7)
+        for (x1, y1), (x3, y3) in zip(one, three):
+            np.testing.assert_array_equal(x1, x3)
+            np.testing.assert_array_equal(y1, y3)
+
+        for x, y in one:
+            self.assertEqual(x.shape, (4, 3, 3, 4))
+            # the label of each image is the index encoded in its pixels
+            np.testing.assert_array_equal(x[:, 0, 0, 0], y)
+        # each epoch visits every image once
+        y = np.concatenate([y for _, y in one])
+        for epoch in range(2):
+            self.assertEqual(
+                sorted(y[epoch * num_images:(epoch + 1) * num_images]),
+                list(range(num_images)))
+
+    def test_no_shuffle(self):
+        list_file = self._write_list(range(num_images))
+        batches = self._take(
+            self._iter(list_file, shuffle=False, num_workers=2), 3)
+        y = np.concatenate([y for _, y in batches])
+        np.testing.assert_array_equal(y, [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 0, 1])
+
+    def test_label_index(self):
+        list_file = self._write_list(range(num_images))
+        x, y = self._take(self._iter(list_file, shuffle=False), 1)[0]
+        self.assertEqual(y.dtype, np.int32)
+        np.testing.assert_array_equal(y, [0, 1, 2, 3])
+
+    def test_label_string(self):
+        list_file = self._write_list(['c%d' % i for i in range(num_images)])
+        x, y = self._take(self._iter(list_file, shuffle=False), 1)[0]
+        self.assertEqual(y, ['c0', 'c1', 'c2', 'c3'])
+
+    def test_no_label(self):
+        list_file = self._write_list([None] * num_images)
+        x, y = self._take(self._iter(list_file, shuffle=False), 1)[0]
+        self.assertEqual(y, [None] * 4)
+        np.testing.assert_array_equal(x[:, 0, 0, 0], [0, 1, 2, 3])
+
+    def test_restart(self):
+        list_file = self._write_list(range(num_images))
+        expected = self._take(self._iter(list_file, num_workers=2, seed=5), 6)
+
+        it = self._iter(list_file, num_workers=2, seed=5)
+        batches = self._take(it, 3)
+        # restart after the workers have filled the buffer
+        batches += self._take(it, 3)
+        for (x, y), (ex, ey) in zip(batches, expected):
+            np.testing.assert_array_equal(x, ex)
+            np.testing.assert_array_equal(y, ey)
+
+    def test_worker_exit(self):
+        list_file = self._write_list(range(num_images))
+        it = self._iter(list_file,
+                        transform=load_image_and_fail,
+                        shuffle=False,
+                        num_workers=2)
+        it.start()
+        try:
+            # img7 is in the second mini-batch
+            next(it)
+            with self.assertRaises(RuntimeError):
+                next(it)
+        finally:
+            it.end()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -18,8 +18,12 @@
 
 from __future__ import division
 
+import io
 import os
+import json
+import zipfile
 import math
+import tempfile
 import unittest
 import numpy as np
 
@@ -331,6 +335,131 @@ class TestModelSaveMethods(unittest.TestCase):
         self._save_states_load_states_helper(cpu_dev, graph_flag=False)
         self._save_states_load_states_helper(cpu_dev, graph_flag=True)
 
+    def _save_load_mlp_helper(self, dev, compression=False, mmap=False):
+        x = tensor.PlaceHolder((2, 10), device=dev)
+        m = MLP(perceptron_size=20)
+        m.compile([x], is_train=True, use_graph=False, sequential=False)
+        states = {k: tensor.to_numpy(v) for k, v in m.get_states().items()}
+        aux = {
+            "opt1": tensor.Tensor((2, 10), device=dev).gaussian(1, 0.1),
+            "step": tensor.from_numpy(np.array([3], dtype=np.int32), dev)
+        }
+
+        fp = 'states_%s.bin' % self._testMethodName
+        if os.path.exists(fp):
+            os.remove(fp)
+        m.save_states(fp, aux, compression=compression)
+
+        for v in m.get_states().values():
+            v.set_value(0.0)
+        aux2 = m.load_states(fp, mmap=mmap)
+        for k, v in m.get_states().items():
+            np.testing.assert_array_almost_equal(tensor.to_numpy(v), states[k])
+        np.testing.assert_array_almost_equal(tensor.to_numpy(aux2["opt1"]),
+                                             tensor.to_numpy(aux["opt1"]))
+        self.assertEqual(aux2["step"].dtype, tensor.int32)
+        np.testing.assert_array_equal(tensor.to_numpy(aux2["step"]), [3])
+        del aux2
+        os.remove(fp)
+
+    def test_save_load_cpu(self):
+        self._save_load_mlp_helper(cpu_dev)
+
+    def test_save_load_compression_cpu(self):
+        self._save_load_mlp_helper(cpu_dev, compression=True)
+
+    def test_save_load_mmap_cpu(self):
+        self._save_load_mlp_helper(cpu_dev, mmap=True)
+
+    @unittest.skipIf(not singa_api.USE_CUDA, 'CUDA is not enabled')
+    def test_save_load_gpu(self):
+        self._save_load_mlp_helper(gpu_dev)
+        self._save_load_mlp_helper(gpu_dev, compression=True, mmap=True)
+
+    def _async_save_helper(self, dev):
+        x = tensor.PlaceHolder((2, 10), device=dev)
+        m = MLP(perceptron_size=20)
+        m.compile([x], is_train=True, use_graph=False, sequential=False)
+        aux = {"opt1": tensor.Tensor((2, 10), device=dev).gaussian(1, 0.1)}
+
+        fps = ['states_%s_%d.bin' % (self._testMethodName, i) for i in range(3)]
+        for fp in fps:
+            if os.path.exists(fp):
+                os.remove(fp)
+        snapshots, handles = [], []
+        for fp in fps:
+            snapshots.append(
+                {k: tensor.to_numpy(v) for k, v in m.get_states().items()})
+            handles.append(m.async_save_states(fp, aux, max_pending=2))
+            # the states change after the snapshot is taken
+            for v in m.get_states().values():
+                v += 1.0
+        for h in handles:
+            h.result()
+
+        for fp, states in zip(fps, snapshots):
+            self.assertFalse(os.path.exists(fp + '.tmp'))
+            aux2 = m.load_states(fp)
+            for k, v in m.get_states().items():
+                np.testing.assert_array_almost_equal(tensor.to_numpy(v),
+                                                     states[k])
+            np.testing.assert_array_almost_equal(tensor.to_numpy(aux2["opt1"]),
+                                                 tensor.to_numpy(aux["opt1"]))
+            os.remove(fp)
+
+    def test_async_save_states_cpu(self):
+        self._async_save_helper(cpu_dev)
+
+    @unittest.skipIf(not singa_api.USE_CUDA, 'CUDA is not enabled')
+    def test_async_save_states_gpu(self):
+        self._async_save_helper(gpu_dev)
+
+    def test_load_states_zip_like_cpu(self):
+        # the tensor data contains the end record of an (empty) zip archive,
+        # which does not make the file a zip
+        x = tensor.PlaceHolder((2, 10), device=cpu_dev)
+        m = MLP(perceptron_size=20)
+        m.compile([x], is_train=True, use_graph=False, sequential=False)
+        npz = io.BytesIO()
+        zipfile.ZipFile(npz, mode="w").close()
+        blob = np.frombuffer(npz.getvalue().ljust(24, b'\x00'), np.int32)
+        aux = {"blob": tensor.from_numpy(blob.copy(), cpu_dev)}
+
+        fp = 'states_%s.bin' % self._testMethodName
+        if os.path.exists(fp):
+            os.remove(fp)
+        m.save_states(fp, aux)
+        try:
+            self.assertTrue(zipfile.is_zipfile(fp))
+            aux2 = m.load_states(fp)
+        finally:
+            os.remove(fp)
+        np.testing.assert_array_equal(tensor.to_numpy(aux2["blob"]), blob)
+
+    def test_load_states_zip_cpu(self):
+        # states saved as a zip of a npz and a json file by earlier versions
+        x = tensor.PlaceHolder((2, 10), device=cpu_dev)
+        m = MLP(perceptron_size=20)
+        m.compile([x], is_train=True, use_graph=False, sequential=False)
+        states = {k: tensor.to_numpy(v) + 1 for k, v in m.get_states().items()}
+        tensor_dict = dict(states, opt1=np.arange(4, dtype=np.float32))
+        states_attr = {k: {'state_type': m.MODEL_STATE_TYPE} for k in states}
+        states_attr['opt1'] = {'state_type': m.AUX_STATE_TYPE}
+
+        fp = 'states_%s.zip' % self._testMethodName
+        with zipfile.ZipFile(fp, mode="w") as zf:
+            npz = io.BytesIO()
+            np.savez(npz, **tensor_dict)
+            zf.writestr('tensor_dict.npz', npz.getvalue())
+            zf.writestr('states_attr.json', json.dumps(states_attr))
+
+        aux = m.load_states(fp)
+        os.remove(fp)
+        np.testing.assert_array_almost_equal(tensor.to_numpy(aux['opt1']),
+                                             tensor_dict['opt1'])
+        for k, v in m.get_states().items():
+            np.testing.assert_array_almost_equal(tensor.to_numpy(v), states[k])
+
 
 class TestPythonModule(unittest.TestCase):
 
@@ -480,6 +609,23 @@ class TestPythonModule(unittest.TestCase):
     def test_train_one_batch_gpu(self):
         self._train_one_batch_helper(gpu_dev, True, True, False)
 
+    def test_train_one_batch_cpu_executors(self):
+        dev = device.create_cpu_device(num_executors=4)
+        self._train_one_batch_helper(dev, True, True, False)
+
+    def test_train_one_batch_cpu_memory_plan(self):
+        dev = device.create_cpu_device()
+        dev.EnableMemoryPlan(True)
+        self._train_one_batch_helper(dev, True, True, False)
+        self.assertGreater(dev.GetPlannedPeakMemory(), 0)
+        self.assertGreaterEqual(dev.GetNaivePeakMemory(),
+                                dev.GetPlannedPeakMemory())
+        dev.EnableMemoryPlan(False)
+
+    def test_train_one_batch_cpu_fused_sgd(self):
+        self.sgd = opt.SGD(lr=0.05, fused=True)
+        self._train_one_batch_helper(cpu_dev, True, True, False)
+
     def test_without_graph_cpu(self):
         self._train_one_batch_helper(cpu_dev, True, False, False)
 
@@ -494,6 +640,34 @@ class TestPythonModule(unittest.TestCase):
     def test_run_in_serial_gpu(self):
         self._train_one_batch_helper(gpu_dev, True, True, True)
 
+    def test_profile_cpu(self):
+        dev = device.create_cpu_device()
+        dev.EnableProfiling(True)
+        dev.ClearProfile()
+        self._train_one_batch_helper(dev, True, True, False)
+        self._train_one_batch_helper(dev, True, True, False)
+        dev.EnableProfiling(False)
+
+        profile = dev.GetProfile()
+        self.assertGreater(profile['iterations'], 0)
+        self.assertGreater(len(profile['ops']), 0)
+        # aggregated per op name and sorted by the total time
+        names = [op['name'] for op in profile['ops']]
+        self.assertEqual(len(names), len(set(names)))
+        totals = [op['total'] for op in profile['ops']]
+        self.assertEqual(totals, sorted(totals, reverse=True))
+        count = sum(op['count'] for op in profile['ops'])
+        self.assertEqual(count, sum(n['count'] for n in profile['nodes']))
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'trace.json')
+            dev.ExportProfile(path)
+            with open(path) as f:
+                trace = json.load(f)
+        events = [e for e in trace['traceEvents'] if e['ph'] == 'X']
+        self.assertEqual(count, len(events))
+        dev.ClearProfile()
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -2123,5 +2123,156 @@ class TestPythonOnnx(unittest.TestCase):
     def test_transfer_learning_gpu(self):
         self._transfer_learning_helper(gpu_dev)
 
+    def _repeated_run_helper(self, dev):
+        x = tensor.Tensor(shape=(2, 3, 3, 3), device=dev)
+        x.gaussian(0.0, 1.0)
+        conv = layer.Conv2d(1, 2)
+
+        def forward(x):
+            y = conv(x)
+            y = autograd.Reshape((2, 4))(y)[0]
+            return autograd.ReLU()(y)[0]
+
+        y = forward(x)
+        # frontend
+        model = sonnx.to_onnx([x], [y])
+
+        # backend
+        sg_ir = sonnx.prepare(model, device=dev)
+        sg_ir.is_graph = True
+        # the first run stops at the conv, then the plan is reused
+        sg_ir.run([x], last_layers=0)
+        for _ in range(3):
+            x.gaussian(0.0, 1.0)
+            y_t = sg_ir.run([x])
+            np.testing.assert_array_almost_equal(tensor.to_numpy(forward(x)),
+                                                 tensor.to_numpy(y_t[0]),
+                                                 decimal=5)
+
+    def test_repeated_run_cpu(self):
+        self._repeated_run_helper(cpu_dev)
+
+    @unittest.skipIf(not singa_api.USE_CUDA, 'CUDA is not enabled')
+    def test_repeated_run_gpu(self):
+        self._repeated_run_helper(gpu_dev)
+
+    def _optimize_helper(self, dev):
+        states = {
+            'W': np.random.randn(2, 3, 3, 3),
+            'B': np.random.randn(2),
+            'scale': np.random.rand(2) + 0.5,
+            'bias': np.random.randn(2),
+            'mean': np.random.randn(2),
+            'var': np.random.rand(2) + 0.5,
+            'Wg': np.random.randn(32, 5),
+            'bg': np.random.randn(5),
+        }
+        initializers = [
+            numpy_helper.from_array(val.astype(np.float32), name)
+            for name, val in states.items()
+        ]
+        initializers.append(
+            numpy_helper.from_array(np.array([0], dtype=np.int64), 'index'))
+        minus_one = numpy_helper.from_array(np.array([-1], dtype=np.int64))
+        nodes = [
+            make_node('Conv', ['x', 'W', 'B'], ['conv'],
+                      kernel_shape=[3, 3],
+                      pads=[1, 1, 1, 1]),
+            make_node('BatchNormalization',
+                      ['conv', 'scale', 'bias', 'mean', 'var'], ['bn']),
+            # the target shape of the reshape, (batch, -1)
+            make_node('Shape', ['bn'], ['shape']),
+            make_node('Gather', ['shape', 'index'], ['batch']),
+            make_node('Constant', [], ['minus_one'], value=minus_one),
+            make_node('Concat', ['batch', 'minus_one'], ['new_shape'], axis=0),
+            make_node('Reshape', ['bn', 'new_shape'], ['flat']),
+            make_node('Transpose', ['flat'], ['t1'], perm=[1, 0]),
+            make_node('Transpose', ['t1'], ['t2'], perm=[1, 0]),
+            make_node('Gemm', ['t2', 'Wg'], ['gemm']),
+            make_node('Add', ['gemm', 'bg'], ['y']),
+            make_node('Relu', ['x'], ['unused']),
+        ]
+        graph = make_graph(
+            nodes, 'optimize',
+            [make_tensor_value_info('x', TensorProto.FLOAT, [2, 3, 4, 4])],
+            [make_tensor_value_info('y', TensorProto.FLOAT, [2, 5])],
+            initializers)
+        model = helper.make_model(graph)
+        model.opset_import[0].version = 11
+
+        # the batch norm is fused for inference only
+        autograd.training = False
+        try:
+            x = tensor.Tensor(shape=(2, 3, 4, 4), device=dev)
+            x.gaussian(0.0, 1.0)
+            sg_ir = sonnx.prepare(model, device=dev, optimize=False)
+            sg_ir.is_graph = True
+            y = sg_ir.run([x])[0]
+            self.assertEqual(len(sg_ir.layers), 11)
+
+            opt_ir = sonnx.prepare(model, device=dev)
+            opt_ir.is_graph = True
+            y_t = opt_ir.run([x])[0]
+            # the shape of x is not folded, as it may change at runtime
+            self.assertEqual(
+                dict(opt_ir.optimization_report), {
+                    'fold_constants': 1,
+                    'fuse_conv_bn': 1,
+                    'fuse_gemm_add': 1,
+                    'cancel_transpose_reshape': 2,
+                    'eliminate_dead_nodes': 1
+                })
+            self.assertEqual(
+                [node.op_type for node, _ in opt_ir.layers],
+                ['Conv', 'Shape', 'Gather', 'Concat', 'Reshape', 'Gemm'])
+            np.testing.assert_array_almost_equal(tensor.to_numpy(y),
+                                                 tensor.to_numpy(y_t),
+                                                 decimal=4)
+
+            # another batch size than the declared one
+            x = tensor.Tensor(shape=(5, 3, 4, 4), device=dev)
+            x.gaussian(0.0, 1.0)
+            sg_ir = sonnx.prepare(model, device=dev, optimize=False)
+            sg_ir.is_graph = True
+            y = sg_ir.run([x])[0]
+            opt_ir = sonnx.prepare(model, device=dev)
+            opt_ir.is_graph = True
+            y_t = opt_ir.run([x])[0]
+            self.assertEqual(y_t.shape, (5, 5))
+            np.testing.assert_array_almost_equal(tensor.to_numpy(y),
+                                                 tensor.to_numpy(y_t),
+                                                 decimal=4)
+        finally:
+            autograd.training = True
+
+        # only the given passes are run
+        sg_ir = sonnx.prepare(model,
+                              device=dev,
+                              optimize=['eliminate_dead_nodes'])
+        self.assertEqual(dict(sg_ir.optimization_report),
+                         {'eliminate_dead_nodes': 1})
+        self.assertEqual(len(sg_ir.layers), 10)
+
+        # SONNXModel keeps all the nodes, which its last_layers counts, unless
+        # it is asked to optimize, then the batch norm is not fused
+        m = sonnx.SONNXModel(model)
+        self.assertEqual(len(m.sg_ir.layers), 11)
+        m = sonnx.SONNXModel(model, optimize=True)
+        self.assertEqual(
+            dict(m.sg_ir.optimization_report), {
+                'fold_constants': 1,
+                'fuse_gemm_add': 1,
+                'cancel_transpose_reshape': 2,
+                'eliminate_dead_nodes': 1
+            })
+
+    def test_optimize_cpu(self):
+        self._optimize_helper(cpu_dev)
+
+    @unittest.skipIf(not singa_api.USE_CUDA, 'CUDA is not enabled')
+    def test_optimize_gpu(self):
+        self._optimize_helper(gpu_dev)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -22,6 +22,7 @@ from singa import tensor
 from singa import singa_wrap as singa
 from singa import autograd
 from singa import layer
+from singa import opt
 from singa import singa_wrap
 from cuda_helper import gpu_dev, cpu_dev
 
@@ -489,6 +490,15 @@ class TestPythonOperation(unittest.TestCase):
     def test_gradient_check_cudnn_rnn_lstm(self):
         self._gradient_check_cudnn_rnn(mode="lstm", dev=gpu_dev)
 
+    def test_gradient_check_cudnn_rnn_vanilla_cpu(self):
+        self._gradient_check_cudnn_rnn(mode="vanilla", dev=cpu_dev)
+
+    def test_gradient_check_cudnn_rnn_lstm_cpu(self):
+        self._gradient_check_cudnn_rnn(mode="lstm", dev=cpu_dev)
+
+    def test_gradient_check_cudnn_rnn_gru_cpu(self):
+        self._gradient_check_cudnn_rnn(mode="gru", dev=cpu_dev)
+
     # Cos Sim Gradient Check
     def _gradient_check_cossim(self, dev=gpu_dev):
         bs = 2
@@ -2731,11 +2741,20 @@ class TestPythonOperation(unittest.TestCase):
         x.to_device(dev)
         dy.to_device(dev)
 
-        result = autograd.dropout(x, 0.5)
+        result = autograd.dropout(x, 0, 0.5)
         dx = result.creator.backward(dy.data)
         self.check_shape(result.shape, (3, 4, 5))
         self.check_shape(dx.shape(), (3, 4, 5))
 
+        # kept elements are scaled by 1 / (1 - ratio), dx uses the same mask
+        y = tensor.to_numpy(result)
+        keep = y != 0
+        np.testing.assert_array_almost_equal(y, np.where(keep, X * 2, 0))
+        np.testing.assert_array_almost_equal(
+            tensor.to_numpy(tensor.from_raw_tensor(dx)),
+            np.where(keep,
+                     tensor.to_numpy(dy) * 2, 0))
+
     def test_dropout_cpu(self):
         self.dropout_test(cpu_dev)
 
@@ -2895,13 +2914,13 @@ class TestPythonOperation(unittest.TestCase):
         DX = np.zeros((2),dtype=np.float32)
         np.testing.assert_array_almost_equal(tensor.to_numpy(result),y,decimal=5)
         np.testing.assert_array_almost_equal(tensor.to_numpy(tensor.from_raw_tensor(dx)),DX,decimal=5)
-    
+
     def test_floor_cpu(self):
         self.floor_test(cpu_dev)
 
     @unittest.skipIf(not singa_wrap.USE_CUDA, 'CUDA is not enabled')
     def test_floor_gpu(self):
-        self.floor_test(gpu_dev)    
+        self.floor_test(gpu_dev)
 
     def _test_scatter_elements(self, dev):
         # testing witout axis
@@ -3013,11 +3032,17 @@ class TestPythonOperation(unittest.TestCase):
 
     def gather_test(self, dev):
         config = [([0, 1, 3], 0), ([0, 1, 3], 1), ([[0, 1], [1, 2], [2, 3]], 1),
-                  ([0, -1, -2], 0)]  # (indices, axis)
+                  ([0, -1, -2], 0), ([3, 0, 3, 1], 1),
+                  (2, 1)]  # (indices, axis)
         for indices, _axis in config:
             X = np.random.randn(5, 4, 3, 2).astype(np.float32)
             y = np.take(X, indices, axis=_axis)
-            DY = np.ones(y.shape, dtype=np.float32)
+            DY = np.random.randn(*y.shape).astype(np.float32)
+            DX = np.zeros_like(X)
+            q = np.ndim(indices)
+            np.add.at(np.moveaxis(DX, _axis, 0), np.mod(indices,
+                                                        X.shape[_axis]),
+                      np.moveaxis(DY, range(_axis, _axis + q), range(q)))
 
             x = tensor.from_numpy(X)
             dy = tensor.from_numpy(DY)
@@ -3031,6 +3056,10 @@ class TestPythonOperation(unittest.TestCase):
                                                  y,
                                                  decimal=5)
             self.check_shape(dx.shape(), tuple(X.shape))
+            np.testing.assert_array_almost_equal(tensor.to_numpy(
+                tensor.from_raw_tensor(dx)),
+                                                 DX,
+                                                 decimal=5)
 
     def test_gather_cpu(self):
         self.gather_test(cpu_dev)
@@ -3160,6 +3189,12 @@ class TestPythonOperation(unittest.TestCase):
 
     @unittest.skipIf(not singa_wrap.USE_CUDA, 'CUDA is not enabled')
     def test_cudnn_rnn_operation(self, dev=gpu_dev):
+        self._rnn_operation_helper(singa.CudnnRNNHandle, dev)
+
+    def test_cpu_rnn_operation(self):
+        self._rnn_operation_helper(singa.RNNHandle, cpu_dev)
+
+    def _rnn_operation_helper(self, handle_class, dev):
         # init params, inputs
         hidden_size = 7
         seq_length = 5
@@ -3182,12 +3217,12 @@ class TestPythonOperation(unittest.TestCase):
                                device=dev).gaussian(0, 1)
 
             # init cudnn rnn op
-            rnn_handle = singa.CudnnRNNHandle(x.data,
-                                              hidden_size,
-                                              mode,
-                                              num_layers=num_layers,
-                                              dropout=0.1,
-                                              bidirectional=1)
+            rnn_handle = handle_class(x.data,
+                                      hidden_size,
+                                      mode,
+                                      num_layers=num_layers,
+                                      dropout=0.1,
+                                      bidirectional=1)
 
             w = tensor.Tensor(shape=(rnn_handle.weights_size,),
                               device=dev).gaussian(0, 1)
@@ -3341,6 +3376,18 @@ class TestPythonOperation(unittest.TestCase):
         self.check_shape(dx1.shape(), (3, 2))
         self.check_shape(dx2.shape(), (3, 2))
         self.check_shape(dx3.shape(), (3, 2))
+        # the gradients of the padded copies are summed into the source
+        X_idx = np.arange(X.size).reshape(X.shape)
+        for mode, dx in (("constant", dx1), ("reflect", dx2), ("edge", dx3)):
+            kwargs = {"constant_values": -1} if mode == "constant" else {}
+            idx = np.pad(X_idx, pad_width=pad_width, mode=mode, **kwargs)
+            DX = np.bincount(idx[idx >= 0],
+                             weights=DY[idx >= 0],
+                             minlength=X.size).reshape(X.shape)
+            np.testing.assert_array_almost_equal(tensor.to_numpy(
+                tensor.from_raw_tensor(dx)),
+                                                 DX,
+                                                 decimal=5)
 
     def test_pad_cpu(self):
         self.pad_helper(cpu_dev)
@@ -3546,6 +3593,14 @@ class TestPythonOperation(unittest.TestCase):
         self.check_shape(dx.shape(), (2, 4))
         self.check_shape(dW.shape(), (10, 3))
 
+        W = tensor.to_numpy(embedding.W)
+        DY = tensor.to_numpy(dy)
+        DW = np.zeros_like(W)
+        np.add.at(DW, X.reshape(-1), DY.reshape(-1, 3))
+        np.testing.assert_array_almost_equal(tensor.to_numpy(y), W[X])
+        np.testing.assert_array_almost_equal(
+            tensor.to_numpy(tensor.from_raw_tensor(dW)), DW)
+
     def test_embedding_cpu(self):
         self.embedding_helper(cpu_dev)
 
@@ -3553,7 +3608,44 @@ class TestPythonOperation(unittest.TestCase):
     def test_embedding_gpu(self):
         self.embedding_helper(gpu_dev)
 
+    def embedding_sparse_grad_helper(self, dev):
+        embedding = layer.Embedding(10, 3, sparse_grad=True)
+
+        X = np.array([[0, 1, 2, 3], [9, 1, 7, 1]])
+        x = tensor.from_numpy(X)
+        x.to_device(dev)
+
+        dy = tensor.Tensor(shape=(2, 4, 3), device=dev)
+        dy.gaussian(0.0, 1.0)
+
+        y = embedding(x)
+        dx, dW = y.creator.backward(dy.data)
+
+        self.assertIsInstance(dW, tensor.RowSparseTensor)
+        self.check_shape(dW.shape, (10, 3))
+        self.check_shape(dW.values.shape, (8, 3))
+        np.testing.assert_array_equal(tensor.to_numpy(dW.indices),
+                                      X.reshape(-1))
+
+        W = tensor.to_numpy(embedding.W)
+        DW = np.zeros_like(W)
+        np.add.at(DW, X.reshape(-1), tensor.to_numpy(dy).reshape(-1, 3))
+        np.testing.assert_array_almost_equal(tensor.to_numpy(dW.to_dense()),
+                                             DW)
+
+        # plain SGD only updates the rows of the input words
+        sgd = opt.SGD(lr=0.1)
+        sgd.apply(embedding.W.name, embedding.W, dW)
+        np.testing.assert_array_almost_equal(tensor.to_numpy(embedding.W),
+                                             W - 0.1 * DW)
+
+    def test_embedding_sparse_grad_cpu(self):
+        self.embedding_sparse_grad_helper(cpu_dev)
+
     @unittest.skipIf(not singa_wrap.USE_CUDA, 'CUDA is not enabled')
+    def test_embedding_sparse_grad_gpu(self):
+        self.embedding_sparse_grad_helper(gpu_dev)
+
     def _cossim_value(self, dev=gpu_dev):
         # numpy val
         np.random.seed(0)
@@ -3623,6 +3715,71 @@ class TestPythonOperation(unittest.TestCase):
             tensor.to_numpy(tensor.from_raw_tensor(sgrad)), np_grad)
         np.testing.assert_array_almost_equal(tensor.to_numpy(sloss), np_loss)
 
+    def _cross_entropy_value(self, dev=cpu_dev):
+        x = np.random.randn(6, 10).astype(np.float32)
+        label = np.array([3, 0, 9, -1, 5, 3], dtype=np.int32)
+        sx = tensor.from_numpy(x, dev)
+        slabel = tensor.from_numpy(label, dev)
+        e = np.exp(x - x.max(axis=1, keepdims=True))
+        p = e / e.sum(axis=1, keepdims=True)
+        sp = tensor.from_numpy(p, dev)
+
+        for smoothing in [0.0, 0.2]:
+            # the target of the rows, the 4th row is ignored
+            q = np.full(x.shape, smoothing / x.shape[1], dtype=np.float32)
+            q[np.arange(6), label] += 1 - smoothing
+            q[3] = 0
+            np_loss = -np.sum(q * np.log(p)) / 5
+            for fn, sin, np_grad in [(autograd.softmax_cross_entropy, sx,
+                                      (p - q) / 5),
+                                     (autograd.cross_entropy, sp, -q / p / 5)]:
+                sloss = fn(sin, slabel, smoothing)
+                sgrad = sloss.creator.backward()
+                np.testing.assert_array_almost_equal(tensor.to_numpy(sloss),
+                                                     np_loss,
+                                                     decimal=5)
+                np_grad[3] = 0
+                np.testing.assert_array_almost_equal(tensor.to_numpy(
+                    tensor.from_raw_tensor(sgrad)),
+                                                     np_grad,
+                                                     decimal=5)
+
+        # int labels and one-hot targets give the same loss and gradient
+        label[3] = 1
+        onehot = np.eye(10, dtype=np.float32)[label]
+        l1 = autograd.softmax_cross_entropy(sx, tensor.from_numpy(label, dev))
+        g1 = l1.creator.backward()
+        l2 = autograd.softmax_cross_entropy(sx, tensor.from_numpy(onehot, dev))
+        g2 = l2.creator.backward()
+        np.testing.assert_array_almost_equal(tensor.to_numpy(l1),
+                                             tensor.to_numpy(l2))
+        np.testing.assert_array_almost_equal(
+            tensor.to_numpy(tensor.from_raw_tensor(g1)),
+            tensor.to_numpy(tensor.from_raw_tensor(g2)))
+
+        # a dense target of shape (N, 1) is not taken as label indices
+        p = np.random.uniform(0.1, 1.0, (6, 1)).astype(np.float32)
+        q = np.random.uniform(0.0, 1.0, (6, 1)).astype(np.float32)
+        sloss = autograd.cross_entropy(tensor.from_numpy(p, dev),
+                                       tensor.from_numpy(q, dev))
+        np.testing.assert_array_almost_equal(tensor.to_numpy(sloss),
+                                             -np.sum(q * np.log(p)) / 6,
+                                             decimal=5)
+        # the gradient is scaled by a tensor dy
+        sdy = tensor.from_numpy(np.array([2.0], dtype=np.float32), dev)
+        sgrad = sloss.creator.backward(sdy.data)
+        np.testing.assert_array_almost_equal(tensor.to_numpy(
+            tensor.from_raw_tensor(sgrad)),
+                                             -2 * q / p / 6,
+                                             decimal=5)
+
+    def test_cross_entropy_value_cpu(self):
+        self._cross_entropy_value(cpu_dev)
+
+    @unittest.skipIf(not singa_wrap.USE_CUDA, 'CUDA is not enabled')
+    def test_cross_entropy_value_gpu(self):
+        self._cross_entropy_value(gpu_dev)
+
     def erf_helper(self, dev):
         X = np.array([
             0.1, 0.5, 0.9, 1.2, 1.5, 1.8, 2.3, 2.5, 2.7, -1.1, -1.5, -1.9, -2.2,
@@ -226,5 +226,176 @@ class TestOptimizer(unittest.TestCase):
 
         assertTensorEqual(w,w_step1)
 
+    @on_cpu_gpu
+    def test_sgd_const_lr_row_sparse(self, dev=cpu_dev):
+        sgd1 = opt.SGD(lr=0.1)
+        w_shape=(4,3)
+        W = np.random.random(w_shape).astype(np.float32)
+        w = tensor.from_numpy(W)
+        w.to_device(dev)
+        indices = tensor.from_numpy(np.array([2, 0, 2], dtype=np.int32))
+        indices.to_device(dev)
+        values = tensor.Tensor((3, 3), device=dev).set_value(0.1)
+        g = tensor.RowSparseTensor(indices, values, w_shape)
+
+        # duplicated rows are accumulated and other rows are not changed
+        W[0] -= 0.1 * 0.1
+        W[2] -= 0.1 * 0.2
+        sgd1.apply(w.name, w, g)
+
+        np.testing.assert_array_almost_equal(tensor.to_numpy(w), W)
+
+    @on_cpu_gpu
+    def test_sgd_const_lr_momentum_row_sparse(self, dev=cpu_dev):
+        sgd1 = opt.SGD(lr=0.1, momentum=0.9)
+        w_shape=(4,3)
+        w = tensor.Tensor(w_shape, device=dev).set_value(0.1)
+        indices = tensor.from_numpy(np.array([1, 3], dtype=np.int32))
+        indices.to_device(dev)
+        values = tensor.Tensor((2, 3), device=dev).set_value(0.01)
+        g = tensor.RowSparseTensor(indices, values, w_shape)
+
+        w_step1 = w - 0.1 * g.to_dense()
+        sgd1.apply(w.name, w, g)
+
+        assertTensorEqual(w, w_step1)
+
+    def _check_row_sparse(self, opt1, opt2, dev):
+        # the touched rows are updated as the dense gradient does and
+        # the other rows are not changed
+        w_shape = (4, 3)
+        W = np.random.random(w_shape).astype(np.float32)
+        w1 = tensor.from_numpy(W)
+        w1.to_device(dev)
+        w2 = tensor.from_numpy(W)
+        w2.to_device(dev)
+        indices = tensor.from_numpy(np.array([2, 0, 2], dtype=np.int32))
+        indices.to_device(dev)
+        values = tensor.from_numpy(
+            np.random.random((3, 3)).astype(np.float32))
+        values.to_device(dev)
+        g = tensor.RowSparseTensor(indices, values, w_shape)
+
+        opt1.apply('w', w1, g)
+        opt2.apply('w', w2, g.to_dense())
+
+        W1 = tensor.to_numpy(w1)
+        np.testing.assert_array_almost_equal(W1[[0, 2]],
+                                             tensor.to_numpy(w2)[[0, 2]])
+        np.testing.assert_array_almost_equal(W1[[1, 3]], W[[1, 3]])
+
+    @on_cpu_gpu
+    def test_sgd_momentum_weight_decay_row_sparse(self, dev=cpu_dev):
+        self._check_row_sparse(
+            opt.SGD(lr=0.1, momentum=0.9, weight_decay=0.2),
+            opt.SGD(lr=0.1, momentum=0.9, weight_decay=0.2), dev)
+
+    @on_cpu_gpu
+    def test_RMSProp_row_sparse(self, dev=cpu_dev):
+        self._check_row_sparse(opt.RMSProp(lr=0.1, weight_decay=0.1),
+                               opt.RMSProp(lr=0.1, weight_decay=0.1), dev)
+
+    @on_cpu_gpu
+    def test_AdaGrad_row_sparse(self, dev=cpu_dev):
+        self._check_row_sparse(opt.AdaGrad(lr=0.1), opt.AdaGrad(lr=0.1), dev)
+
+    @on_cpu_gpu
+    def test_Adam_row_sparse(self, dev=cpu_dev):
+        self._check_row_sparse(opt.Adam(lr=0.1), opt.Adam(lr=0.1), dev)
+
+    @on_cpu_gpu
+    def test_Adam_lazy_row_sparse(self, dev=cpu_dev):
+        opt1 = opt.Adam(lr=0.1)
+        w_shape = (4, 3)
+        W = np.random.random(w_shape).astype(np.float32)
+        w = tensor.from_numpy(W)
+        w.to_device(dev)
+
+        def adam_step(w, g, step):
+            m = 0.1 * g
+            v = 0.001 * g * g
+            m_norm = m / (1 - 0.9**step)
+            v_norm = v / (1 - 0.999**step)
+            return w - 0.1 * m_norm / (np.sqrt(v_norm) + 1e-8)
+
+        # step 1 updates rows 0 and 2
+        G = np.random.random((2, 3)).astype(np.float32)
+        indices = tensor.from_numpy(np.array([2, 0], dtype=np.int32))
+        indices.to_device(dev)
+        values = tensor.from_numpy(G)
+        values.to_device(dev)
+        opt1.apply('w', w, tensor.RowSparseTensor(indices, values, w_shape))
+        opt1.step()
+        W[2] = adam_step(W[2], G[0], 1)
+        W[0] = adam_step(W[0], G[1], 1)
+        np.testing.assert_array_almost_equal(tensor.to_numpy(w), W, decimal=5)
+
+        # step 2 updates row 1 only; m and v of rows 0 and 2 are kept
+        M = tensor.to_numpy(opt1.m['w'])
+        G = np.random.random((1, 3)).astype(np.float32)
+        indices = tensor.from_numpy(np.array([1], dtype=np.int32))
+        indices.to_device(dev)
+        values = tensor.from_numpy(G)
+        values.to_device(dev)
+        opt1.apply('w', w, tensor.RowSparseTensor(indices, values, w_shape))
+        W[1] = adam_step(W[1], G[0], 2)
+        np.testing.assert_array_almost_equal(tensor.to_numpy(w), W, decimal=5)
+        np.testing.assert_array_almost_equal(
+            tensor.to_numpy(opt1.m['w'])[[0, 2]], M[[0, 2]])
+
+    def _check_fused(self, opt1, opt2, dev):
+        # apply_fused has the same update rule as apply
+        shapes = [(2, 3), (4,), (3, 2, 2)]
+        ws = [np.random.random(s).astype(np.float32) for s in shapes]
+        w1, w2 = [], []
+        for w in ws:
+            w1.append(tensor.from_numpy(w))
+            w1[-1].to_device(dev)
+            w2.append(tensor.from_numpy(w))
+            w2[-1].to_device(dev)
+        names = ['w%d' % i for i in range(len(shapes))]
+        for _ in range(2):
+            gs = [np.random.random(s).astype(np.float32) for s in shapes]
+            g1, g2 = [], []
+            for g in gs:
+                g1.append(tensor.from_numpy(g))
+                g1[-1].to_device(dev)
+                g2.append(tensor.from_numpy(g))
+                g2[-1].to_device(dev)
+            opt1.apply_fused(names, w1, g1)
+            for name, w, g in zip(names, w2, g2):
+                opt2.apply(name, w, g)
+            opt1.step()
+            opt2.step()
+            for a, b in zip(w1, w2):
+                np.testing.assert_array_almost_equal(tensor.to_numpy(a),
+                                                     tensor.to_numpy(b),
+                                                     decimal=5)
+            # the grads are not changed
+            for a, g in zip(g1, gs):
+                np.testing.assert_array_equal(tensor.to_numpy(a), g)
+
+    @on_cpu_gpu
+    def test_sgd_fused(self, dev=cpu_dev):
+        self._check_fused(opt.SGD(lr=0.1), opt.SGD(lr=0.1), dev)
+
+    @on_cpu_gpu
+    def test_sgd_momentum_weight_decay_fused(self, dev=cpu_dev):
+        self._check_fused(
+            opt.SGD(lr=0.1, momentum=0.9, dampening=0.1, weight_decay=0.2),
+            opt.SGD(lr=0.1, momentum=0.9, dampening=0.1, weight_decay=0.2),
+            dev)
+
+    @on_cpu_gpu
+    def test_sgd_nesterov_fused(self, dev=cpu_dev):
+        self._check_fused(opt.SGD(lr=0.1, momentum=0.9, nesterov=True),
+                          opt.SGD(lr=0.1, momentum=0.9, nesterov=True), dev)
+
+    @on_cpu_gpu
+    def test_Adam_fused(self, dev=cpu_dev):
+        self._check_fused(opt.Adam(lr=0.1, weight_decay=0.1),
+                          opt.Adam(lr=0.1, weight_decay=0.1), dev)
+
+
 if __name__ == '__main__':
     unittest.main()
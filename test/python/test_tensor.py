@@ -613,6 +613,62 @@ class TestTensorMethods(unittest.TestCase):
     def test_kint_kint_bc_gpu(self, dev=gpu_dev):
         self._kint_kint_bc(gpu_dev)
 
+    def _row_sparse_coalesce(self, dev=gpu_dev):
+        idx = tensor.from_numpy(np.array([2, 0, 2, 3], dtype=np.int32))
+        idx.to_device(dev)
+        val_np = np.random.random((4, 3)).astype(np.float32)
+        val = tensor.from_numpy(val_np)
+        val.to_device(dev)
+        t = tensor.RowSparseTensor(idx, val, (5, 3))
+        c = t.coalesce()
+        np.testing.assert_array_equal(tensor.to_numpy(c.indices),
+                                      [2, 0, -1, 3])
+        np.testing.assert_array_almost_equal(
+            tensor.to_numpy(c.values),
+            [val_np[0] + val_np[2], val_np[1], [0, 0, 0], val_np[3]])
+        np.testing.assert_array_almost_equal(tensor.to_numpy(c.to_dense()),
+                                             tensor.to_numpy(t.to_dense()))
+
+    def test_row_sparse_coalesce_cpu(self):
+        self._row_sparse_coalesce(cpu_dev)
+
+    @unittest.skipIf(not singa_api.USE_CUDA, 'CUDA is not enabled')
+    def test_row_sparse_coalesce_gpu(self):
+        self._row_sparse_coalesce(gpu_dev)
+
+
+    def test_to_numpy_no_copy(self):
+        t = tensor.from_numpy(np.arange(6, dtype=np.float32).reshape(2, 3))
+        a = tensor.to_numpy(t, copy=False)
+        t += 1.0
+        np.testing.assert_array_equal(a, np.arange(1, 7).reshape(2, 3))
+        # the array keeps the block alive
+        del t
+        a[0, 0] = 10
+        self.assertEqual(a[0, 0], 10)
+        # transposed tensors are copied
+        t = tensor.from_numpy(np.arange(6, dtype=np.float32).reshape(2, 3))
+        a = tensor.to_numpy(t.T(), copy=False)
+        np.testing.assert_array_equal(a, np.arange(6).reshape(2, 3).T)
+
+    def test_from_numpy_no_copy(self):
+        a = np.arange(6, dtype=np.float32).reshape(2, 3)
+        t = tensor.from_numpy(a, copy=False)
+        a[1, 2] = 10
+        t *= 2.0
+        np.testing.assert_array_equal(a, [[0, 2, 4], [6, 8, 20]])
+        # the tensor keeps the array alive
+        del a
+        np.testing.assert_array_equal(tensor.to_numpy(t),
+                                      [[0, 2, 4], [6, 8, 20]])
+        # non-contiguous arrays are copied
+        a = np.arange(6, dtype=np.int32).reshape(2, 3).T
+        t = tensor.from_numpy(a, copy=False)
+        a[0, 0] = 10
+        self.assertEqual(t.dtype, tensor.int32)
+        np.testing.assert_array_equal(tensor.to_numpy(t),
+                                      np.arange(6).reshape(2, 3).T)
+
 
 if __name__ == '__main__':
     unittest.main()
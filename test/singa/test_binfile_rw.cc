@@ -19,11 +19,17 @@
  *
  *************************************************************/
 
+#include <algorithm>
+#include <fstream>
+#include <iterator>
+#include <string>
+
 #include "../include/singa/io/reader.h"
 #include "../include/singa/io/writer.h"
 #include "gtest/gtest.h"
 
 const char* path_bin = "./binfile_test";
+const char* path_idx = "./binfile_index_test";
 using singa::io::BinFileReader;
 using singa::io::BinFileWriter;
 TEST(BinFileWriter, Create) {
@@ -131,3 +137,156 @@ TEST(BinFileReader, SeekToFirst) {
   reader.Close();
   remove(path_bin);
 }
+
+TEST(BinFileIndex, Create) {
+  BinFileWriter writer;
+  bool ret;
+  // a small capacity to flush the buffer during writing
+  ret = writer.Open(path_idx, singa::io::kCreate, 64, true);
+  EXPECT_EQ(true, ret);
+
+  for (int i = 0; i < 10; i++) {
+    ret = writer.Write(i % 2 ? std::to_string(i) : "",
+                       "value " + std::to_string(i));
+    EXPECT_EQ(true, ret);
+  }
+  writer.Close();
+}
+
+TEST(BinFileIndex, ReadAt) {
+  BinFileReader reader;
+  bool ret;
+  ret = reader.Open(path_idx);
+  EXPECT_EQ(true, ret);
+  EXPECT_EQ(true, reader.has_index());
+  EXPECT_EQ(10, reader.Count());
+
+  std::string key, value;
+  EXPECT_EQ(true, reader.ReadAt(7, &key, &value));
+  EXPECT_STREQ("7", key.c_str());
+  EXPECT_STREQ("value 7", value.c_str());
+  EXPECT_EQ(true, reader.ReadAt(4, &key, &value));
+  EXPECT_STREQ("", key.c_str());
+  EXPECT_STREQ("value 4", value.c_str());
+  EXPECT_EQ(false, reader.ReadAt(10, &key, &value));
+
+  reader.Seek(8);
+  reader.Read(&key, &value);
+  EXPECT_STREQ("value 8", value.c_str());
+  reader.Read(&key, &value);
+  EXPECT_STREQ("value 9", value.c_str());
+  EXPECT_EQ(false, reader.Read(&key, &value));
+
+  std::vector<std::string> keys, values;
+  reader.ReadMany({9, 0, 3}, &keys, &values);
+  EXPECT_STREQ("value 9", values[0].c_str());
+  EXPECT_STREQ("", keys[1].c_str());
+  EXPECT_STREQ("value 0", values[1].c_str());
+  EXPECT_STREQ("3", keys[2].c_str());
+
+  EXPECT_EQ(5, reader.Find("5"));
+  EXPECT_EQ(-1, reader.Find("6"));
+  reader.Close();
+}
+
+TEST(BinFileIndex, Shuffle) {
+  BinFileReader reader;
+  reader.Open(path_idx);
+  reader.Shuffle(true, 1);
+
+  std::string key, value;
+  std::vector<std::string> epoch1, epoch2;
+  while (reader.Read(&key, &value)) epoch1.push_back(value);
+  reader.SeekToFirst();
+  while (reader.Read(&key, &value)) epoch2.push_back(value);
+  EXPECT_EQ(10u, epoch1.size());
+  EXPECT_EQ(10u, epoch2.size());
+  EXPECT_NE(epoch1, epoch2);
+  std::sort(epoch1.begin(), epoch1.end());
+  std::sort(epoch2.begin(), epoch2.end());
+  EXPECT_EQ(epoch1, epoch2);
+
+  reader.Shuffle(false);
+  reader.SeekToFirst();
+  reader.Read(&key, &value);
+  EXPECT_STREQ("value 0", value.c_str());
+  reader.Close();
+}
+
+TEST(BinFileIndex, Append) {
+  // appending without the index removes the index file
+  BinFileWriter writer;
+  writer.Open(path_idx, singa::io::kAppend);
+  writer.Write("10", "value 10");
+  writer.Close();
+  std::ifstream fidx(std::string(path_idx) + singa::io::kBinFileIndexSuffix);
+  EXPECT_EQ(false, fidx.is_open());
+
+  BinFileReader reader;
+  reader.Open(path_idx);
+  EXPECT_EQ(false, reader.has_index());
+  EXPECT_EQ(11, reader.Count());
+  reader.Close();
+
+  // the tuples written without the index are indexed when the file is
+  // appended with the index
+  writer.Open(path_idx, singa::io::kAppend, 1024, true);
+  writer.Write("11", "value 11");
+  writer.Close();
+
+  reader.Open(path_idx);
+  EXPECT_TRUE(reader.has_index());
+  EXPECT_EQ(12, reader.Count());
+  std::string key, value;
+  reader.ReadAt(10, &key, &value);
+  EXPECT_STREQ("value 10", value.c_str());
+  reader.ReadAt(11, &key, &value);
+  EXPECT_STREQ("11", key.c_str());
+  EXPECT_EQ(3, reader.Find("3"));
+  reader.Close();
+  remove(path_idx);
+  remove((std::string(path_idx) + singa::io::kBinFileIndexSuffix).c_str());
+}
+
+TEST(BinFileIndex, StaleIndex) {
+  std::string idx = std::string(path_idx) + singa::io::kBinFileIndexSuffix;
+  BinFileWriter writer;
+  writer.Open(path_idx, singa::io::kCreate, 1024, true);
+  for (int i = 0; i < 3; i++) writer.Write("", "value " + std::to_string(i));
+  writer.Close();
+  std::ifstream fin(idx, std::ios::in | std::ios::binary);
+  std::string stale((std::istreambuf_iterator<char>(fin)),
+                    std::istreambuf_iterator<char>());
+  fin.close();
+  EXPECT_EQ(3 * sizeof(singa::io::BinFileIndexEntry), stale.size());
+
+  // recreating the file without the index removes the old index file
+  writer.Open(path_idx, singa::io::kCreate);
+  for (int i = 0; i < 3; i++) writer.Write(std::to_string(i), "v");
+  writer.Close();
+  fin.open(idx);
+  EXPECT_EQ(false, fin.is_open());
+
+  // the reader ignores an index file of the old data
+  std::ofstream fout(idx, std::ios::out | std::ios::binary);
+  fout.write(stale.data(), stale.size());
+  fout.close();
+  BinFileReader reader;
+  reader.Open(path_idx);
+  EXPECT_EQ(false, reader.has_index());
+  EXPECT_EQ(3, reader.Count());
+  reader.Close();
+
+  // appending with the index rebuilds the index file of the old data
+  writer.Open(path_idx, singa::io::kAppend, 1024, true);
+  writer.Write("3", "v");
+  writer.Close();
+  reader.Open(path_idx);
+  EXPECT_TRUE(reader.has_index());
+  EXPECT_EQ(4, reader.Count());
+  EXPECT_EQ(2, reader.Find("2"));
+  EXPECT_EQ(3, reader.Find("3"));
+  reader.Close();
+  remove(path_idx);
+  remove(idx.c_str());
+}
@@ -38,6 +38,31 @@ TEST(CppCPU, MemoryMallocFree) {
   dev.FreeBlock(b);
 }
 
+TEST(CppCPU, AllocatedMem) {
+  CppCPU dev;
+  Block* b = dev.NewBlock(100);
+  EXPECT_EQ(0u, dev.GetAllocatedMem());
+  b->mutable_data();
+  EXPECT_EQ(128u, dev.GetAllocatedMem());
+  dev.FreeBlock(b);
+  EXPECT_EQ(0u, dev.GetAllocatedMem());
+}
+
+TEST(CppCPU, ZeroedBlock) {
+  CppCPU dev;
+  Block* b = dev.NewBlock(16 * sizeof(float));
+  float* ptr = static_cast<float*>(b->mutable_data());
+  for (int i = 0; i < 16; i++) ptr[i] = 1.0f;
+  dev.FreeBlock(b);
+
+  // the block reused from the pool is zeroed
+  b = dev.NewBlock(16 * sizeof(float));
+  const float* data = static_cast<const float*>(b->mutable_data());
+  EXPECT_EQ(ptr, data);
+  for (int i = 0; i < 16; i++) EXPECT_EQ(0.0f, data[i]);
+  dev.FreeBlock(b);
+}
+
 TEST(CppCPU, Exec) {
   CppCPU dev;
   Block* b = dev.NewBlock(4);
@@ -26,6 +26,68 @@
 #include "singa/utils/logging.h"
 #include "singa/utils/timer.h"
 
+TEST(CppMemPool, ReuseFreedBlock) {
+  singa::CppMemPool pool;
+  void* ptr1 = nullptr;
+  pool.Malloc(&ptr1, 100);
+  EXPECT_EQ(0u, reinterpret_cast<size_t>(ptr1) % pool.kAlignment);
+  pool.Free(ptr1);
+  auto usage = pool.GetMemUsage();
+  EXPECT_EQ(128u, usage.first);
+  EXPECT_EQ(128u, usage.second);
+
+  // the same bucket reuses the cached block
+  void* ptr2 = nullptr;
+  pool.Malloc(&ptr2, 120);
+  EXPECT_EQ(ptr1, ptr2);
+  usage = pool.GetMemUsage();
+  EXPECT_EQ(0u, usage.first);
+  EXPECT_EQ(128u, usage.second);
+
+  // a different bucket gets a new block
+  void* ptr3 = nullptr;
+  pool.Malloc(&ptr3, 200);
+  EXPECT_NE(ptr2, ptr3);
+  usage = pool.GetMemUsage();
+  EXPECT_EQ(0u, usage.first);
+  EXPECT_EQ(384u, usage.second);
+
+  pool.Free(ptr2);
+  pool.Free(ptr3);
+  pool.ReleaseCache();
+  usage = pool.GetMemUsage();
+  EXPECT_EQ(0u, usage.first);
+  EXPECT_EQ(0u, usage.second);
+}
+
+TEST(CppMemPool, Calloc) {
+  singa::CppMemPool pool;
+  float* ptr = nullptr;
+  pool.Malloc((void**)&ptr, 16 * sizeof(float));
+  for (int i = 0; i < 16; i++) ptr[i] = 1.0f;
+  pool.Free(ptr);
+
+  float* zeros = nullptr;
+  pool.Calloc((void**)&zeros, 16 * sizeof(float));
+  EXPECT_EQ(ptr, zeros);
+  for (int i = 0; i < 16; i++) EXPECT_EQ(0.0f, zeros[i]);
+  pool.Free(zeros);
+}
+
+TEST(CppMemPool, MaxCached) {
+  singa::CppMemPool pool(256);
+  void* ptr1 = nullptr;
+  void* ptr2 = nullptr;
+  pool.Malloc(&ptr1, 256);
+  pool.Malloc(&ptr2, 256);
+  pool.Free(ptr1);
+  // the cache is full, ptr2 is returned to the system
+  pool.Free(ptr2);
+  auto usage = pool.GetMemUsage();
+  EXPECT_EQ(256u, usage.first);
+  EXPECT_EQ(256u, usage.second);
+}
+
 #ifdef USE_CUDA
 /*
 TEST(CnmemPool, PoolInitAll) {
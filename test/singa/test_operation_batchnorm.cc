@@ -19,6 +19,7 @@
  *
  ************************************************************/
 
+#include <cmath>
 #include <iostream>
 
 #include "../src/model/operation/batchnorm.h"
@@ -26,6 +27,88 @@
 
 using namespace singa;
 
+TEST(OperationBatchNorm, ForwardTraining) {
+  const float x[8] = {1.0f, 2.0f, 3.0f, 4.0f, 5.0f, 6.0f, 7.0f, 8.0f};
+  Tensor in(Shape{2, 2, 1, 2});
+  in.CopyDataFromHostPtr(x, 8);
+  Tensor alpha(Shape{2}), beta(Shape{2});
+  alpha.SetValue(2.0f);
+  beta.SetValue(1.0f);
+  Tensor running_mean(Shape{2}), running_var(Shape{2});
+  running_mean.SetValue(0.0f);
+  running_var.SetValue(1.0f);
+
+  BatchNormHandle handle(0.5f, in);
+  handle.use_dnnl = false;
+  auto ret = CpuBatchNormForwardTraining(handle, in, alpha, beta, running_mean,
+                                         running_var);
+  // channel 0 has {1, 2, 5, 6} and channel 1 has {3, 4, 7, 8}
+  const float *mean = ret[1].data<float>(), *var = ret[2].data<float>();
+  EXPECT_FLOAT_EQ(3.5f, mean[0]);
+  EXPECT_FLOAT_EQ(5.5f, mean[1]);
+  EXPECT_FLOAT_EQ(4.25f, var[0]);
+  EXPECT_FLOAT_EQ(4.25f, var[1]);
+  const float *y = ret[0].data<float>();
+  for (size_t i = 0; i < 8; i++) {
+    float m = (i / 2) % 2 == 0 ? 3.5f : 5.5f;
+    EXPECT_NEAR((x[i] - m) / std::sqrt(4.25f + 1e-5f) * 2.0f + 1.0f, y[i],
+                1e-5);
+  }
+  EXPECT_FLOAT_EQ(1.75f, running_mean.data<float>()[0]);
+  EXPECT_FLOAT_EQ(0.5f + 4.25f * 4 / 3 * 0.5f, running_var.data<float>()[1]);
+
+  Tensor out = CpuBatchNormForwardInference(handle, in, alpha, beta,
+                                            running_mean, running_var);
+  EXPECT_NEAR(
+      (x[0] - 1.75f) / std::sqrt(running_var.data<float>()[0] + 1e-5f) * 2.0f +
+          1.0f,
+      out.data<float>()[0], 1e-5);
+}
+
+// the gradients are checked against the finite difference of <dy, y(x)>
+TEST(OperationBatchNorm, Backward) {
+  Tensor in(Shape{3, 2, 2, 2});
+  Gaussian(0.0f, 1.0f, &in);
+  Tensor alpha(Shape{2}), beta(Shape{2}), dy(in.shape());
+  Gaussian(1.0f, 0.5f, &alpha);
+  Gaussian(0.0f, 1.0f, &beta);
+  Gaussian(0.0f, 1.0f, &dy);
+  Tensor running_mean(Shape{2}), running_var(Shape{2});
+  running_mean.SetValue(0.0f);
+  running_var.SetValue(1.0f);
+
+  BatchNormHandle handle(0.1f, in);
+  handle.use_dnnl = false;
+  auto loss = [&](const Tensor &x, const Tensor &a) {
+    auto ret = CpuBatchNormForwardTraining(handle, x, a, beta, running_mean,
+                                           running_var);
+    return Sum(ret[0] * dy);
+  };
+  auto ret = CpuBatchNormForwardTraining(handle, in, alpha, beta, running_mean,
+                                         running_var);
+  auto grads = CpuBatchNormBackwardx(handle, ret[0], dy, in, alpha, beta,
+                                     ret[1], ret[2]);
+  EXPECT_NEAR(Sum(dy), Sum(grads[2]), 1e-4);
+
+  const float eps = 1e-2f;
+  for (size_t i : {0u, 5u, 13u, 22u}) {
+    Tensor x1 = in.Clone(), x2 = in.Clone();
+    float v1 = in.data<float>()[i] - eps, v2 = in.data<float>()[i] + eps;
+    x1.CopyDataFromHostPtr(&v1, 1, i);
+    x2.CopyDataFromHostPtr(&v2, 1, i);
+    float numeric = (loss(x2, alpha) - loss(x1, alpha)) / (2 * eps);
+    EXPECT_NEAR(numeric, grads[0].data<float>()[i], 1e-2);
+  }
+  for (size_t k : {0u, 1u}) {
+    Tensor a1 = alpha.Clone(), a2 = alpha.Clone();
+    float v1 = alpha.data<float>()[k] - eps, v2 = alpha.data<float>()[k] + eps;
+    a1.CopyDataFromHostPtr(&v1, 1, k);
+    a2.CopyDataFromHostPtr(&v2, 1, k);
+    float numeric = (loss(in, a2) - loss(in, a1)) / (2 * eps);
+    EXPECT_NEAR(numeric, grads[1].data<float>()[k], 1e-2);
+  }
+}
+
 #ifdef USE_DNNL
 TEST(DNNLOperationBatchNorm, ForwardInference) {
   Tensor x(Shape{2, 2});
@@ -24,11 +24,171 @@
 
 #include <chrono>
 #include <iostream>
+#include <vector>
 
 #include "../src/model/operation/convolution.h"
 #include "gtest/gtest.h"
 
 using namespace singa;
+
+// reference convolution computed by the definition, for float x and W
+static std::vector<float> RefConv(const std::vector<float> &x,
+                                  const std::vector<float> &w,
+                                  const ConvHandle &ch) {
+  size_t cg = ch.channels / ch.group, fg = ch.num_filters / ch.group;
+  std::vector<float> y(
+      ch.batchsize * ch.num_filters * ch.conv_height * ch.conv_width, 0.0f);
+  for (size_t n = 0; n < ch.batchsize; n++)
+    for (size_t f = 0; f < ch.num_filters; f++)
+      for (size_t oh = 0; oh < ch.conv_height; oh++)
+        for (size_t ow = 0; ow < ch.conv_width; ow++) {
+          float sum = 0.0f;
+          for (size_t c = 0; c < cg; c++)
+            for (size_t i = 0; i < ch.kernel_h; i++)
+              for (size_t j = 0; j < ch.kernel_w; j++) {
+                int ih = oh * ch.stride_h + i - ch.pad_h;
+                int iw = ow * ch.stride_w + j - ch.pad_w;
+                if (ih < 0 || ih >= (int)ch.height || iw < 0 ||
+                    iw >= (int)ch.width)
+                  continue;
+                size_t ic = f / fg * cg + c;
+                sum += x[((n * ch.channels + ic) * ch.height + ih) * ch.width +
+                         iw] *
+                       w[((f * cg + c) * ch.kernel_h + i) * ch.kernel_w + j];
+              }
+          y[((n * ch.num_filters + f) * ch.conv_height + oh) * ch.conv_width +
+            ow] = sum;
+        }
+  return y;
+}
+
+TEST(OperationConvolution, Forward) {
+  const size_t batch_size = 2, c = 1, h = 3, w = 3;
+  const float x[batch_size * c * h * w] = {1.0f, 2.0f, 3.0f, 4.0f, 5.0f, 6.0f,
+                                           7.0f, 8.0f, 9.0f, 1.0f, 2.0f, 3.0f,
+                                           4.0f, 5.0f, 6.0f, 7.0f, 8.0f, 9.0f};
+  Tensor in(Shape{batch_size, c, h, w});
+  in.CopyDataFromHostPtr(x, batch_size * c * h * w);
+
+  const float we[9] = {1.0f, 1.0f, 0.0f, 0.0f, 0.0f, -1.0f, 0.0f, 1.0f, 0.0f};
+  Tensor weight(Shape{1, 1, 3, 3});
+  weight.CopyDataFromHostPtr(we, 9);
+  Tensor bias(Shape{1});
+  bias.SetValue(1.0f);
+
+  ConvHandle conv_handle(in, {3, 3}, {2, 2}, {1, 1}, c, 1, true);
+  conv_handle.use_dnnl = false;
+  Tensor out1 = CpuConvForward(in, weight, bias, conv_handle);
+
+  const float *out_ptr1 = out1.data<float>();
+  EXPECT_EQ(8u, out1.Size());
+  EXPECT_FLOAT_EQ(3.0f, out_ptr1[0]);
+  EXPECT_FLOAT_EQ(7.0f, out_ptr1[1]);
+  EXPECT_FLOAT_EQ(-3.0f, out_ptr1[2]);
+  EXPECT_FLOAT_EQ(12.0f, out_ptr1[3]);
+  EXPECT_FLOAT_EQ(3.0f, out_ptr1[4]);
+  EXPECT_FLOAT_EQ(7.0f, out_ptr1[5]);
+  EXPECT_FLOAT_EQ(-3.0f, out_ptr1[6]);
+  EXPECT_FLOAT_EQ(12.0f, out_ptr1[7]);
+}
+
+TEST(OperationConvolution, Backward) {
+  const size_t batch_size = 2, c = 1, h = 3, w = 3;
+  const float x[batch_size * c * h * w] = {1.0f, 2.0f, 3.0f, 4.0f, 5.0f, 6.0f,
+                                           7.0f, 8.0f, 9.0f, 1.0f, 2.0f, 3.0f,
+                                           4.0f, 5.0f, 6.0f, 7.0f, 8.0f, 9.0f};
+  Tensor in(Shape{batch_size, c, h, w});
+  in.CopyDataFromHostPtr(x, batch_size * c * h * w);
+
+  const float we[9] = {1.0f, 1.0f, 0.0f, 0.0f, 0.0f, -1.0f, 0.0f, 1.0f, 0.0f};
+  Tensor weight(Shape{1, 1, 3, 3});
+  weight.CopyDataFromHostPtr(we, 9);
+  Tensor bias(Shape{1});
+  bias.SetValue(1.0f);
+
+  ConvHandle conv_handle(in, {3, 3}, {2, 2}, {1, 1}, c, 1, true);
+  conv_handle.use_dnnl = false;
+
+  const float dy[8] = {0.1f, 0.2f, 0.3f, 0.4f, 0.1f, 0.2f, 0.3f, 0.4f};
+  Tensor grad(Shape{batch_size, 1, 2, 2});
+  grad.CopyDataFromHostPtr(dy, 8);
+
+  Tensor in_grad = CpuConvBackwardx(grad, weight, in, conv_handle);
+  const float *dx = in_grad.data<float>();
+  const float *wptr = we;
+  EXPECT_EQ(18u, in_grad.Size());
+  EXPECT_FLOAT_EQ(dy[0] * wptr[4], dx[0]);
+  EXPECT_FLOAT_EQ(dy[0] * wptr[5] + dy[1] * wptr[3], dx[1]);
+  EXPECT_FLOAT_EQ(
+      dy[0] * wptr[8] + dy[1] * wptr[6] + dy[2] * wptr[2] + dy[3] * wptr[0],
+      dx[4]);
+  EXPECT_FLOAT_EQ(dy[7] * wptr[4], dx[17]);
+
+  Tensor dw = CpuConvBackwardW(grad, in, weight, conv_handle);
+  const float *dwptr = dw.data<float>();
+  EXPECT_EQ(9u, dw.Size());
+  EXPECT_FLOAT_EQ(dy[3] * x[4] + dy[7] * x[13], dwptr[0]);
+  EXPECT_FLOAT_EQ(dy[0] * x[0] + dy[4] * x[9] + dy[1] * x[2] + dy[5] * x[11] +
+                      dy[2] * x[6] + dy[6] * x[15] + dy[3] * x[8] +
+                      dy[7] * x[17],
+                  dwptr[4]);
+  EXPECT_FLOAT_EQ(dy[0] * x[4] + dy[4] * x[13], dwptr[8]);
+
+  Tensor db = CpuConvBackwardb(grad, bias, conv_handle);
+  EXPECT_FLOAT_EQ(2.0f, db.data<float>()[0]);
+
+  // a smaller (last) batch with the handle of 2 filters
+  Tensor bias2(Shape{2});
+  ConvHandle conv_handle2(in, {3, 3}, {2, 2}, {1, 1}, c, 2, true);
+  conv_handle2.use_dnnl = false;
+  const float dy2[8] = {0.1f, 0.2f, 0.3f, 0.4f, 1.0f, 1.0f, 1.0f, 1.0f};
+  Tensor grad2(Shape{1, 2, 2, 2});
+  grad2.CopyDataFromHostPtr(dy2, 8);
+  Tensor db2 = CpuConvBackwardb(grad2, bias2, conv_handle2);
+  EXPECT_FLOAT_EQ(1.0f, db2.data<float>()[0]);
+  EXPECT_FLOAT_EQ(4.0f, db2.data<float>()[1]);
+}
+
+// grouped, depthwise and 1x1 convolutions against the reference; the
+// backward passes are checked via <dy, conv(x, W)> = <dx, x> = <dW, W>
+TEST(OperationConvolution, Groups) {
+  struct Config {
+    size_t c, f, k, s, p, g;
+  } configs[] = {{4, 6, 3, 1, 1, 2},
+                 {4, 8, 3, 2, 1, 4},
+                 {6, 4, 1, 1, 0, 2},
+                 {3, 5, 2, 1, 0, 1}};
+  const size_t n = 3, h = 5, w = 4;
+  for (auto &cfg : configs) {
+    Tensor in(Shape{n, cfg.c, h, w});
+    Tensor weight(Shape{cfg.f, cfg.c / cfg.g, cfg.k, cfg.k});
+    Tensor bias(Shape{cfg.f});
+    Gaussian(0.0f, 1.0f, &in);
+    Gaussian(0.0f, 1.0f, &weight);
+    bias.SetValue(0.0f);
+    ConvHandle ch(in, {cfg.k, cfg.k}, {cfg.s, cfg.s}, {cfg.p, cfg.p}, cfg.c,
+                  cfg.f, false, cfg.g);
+    ch.use_dnnl = false;
+
+    std::vector<float> x(in.data<float>(), in.data<float>() + in.Size());
+    std::vector<float> wv(weight.data<float>(),
+                          weight.data<float>() + weight.Size());
+    std::vector<float> ref = RefConv(x, wv, ch);
+    Tensor out = CpuConvForward(in, weight, bias, ch);
+    ASSERT_EQ(ref.size(), out.Size());
+    const float *y = out.data<float>();
+    for (size_t i = 0; i < ref.size(); i++) EXPECT_NEAR(ref[i], y[i], 1e-4);
+
+    Tensor grad(out.shape());
+    Gaussian(0.0f, 1.0f, &grad);
+    float expected = Sum(grad * out);
+    Tensor dx = CpuConvBackwardx(grad, weight, in, ch);
+    Tensor dw = CpuConvBackwardW(grad, in, weight, ch);
+    EXPECT_NEAR(expected, Sum(dx * in), 1e-3);
+    EXPECT_NEAR(expected, Sum(dw * weight), 1e-3);
+  }
+}
+
 #ifdef USE_DNNL
 
 #include <stdio.h>
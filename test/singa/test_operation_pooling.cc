@@ -23,6 +23,53 @@
 
 using namespace singa;
 
+TEST(OperationPooling, ForwardBackwardMax) {
+  const size_t batchsize = 2, c = 1, h = 3, w = 3;
+  const float x[batchsize * c * h * w] = {1.0f, 2.0f, 3.0f, 4.0f, 5.0f, 6.0f,
+                                          7.0f, 8.0f, 9.0f, 9.0f, 8.0f, 7.0f,
+                                          6.0f, 5.0f, 4.0f, 3.0f, 2.0f, 1.0f};
+  Tensor in(Shape{batchsize, c, h, w});
+  in.CopyDataFromHostPtr(x, batchsize * c * h * w);
+
+  PoolingHandle pool_handle(in, {2, 2}, {1, 1}, {0, 0}, true);
+  pool_handle.use_dnnl = false;
+  Tensor out = CpuPoolingForward(pool_handle, in);
+  const float y[8] = {5.0f, 6.0f, 8.0f, 9.0f, 9.0f, 8.0f, 6.0f, 5.0f};
+  const float *yptr = out.data<float>();
+  EXPECT_EQ(8u, out.Size());
+  for (size_t i = 0; i < 8; i++) EXPECT_FLOAT_EQ(y[i], yptr[i]);
+
+  const float dy[8] = {0.1f, 0.2f, 0.3f, 0.4f, 0.1f, 0.2f, 0.3f, 0.4f};
+  Tensor grad(Shape{batchsize, c, 2, 2});
+  grad.CopyDataFromHostPtr(dy, 8);
+  Tensor in_grad = CpuPoolingBackward(pool_handle, grad, in, out);
+  const float dx[18] = {0.0f, 0.0f, 0.0f, 0.0f, 0.1f, 0.2f, 0.0f, 0.3f, 0.4f,
+                        0.1f, 0.2f, 0.0f, 0.3f, 0.4f, 0.0f, 0.0f, 0.0f, 0.0f};
+  const float *dxptr = in_grad.data<float>();
+  for (size_t i = 0; i < 18; i++) EXPECT_FLOAT_EQ(dx[i], dxptr[i]);
+}
+
+TEST(OperationPooling, ForwardBackwardAvgPadding) {
+  const size_t batchsize = 1, c = 1, h = 2, w = 2;
+  const float x[4] = {1.0f, 2.0f, 3.0f, 4.0f};
+  Tensor in(Shape{batchsize, c, h, w});
+  in.CopyDataFromHostPtr(x, 4);
+
+  // the padding is excluded from the average
+  PoolingHandle pool_handle(in, {2, 2}, {2, 2}, {1, 1}, false);
+  pool_handle.use_dnnl = false;
+  Tensor out = CpuPoolingForward(pool_handle, in);
+  const float *yptr = out.data<float>();
+  EXPECT_EQ(4u, out.Size());
+  for (size_t i = 0; i < 4; i++) EXPECT_FLOAT_EQ(x[i], yptr[i]);
+
+  Tensor grad(Shape{batchsize, c, 2, 2});
+  grad.SetValue(1.0f);
+  Tensor in_grad = CpuPoolingBackward(pool_handle, grad, in, out);
+  const float *dxptr = in_grad.data<float>();
+  for (size_t i = 0; i < 4; i++) EXPECT_FLOAT_EQ(1.0f, dxptr[i]);
+}
+
 #ifdef USE_DNNL
 TEST(DNNLOperationPooling, Forward) {
   const size_t batchsize = 2, c = 1, h = 3, w = 3;
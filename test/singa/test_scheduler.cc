@@ -345,22 +345,63 @@ TEST_F(TestGraph, BlockTypeParam) {
     graph.AddOperation(op, {in.block(), mid.block()}, {out.block()});
     graph.AddOperation(op, {out.block()}, {mid.block()});
 
+    // the 5th edge orders the read of mid before its write
     EXPECT_EQ(3u, nodes.size());
-    EXPECT_EQ(5u, edges.size());
+    EXPECT_EQ(6u, edges.size());
     EXPECT_EQ(3u, blocks.size());
     EXPECT_EQ(1u, leaf_blocks.size());
 
     auto edge2 = edges[1];
     auto edge5 = edges[4];
+    auto edge6 = edges[5];
     auto block1 = blocks.find(in.block())->second;
     auto block2 = blocks.find(mid.block())->second;
 
+    CheckEdge(edge5, 4, mid.block(), nodes[1], nodes[2]);
     CheckBlock(block1, 0, in.block(), BlockType::kParam, 3, edge2, NodeVec({}));
-    CheckBlock(block2, 1, mid.block(), BlockType::kParam, 2, edge5,
+    CheckBlock(block2, 1, mid.block(), BlockType::kParam, 2, edge6,
                NodeVec({}));
   }
 }
 
+TEST_F(TestGraph, WriteAfterReadParam) {
+  for (auto &it : devices) {
+    GOUT << "Test graph on device [" << it.first << "]" << std::endl;
+
+    auto dev = it.second;
+    Graph graph(dev.get());
+
+    auto &nodes = graph.nodes();
+
+    Tensor x(Shape{1}, dev);
+    Tensor W(Shape{1}, dev);
+    Tensor y(Shape{1}, dev);
+    Tensor dx(Shape{1}, dev);
+    Tensor dW(Shape{1}, dev);
+    auto op = [](Context *ctx) mutable {};
+
+    // forward and backward read the param W, which is then updated by the
+    // node depending only on dW
+    graph.AddOperation(op, {x.block(), W.block()}, {y.block()});
+    graph.AddOperation(op, {y.block(), W.block()}, {dx.block()});
+    graph.AddOperation(op, {y.block(), x.block()}, {dW.block()});
+    graph.AddOperation(op, {dW.block()}, {W.block()});
+
+    EXPECT_EQ(4u, nodes.size());
+    auto update = nodes[3];
+    NodeVec readers;
+    for (auto edge : update->in_edges()) {
+      if (edge->block() == W.block()) {
+        readers.push_back(edge->src_node());
+      }
+    }
+    EXPECT_EQ(NodeVec({nodes[0], nodes[1]}), readers);
+    auto blkInfo = graph.blocks().find(W.block())->second;
+    EXPECT_EQ(BlockType::kParam, blkInfo->type());
+    EXPECT_EQ(update, blkInfo->write_edge()->src_node());
+  }
+}
+
 TEST_F(TestGraph, BlockTypeInter) {
   for (auto &it : devices) {
     GOUT << "Test graph on device [" << it.first << "]" << std::endl;
@@ -758,3 +799,306 @@ TEST_F(TestGraph, AutoRecycle) {
     }
   }
 }
+
+TEST_F(TestGraph, RunGraphOnExecutors) {
+  auto dev = singa::Platform::CreateCppCPU(4);
+  EXPECT_EQ(4, dev->num_executors());
+  Graph graph(dev.get());
+
+  Tensor in(Shape{1}, dev);
+  Tensor mid(Shape{1}, dev);
+  Tensor out(Shape{1}, dev);
+  Tensor b1(Shape{1}, dev);
+  Tensor b2(Shape{1}, dev);
+  Tensor dx(Shape{1}, dev);
+  Tensor dx1(Shape{1}, dev);
+  Tensor dx2(Shape{1}, dev);
+  Tensor dy1(Shape{1}, dev);
+  Tensor dy2(Shape{1}, dev);
+  Tensor db1(Shape{1}, dev);
+  Tensor db2(Shape{1}, dev);
+
+  // function: (in + b1) * in + b2
+  auto op1 = [in, b1, mid](Context *ctx) mutable { singa::Add(in, b1, &mid); };
+  auto op2 = [mid, in, out](Context *ctx) mutable {
+    singa::EltwiseMult(mid, in, &out);
+  };
+  auto op3 = [out, b2](Context *ctx) mutable { singa::Add(out, b2, &out); };
+  auto op4 = [out, dy1, db2](Context *ctx) mutable {
+    dy1.CopyData(out);
+    db2.CopyData(out);
+  };
+  auto op5 = [in, mid, dy1, dy2, dx1](Context *ctx) mutable {
+    singa::EltwiseMult(dy1, in, &dy2);
+    singa::EltwiseMult(dy1, mid, &dx1);
+  };
+  auto op6 = [dy2, dx2, db1](Context *ctx) mutable {
+    dx2.CopyData(dy2);
+    db1.CopyData(dy2);
+  };
+  auto op7 = [dx1, dx2, dx](Context *ctx) mutable {
+    singa::Add(dx1, dx2, &dx);
+  };
+
+  graph.AddOperation(op1, {in.block(), b1.block()}, {mid.block()});
+  graph.AddOperation(op2, {mid.block(), in.block()}, {out.block()});
+  graph.AddOperation(op3, {out.block(), b2.block()}, {out.block()});
+  graph.AddOperation(op4, {out.block()}, {dy1.block(), db2.block()});
+  graph.AddOperation(op5, {dy1.block()}, {dy2.block(), dx1.block()});
+  graph.AddOperation(op6, {dy2.block()}, {dx2.block(), db1.block()});
+  graph.AddOperation(op7, {dx1.block(), dx2.block()}, {dx.block()});
+
+  in.SetValue(0);
+  b1.SetValue(-1);
+  b2.SetValue(2);
+
+  for (int i = 0; i < 3; ++i) {
+    graph.RunGraph();
+
+    float dx_, db1_, db2_;
+    dx.get_value(&dx_, 1);
+    db1.get_value(&db1_, 1);
+    db2.get_value(&db2_, 1);
+
+    EXPECT_EQ(-2, dx_);
+    EXPECT_EQ(0, db1_);
+    EXPECT_EQ(2, db2_);
+  }
+}
+
+TEST_F(TestGraph, AutoRecycleOnExecutors) {
+  auto dev = singa::Platform::CreateCppCPU(3);
+  Graph graph(dev.get());
+
+  auto &blocks = graph.blocks();
+
+  {
+    Tensor in(Shape{1}, dev);
+    Tensor mid1(Shape{1}, dev);
+    Tensor mid2(Shape{1}, dev);
+    Tensor out(Shape{1}, dev);
+    Tensor b1(Shape{1}, dev);
+    Tensor b2(Shape{1}, dev);
+
+    // function: (in + b1) * in + (in + b2)
+    auto op1 = [in, b1, mid1](Context *ctx) mutable {
+      singa::Add(in, b1, &mid1);
+    };
+    auto op2 = [mid1, in, out](Context *ctx) mutable {
+      singa::EltwiseMult(mid1, in, &out);
+    };
+    auto op3 = [in, b2, mid2](Context *ctx) mutable {
+      singa::Add(in, b2, &mid2);
+    };
+    auto op4 = [out, mid2](Context *ctx) mutable {
+      singa::Add(out, mid2, &out);
+    };
+
+    graph.AddOperation(op1, {in.block(), b1.block()}, {mid1.block()});
+    graph.AddOperation(op2, {mid1.block(), in.block()}, {out.block()});
+    graph.AddOperation(op3, {in.block(), b2.block()}, {mid2.block()});
+    graph.AddOperation(op4, {out.block(), mid2.block()}, {out.block()});
+
+    in.SetValue(1);
+    b1.SetValue(-1);
+    b2.SetValue(2);
+  }
+
+  graph.RunGraph();
+
+  // in 0 b1 1 mid1 2 out 3 b2 4 mid2 5
+  bool state[6] = {true, true, false, false, true, false};
+  for (auto it : blocks) {
+    int id = it.second->id();
+    EXPECT_EQ(state[id], it.first->initialized())
+        << "The memory of the block[" << id << "] is not properly recycled"
+        << std::endl;
+  }
+}
+
+TEST_F(TestGraph, PlanMemory) {
+  for (auto &it : devices) {
+    GOUT << "Test graph on device [" << it.first << "]" << std::endl;
+
+    auto dev = it.second;
+    Graph graph(dev.get());
+    graph.EnableMemoryPlan(true);
+
+    Tensor in(Shape{16}, dev);
+    Tensor b1(Shape{16}, dev);
+    Tensor out(Shape{16}, dev);
+    Block *mid[3];
+
+    {
+      Tensor mid1(Shape{16}, dev);
+      Tensor mid2(Shape{16}, dev);
+      Tensor mid3(Shape{16}, dev);
+      mid[0] = mid1.block();
+      mid[1] = mid2.block();
+      mid[2] = mid3.block();
+
+      // function: ((in + b1) * in + b1) * in
+      auto op1 = [in, b1, mid1](Context *ctx) mutable {
+        singa::Add(in, b1, &mid1);
+      };
+      auto op2 = [mid1, in, mid2](Context *ctx) mutable {
+        singa::EltwiseMult(mid1, in, &mid2);
+      };
+      auto op3 = [mid2, b1, mid3](Context *ctx) mutable {
+        singa::Add(mid2, b1, &mid3);
+      };
+      auto op4 = [mid3, in, out](Context *ctx) mutable {
+        singa::EltwiseMult(mid3, in, &out);
+      };
+
+      graph.AddOperation(op1, {in.block(), b1.block()}, {mid1.block()});
+      graph.AddOperation(op2, {mid1.block(), in.block()}, {mid2.block()});
+      graph.AddOperation(op3, {mid2.block(), b1.block()}, {mid3.block()});
+      graph.AddOperation(op4, {mid3.block(), in.block()}, {out.block()});
+    }
+
+    in.SetValue(2);
+    b1.SetValue(1);
+
+    // mid1 and mid3 share the same memory as their lifetimes do not overlap
+    EXPECT_EQ(128u, graph.GetPlannedPeakMemory());
+    EXPECT_EQ(192u, graph.GetNaivePeakMemory());
+
+    for (int i = 0; i < 3; ++i) {
+      graph.RunGraph();
+
+      const float *dptr = out.data<float>();
+      for (int k = 0; k < 16; ++k) EXPECT_FLOAT_EQ(14.0f, dptr[k]);
+      for (int k = 0; k < 3; ++k) EXPECT_FALSE(mid[k]->initialized());
+    }
+  }
+}
+
+TEST_F(TestGraph, PlanMemoryTooLarge) {
+  auto dev = singa::Platform::GetDefaultDevice();
+  Graph graph(dev.get());
+  graph.EnableMemoryPlan(true);
+
+  // the blocks are not allocated by the ops that do nothing
+  Tensor in(Shape{16}, dev);
+  Tensor out(Shape{16}, dev);
+  {
+    Tensor mid1(Shape{size_t(1) << 28}, dev);
+    Tensor mid2(Shape{size_t(1) << 28}, dev);
+    auto op = [mid1, mid2](Context *ctx) mutable {};
+    graph.AddOperation(op, {in.block()}, {mid1.block(), mid2.block()});
+    graph.AddOperation(op, {mid1.block(), mid2.block()}, {out.block()});
+  }
+
+  // the arena of 2 GB cannot be allocated by Device::Malloc
+  EXPECT_EQ(0u, graph.GetPlannedPeakMemory());
+  EXPECT_EQ(0u, graph.GetNaivePeakMemory());
+  graph.RunGraph();
+}
+
+TEST_F(TestGraph, PlanMemoryOnExecutors) {
+  auto dev = singa::Platform::CreateCppCPU(2);
+  Graph graph(dev.get());
+  graph.EnableMemoryPlan(true);
+
+  Tensor in(Shape{16}, dev);
+  Tensor out(Shape{16}, dev);
+  {
+    Tensor mid(Shape{16}, dev);
+    auto op1 = [in, mid](Context *ctx) mutable { singa::Add(in, in, &mid); };
+    auto op2 = [mid, out](Context *ctx) mutable { singa::Add(mid, mid, &out); };
+    graph.AddOperation(op1, {in.block()}, {mid.block()});
+    graph.AddOperation(op2, {mid.block()}, {out.block()});
+  }
+  in.SetValue(1);
+
+  // the lifetimes are not fixed when the nodes run concurrently
+  EXPECT_EQ(0u, graph.GetPlannedPeakMemory());
+  graph.RunGraph();
+  float out_;
+  out.get_value(&out_, 1);
+  EXPECT_EQ(4, out_);
+}
+
+TEST_F(TestGraph, Profile) {
+  for (auto &it : devices) {
+    GOUT << "Test graph on device [" << it.first << "]" << std::endl;
+
+    auto dev = it.second;
+    Graph graph(dev.get());
+    graph.profiler()->Enable(true);
+
+    Tensor in(Shape{16}, dev);
+    Tensor out(Shape{16}, dev);
+    {
+      Tensor mid(Shape{16}, dev);
+      auto op1 = [in, mid](Context *ctx) mutable { singa::Add(in, in, &mid); };
+      auto op2 = [mid, out](Context *ctx) mutable {
+        singa::Add(mid, mid, &out);
+      };
+      graph.AddOperation(op1, {in.block()}, {mid.block()}, "Double");
+      graph.AddOperation(op2, {mid.block()}, {out.block()}, "Double");
+    }
+    in.SetValue(1);
+
+    graph.RunGraph();
+    graph.RunInSerial();
+
+    auto records = graph.profiler()->records();
+    ASSERT_EQ(4u, records.size());
+    for (size_t i = 0; i < records.size(); ++i) {
+      auto &r = records[i];
+      EXPECT_EQ(int(i / 2), r.iteration);
+      EXPECT_EQ(int(i % 2), r.node);
+      EXPECT_EQ("Double", r.op_name);
+      EXPECT_EQ(0, r.executor);
+      EXPECT_LE(r.start, r.end);
+      if (i > 0) EXPECT_GE(r.start, records[i - 1].end);
+      ASSERT_EQ(1u, r.read_blocks.size());
+      ASSERT_EQ(1u, r.write_blocks.size());
+    }
+    // in -> mid -> out
+    EXPECT_EQ(records[0].write_blocks[0], records[1].read_blocks[0]);
+    EXPECT_NE(records[0].read_blocks[0], records[1].write_blocks[0]);
+    // mid is allocated by the first op and freed after the second one, which
+    // also allocates out in the first iteration
+    EXPECT_EQ(64u, records[2].bytes_allocated);
+    EXPECT_EQ(0u, records[2].bytes_freed);
+    EXPECT_EQ(64u, records[3].bytes_freed);
+
+    std::string summary = graph.profiler()->Summary();
+    EXPECT_NE(std::string::npos, summary.find("\"iterations\":2"));
+    EXPECT_NE(std::string::npos,
+              summary.find("\"name\":\"Double\",\"count\":4"));
+    std::string trace = graph.profiler()->ChromeTrace();
+    EXPECT_NE(std::string::npos, trace.find("\"traceEvents\""));
+    EXPECT_NE(std::string::npos, trace.find("\"ph\":\"X\""));
+
+    graph.profiler()->Clear();
+    EXPECT_EQ(0u, graph.profiler()->records().size());
+  }
+}
+
+TEST_F(TestGraph, ProfileOnExecutors) {
+  auto dev = singa::Platform::CreateCppCPU(2);
+  Graph graph(dev.get());
+  graph.profiler()->Enable(true);
+
+  Tensor in(Shape{16}, dev);
+  Tensor out1(Shape{16}, dev);
+  Tensor out2(Shape{16}, dev);
+  auto op1 = [in, out1](Context *ctx) mutable { singa::Add(in, in, &out1); };
+  auto op2 = [in, out2](Context *ctx) mutable { singa::Sub(in, in, &out2); };
+  graph.AddOperation(op1, {in.block()}, {out1.block()}, "Add");
+  graph.AddOperation(op2, {in.block()}, {out2.block()}, "Sub");
+  in.SetValue(1);
+
+  for (int i = 0; i < 3; ++i) graph.RunGraph();
+  auto records = graph.profiler()->records();
+  ASSERT_EQ(6u, records.size());
+  for (auto &r : records) {
+    EXPECT_GE(r.executor, 0);
+    EXPECT_LT(r.executor, 2);
+    EXPECT_EQ(r.node == 0 ? "Add" : "Sub", r.op_name);
+  }
+}
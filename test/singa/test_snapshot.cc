@@ -97,6 +97,34 @@ TEST(Snapshot, ReadIntTest) {
   }
 }
 
+TEST(Snapshot, ReadRowSparseTest) {
+  {
+    singa::Snapshot sparse_snapshot_write(prefix + ".sparse",
+                                          singa::Snapshot::kWrite);
+    // rows 2 and 0 of a 3x2 tensor; the row of index -1 is skipped
+    singa::Tensor indices(singa::Shape{3}, singa::kInt);
+    const int idx[] = {2, -1, 0};
+    indices.CopyDataFromHostPtr(idx, 3);
+    singa::Tensor values(singa::Shape{3, 2});
+    const float val[] = {1.0f, 2.0f, 9.0f, 9.0f, 3.0f, 4.0f};
+    values.CopyDataFromHostPtr(val, 6);
+    sparse_snapshot_write.Write("SparseParam", indices, values,
+                                singa::Shape{3, 2});
+  }
+
+  {
+    singa::Snapshot sparse_snapshot_read(prefix + ".sparse",
+                                         singa::Snapshot::kRead);
+    singa::Shape shape = sparse_snapshot_read.ReadShape("SparseParam");
+    EXPECT_EQ(shape, singa::Shape({3, 2}));
+    singa::Tensor param = sparse_snapshot_read.Read("SparseParam");
+    EXPECT_EQ(param.shape(), singa::Shape({3, 2}));
+    const float expected[] = {3.0f, 4.0f, 0.0f, 0.0f, 1.0f, 2.0f};
+    const float* param_data = param.data<float>();
+    for (size_t i = 0; i < 6; ++i) EXPECT_FLOAT_EQ(param_data[i], expected[i]);
+  }
+}
+
 /*
 TEST(Snapshot, ReadDoubleTest) {
   {
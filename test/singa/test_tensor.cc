@@ -220,6 +220,30 @@ TEST(TensorClass, T) {
   EXPECT_EQ(t.shape()[1], o.shape()[0]);
 }
 
+TEST(TensorClass, ExternalMemory) {
+  bool released = false;
+  std::shared_ptr<std::vector<float>> vec(
+      new std::vector<float>{1.0f, 2.0f, 3.0f, 4.0f},
+      [&released](std::vector<float>* v) {
+        released = true;
+        delete v;
+      });
+  {
+    Tensor t(Shape{2, 2}, singa::defaultDevice, singa::kFloat32, vec->data(),
+             vec);
+    EXPECT_TRUE(t.initialized());
+    t *= 2.0f;
+    EXPECT_FLOAT_EQ(2.0f, vec->at(0));
+    EXPECT_FLOAT_EQ(8.0f, vec->at(3));
+    Tensor o = t;
+    vec.reset();
+    EXPECT_FALSE(released);
+    const float* dptr = static_cast<const float*>(o.block()->data());
+    EXPECT_FLOAT_EQ(6.0f, dptr[2]);
+  }
+  EXPECT_TRUE(released);
+}
+
 TEST(TensorClass, Repeat) {
   float data[] = {1.0f, 2.0f, 3.0f};
   Tensor t(Shape{3});
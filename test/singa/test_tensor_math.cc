@@ -17,8 +17,11 @@
  */
 
 #include <array>
+#include <cmath>
+#include <vector>
 
 #include "gtest/gtest.h"
+#include "singa/core/device.h"
 #include "singa/core/tensor.h"
 using singa::Device;
 using singa::Shape;
@@ -607,6 +610,349 @@ TEST_F(TensorMath, BroadcastCpp) {
   }
 }
 
+TEST_F(TensorMath, StridedCopyCpp) {
+  // permutations of a (5,37,70) tensor cover the tiled 2d transpose, the row
+  // copies of the last axis and the generic strided loop
+  const size_t d0 = 5, d1 = 37, d2 = 70;
+  std::vector<float> dat(d0 * d1 * d2);
+  for (size_t i = 0; i < dat.size(); i++) dat[i] = static_cast<float>(i);
+  Tensor x(Shape{d0, d1, d2});
+  x.CopyDataFromHostPtr(dat.data(), dat.size());
+  const size_t dims[3] = {d0, d1, d2};
+  const std::vector<std::vector<size_t>> perms = {
+      {0, 2, 1}, {1, 0, 2}, {2, 1, 0}, {1, 2, 0}, {2, 0, 1}};
+  for (const auto &perm : perms) {
+    Tensor y = Contiguous(Transpose(x, perm));
+    const float *yptr = y.data<float>();
+    size_t idx[3], i = 0;
+    for (idx[0] = 0; idx[0] < dims[perm[0]]; idx[0]++)
+      for (idx[1] = 0; idx[1] < dims[perm[1]]; idx[1]++)
+        for (idx[2] = 0; idx[2] < dims[perm[2]]; idx[2]++, i++) {
+          size_t src[3];
+          for (size_t k = 0; k < 3; k++) src[perm[k]] = idx[k];
+          EXPECT_EQ(dat[(src[0] * d1 + src[1]) * d2 + src[2]], yptr[i]);
+        }
+  }
+}
+
+TEST_F(TensorMath, StridedBroadcastCpp) {
+  const size_t m = 40, n = 900;
+  std::vector<float> row(n), col(m);
+  for (size_t j = 0; j < n; j++) row[j] = static_cast<float>(j);
+  for (size_t i = 0; i < m; i++) col[i] = static_cast<float>(i) * 1000.0f;
+  Tensor r(Shape{n}), c(Shape{m, 1});
+  r.CopyDataFromHostPtr(row.data(), n);
+  c.CopyDataFromHostPtr(col.data(), m);
+
+  Tensor y = c + r, z = r - c;
+  Tensor w = Transpose(Contiguous(Transpose(c + r))) * r;
+  const float *yptr = y.data<float>(), *zptr = z.data<float>();
+  const float *wptr = Contiguous(w).data<float>();
+  for (size_t i = 0; i < m; i++)
+    for (size_t j = 0; j < n; j++) {
+      EXPECT_FLOAT_EQ(col[i] + row[j], yptr[i * n + j]);
+      EXPECT_FLOAT_EQ(row[j] - col[i], zptr[i * n + j]);
+      EXPECT_FLOAT_EQ((col[i] + row[j]) * row[j], wptr[i * n + j]);
+    }
+}
+
+TEST_F(TensorMath, GatherRowsCpp) {
+  // e = [[1, 2], [3, 4], [5, 6]]
+  Tensor idx(Shape{2, 2}, singa::kInt);
+  const int idx_dat[4] = {2, 0, 2, 1};
+  idx.CopyDataFromHostPtr<int>(idx_dat, 4);
+  const auto ret = singa::GatherRows(e, idx);
+  EXPECT_EQ(Shape({2, 2, 2}), ret.shape());
+  const float *retPtr = ret.data<float>();
+  for (size_t i = 0; i < 4; i++)
+    for (size_t j = 0; j < 2; j++)
+      EXPECT_FLOAT_EQ(dat1[idx_dat[i] * 2 + j], retPtr[i * 2 + j]);
+}
+
+TEST_F(TensorMath, ScatterAddRowsCpp) {
+  // float indices are accepted and duplicated rows are accumulated
+  Tensor idx(Shape{3});
+  const float idx_dat[3] = {2.0f, 0.0f, 2.0f};
+  idx.CopyDataFromHostPtr<float>(idx_dat, 3);
+  Tensor out(Shape{3, 2});
+  out.SetValue(1.0f);
+  singa::ScatterAddRows(e, idx, &out);
+  const float *outPtr = out.data<float>();
+  const float expected[6] = {4.0f, 5.0f, 1.0f, 1.0f, 7.0f, 9.0f};
+  for (size_t i = 0; i < 6; i++) EXPECT_FLOAT_EQ(expected[i], outPtr[i]);
+}
+
+TEST_F(TensorMath, ScatterRowsCpp) {
+  // the row of the negative index is skipped
+  Tensor idx(Shape{3}, singa::kInt);
+  const int idx_dat[3] = {2, -1, 0};
+  idx.CopyDataFromHostPtr<int>(idx_dat, 3);
+  Tensor out(Shape{3, 2});
+  out.SetValue(1.0f);
+  singa::ScatterRows(e, idx, &out);
+  const float *outPtr = out.data<float>();
+  const float expected[6] = {5.0f, 6.0f, 1.0f, 1.0f, 1.0f, 2.0f};
+  for (size_t i = 0; i < 6; i++) EXPECT_FLOAT_EQ(expected[i], outPtr[i]);
+}
+
+TEST_F(TensorMath, GatherCpp) {
+  // e = [[1, 2], [3, 4], [5, 6]], gather the columns; negative is zeros
+  Tensor idx(Shape{2, 2}, singa::kInt);
+  const int idx_dat[4] = {1, 0, 1, -1};
+  idx.CopyDataFromHostPtr<int>(idx_dat, 4);
+  const auto ret = singa::Gather(e, idx, -1);
+  EXPECT_EQ(Shape({3, 2, 2}), ret.shape());
+  const float *retPtr = ret.data<float>();
+  for (size_t i = 0; i < 3; i++)
+    for (size_t j = 0; j < 4; j++)
+      EXPECT_FLOAT_EQ(idx_dat[j] < 0 ? 0.0f : dat1[i * 2 + idx_dat[j]],
+                      retPtr[i * 4 + j]);
+
+  // int tensors, e.g., shapes, are gathered as well
+  Tensor shape(Shape{4}, singa::kInt);
+  const int shape_dat[4] = {8, 3, 32, 32};
+  shape.CopyDataFromHostPtr<int>(shape_dat, 4);
+  const auto dims = singa::Gather(shape, idx, 0);
+  EXPECT_EQ(singa::kInt, dims.data_type());
+  for (size_t j = 0; j < 4; j++)
+    EXPECT_EQ(idx_dat[j] < 0 ? 0 : shape_dat[idx_dat[j]], dims.data<int>()[j]);
+}
+
+TEST_F(TensorMath, ScatterAddCpp) {
+  // the columns of duplicated indices are accumulated
+  Tensor idx(Shape{2}, singa::kInt);
+  const int idx_dat[2] = {2, 2};
+  idx.CopyDataFromHostPtr<int>(idx_dat, 2);
+  Tensor out(Shape{3, 3});
+  out.SetValue(1.0f);
+  singa::ScatterAdd(e, idx, 1, &out);
+  const float *outPtr = out.data<float>();
+  const float expected[9] = {1.0f, 1.0f, 4.0f, 1.0f, 1.0f,
+                             8.0f, 1.0f, 1.0f, 12.0f};
+  for (size_t i = 0; i < 9; i++) EXPECT_FLOAT_EQ(expected[i], outPtr[i]);
+}
+
+TEST_F(TensorMath, StridedSliceCpp) {
+  // x[1:, ::-2, 5:0:-3] of a (2,3,7) tensor, and of its transposed copy
+  std::vector<float> dat(2 * 3 * 7);
+  for (size_t i = 0; i < dat.size(); i++) dat[i] = static_cast<float>(i);
+  Tensor x(Shape{2, 3, 7});
+  x.CopyDataFromHostPtr(dat.data(), dat.size());
+  const std::vector<int> starts = {1, -1, 5}, ends = {100, -100, 0},
+                         steps = {1, -2, -3};
+  const auto y = singa::StridedSlice(x, starts, ends, steps);
+  EXPECT_EQ(Shape({1, 2, 2}), y.shape());
+  const float expected[4] = {40.0f, 37.0f, 26.0f, 23.0f};
+  for (size_t i = 0; i < 4; i++)
+    EXPECT_FLOAT_EQ(expected[i], y.data<float>()[i]);
+
+  // x.T[5:0:-3, ::-2, 1:]
+  const auto t = singa::StridedSlice(Transpose(x), {5, -1, 1}, {0, -100, 100},
+                                     {-3, -2, 1});
+  EXPECT_EQ(Shape({2, 2, 1}), t.shape());
+  const float expected_t[4] = {40.0f, 26.0f, 37.0f, 23.0f};
+  for (size_t i = 0; i < 4; i++)
+    EXPECT_FLOAT_EQ(expected_t[i], t.data<float>()[i]);
+
+  // the backward scatters dy into zeros
+  const auto dx =
+      singa::StridedSliceBackward(y, x.shape(), starts, ends, steps);
+  EXPECT_EQ(x.shape(), dx.shape());
+  const float *dxPtr = dx.data<float>();
+  for (size_t i = 0; i < dat.size(); i++) {
+    bool sliced = false;
+    for (size_t j = 0; j < 4; j++) sliced |= expected[j] == dat[i];
+    EXPECT_FLOAT_EQ(sliced ? dat[i] : 0.0f, dxPtr[i]);
+  }
+}
+
+TEST_F(TensorMath, IndexMapCpp) {
+  // map a (2, 3, 2) tensor to (3, 4, 3) with repeated and negative indices
+  std::vector<float> dat(2 * 3 * 2);
+  for (size_t i = 0; i < dat.size(); i++) dat[i] = static_cast<float>(i);
+  Tensor x(Shape{3, 2, 2});
+  x.CopyDataFromHostPtr(dat.data(), dat.size());
+  x = Transpose(x, {1, 0, 2});
+  const int maps_dat[10] = {1, -1, 1, 2, 0, 2, 1, 0, 1, 1};
+  Tensor maps(Shape{10}, singa::kInt);
+  maps.CopyDataFromHostPtr<int>(maps_dat, 10);
+  const int *m0 = maps_dat, *m1 = maps_dat + 3, *m2 = maps_dat + 7;
+  const auto y = singa::IndexMap(x, Shape{3, 4, 3}, maps, -1.0f);
+  EXPECT_EQ(Shape({3, 4, 3}), y.shape());
+  const float *yPtr = y.data<float>();
+  for (size_t i = 0; i < 3; i++)
+    for (size_t j = 0; j < 4; j++)
+      for (size_t k = 0; k < 3; k++)
+        EXPECT_FLOAT_EQ(m0[i] < 0 ? -1.0f : dat[m1[j] * 4 + m0[i] * 2 + m2[k]],
+                        yPtr[(i * 4 + j) * 3 + k]);
+
+  // the backward sums the elements mapped from the same element
+  const auto dx = singa::IndexMapBackward(y, Shape{2, 3, 2}, maps);
+  EXPECT_EQ(Shape({2, 3, 2}), dx.shape());
+  std::vector<float> expected(12, 0.0f);
+  for (size_t i = 0; i < 3; i++)
+    for (size_t j = 0; j < 4; j++)
+      for (size_t k = 0; k < 3; k++)
+        if (m0[i] >= 0)
+          expected[(m0[i] * 3 + m1[j]) * 2 + m2[k]] +=
+              yPtr[(i * 4 + j) * 3 + k];
+  for (size_t i = 0; i < 12; i++)
+    EXPECT_FLOAT_EQ(expected[i], dx.data<float>()[i]);
+}
+
+TEST_F(TensorMath, PackedDropoutCpp) {
+  // 1000 elements do not fill the last int of the mask
+  const size_t n = 1000;
+  std::vector<float> dat(n);
+  for (size_t i = 0; i < n; i++) dat[i] = static_cast<float>(i + 1);
+  Tensor x(Shape{10, 100}), mask(Shape{(n + 31) / 32}, singa::kInt);
+  x.CopyDataFromHostPtr(dat.data(), n);
+  const auto y = singa::PackedDropout(x, 0.25f, &mask);
+  const auto dx = singa::PackedDropoutBackward(x, 0.25f, mask);
+  EXPECT_EQ(x.shape(), y.shape());
+  EXPECT_EQ(x.shape(), dx.shape());
+  const float *yPtr = y.data<float>(), *dxPtr = dx.data<float>();
+  const int *maskPtr = mask.data<int>();
+  size_t kept = 0;
+  for (size_t i = 0; i < n; i++) {
+    const bool keep = (maskPtr[i / 32] >> (i % 32)) & 1;
+    kept += keep;
+    EXPECT_FLOAT_EQ(keep ? dat[i] / 0.75f : 0.0f, yPtr[i]);
+    EXPECT_FLOAT_EQ(yPtr[i], dxPtr[i]);
+  }
+  EXPECT_NEAR(0.75, static_cast<double>(kept) / n, 0.05);
+}
+
+TEST_F(TensorMath, CrossEntropyFwdBwdCpp) {
+  // 4 rows of 5 logits, the third row is ignored
+  const size_t n = 4, dim = 5;
+  const float smoothing = 0.1f;
+  std::vector<float> dat(n * dim);
+  for (size_t i = 0; i < dat.size(); i++)
+    dat[i] = static_cast<float>((i * 7) % 11) - 5.0f;
+  const int labels[4] = {1, 4, -1, 0};
+  Tensor x(Shape{n, dim}), t(Shape{n}, singa::kInt), grad(Shape{n, dim});
+  x.CopyDataFromHostPtr(dat.data(), dat.size());
+  t.CopyDataFromHostPtr<int>(labels, n);
+  const auto loss = singa::SoftmaxCrossEntropyFwdBwd(x, t, &grad, smoothing);
+  EXPECT_EQ(Shape({n}), loss.shape());
+
+  // the same with the probabilities
+  const auto p = singa::SoftMax(x, 1);
+  Tensor pgrad(Shape{n, dim});
+  const auto ploss = singa::CrossEntropyFwdBwd(p, t, &pgrad, smoothing);
+  const float *pPtr = p.data<float>();
+  for (size_t i = 0; i < n; i++) {
+    double expected_loss = 0.0;
+    for (size_t j = 0; j < dim; j++) {
+      // the loss and the gradient are averaged over the 3 valid rows
+      double q = smoothing / dim + (labels[i] == int(j) ? 1 - smoothing : 0);
+      if (labels[i] < 0) q = 0.0;
+      const double prob = pPtr[i * dim + j];
+      expected_loss -= q * std::log(prob) / 3;
+      EXPECT_NEAR(labels[i] < 0 ? 0.0 : (prob - q) / 3,
+                  grad.data<float>()[i * dim + j], 1e-5);
+      EXPECT_NEAR(-q / prob / 3, pgrad.data<float>()[i * dim + j],
+                  1e-4 * q / prob);
+    }
+    EXPECT_NEAR(expected_loss, loss.data<float>()[i], 1e-5);
+    EXPECT_NEAR(expected_loss, ploss.data<float>()[i], 1e-5);
+  }
+
+  // the gradient is optional
+  const auto loss2 = singa::SoftmaxCrossEntropyFwdBwd(x, t, nullptr, smoothing);
+  for (size_t i = 0; i < n; i++)
+    EXPECT_FLOAT_EQ(loss.data<float>()[i], loss2.data<float>()[i]);
+}
+
+TEST_F(TensorMath, RowDotCpp) {
+  // a = [[1, 2], [3, 4], [5, 6]] and b = a^T reshaped to 3 x 2
+  Tensor b = Reshape(Transpose(e), Shape{3, 2});
+  const auto dot = singa::RowDot(e, b);
+  const auto norm = singa::RowNorm(e);
+  EXPECT_EQ(Shape({3}), dot.shape());
+  const float expected[3] = {1 * 1 + 2 * 3, 3 * 5 + 4 * 2, 5 * 4 + 6 * 6};
+  for (size_t i = 0; i < 3; i++) {
+    EXPECT_FLOAT_EQ(expected[i], dot.data<float>()[i]);
+    const float x = dat1[2 * i], y = dat1[2 * i + 1];
+    EXPECT_FLOAT_EQ(std::sqrt(x * x + y * y), norm.data<float>()[i]);
+  }
+}
+
+TEST_F(TensorMath, CoalesceRowsCpp) {
+  // e = [[1, 2], [3, 4], [5, 6]]
+  Tensor idx(Shape{3}, singa::kInt);
+  const int idx_dat[3] = {2, 0, 2};
+  idx.CopyDataFromHostPtr<int>(idx_dat, 3);
+  Tensor out_idx(Shape{3}, singa::kInt), out(Shape{3, 2});
+  singa::CoalesceRows(idx, e, &out_idx, &out);
+  const int *outIdxPtr = out_idx.data<int>();
+  const int expected_idx[3] = {2, 0, -1};
+  for (size_t i = 0; i < 3; i++) EXPECT_EQ(expected_idx[i], outIdxPtr[i]);
+  const float *outPtr = out.data<float>();
+  const float expected[6] = {6.0f, 8.0f, 3.0f, 4.0f, 0.0f, 0.0f};
+  for (size_t i = 0; i < 6; i++) EXPECT_FLOAT_EQ(expected[i], outPtr[i]);
+
+  // GatherRows returns zeros for the negative index
+  const auto ret = singa::GatherRows(e, out_idx);
+  const float *retPtr = ret.data<float>();
+  const float expected_ret[6] = {5.0f, 6.0f, 1.0f, 2.0f, 0.0f, 0.0f};
+  for (size_t i = 0; i < 6; i++) EXPECT_FLOAT_EQ(expected_ret[i], retPtr[i]);
+}
+
+TEST_F(TensorMath, MultiTensorSGDCpp) {
+  // p = 1, g = 0.5, lr = 0.1, momentum = 0.9, weight_decay = 0.2
+  Tensor p1(Shape{2, 3}), p2(Shape{4}), g1(Shape{2, 3}), g2(Shape{4});
+  Tensor m1(Shape{2, 3}), m2(Shape{4});
+  for (Tensor *t : {&p1, &p2}) t->SetValue(1.0f);
+  for (Tensor *t : {&g1, &g2}) t->SetValue(0.5f);
+  for (Tensor *t : {&m1, &m2}) t->SetValue(0.0f);
+  Tensor lr(Shape{1}), mom(Shape{1}), dam(Shape{1}), decay(Shape{1});
+  lr.SetValue(0.1f);
+  mom.SetValue(0.9f);
+  dam.SetValue(0.0f);
+  decay.SetValue(0.2f);
+  for (int step = 0; step < 2; step++)
+    singa::MultiTensorSGD({g1, g2}, {p1, p2}, {m1, m2}, lr, mom, dam, decay,
+                          false);
+  // step 1: g = 0.7, m = 0.7, p = 0.93
+  // step 2: g = 0.686, m = 1.316, p = 0.7984
+  for (const Tensor &p : {p1, p2}) {
+    const float *pPtr = p.data<float>();
+    for (size_t i = 0; i < p.Size(); i++) EXPECT_FLOAT_EQ(0.7984f, pPtr[i]);
+  }
+  for (const Tensor &m : {m1, m2}) {
+    const float *mPtr = m.data<float>();
+    for (size_t i = 0; i < m.Size(); i++) EXPECT_FLOAT_EQ(1.316f, mPtr[i]);
+  }
+}
+
+TEST_F(TensorMath, MultiTensorAdamCpp) {
+  Tensor p1(Shape{2, 3}), p2(Shape{4}), g1(Shape{2, 3}), g2(Shape{4});
+  Tensor m1(Shape{2, 3}), m2(Shape{4}), v1(Shape{2, 3}), v2(Shape{4});
+  for (Tensor *t : {&p1, &p2}) t->SetValue(1.0f);
+  for (Tensor *t : {&g1, &g2}) t->SetValue(0.5f);
+  for (Tensor *t : {&m1, &m2, &v1, &v2}) t->SetValue(0.0f);
+  Tensor lr(Shape{1}), b1(Shape{1}), b2(Shape{1}), eps(Shape{1});
+  Tensor decay(Shape{1}), step(Shape{1});
+  lr.SetValue(0.1f);
+  b1.SetValue(0.9f);
+  b2.SetValue(0.999f);
+  eps.SetValue(1e-8f);
+  decay.SetValue(0.0f);
+  step.SetValue(0.0f);
+  singa::MultiTensorAdam({g1, g2}, {p1, p2}, {m1, m2}, {v1, v2}, lr, b1, b2,
+                         eps, decay, step);
+  // the first step moves each param by lr
+  for (const Tensor &p : {p1, p2}) {
+    const float *pPtr = p.data<float>();
+    for (size_t i = 0; i < p.Size(); i++) EXPECT_NEAR(0.9f, pPtr[i], 1e-5);
+  }
+  const float *mPtr = m2.data<float>(), *vPtr = v2.data<float>();
+  EXPECT_FLOAT_EQ(0.05f, mPtr[0]);
+  EXPECT_NEAR(0.00025f, vPtr[0], 1e-8);
+}
+
 #ifdef USE_CBLAS
 TEST_F(TensorMath, L2Cpp) {
   float l2 = a.L2();
@@ -802,6 +1148,65 @@ TEST_F(TensorMath, SumColumnsCpp) {
   }
 }
 
+TEST_F(TensorMath, ParallelReduceCpp) {
+  // large enough to run the reductions with multiple threads and blocks
+  const size_t nrow = 300, ncol = 700;
+  std::vector<float> dat(nrow * ncol);
+  for (size_t i = 0; i < dat.size(); i++)
+    dat[i] = -1.0f - static_cast<float>((i * 7919) % 1000) / 100.0f;
+  Tensor x(Shape{nrow, ncol});
+  x.CopyDataFromHostPtr(dat.data(), dat.size());
+
+  double total = 0;
+  for (float v : dat) total += v;
+  EXPECT_NEAR(total, singa::Sum<float>(x), std::abs(total) * 1e-5);
+
+  Tensor rmax = RowMax(x), rsum(Shape{nrow}), csum(Shape{ncol});
+  SumColumns(x, &rsum);
+  SumRows(x, &csum);
+  Tensor p = SoftMax(x);
+  const float *mptr = rmax.data<float>(), *rptr = rsum.data<float>();
+  const float *cptr = csum.data<float>(), *pptr = p.data<float>();
+  for (size_t r = 0; r < nrow; r++) {
+    float m = dat[r * ncol], s = 0.f, es = 0.f;
+    for (size_t c = 0; c < ncol; c++) {
+      m = std::max(m, dat[r * ncol + c]);
+      s += dat[r * ncol + c];
+    }
+    for (size_t c = 0; c < ncol; c++) es += std::exp(dat[r * ncol + c] - m);
+    EXPECT_FLOAT_EQ(m, mptr[r]);
+    EXPECT_NEAR(s, rptr[r], std::abs(s) * 1e-5);
+    for (size_t c = 0; c < ncol; c++)
+      EXPECT_NEAR(std::exp(dat[r * ncol + c] - m) / es, pptr[r * ncol + c],
+                  1e-6);
+  }
+  for (size_t c = 0; c < ncol; c++) {
+    float s = 0.f;
+    for (size_t r = 0; r < nrow; r++) s += dat[r * ncol + c];
+    EXPECT_NEAR(s, cptr[c], std::abs(s) * 1e-5);
+  }
+}
+
+TEST_F(TensorMath, NumCpuThreadsCpp) {
+  const size_t n = 1 << 17;
+  std::vector<float> dat(n);
+  for (size_t i = 0; i < n; i++) dat[i] = static_cast<float>(i % 97) / 97.0f;
+  Tensor x(Shape{n});
+  x.CopyDataFromHostPtr(dat.data(), n);
+
+  singa::Platform::SetNumCpuThreads(1);
+  EXPECT_EQ(1, singa::Platform::GetNumCpuThreads());
+  float s1 = singa::Sum<float>(x);
+  Tensor y1 = Exp(x);
+  singa::Platform::SetNumCpuThreads(0);
+  EXPECT_GE(singa::Platform::GetNumCpuThreads(), 1);
+  // the blocked reduction gives the same result for any number of threads
+  EXPECT_EQ(s1, singa::Sum<float>(x));
+  Tensor y2 = Exp(x);
+  const float *ptr1 = y1.data<float>(), *ptr2 = y2.data<float>();
+  for (size_t i = 0; i < n; i++) EXPECT_EQ(ptr1[i], ptr2[i]);
+}
+
 TEST_F(TensorMath, ConcatenateRowsCpp) {
   d.CopyDataFromHostPtr<float>(dat1, 6);
   e.CopyDataFromHostPtr<float>(dat2, 6);
@@ -1143,6 +1548,233 @@ TEST_F(TensorMath, CopyRowsCuda) {
     EXPECT_FLOAT_EQ(retPtr[i], dat1[1 * 2 + i]);
 }
 
+TEST_F(TensorMath, GatherRowsCuda) {
+  auto dev = std::make_shared<singa::CudaGPU>();
+  e.ToDevice(dev);
+  Tensor idx(Shape{3}, dev, singa::kInt);
+  const int idx_dat[3] = {2, 0, 2};
+  idx.CopyDataFromHostPtr<int>(idx_dat, 3);
+  auto ret = singa::GatherRows(e, idx);
+  ret.ToHost();
+  EXPECT_EQ(Shape({3, 2}), ret.shape());
+  const float *retPtr = ret.data<float>();
+  for (size_t i = 0; i < 3; i++)
+    for (size_t j = 0; j < 2; j++)
+      EXPECT_FLOAT_EQ(dat1[idx_dat[i] * 2 + j], retPtr[i * 2 + j]);
+}
+
+TEST_F(TensorMath, ScatterAddRowsCuda) {
+  auto dev = std::make_shared<singa::CudaGPU>();
+  e.ToDevice(dev);
+  Tensor idx(Shape{3}, dev, singa::kInt);
+  const int idx_dat[3] = {2, 0, 2};
+  idx.CopyDataFromHostPtr<int>(idx_dat, 3);
+  Tensor out(Shape{3, 2}, dev);
+  out.SetValue(1.0f);
+  singa::ScatterAddRows(e, idx, &out);
+  out.ToHost();
+  const float *outPtr = out.data<float>();
+  const float expected[6] = {4.0f, 5.0f, 1.0f, 1.0f, 7.0f, 9.0f};
+  for (size_t i = 0; i < 6; i++) EXPECT_FLOAT_EQ(expected[i], outPtr[i]);
+}
+
+TEST_F(TensorMath, ScatterRowsCuda) {
+  auto dev = std::make_shared<singa::CudaGPU>();
+  e.ToDevice(dev);
+  Tensor idx(Shape{3}, dev, singa::kInt);
+  const int idx_dat[3] = {2, -1, 0};
+  idx.CopyDataFromHostPtr<int>(idx_dat, 3);
+  Tensor out(Shape{3, 2}, dev);
+  out.SetValue(1.0f);
+  singa::ScatterRows(e, idx, &out);
+  out.ToHost();
+  const float *outPtr = out.data<float>();
+  const float expected[6] = {5.0f, 6.0f, 1.0f, 1.0f, 1.0f, 2.0f};
+  for (size_t i = 0; i < 6; i++) EXPECT_FLOAT_EQ(expected[i], outPtr[i]);
+}
+
+TEST_F(TensorMath, GatherCuda) {
+  auto dev = std::make_shared<singa::CudaGPU>();
+  e.ToDevice(dev);
+  Tensor idx(Shape{3}, dev, singa::kInt);
+  const int idx_dat[3] = {1, 0, 1};
+  idx.CopyDataFromHostPtr<int>(idx_dat, 3);
+  auto ret = singa::Gather(e, idx, 1);
+  ret.ToHost();
+  EXPECT_EQ(Shape({3, 3}), ret.shape());
+  const float *retPtr = ret.data<float>();
+  for (size_t i = 0; i < 3; i++)
+    for (size_t j = 0; j < 3; j++)
+      EXPECT_FLOAT_EQ(dat1[i * 2 + idx_dat[j]], retPtr[i * 3 + j]);
+}
+
+TEST_F(TensorMath, ScatterAddCuda) {
+  auto dev = std::make_shared<singa::CudaGPU>();
+  e.ToDevice(dev);
+  Tensor idx(Shape{2}, dev, singa::kInt);
+  const int idx_dat[2] = {2, 2};
+  idx.CopyDataFromHostPtr<int>(idx_dat, 2);
+  Tensor out(Shape{3, 3}, dev);
+  out.SetValue(1.0f);
+  singa::ScatterAdd(e, idx, 1, &out);
+  out.ToHost();
+  const float *outPtr = out.data<float>();
+  const float expected[9] = {1.0f, 1.0f, 4.0f, 1.0f, 1.0f,
+                             8.0f, 1.0f, 1.0f, 12.0f};
+  for (size_t i = 0; i < 9; i++) EXPECT_FLOAT_EQ(expected[i], outPtr[i]);
+}
+
+TEST_F(TensorMath, StridedSliceCuda) {
+  auto dev = std::make_shared<singa::CudaGPU>();
+  std::vector<float> dat(2 * 3 * 7);
+  for (size_t i = 0; i < dat.size(); i++) dat[i] = static_cast<float>(i);
+  Tensor x(Shape{2, 3, 7}, dev);
+  x.CopyDataFromHostPtr(dat.data(), dat.size());
+  const std::vector<int> starts = {1, -1, 5}, ends = {100, -100, 0},
+                         steps = {1, -2, -3};
+  auto y = singa::StridedSlice(x, starts, ends, steps);
+  auto dx = singa::StridedSliceBackward(y, x.shape(), starts, ends, steps);
+  y.ToHost();
+  dx.ToHost();
+  EXPECT_EQ(Shape({1, 2, 2}), y.shape());
+  const float expected[4] = {40.0f, 37.0f, 26.0f, 23.0f};
+  for (size_t i = 0; i < 4; i++)
+    EXPECT_FLOAT_EQ(expected[i], y.data<float>()[i]);
+  const float *dxPtr = dx.data<float>();
+  for (size_t i = 0; i < dat.size(); i++) {
+    bool sliced = false;
+    for (size_t j = 0; j < 4; j++) sliced |= expected[j] == dat[i];
+    EXPECT_FLOAT_EQ(sliced ? dat[i] : 0.0f, dxPtr[i]);
+  }
+}
+
+TEST_F(TensorMath, IndexMapCuda) {
+  auto dev = std::make_shared<singa::CudaGPU>();
+  // tile e = [[1, 2], [3, 4], [5, 6]] to (2, 4) and pad the last column
+  Tensor maps(Shape{6}, dev, singa::kInt);
+  const int maps_dat[6] = {2, 0, 1, 0, 1, -1};
+  maps.CopyDataFromHostPtr<int>(maps_dat, 6);
+  e.ToDevice(dev);
+  auto y = singa::IndexMap(e, Shape{2, 4}, maps, 9.0f);
+  auto dx = singa::IndexMapBackward(y, e.shape(), maps);
+  y.ToHost();
+  dx.ToHost();
+  const float expected[8] = {6.0f, 5.0f, 6.0f, 9.0f, 2.0f, 1.0f, 2.0f, 9.0f};
+  for (size_t i = 0; i < 8; i++)
+    EXPECT_FLOAT_EQ(expected[i], y.data<float>()[i]);
+  const float expected_dx[6] = {1.0f, 4.0f, 0.0f, 0.0f, 5.0f, 12.0f};
+  for (size_t i = 0; i < 6; i++)
+    EXPECT_FLOAT_EQ(expected_dx[i], dx.data<float>()[i]);
+}
+
+TEST_F(TensorMath, PackedDropoutCuda) {
+  auto dev = std::make_shared<singa::CudaGPU>();
+  const size_t n = 1000;
+  std::vector<float> dat(n);
+  for (size_t i = 0; i < n; i++) dat[i] = static_cast<float>(i + 1);
+  Tensor x(Shape{10, 100}, dev), mask(Shape{(n + 31) / 32}, dev, singa::kInt);
+  x.CopyDataFromHostPtr(dat.data(), n);
+  auto y = singa::PackedDropout(x, 0.25f, &mask);
+  auto dx = singa::PackedDropoutBackward(x, 0.25f, mask);
+  y.ToHost();
+  dx.ToHost();
+  mask.ToHost();
+  const float *yPtr = y.data<float>(), *dxPtr = dx.data<float>();
+  const int *maskPtr = mask.data<int>();
+  size_t kept = 0;
+  for (size_t i = 0; i < n; i++) {
+    const bool keep = (maskPtr[i / 32] >> (i % 32)) & 1;
+    kept += keep;
+    EXPECT_FLOAT_EQ(keep ? dat[i] / 0.75f : 0.0f, yPtr[i]);
+    EXPECT_FLOAT_EQ(yPtr[i], dxPtr[i]);
+  }
+  EXPECT_NEAR(0.75, static_cast<double>(kept) / n, 0.05);
+}
+
+TEST_F(TensorMath, CrossEntropyFwdBwdCuda) {
+  auto dev = std::make_shared<singa::CudaGPU>();
+  const size_t n = 4, dim = 5;
+  const float smoothing = 0.1f;
+  std::vector<float> dat(n * dim);
+  for (size_t i = 0; i < dat.size(); i++)
+    dat[i] = static_cast<float>((i * 7) % 11) - 5.0f;
+  const int labels[4] = {1, 4, -1, 0};
+  Tensor x(Shape{n, dim}, dev), t(Shape{n}, dev, singa::kInt),
+      grad(Shape{n, dim}, dev);
+  x.CopyDataFromHostPtr(dat.data(), dat.size());
+  t.CopyDataFromHostPtr<int>(labels, n);
+  auto loss = singa::SoftmaxCrossEntropyFwdBwd(x, t, &grad, smoothing);
+  auto p = singa::SoftMax(x, 1);
+  Tensor pgrad(Shape{n, dim}, dev);
+  auto ploss = singa::CrossEntropyFwdBwd(p, t, &pgrad, smoothing);
+  loss.ToHost();
+  grad.ToHost();
+  p.ToHost();
+  ploss.ToHost();
+  pgrad.ToHost();
+  const float *pPtr = p.data<float>();
+  for (size_t i = 0; i < n; i++) {
+    double expected_loss = 0.0;
+    for (size_t j = 0; j < dim; j++) {
+      double q = smoothing / dim + (labels[i] == int(j) ? 1 - smoothing : 0);
+      if (labels[i] < 0) q = 0.0;
+      const double prob = pPtr[i * dim + j];
+      expected_loss -= q * std::log(prob) / 3;
+      EXPECT_NEAR(labels[i] < 0 ? 0.0 : (prob - q) / 3,
+                  grad.data<float>()[i * dim + j], 1e-5);
+      EXPECT_NEAR(-q / prob / 3, pgrad.data<float>()[i * dim + j],
+                  1e-4 * q / prob);
+    }
+    EXPECT_NEAR(expected_loss, loss.data<float>()[i], 1e-5);
+    EXPECT_NEAR(expected_loss, ploss.data<float>()[i], 1e-5);
+  }
+}
+
+TEST_F(TensorMath, RowDotCuda) {
+  auto dev = std::make_shared<singa::CudaGPU>();
+  // 3 rows of 1500 elements, longer than a block of threads
+  const size_t ncol = 1500;
+  std::vector<float> x(3 * ncol), y(3 * ncol);
+  for (size_t i = 0; i < x.size(); i++) {
+    x[i] = static_cast<float>(i % 7) - 3.0f;
+    y[i] = static_cast<float>(i % 5) - 2.0f;
+  }
+  Tensor a(Shape{3, ncol}, dev), b(Shape{3, ncol}, dev);
+  a.CopyDataFromHostPtr(x.data(), x.size());
+  b.CopyDataFromHostPtr(y.data(), y.size());
+  auto dot = singa::RowDot(a, b);
+  auto norm = singa::RowNorm(a);
+  dot.ToHost();
+  norm.ToHost();
+  for (size_t r = 0; r < 3; r++) {
+    float expected = 0.0f, expected_norm = 0.0f;
+    for (size_t c = r * ncol; c < (r + 1) * ncol; c++) {
+      expected += x[c] * y[c];
+      expected_norm += x[c] * x[c];
+    }
+    EXPECT_FLOAT_EQ(expected, dot.data<float>()[r]);
+    EXPECT_FLOAT_EQ(std::sqrt(expected_norm), norm.data<float>()[r]);
+  }
+}
+
+TEST_F(TensorMath, CoalesceRowsCuda) {
+  auto dev = std::make_shared<singa::CudaGPU>();
+  e.ToDevice(dev);
+  Tensor idx(Shape{3}, dev, singa::kInt);
+  const int idx_dat[3] = {2, 0, 2};
+  idx.CopyDataFromHostPtr<int>(idx_dat, 3);
+  Tensor out_idx(Shape{3}, dev, singa::kInt), out(Shape{3, 2}, dev);
+  singa::CoalesceRows(idx, e, &out_idx, &out);
+  out_idx.ToHost();
+  out.ToHost();
+  const int *outIdxPtr = out_idx.data<int>();
+  const int expected_idx[3] = {2, 0, -1};
+  for (size_t i = 0; i < 3; i++) EXPECT_EQ(expected_idx[i], outIdxPtr[i]);
+  const float *outPtr = out.data<float>();
+  const float expected[6] = {6.0f, 8.0f, 3.0f, 4.0f, 0.0f, 0.0f};
+  for (size_t i = 0; i < 6; i++) EXPECT_FLOAT_EQ(expected[i], outPtr[i]);
+}
+
 TEST_F(TensorMath, CopyColumnsCuda) {
   auto dev = std::make_shared<singa::CudaGPU>();
   a.Reshape(Shape{2, 3});